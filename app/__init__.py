@@ -16,11 +16,15 @@ from .helpers.thread_safe_cache import (
     set_cached_shift_info,
     invalidate_shift_cache
 )
+from .helpers.startup_profiler import StartupProfiler
 
 
 socketio = SocketIO(cors_allowed_origins="*")
 
 def create_app():
+    # Perfil de arranque por etapas (ver /api/system/startup)
+    startup = StartupProfiler()
+
     # Cargar variables de entorno
     # En producción, solo cargar desde variables de entorno del sistema, no desde archivos
     is_cloud_run = bool(os.environ.get('K_SERVICE') or os.environ.get('GAE_ENV') or os.environ.get('CLOUD_RUN_SERVICE'))
@@ -154,6 +158,8 @@ def create_app():
         
         app.logger.info("✅ Validación de variables de entorno completada")
     
+    startup.lap('entorno y logging')
+
     # Configurar CSRF Protection
     csrf = None
     try:
@@ -257,6 +263,8 @@ def create_app():
         @app.context_processor
         def inject_csrf_token():
             return dict(csrf_token=lambda: '')
+    startup.lap('CSRF')
+
     # MODO SOLO LOCAL: No conectarse a servicios externos
     app.config['LOCAL_ONLY'] = os.environ.get('LOCAL_ONLY', 'true').lower() == 'true'
     if app.config['LOCAL_ONLY']:
@@ -342,6 +350,8 @@ def create_app():
             app.logger.error(f"Error al configurar instance_path: {e}", exc_info=True)
             raise
 
+    startup.lap('configuración')
+
     # Configuración de base de datos para BIMBA System
     # Migrado a MySQL - soporta MySQL, PostgreSQL (legacy) y SQLite (desarrollo)
     is_cloud_run = bool(os.environ.get('K_SERVICE') or os.environ.get('GAE_ENV') or os.environ.get('CLOUD_RUN_SERVICE'))
@@ -429,37 +439,46 @@ def create_app():
     app.config['DB_TYPE'] = db_type  # Guardar tipo de BD para uso posterior
     
     # Optimizaciones de conexión según tipo de BD
+    # Pool dimensionado por perfil (Cloud Run / VM / dev), ver helpers/db_pool.py
+    from .helpers.db_pool import build_engine_options
+    engine_options = build_engine_options(db_type, is_cloud_run, is_production)
     if db_type == 'mysql':
-        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-            'pool_pre_ping': True,  # Verificar conexiones antes de usarlas
-            'pool_recycle': 3600,   # Reciclar conexiones cada hora
-            'connect_args': {
-                'charset': 'utf8mb4',
-                'collation': 'utf8mb4_unicode_ci',
-                'autocommit': False,
-            }
+        engine_options['connect_args'] = {
+            'charset': 'utf8mb4',
+            'collation': 'utf8mb4_unicode_ci',
+            'autocommit': False,
         }
     elif db_type == 'postgresql':
         # Configuración legacy para PostgreSQL
-        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-            'pool_pre_ping': True,
-            'pool_recycle': 3600,
-            'connect_args': {
-                'connect_timeout': 5,
-                'options': '-c statement_timeout=10000'
-            }
-        }
-    else:
-        # SQLite - sin opciones especiales
-        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-            'pool_pre_ping': True,
+        engine_options['connect_args'] = {
+            'connect_timeout': 5,
+            'options': '-c statement_timeout=10000'
         }
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+    
+    # Réplica de lectura para reportes y dashboards (helpers/read_replica.py)
+    from .helpers.read_replica import REPLICA_URL, REPLICA_BIND_KEY, replica_engine_options
+    if REPLICA_URL and db_type in ('mysql', 'postgresql'):
+        app.config['SQLALCHEMY_BINDS'] = {REPLICA_BIND_KEY: replica_engine_options(engine_options)}
+        app.logger.info("📖 Réplica de lectura configurada para reportes")
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    startup.lap('URL y pool de base de datos')
+
     # Inicializar SQLAlchemy
     from .models import db
     db.init_app(app)
     
+    # Métricas de tiempo de queries (histogramas, ver /api/system/metrics)
+    from .helpers.metrics import instrument_sqlalchemy
+    instrument_sqlalchemy()
+    
+    # Profiler SQL por request con detección de N+1 (opt-in: SQL_PROFILER_ENABLED)
+    from .helpers.sql_profiler import init_sql_profiler
+    init_sql_profiler(app)
+    
+    startup.lap('SQLAlchemy e instrumentación')
+
     # Después de inicializar la BD, intentar leer configuración guardada
     # Esto permite cambiar la BD dinámicamente (requiere reinicio de app)
     with app.app_context():
@@ -500,6 +519,8 @@ def create_app():
             # Si falla (primera vez, BD no disponible, etc.), continuar con configuración actual
             app.logger.debug(f"No se pudo leer configuración de BD guardada: {e}")
 
+    startup.lap('SystemConfig (modo de BD)')
+
     # Logging de configuración cargada (después de crear la app)
     if not is_production:
         env_path_used = None
@@ -530,6 +551,8 @@ def create_app():
         engineio_logger=False
     )
 
+    startup.lap('SocketIO')
+
     # Obtener prefijo de URL de variables de entorno
     url_prefix = os.environ.get('APPLICATION_ROOT', '')
     
@@ -820,6 +843,8 @@ def create_app():
     # Configuración Kiosko
     app.config['KIOSK_ENABLED'] = os.environ.get('KIOSK_ENABLED', 'true').lower() == 'true'
     
+    startup.lap('blueprints principales')
+
     # Registrar blueprint de Kiosko
     # Crear tablas de la base de datos si no existen (siempre, no solo para kiosko)
     with app.app_context():
@@ -849,6 +874,14 @@ def create_app():
                     app.logger.info("✅ Blueprint de kiosko exento de CSRF")
                 except Exception as exempt_error:
                     app.logger.debug(f"No se pudo eximir blueprint de kiosko de CSRF: {exempt_error}")
+            
+            # Precalentar catálogo de productos en segundo plano (el kiosko nunca espera a la API)
+            try:
+                from .helpers.product_catalog import get_phppos_items
+                with app.app_context():
+                    get_phppos_items()
+            except Exception as warm_error:
+                app.logger.debug(f"No se pudo precalentar catálogo de productos: {warm_error}")
         except ImportError as e:
             app.logger.warning(f"⚠️  No se pudo registrar el blueprint del kiosko: {e}")
         except Exception as e:
@@ -856,6 +889,8 @@ def create_app():
     else:
         app.logger.info("⚠️  Kiosko desactivado")
     
+    startup.lap('create_all y kiosko')
+
     # Registrar blueprint de scanner (barra/bartender)
     try:
         from .routes.scanner_routes import scanner_bp
@@ -876,6 +911,8 @@ def create_app():
     except Exception as e:
         app.logger.error(f"❌ Error al registrar blueprint de turnos de bartender: {e}")
     
+    startup.lap('scanner y turnos')
+
     # Registrar filtros de template personalizados
     from app.helpers.template_filters import format_datetime, format_date, format_time
     app.jinja_env.filters['format_datetime'] = format_datetime
@@ -952,6 +989,8 @@ def create_app():
     except Exception as e:
         app.logger.error(f"❌ Error al registrar blueprint de ecommerce: {e}")
     
+    startup.lap('filtros y ecommerce')
+
     # Registrar blueprint de Caja (POS)
     try:
         from .blueprints.pos import caja_bp
@@ -1007,6 +1046,8 @@ def create_app():
     except Exception as e:
         app.logger.error(f"❌ Error al registrar blueprint de caja: {e}", exc_info=True)
     
+    startup.lap('caja (POS)')
+
     # Error handler global para capturar errores 500 (solo loguea, no maneja)
     # El manejo real se hace en error_handlers.py si está registrado
     # Este handler solo asegura que los errores se logueen correctamente
@@ -1320,6 +1361,8 @@ def create_app():
                 'app_build_info': version_info.get('app_build_info', {})
             }
 
+    startup.lap('error handlers y context processors')
+
     # Registrar eventos de socket
     from .socketio_events import register_socketio_events
     register_socketio_events(socketio)
@@ -1328,7 +1371,18 @@ def create_app():
     if hasattr(socketio, '_start_metrics_thread'):
         socketio._start_metrics_thread(app)
         app.logger.info("✅ Thread de métricas periódicas iniciado")
-    
+
+    # Evaluación periódica de alertas de stock (estado en stock_alert_states)
+    from .helpers.stock_alerts import STOCK_ALERTS_ENABLED, get_stock_alert_engine
+    if STOCK_ALERTS_ENABLED:
+        get_stock_alert_engine().ensure_started(app)
+
+    # Tareas post-commit (outbox_events): workers + barrido de pendientes de otros procesos
+    from .helpers.post_commit import get_post_commit_pipeline
+    get_post_commit_pipeline().ensure_started(app)
+
+    startup.lap('eventos Socket.IO')
+
     # Configuración de Instagram/Meta Webhooks
     app.config['INSTAGRAM_VERIFY_TOKEN'] = os.environ.get('INSTAGRAM_VERIFY_TOKEN')
     app.config['INSTAGRAM_PAGE_ACCESS_TOKEN'] = os.environ.get('INSTAGRAM_PAGE_ACCESS_TOKEN')
@@ -1359,6 +1413,8 @@ def create_app():
         except Exception as e:
             app.logger.debug(f"No se pudo leer configuración n8n desde SystemConfig: {e}")
 
+    startup.lap('integraciones (Instagram/n8n)')
+
     # Registrar filtros personalizados de Jinja2
     @app.template_filter('to_datetime')
     def to_datetime_filter(value):
@@ -1589,4 +1645,7 @@ def create_app():
             
             return None
 
+    startup.lap('filtros y middleware')
+    startup.finish(app)
+
     return app# Version bump Sun Dec  7 02:37:54 -03 2025
@@ -8,7 +8,7 @@ Sistema de 3 capas de inteligencia:
 from typing import Optional, Dict, Any, Tuple
 from app.application.services.programacion_service import ProgramacionService
 from app.application.services.operational_insights_service import OperationalInsightsService
-import re
+from app.application.services.intent_matcher import ENGINE_MATCHER, normalize_message
 
 
 class BimbaBotEngine:
@@ -20,67 +20,18 @@ class BimbaBotEngine:
     @staticmethod
     def _normalize_message(mensaje: str) -> str:
         """Normaliza el mensaje para comparación (lowercase, sin acentos básicos)"""
-        mensaje = mensaje.lower().strip()
-        # Reemplazos básicos de acentos
-        replacements = {
-            'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
-            'ñ': 'n', '¿': '', '?': '', '¡': '', '!': ''
-        }
-        for old, new in replacements.items():
-            mensaje = mensaje.replace(old, new)
-        return mensaje
+        return normalize_message(mensaje)
     
     @staticmethod
     def _detect_intent(mensaje: str) -> Optional[str]:
         """
         Detecta la intención del mensaje para aplicar reglas duras.
+        Usa el clasificador compilado ENGINE_MATCHER (una sola pasada sobre el mensaje).
         
         Returns:
             str: Tipo de intención detectada o None si no hay match
         """
-        normalized = BimbaBotEngine._normalize_message(mensaje)
-        
-        # Patrones para "qué hay hoy" / "evento de hoy"
-        if re.search(r'\b(que|q)\s*(hay|tiene|pasa|sucede|ocurre)\s*(hoy|esta noche|esta nochecita)\b', normalized) or \
-           re.search(r'\bevento\s*(de|del|hoy|esta noche)\b', normalized) or \
-           re.search(r'\b(hay|tiene|tendran)\s*(algo|evento|fiesta|noche)\s*(hoy|esta noche)\b', normalized):
-            return "evento_hoy"
-        
-        # Patrones para "cómo va la noche"
-        if re.search(r'\b(como|como va|como esta|como andamos|como andan)\s*(la noche|la nochecita|la fiesta|el ambiente|todo)\b', normalized) or \
-           re.search(r'\b(como va|como esta|como andamos)\s*(hoy|esta noche|esta nochecita)\b', normalized):
-            return "estado_noche"
-        
-        # Patrones para "próximos eventos"
-        if re.search(r'\b(proximos|siguientes|que viene|que vienen|futuros)\s*(eventos|evento|fiestas|fiesta|noches|noche)\b', normalized) or \
-           re.search(r'\b(que|q)\s*(viene|vienen|sigue|siguen|hay despues)\b', normalized):
-            return "proximos_eventos"
-        
-        # Patrones para "precios"
-        if re.search(r'\b(precio|precios|cuanto|cuanto cuesta|cuanto vale|tarifa|tarifas|entrada|entradas)\b', normalized):
-            return "precios"
-        
-        # Patrones para "horario"
-        if re.search(r'\b(horario|hora|a que hora|desde que hora|hasta que hora|cuando|que hora)\b', normalized):
-            return "horario"
-        
-        # Patrones para "lista"
-        if re.search(r'\b(lista|lista de espera|reserva|reservas|mesa|mesas)\b', normalized):
-            return "lista"
-        
-        # Patrones para "DJ" / "música"
-        if re.search(r'\b(dj|djs|disc jockey|musica|musical|quien toca|quienes tocan)\b', normalized):
-            return "djs"
-        
-        # Patrones para preguntas sobre "cómo funciona"
-        if re.search(r'\b(como funciona|como se|explicame|explica|que es|que significa)\s*(el sistema|un pedido|pedidos|una venta|ventas|ticket|qr|jornada|barra|bartender)\b', normalized):
-            return "como_funciona"
-        
-        # Patrones para saludo genérico
-        if re.search(r'\b(hola|holi|buenas|buenos|saludos|hey|hi|hello)\b', normalized):
-            return "saludo"
-        
-        return None
+        return ENGINE_MATCHER.match(normalize_message(mensaje))
     
     @staticmethod
     def _generate_rule_based_response(intent: str, evento_info: Optional[Dict[str, Any]], 
@@ -0,0 +1,131 @@
+"""
+Intent Matcher - Clasificador de intenciones compilado
+Compila todas las reglas de intención en una sola expresión regular al importar
+el módulo, compartida por IntentRouter y BimbaBotEngine.
+"""
+from typing import Optional, List, Tuple
+import re
+
+
+# Normalización: minúsculas, sin acentos básicos ni signos de pregunta/exclamación
+_NORMALIZE_TABLE = str.maketrans({
+    'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
+    'ñ': 'n', '¿': None, '?': None, '¡': None, '!': None
+})
+
+
+def normalize_message(mensaje: str) -> str:
+    """
+    Normaliza el mensaje para comparación (lowercase, sin acentos básicos).
+
+    Args:
+        mensaje: Mensaje original
+
+    Returns:
+        str: Mensaje normalizado
+    """
+    return mensaje.lower().strip().translate(_NORMALIZE_TABLE)
+
+
+class IntentMatcher:
+    """
+    Clasificador de intenciones en una sola pasada.
+
+    Las reglas se dan en orden de prioridad como (intent, [patrones]). Todas se
+    compilan en una única alternación dentro de un lookahead, de modo que en cada
+    posición del mensaje el motor de regex prueba las reglas en orden de prioridad.
+    Se recorre el mensaje una sola vez y se retorna la regla de mayor prioridad que
+    haya coincidido en cualquier posición (mismo resultado que evaluar las reglas
+    una por una con re.search).
+    """
+
+    def __init__(self, rules: List[Tuple[str, List[str]]]):
+        self.intents: List[str] = []
+        alternativas = []
+        for intent, patterns in rules:
+            for pattern in patterns:
+                alternativas.append(f'(?P<r{len(self.intents)}>{pattern})')
+                self.intents.append(intent)
+        self._prioridad = {f'r{i}': i for i in range(len(self.intents))}
+        self._regex = re.compile('(?=' + '|'.join(alternativas) + ')')
+
+    def match(self, normalized: str) -> Optional[str]:
+        """
+        Retorna la intención de mayor prioridad para un mensaje ya normalizado.
+
+        Args:
+            normalized: Mensaje normalizado con normalize_message()
+
+        Returns:
+            str: Intención detectada o None si ninguna regla coincide
+        """
+        mejor = None
+        for m in self._regex.finditer(normalized):
+            # lastgroup = grupo externo (rN) de la regla que coincidió en esta posición
+            prioridad = self._prioridad[m.lastgroup]
+            if mejor is None or prioridad < mejor:
+                mejor = prioridad
+                if mejor == 0:
+                    break
+        return self.intents[mejor] if mejor is not None else None
+
+    def detect(self, mensaje: str) -> Optional[str]:
+        """Normaliza y clasifica un mensaje"""
+        if not mensaje:
+            return None
+        return self.match(normalize_message(mensaje))
+
+
+# Reglas comunes a ambos motores (en orden de prioridad)
+_COMMON_RULES: List[Tuple[str, List[str]]] = [
+    # "qué hay hoy" / "evento de hoy"
+    ('evento_hoy', [
+        r'\b(que|q)\s*(hay|tiene|pasa|sucede|ocurre)\s*(hoy|esta noche|esta nochecita)\b',
+        r'\bevento\s*(de|del|hoy|esta noche)\b',
+        r'\b(hay|tiene|tendran)\s*(algo|evento|fiesta|noche)\s*(hoy|esta noche)\b',
+    ]),
+    # "cómo va la noche"
+    ('estado_noche', [
+        r'\b(como|como va|como esta|como andamos|como andan)\s*(la noche|la nochecita|la fiesta|el ambiente|todo)\b',
+        r'\b(como va|como esta|como andamos)\s*(hoy|esta noche|esta nochecita)\b',
+    ]),
+    # "próximos eventos"
+    ('proximos_eventos', [
+        r'\b(proximos|siguientes|que viene|que vienen|futuros)\s*(eventos|evento|fiestas|fiesta|noches|noche)\b',
+        r'\b(que|q)\s*(viene|vienen|sigue|siguen|hay despues)\b',
+    ]),
+    ('precios', [
+        r'\b(precio|precios|cuanto|cuanto cuesta|cuanto vale|tarifa|tarifas|entrada|entradas)\b',
+    ]),
+    ('horario', [
+        r'\b(horario|hora|a que hora|desde que hora|hasta que hora|cuando|que hora)\b',
+    ]),
+    ('lista', [
+        r'\b(lista|lista de espera|reserva|reservas|mesa|mesas)\b',
+    ]),
+    # "DJ" / "música"
+    ('djs', [
+        r'\b(dj|djs|disc jockey|musica|musical|quien toca|quienes tocan)\b',
+    ]),
+]
+
+# IntentRouter: "cómo funciona el sistema" y saludos simples anclados al mensaje completo
+ROUTER_MATCHER = IntentMatcher(_COMMON_RULES + [
+    ('como_funciona', [
+        r'\b(como funciona|como es el sistema|como se pide|como se compra|flujo de venta|flujo de pedidos|sistema de tickets|sistema de entregas)\b',
+    ]),
+    ('saludo', [
+        r'^(hola|buenas|que tal|saludos|hi|hello|buenos dias|buenas tardes|buenas noches)\.?$',
+        r'^(hola|buenas|que tal|saludos|hi|hello)\s+(amigo|amiga|amigues|compa|compañero|compañera)\.?$',
+    ]),
+])
+
+# BimbaBotEngine: "cómo funciona" con objeto y saludo en cualquier parte del mensaje
+ENGINE_MATCHER = IntentMatcher(_COMMON_RULES + [
+    ('como_funciona', [
+        r'\b(como funciona|como se|explicame|explica|que es|que significa)\s*(el sistema|un pedido|pedidos|una venta|ventas|ticket|qr|jornada|barra|bartender)\b',
+    ]),
+    ('saludo', [
+        r'\b(hola|holi|buenas|buenos|saludos|hey|hi|hello)\b',
+    ]),
+])
@@ -841,73 +841,32 @@ class InventoryStockService:
     def get_stock_summary(self, location: str) -> Dict[str, Any]:
         """
         Obtiene un resumen del stock de una ubicación.
+        Stock, consumo promedio de 7 días y umbral salen de una sola query agrupada
+        (app/helpers/stock_alerts.compute_stock_levels).
         """
-        stocks = self.get_all_stock_by_location(location)
+        from app.helpers.stock_alerts import compute_stock_levels
+        
+        levels = compute_stock_levels(location=location)
         
         summary = {
             'location': location,
-            'total_ingredients': len(stocks),
+            'total_ingredients': len(levels),
             'ingredients': []
         }
         
-        for stock in stocks:
-            ingredient = stock.ingredient
-            quantity = float(stock.quantity) if stock.quantity else 0.0
-            is_negative = quantity < 0
-            
-            # MEJORA: Calcular si está bajo umbral (usar 10% del promedio de consumo diario como umbral por defecto)
-            is_low = False
-            low_threshold = None
-            
-            if ingredient and not is_negative:
-                # Calcular consumo promedio diario de los últimos 7 días
-                avg_daily_consumption = self._get_average_daily_consumption(
-                    stock.ingredient_id,
-                    location,
-                    days=7
-                )
-                
-                # Umbral: 10% del consumo diario promedio o mínimo 100 unidades
-                low_threshold = max(avg_daily_consumption * 0.1, 100.0)
-                is_low = quantity <= low_threshold
-            
+        for level in levels:
             summary['ingredients'].append({
-                'ingredient_id': stock.ingredient_id,
-                'ingredient_name': ingredient.name if ingredient else '?',
-                'quantity': quantity,
-                'unit': ingredient.base_unit if ingredient else 'ml',
-                'is_negative': is_negative,
-                'is_low': is_low,
-                'low_threshold': low_threshold
+                'ingredient_id': level['ingredient_id'],
+                'ingredient_name': level['ingredient_name'],
+                'quantity': level['quantity'],
+                'unit': level['unit'],
+                'is_negative': level['state'] == 'negative',
+                'is_low': level['state'] == 'low',
+                'low_threshold': level['low_threshold']
             })
         
         return summary
     
-    def _get_average_daily_consumption(
-        self,
-        ingredient_id: int,
-        location: str,
-        days: int = 7
-    ) -> float:
-        """
-        Calcula el consumo promedio diario de un ingrediente en los últimos N días.
-        """
-        try:
-            end_date = datetime.utcnow()
-            start_date = end_date - timedelta(days=days)
-            
-            total_consumption = self.get_theoretical_consumption(
-                ingredient_id=ingredient_id,
-                location=location,
-                start_date=start_date,
-                end_date=end_date
-            )
-            
-            return total_consumption / days if days > 0 else 0.0
-        except Exception as e:
-            current_app.logger.warning(f"Error al calcular consumo promedio: {e}")
-            return 0.0
-    
     def get_low_stock_alerts(
         self,
         location: Optional[str] = None,
@@ -916,6 +875,10 @@ class InventoryStockService:
         """
         MEJORA: Obtiene alertas de stock bajo para una ubicación o todas.
         
+        Lee el último estado guardado por el motor de alertas
+        (app/helpers/stock_alerts.py), que evalúa todas las ubicaciones en
+        segundo plano y notifica solo los cambios de estado.
+        
         Args:
             location: Ubicación específica o None para todas
             include_negative: Incluir ingredientes con stock negativo
@@ -923,47 +886,9 @@ class InventoryStockService:
         Returns:
             Lista de alertas con información detallada
         """
-        alerts = []
-        
-        # Obtener ubicaciones
-        if location:
-            locations = [location]
-        else:
-            # Obtener todas las ubicaciones únicas
-            locations = db.session.query(
-                IngredientStock.location
-            ).distinct().all()
-            locations = [loc[0] for loc in locations]
-        
-        for loc in locations:
-            summary = self.get_stock_summary(loc)
-            
-            for ing in summary['ingredients']:
-                if ing['is_negative'] and include_negative:
-                    alerts.append({
-                        'location': loc,
-                        'ingredient_id': ing['ingredient_id'],
-                        'ingredient_name': ing['ingredient_name'],
-                        'quantity': ing['quantity'],
-                        'unit': ing['unit'],
-                        'type': 'negative',
-                        'severity': 'critical',
-                        'message': f"{ing['ingredient_name']} tiene stock negativo ({ing['quantity']:.2f} {ing['unit']})"
-                    })
-                elif ing.get('is_low', False):
-                    alerts.append({
-                        'location': loc,
-                        'ingredient_id': ing['ingredient_id'],
-                        'ingredient_name': ing['ingredient_name'],
-                        'quantity': ing['quantity'],
-                        'unit': ing['unit'],
-                        'low_threshold': ing.get('low_threshold'),
-                        'type': 'low',
-                        'severity': 'warning',
-                        'message': f"{ing['ingredient_name']} está bajo el umbral mínimo ({ing['quantity']:.2f} {ing['unit']} < {ing.get('low_threshold', 0):.2f} {ing['unit']})"
-                    })
+        from app.helpers.stock_alerts import get_stock_alert_engine
         
-        return alerts
+        return get_stock_alert_engine().get_alerts(location=location, include_negative=include_negative)
     
     def validate_recipe_completeness(self, recipe_id: int) -> Tuple[bool, List[str]]:
         """
@@ -112,93 +112,18 @@ class JornadaService:
             db.session.add(jornada)
             db.session.flush()  # Para obtener el ID sin commit
             
-            # ⭐ COPIAR PROGRAMACIÓN SI EXISTE
+            # ⭐ COPIAR PROGRAMACIÓN SI EXISTE (carga masiva: empleados, planilla existente
+            # y sueldos precargados en una query cada uno, planilla en un solo INSERT)
             try:
-                from app.models.programacion_models import ProgramacionAsignacion
-                from app.models.jornada_models import PlanillaTrabajador
-                from app.models.pos_models import Employee
-                from datetime import datetime
+                from app.application.services.planilla_bulk_service import PlanillaBulkService
                 
-                # Mapear tipo_turno de jornada a tipo_turno de programación
-                tipo_turno_programacion = 'NOCHE' if request.tipo_turno.upper() in ['NOCHE', 'NOCTURNO'] else 'DIA'
-                
-                # Convertir fecha_jornada (string) a date
-                fecha_programacion = datetime.strptime(request.fecha_jornada, '%Y-%m-%d').date()
-                
-                # Buscar asignaciones de programación para esta fecha y tipo de turno
-                asignaciones = ProgramacionAsignacion.query.filter_by(
-                    fecha=fecha_programacion,
-                    tipo_turno=tipo_turno_programacion
-                ).all()
-                
-                if asignaciones:
-                    current_app.logger.info(f"📋 Copiando {len(asignaciones)} asignaciones de programación a la planilla...")
-                    copiados = 0
-                    
-                    for asignacion in asignaciones:
-                        # Verificar que el trabajador existe
-                        trabajador = Employee.query.get(asignacion.trabajador_id)
-                        if not trabajador:
-                            current_app.logger.warning(f"⚠️ Trabajador {asignacion.trabajador_id} de programación no encontrado, saltando...")
-                            continue
-                        
-                        # Verificar que no esté duplicado
-                        existente = PlanillaTrabajador.query.filter_by(
-                            jornada_id=jornada.id,
-                            id_empleado=asignacion.trabajador_id
-                        ).first()
-                        
-                        if existente:
-                            current_app.logger.warning(f"⚠️ Trabajador {trabajador.name} ya está en la planilla, saltando...")
-                            continue
-                        
-                        # Obtener horarios de la jornada
-                        hora_inicio = request.horario_apertura_programado or '22:00'
-                        hora_fin = request.horario_cierre_programado or '05:00'
-                        
-                        # Calcular costo_hora
-                        costo_hora = 0.0
-                        try:
-                            from app.models.cargo_salary_models import CargoSalaryConfig
-                            if asignacion.cargo:
-                                config_cargo = CargoSalaryConfig.query.filter_by(cargo=asignacion.cargo.nombre).first()
-                                if config_cargo and config_cargo.sueldo_por_turno:
-                                    from datetime import datetime as dt
-                                    inicio = dt.strptime(hora_inicio, '%H:%M')
-                                    fin = dt.strptime(hora_fin, '%H:%M')
-                                    if fin < inicio:
-                                        fin = fin.replace(day=fin.day + 1)
-                                    diferencia = fin - inicio
-                                    horas_turno = diferencia.total_seconds() / 3600.0
-                                    costo_hora = float(config_cargo.sueldo_por_turno) / horas_turno if horas_turno > 0 else 0.0
-                        except Exception as e:
-                            current_app.logger.warning(f"Error calculando costo_hora: {e}")
-                        
-                        # Crear entrada en planilla desde programación
-                        planilla_trabajador = PlanillaTrabajador(
-                            jornada_id=jornada.id,
-                            id_empleado=str(asignacion.trabajador_id).strip(),
-                            nombre_empleado=trabajador.name or f'Empleado {asignacion.trabajador_id}',
-                            rol=asignacion.cargo.nombre.upper() if asignacion.cargo else 'SIN CARGO',
-                            hora_inicio=hora_inicio,
-                            hora_fin=hora_fin,
-                            costo_hora=float(costo_hora) if costo_hora else 0.0,
-                            area=asignacion.cargo.nombre.upper() if asignacion.cargo else 'SIN CARGO',
-                            cargo_id=asignacion.cargo_id,
-                            origen='programacion'  # ⭐ Marcar como origen programación
-                        )
-                        
-                        # Calcular costo total y pago
-                        planilla_trabajador.calcular_costo_total()
-                        planilla_trabajador.calcular_y_congelar_pago(
-                            cargo_nombre=asignacion.cargo.nombre if asignacion.cargo else None
-                        )
-                        
-                        db.session.add(planilla_trabajador)
-                        copiados += 1
-                    
-                    if copiados > 0:
-                        current_app.logger.info(f"✅ {copiados} trabajador(es) copiado(s) desde programación")
+                PlanillaBulkService().materializar_planilla_desde_programacion(
+                    jornada,
+                    fecha=request.fecha_jornada,
+                    tipo_turno=request.tipo_turno,
+                    hora_inicio=request.horario_apertura_programado or '22:00',
+                    hora_fin=request.horario_cierre_programado or '05:00'
+                )
             except Exception as e:
                 current_app.logger.warning(f"⚠️ Error al copiar programación (continuando): {e}", exc_info=True)
                 # No fallar la creación de jornada si falla la copia de programación
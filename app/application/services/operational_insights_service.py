@@ -7,6 +7,10 @@ import requests
 from typing import Optional, Dict, Any
 from flask import current_app
 
+from app.helpers.thread_safe_cache import ThreadSafeCache
+
+_event_context_cache = ThreadSafeCache(default_ttl=60)
+
 
 class OperationalInsightsService:
     """Servicio para obtener datos operativos internos"""
@@ -85,4 +89,29 @@ class OperationalInsightsService:
         except Exception:
             return None
 
-
+    @staticmethod
+    def get_event_context_key() -> str:
+        """
+        Clave del contexto de evento actual (jornada abierta o fecha de Chile).
+        Las respuestas cacheadas del bot se acotan a esta clave: al abrir otra
+        jornada o cambiar de día se descartan.
+        Se memoriza 60 segundos para no consultar la BD en cada mensaje.
+        """
+        cached = _event_context_cache.get('event_context')
+        if cached:
+            return cached
+        
+        from app.helpers.timezone_utils import get_chile_time
+        context_key = get_chile_time().strftime('%Y-%m-%d')
+        try:
+            from app.models.jornada_models import Jornada
+            jornada = Jornada.query.filter_by(estado_apertura='abierto').order_by(
+                Jornada.fecha_jornada.desc()
+            ).first()
+            if jornada:
+                context_key = f"jornada-{jornada.id}-{jornada.fecha_jornada}"
+        except Exception:
+            pass  # Sin contexto de app o BD no disponible: usar la fecha
+        
+        _event_context_cache.set('event_context', context_key)
+        return context_key
@@ -0,0 +1,264 @@
+"""
+Servicio de Aplicación: Carga masiva de planilla
+Materializa la planilla de una jornada (apertura) y los turnos de empleados
+(cierre) con un número fijo de queries, sin importar la cantidad de trabajadores.
+"""
+from typing import Dict, Any, List, Optional, Set, Iterable
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+import pytz
+
+from app.models import db
+from app.helpers.timezone_utils import CHILE_TZ
+from app.models.jornada_models import Jornada, PlanillaTrabajador
+
+
+def _horas_entre(hora_inicio: str, hora_fin: str) -> float:
+    """Horas entre dos strings HH:MM (maneja turnos que cruzan medianoche)"""
+    inicio = datetime.strptime(str(hora_inicio).strip(), '%H:%M')
+    fin = datetime.strptime(str(hora_fin).strip(), '%H:%M')
+    if fin < inicio:
+        fin += timedelta(days=1)
+    return (fin - inicio).total_seconds() / 3600.0
+
+
+def _columnas(instancia) -> Dict[str, Any]:
+    """Extrae los valores de columnas de una instancia transitoria para un INSERT masivo"""
+    valores = {}
+    for columna in instancia.__table__.columns:
+        if columna.primary_key:
+            continue
+        valor = getattr(instancia, columna.key, None)
+        if valor is not None:
+            valores[columna.key] = valor
+    return valores
+
+
+class PlanillaBulkService:
+    """
+    Motor de carga masiva para planilla y turnos.
+
+    Apertura: precarga empleados, planilla existente y configuraciones de sueldo
+    (una query cada una) e inserta la planilla con un único INSERT masivo.
+    Cierre: crea los EmployeeShift de toda la planilla con el mismo enfoque.
+    """
+
+    def _cargar_configs_sueldo(self, cargos: Iterable[str]) -> Dict[str, Any]:
+        """Carga las configuraciones de sueldo de todos los cargos en una query"""
+        from app.models.cargo_salary_models import CargoSalaryConfig
+
+        nombres = {c for c in cargos if c}
+        if not nombres:
+            return {}
+        configs = CargoSalaryConfig.query.filter(CargoSalaryConfig.cargo.in_(nombres)).all()
+        return {config.cargo: config for config in configs}
+
+    def materializar_planilla_desde_programacion(
+        self,
+        jornada: Jornada,
+        fecha: str,
+        tipo_turno: str,
+        hora_inicio: str,
+        hora_fin: str
+    ) -> int:
+        """
+        Copia las asignaciones de programación a la planilla de la jornada.
+
+        Args:
+            jornada: Jornada ya persistida (con ID)
+            fecha: Fecha de la jornada (YYYY-MM-DD)
+            tipo_turno: Tipo de turno de la jornada ("Noche", "Día", ...)
+            hora_inicio: Hora de inicio de la planilla (HH:MM)
+            hora_fin: Hora de fin de la planilla (HH:MM)
+
+        Returns:
+            int: Cantidad de trabajadores insertados
+        """
+        from app.models.programacion_models import ProgramacionAsignacion
+        from app.models.pos_models import Employee
+
+        # Mapear tipo_turno de jornada a tipo_turno de programación
+        tipo_turno_programacion = 'NOCHE' if tipo_turno.upper() in ['NOCHE', 'NOCTURNO'] else 'DIA'
+        fecha_programacion = datetime.strptime(fecha, '%Y-%m-%d').date()
+
+        # 1. Asignaciones con su cargo (JOIN, sin lazy load por fila)
+        asignaciones = ProgramacionAsignacion.query.options(
+            joinedload(ProgramacionAsignacion.cargo)
+        ).filter_by(
+            fecha=fecha_programacion,
+            tipo_turno=tipo_turno_programacion
+        ).all()
+
+        if not asignaciones:
+            return 0
+
+        current_app.logger.info(f"📋 Copiando {len(asignaciones)} asignaciones de programación a la planilla...")
+
+        # 2. Empleados en una query
+        ids_trabajadores = {str(a.trabajador_id).strip() for a in asignaciones}
+        empleados = {
+            str(e.id): e for e in Employee.query.filter(Employee.id.in_(ids_trabajadores)).all()
+        }
+
+        # 3. Planilla existente en una query
+        existentes: Set[str] = {
+            str(fila.id_empleado).strip() for fila in db.session.query(PlanillaTrabajador.id_empleado).filter_by(
+                jornada_id=jornada.id
+            )
+        }
+
+        # 4. Configuraciones de sueldo en una query
+        configs = self._cargar_configs_sueldo(a.cargo.nombre for a in asignaciones if a.cargo)
+
+        try:
+            horas_turno = _horas_entre(hora_inicio, hora_fin)
+        except ValueError as e:
+            current_app.logger.warning(f"Error calculando horas del turno: {e}")
+            horas_turno = 0.0
+
+        filas: List[Dict[str, Any]] = []
+        for asignacion in asignaciones:
+            id_empleado = str(asignacion.trabajador_id).strip()
+            trabajador = empleados.get(id_empleado)
+            if not trabajador:
+                current_app.logger.warning(f"⚠️ Trabajador {asignacion.trabajador_id} de programación no encontrado, saltando...")
+                continue
+
+            if id_empleado in existentes:
+                current_app.logger.warning(f"⚠️ Trabajador {trabajador.name} ya está en la planilla, saltando...")
+                continue
+            existentes.add(id_empleado)
+
+            cargo_nombre = asignacion.cargo.nombre if asignacion.cargo else None
+            config_cargo = configs.get(cargo_nombre) if cargo_nombre else None
+
+            # Calcular costo_hora desde el sueldo por turno del cargo
+            costo_hora = 0.0
+            if config_cargo and config_cargo.sueldo_por_turno and horas_turno > 0:
+                costo_hora = float(config_cargo.sueldo_por_turno) / horas_turno
+
+            planilla_trabajador = PlanillaTrabajador(
+                jornada_id=jornada.id,
+                id_empleado=id_empleado,
+                nombre_empleado=trabajador.name or f'Empleado {asignacion.trabajador_id}',
+                rol=cargo_nombre.upper() if cargo_nombre else 'SIN CARGO',
+                hora_inicio=hora_inicio,
+                hora_fin=hora_fin,
+                costo_hora=costo_hora,
+                area=cargo_nombre.upper() if cargo_nombre else 'SIN CARGO',
+                cargo_id=asignacion.cargo_id,
+                origen='programacion',  # ⭐ Marcar como origen programación
+                override=False
+            )
+            planilla_trabajador.calcular_costo_total()
+
+            if config_cargo:
+                planilla_trabajador.congelar_pago_desde_config(config_cargo, cargo_id=asignacion.cargo_id)
+            elif cargo_nombre:
+                current_app.logger.warning(f"⚠️ No se encontró configuración de sueldo para cargo '{cargo_nombre}'. Pago no congelado.")
+
+            filas.append(_columnas(planilla_trabajador))
+
+        # 5. Un único INSERT masivo
+        if filas:
+            db.session.execute(insert(PlanillaTrabajador), filas)
+            current_app.logger.info(f"✅ {len(filas)} trabajador(es) copiado(s) desde programación")
+
+        return len(filas)
+
+    def _rango_turno(self, fecha: str, hora_inicio: str, hora_fin: str) -> Optional[tuple]:
+        """
+        Convierte fecha + horas HH:MM (hora de Chile) a datetimes UTC naive,
+        como los guarda EmployeeShift.
+        """
+        try:
+            inicio_local = datetime.strptime(f"{fecha} {str(hora_inicio).strip()}", '%Y-%m-%d %H:%M')
+            fin_local = datetime.strptime(f"{fecha} {str(hora_fin).strip()}", '%Y-%m-%d %H:%M')
+        except ValueError:
+            return None
+        if fin_local < inicio_local:
+            fin_local += timedelta(days=1)
+        inicio_utc = CHILE_TZ.localize(inicio_local).astimezone(pytz.UTC).replace(tzinfo=None)
+        fin_utc = CHILE_TZ.localize(fin_local).astimezone(pytz.UTC).replace(tzinfo=None)
+        return inicio_utc, fin_utc
+
+    def materializar_turnos_cierre(self, jornada: Jornada, estado: str = 'completo') -> int:
+        """
+        Crea los EmployeeShift de toda la planilla al cerrar la jornada.
+        Es idempotente: los trabajadores que ya tienen turno en la jornada se saltan.
+
+        Args:
+            jornada: Jornada que se está cerrando
+            estado: Estado con el que se registran los turnos
+
+        Returns:
+            int: Cantidad de turnos creados
+        """
+        from app.models.employee_shift_models import EmployeeShift
+
+        # 1. Planilla actual en una query
+        planilla = PlanillaTrabajador.query.filter_by(jornada_id=jornada.id).all()
+        if not planilla:
+            return 0
+
+        # 2. Turnos ya registrados en una query
+        ya_registrados: Set[str] = {
+            str(fila.employee_id) for fila in db.session.query(EmployeeShift.employee_id).filter_by(
+                jornada_id=jornada.id
+            )
+        }
+
+        # 3. Configuraciones de sueldo solo para filas sin snapshot congelado
+        configs = self._cargar_configs_sueldo(
+            t.rol for t in planilla if t.pago_total is None
+        )
+
+        filas: List[Dict[str, Any]] = []
+        for trabajador in planilla:
+            employee_id = str(trabajador.id_empleado).strip()
+            if employee_id in ya_registrados:
+                continue
+            ya_registrados.add(employee_id)
+
+            rango = self._rango_turno(jornada.fecha_jornada, trabajador.hora_inicio, trabajador.hora_fin)
+            if not rango:
+                current_app.logger.warning(f"⚠️ Horario inválido para {trabajador.nombre_empleado}, turno no registrado")
+                continue
+            hora_inicio, hora_fin = rango
+
+            if trabajador.pago_total is not None:
+                sueldo_base = float(trabajador.sueldo_snapshot or 0)
+                bonos = float(trabajador.bono_snapshot or 0)
+                sueldo_turno = float(trabajador.pago_total)
+            else:
+                config_cargo = configs.get(trabajador.rol)
+                sueldo_base = float(config_cargo.sueldo_por_turno or 0) if config_cargo else 0.0
+                bonos = float(config_cargo.bono_fijo or 0) if config_cargo else 0.0
+                sueldo_turno = sueldo_base + bonos
+
+            filas.append({
+                'employee_id': employee_id,
+                'employee_name': trabajador.nombre_empleado,
+                'jornada_id': jornada.id,
+                'fecha_turno': jornada.fecha_jornada,
+                'tipo_turno': jornada.tipo_turno,
+                'cargo': trabajador.rol,
+                'hora_inicio': hora_inicio,
+                'hora_fin': hora_fin,
+                'horas_trabajadas': round((hora_fin - hora_inicio).total_seconds() / 3600.0, 2),
+                'sueldo_por_turno': sueldo_base,
+                'sueldo_turno': round(sueldo_turno, 2),
+                'bonos': bonos,
+                'descuentos': 0.0,
+                'estado': estado,
+                'pagado': False
+            })
+
+        # 4. Un único INSERT masivo
+        if filas:
+            db.session.execute(insert(EmployeeShift), filas)
+            current_app.logger.info(f"💰 {len(filas)} turno(s) registrado(s) para jornada {jornada.id}")
+
+        return len(filas)
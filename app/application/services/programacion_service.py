@@ -9,6 +9,7 @@ from flask import current_app
 from app.models import db
 from app.helpers.timezone_utils import CHILE_TZ
 from app.models.programacion_models import ProgramacionEvento
+from app.helpers.public_event_snapshots import refresh_after_commit
 
 
 class ProgramacionService:
@@ -226,6 +227,8 @@ class ProgramacionService:
             evento.creado_por = creado_por
             
             db.session.add(evento)
+            # Regenerar info pública materializada tras el commit
+            refresh_after_commit(evento.fecha)
             db.session.commit()
             
             current_app.logger.info(f"✅ Evento creado: {evento.nombre_evento} ({evento.fecha})")
@@ -252,6 +255,7 @@ class ProgramacionService:
             evento = ProgramacionEvento.query.get(evento_id)
             if not evento:
                 return None
+            fecha_anterior = evento.fecha
             
             # Actualizar campos básicos
             if 'fecha' in datos:
@@ -326,6 +330,8 @@ class ProgramacionService:
             evento.actualizado_por = actualizado_por
             evento.actualizado_en = datetime.utcnow()
             
+            # Regenerar info pública materializada tras el commit (fecha anterior y nueva)
+            refresh_after_commit(fecha_anterior, evento.fecha)
             db.session.commit()
             
             current_app.logger.info(f"✅ Evento actualizado: {evento.nombre_evento} ({evento.fecha})")
@@ -7,6 +7,7 @@ from typing import Dict, Any, List, Tuple, Optional
 from datetime import datetime, timedelta
 from collections import Counter, defaultdict
 from flask import current_app
+from app.helpers.read_replica import read_only
 
 from app.infrastructure.repositories.delivery_repository import DeliveryRepository, CsvDeliveryRepository
 from app.infrastructure.repositories.shift_repository import ShiftRepository, JsonShiftRepository
@@ -145,6 +146,7 @@ class StatsService:
             self._item_categorias_cache[item_name] = None
             return None
     
+    @read_only
     def get_delivery_stats_for_shift(self, shift) -> Dict[str, Any]:
         """
         Obtiene estadísticas de entregas para un turno específico.
@@ -272,6 +274,7 @@ class StatsService:
             'avg_per_hour': avg_per_hour
         }
     
+    @read_only
     def get_delivery_stats(
         self,
         start_date: Optional[str] = None,
@@ -469,6 +472,7 @@ class StatsService:
             'is_slow_hour': is_slow_hour
         }
     
+    @read_only
     def get_shift_stats(self, shift_date: str) -> Optional[Dict[str, Any]]:
         """
         Obtiene estadísticas de un turno específico.
@@ -531,6 +535,7 @@ class StatsService:
             'shift_info': shift_info
         }
     
+    @read_only
     def get_shifts_history_stats(self, limit: int = 30) -> List[Dict[str, Any]]:
         """
         Obtiene estadísticas de turnos cerrados.
@@ -637,6 +642,7 @@ class StatsService:
                 'has_data': False
             }
     
+    @read_only
     def get_survey_stats(
         self,
         session_date: Optional[str] = None,
@@ -698,6 +704,7 @@ class StatsService:
             'barra_stats': dict(barra_stats)
         }
     
+    @read_only
     def get_cashiers_and_registers_stats_from_log_for_shift(self, shift) -> Dict[str, Any]:
         """
         Obtiene estadísticas de cajeros y cajas desde el log local para un turno específico (NO consulta API).
@@ -817,6 +824,7 @@ class StatsService:
                 'top_registers_by_amount': []
             }
     
+    @read_only
     def get_cashiers_and_registers_stats(self, limit: int = 5000) -> Dict[str, Any]:
         """
         Obtiene estadísticas de cajeros y cajas.
@@ -933,6 +941,7 @@ class StatsService:
                 'top_registers_by_amount': []
             }
     
+    @read_only
     def get_entradas_stats_from_log_for_shift(self, shift) -> Dict[str, Any]:
         """
         Obtiene estadísticas de entradas desde el log local para un turno específico.
@@ -1133,6 +1142,7 @@ class StatsService:
                 'last_7_days_labels': []
             }
     
+    @read_only
     def get_entradas_stats_from_log(self) -> Dict[str, Any]:
         """
         Obtiene estadísticas de entradas desde el log local (NO consulta API).
@@ -1284,6 +1294,7 @@ class StatsService:
                 'last_7_days_labels': []
             }
     
+    @read_only
     def get_entradas_stats(self, limit: int = 1000) -> Dict[str, Any]:
         """
         Obtiene estadísticas de entradas vendidas.
@@ -1439,6 +1450,7 @@ class StatsService:
                     'last_7_days_labels': []
                 }
     
+    @read_only
     def get_rankings_from_closes(
         self,
         period_type: str = 'week',  # 'day', 'week', 'month'
@@ -1580,6 +1592,7 @@ class StatsService:
             'total_closes': len(closes)
         }
     
+    @read_only
     def get_weekly_rankings(
         self,
         week_start_date: Optional[str] = None
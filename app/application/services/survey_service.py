@@ -12,6 +12,9 @@ from app.infrastructure.repositories.survey_repository import SurveyRepository,
 from app.infrastructure.repositories.shift_repository import ShiftRepository, JsonShiftRepository
 from app.application.services.shift_service import ShiftService
 
+# Respuestas recientes que acompañan a los agregados en /encuesta/api/results
+RECENT_RESPONSES_LIMIT = 50
+
 
 class SurveyService:
     """
@@ -166,15 +169,9 @@ class SurveyService:
                 # Si está cerrada, no actualizar
                 pass
         
-        # Actualizar estadísticas de sesión
-        all_responses = self.survey_repository.find_responses_by_session_date(session_date)
-        session.total_respuestas = len(all_responses)
-        
-        if all_responses:
-            total_rating = sum(r.rating for r in all_responses)
-            session.promedio_rating = round(total_rating / len(all_responses), 2)
-        else:
-            session.promedio_rating = 0.0
+        # Actualizar estadísticas de sesión desde los agregados (sin recorrer respuestas)
+        aggregates = self.survey_repository.find_session_aggregates(session_date)
+        self._apply_session_totals(session, aggregates)
         
         self.survey_repository.save_session(session)
         
@@ -190,6 +187,16 @@ class SurveyService:
                 'timestamp': response.timestamp
             }
             self.event_publisher.emit_survey_response_created(response_dict)
+            
+            # Push de los resultados agregados a los dashboards (/encuesta)
+            if hasattr(self.event_publisher, 'emit_survey_stats_update'):
+                try:
+                    recent = self.survey_repository.find_recent_responses(session_date, limit=RECENT_RESPONSES_LIMIT)
+                    self.event_publisher.emit_survey_stats_update(
+                        self._build_results(aggregates, recent, session_info, session_date)
+                    )
+                except Exception as e:
+                    current_app.logger.warning(f"Error emitiendo evento de estadísticas: {e}")
         
         current_app.logger.info(
             f"Respuesta de encuesta guardada: Barra {response.barra}, Rating {response.rating}"
@@ -246,14 +253,7 @@ class SurveyService:
         session.close()
         
         # Recalcular estadísticas finales
-        responses = self.survey_repository.find_responses_by_session_date(session_date)
-        session.total_respuestas = len(responses)
-        
-        if responses:
-            total_rating = sum(r.rating for r in responses)
-            session.promedio_rating = round(total_rating / len(responses), 2)
-        else:
-            session.promedio_rating = 0.0
+        self._apply_session_totals(session, self.survey_repository.find_session_aggregates(session_date))
         
         # Guardar sesión cerrada
         if not self.survey_repository.save_session(session):
@@ -316,116 +316,83 @@ class SurveyService:
         """
         Obtiene resultados de encuestas para la sesión activa actual.
         
+        Lee los agregados por (barra, hora) de la sesión y las últimas
+        respuestas con LIMIT: el costo no crece con las respuestas de la noche.
+        
         Args:
             barra: Opcional, filtrar por barra ('1' o '2')
             
         Returns:
             Dict[str, Any]: Estadísticas de encuestas para la sesión activa
         """
-        from collections import Counter, defaultdict
+        empty = self._build_results([], [], None, None)
         
         # Verificar si hay turno abierto
         shift_status = self.shift_service.get_current_shift_status()
         if not shift_status.is_open:
             # Si no hay turno abierto, retornar datos vacíos
-            return {
-                'total': 0,
-                'average_rating': 0.0,
-                'ratings_count': {},
-                'by_barra': {},
-                'by_hour': {},
-                'recent_responses': [],
-                'session_info': None,
-                'session_date': None
-            }
+            return empty
         
         # Obtener información de la sesión activa
         session_info = self.get_active_session_info()
         if not session_info:
-            return {
-                'total': 0,
-                'average_rating': 0.0,
-                'ratings_count': {},
-                'by_barra': {},
-                'by_hour': {},
-                'recent_responses': [],
-                'session_info': None,
-                'session_date': None
-            }
+            return empty
         
         session_date = session_info.get('fecha_sesion') or self._get_current_session_date()
-        hora_inicio_str = session_info.get('hora_inicio', '00:00:00')
-        
-        # Ensure hora_inicio_str is just the time part if it's an ISO datetime
-        if 'T' in hora_inicio_str and len(hora_inicio_str) > 10:
-            hora_inicio_str = hora_inicio_str[11:19]  # Extract HH:MM:SS
-        elif len(hora_inicio_str) > 8:  # If it's a full datetime string without 'T'
-            hora_inicio_str = hora_inicio_str[11:19]
-        
-        # Filter responses by session date
-        all_responses = self.survey_repository.find_responses_by_session_date(session_date)
         
-        # If barra filter is applied, filter here
+        aggregates = self.survey_repository.find_session_aggregates(session_date)
         if barra:
-            all_responses = [r for r in all_responses if r.barra == str(barra)]
+            aggregates = [cell for cell in aggregates if cell['barra'] == str(barra)]
+        recent = self.survey_repository.find_recent_responses(
+            session_date, limit=RECENT_RESPONSES_LIMIT, barra=barra
+        )
         
-        # Filter only responses created AFTER session start
-        responses = []
-        try:
-            # Ensure hora_inicio_str is in HH:MM:SS format
-            if len(hora_inicio_str) == 5:  # HH:MM
-                hora_inicio_str = hora_inicio_str + ':00'  # Convert to HH:MM:SS
-            elif len(hora_inicio_str) < 5:
-                hora_inicio_str = '00:00:00'
-            
-            session_start_datetime = datetime.strptime(
-                f"{session_date} {hora_inicio_str}",
-                '%Y-%m-%d %H:%M:%S'
-            )
-            
-            for r in all_responses:
-                try:
-                    response_datetime = datetime.strptime(r.timestamp, '%Y-%m-%d %H:%M:%S')
-                    if response_datetime >= session_start_datetime:
-                        responses.append(r)
-                except ValueError:
-                    current_app.logger.warning(f"Could not parse timestamp for survey response: {r.timestamp}")
-                    pass
-        except ValueError as e:
-            current_app.logger.error(f"Error parsing session start time for survey results: {e} with date {session_date} and time {hora_inicio_str}")
-            responses = []  # Fallback to no responses if session start time is invalid
-        
-        total = len(responses)
-        ratings = [r.rating for r in responses]
-        
-        # Calcular estadísticas por hora
-        hour_counts = Counter()
-        for r in responses:
-            try:
-                response_hour = datetime.strptime(r.timestamp, '%Y-%m-%d %H:%M:%S').hour
-                hour_counts[response_hour] += 1
-            except (ValueError, AttributeError):
-                pass  # Skip invalid timestamps
-        
-        stats = {
+        return self._build_results(aggregates, recent, session_info, session_date)
+    
+    def _build_results(
+        self,
+        aggregates: List[Dict[str, Any]],
+        recent: List[SurveyResponse],
+        session_info: Optional[Dict[str, Any]],
+        session_date: Optional[str]
+    ) -> Dict[str, Any]:
+        """Pliega las celdas (barra, hora) en el payload de /encuesta/api/results"""
+        total = 0
+        sum_rating = 0
+        ratings_count: Dict[int, int] = {}
+        by_barra: Dict[str, int] = {}
+        sum_by_barra: Dict[str, int] = {}
+        by_hour: Dict[int, int] = {}
+        for cell in aggregates:
+            total += cell['total']
+            sum_rating += cell['sum_rating']
+            by_barra[cell['barra']] = by_barra.get(cell['barra'], 0) + cell['total']
+            sum_by_barra[cell['barra']] = sum_by_barra.get(cell['barra'], 0) + cell['sum_rating']
+            by_hour[cell['hora']] = by_hour.get(cell['hora'], 0) + cell['total']
+            for rating, count in cell['ratings'].items():
+                if count:
+                    ratings_count[rating] = ratings_count.get(rating, 0) + count
+        
+        return {
             'total': total,
-            'average_rating': sum(ratings) / len(ratings) if ratings else 0.0,
-            'ratings_count': dict(Counter(ratings)),
-            'by_barra': dict(Counter([r.barra for r in responses])),
-            'by_hour': dict(hour_counts),
-            'recent_responses': [self._response_to_dict(r) for r in responses[-50:]] if responses else [],
+            'average_rating': sum_rating / total if total else 0.0,
+            'ratings_count': ratings_count,
+            'by_barra': by_barra,
+            'average_by_barra': {
+                b: round(sum_by_barra[b] / n, 2) for b, n in by_barra.items() if n
+            },
+            'by_hour': by_hour,
+            'recent_responses': [self._response_to_dict(r) for r in recent],
             'session_info': session_info,
             'session_date': session_date
         }
-        
-        # Emit event for real-time updates (if publisher supports it)
-        if self.event_publisher and hasattr(self.event_publisher, 'emit_survey_stats_update'):
-            try:
-                self.event_publisher.emit_survey_stats_update(stats)
-            except Exception as e:
-                current_app.logger.warning(f"Error emitiendo evento de estadísticas: {e}")
-        
-        return stats
+    
+    @staticmethod
+    def _apply_session_totals(session: SurveySession, aggregates: List[Dict[str, Any]]) -> None:
+        """Actualiza total_respuestas y promedio_rating de la sesión desde los agregados"""
+        total = sum(cell['total'] for cell in aggregates)
+        session.total_respuestas = total
+        session.promedio_rating = round(sum(cell['sum_rating'] for cell in aggregates) / total, 2) if total else 0.0
     
     def _response_to_dict(self, response: SurveyResponse) -> Dict[str, Any]:
         """Convierte una SurveyResponse a diccionario para JSON"""
@@ -10,6 +10,7 @@ from decimal import Decimal
 
 from app.models import db, RegisterClose, PosSale, PosSaleItem
 from app.infrastructure.clients.pos_api_client import PhpPosApiClient
+from app.helpers.read_replica import read_only
 
 
 class TurnReviewService:
@@ -27,6 +28,7 @@ class TurnReviewService:
         """
         self.pos_client = pos_client or PhpPosApiClient()
     
+    @read_only
     def get_turn_review_summary(self, shift_date: Optional[str] = None) -> Dict[str, Any]:
         """
         Obtiene un resumen consolidado del turno para revisión.
@@ -151,6 +153,7 @@ class TurnReviewService:
                 'error': str(e)
             }
     
+    @read_only
     def get_turn_rankings(self, shift_date: Optional[str] = None) -> Dict[str, Any]:
         """
         Obtiene rankings del turno (vendedores, productos, cajas).
@@ -320,6 +323,7 @@ class TurnReviewService:
                 'error': str(e)
             }
     
+    @read_only
     def get_stock_analysis(self, shift_date: Optional[str] = None) -> Dict[str, Any]:
         """
         Obtiene análisis de stock del turno (productos vendidos).
@@ -289,6 +289,10 @@ def bot_config():
         openai_timeout = 5.0  # Definido en el código
         operational_timeout = 2.0  # Definido en operational_insights_service
         
+        # Métricas de la cache de respuestas de OpenAI
+        from app.infrastructure.external.openai_response_cache import get_openai_response_cache
+        response_cache_stats = get_openai_response_cache().stats()
+        
         # Información de reglas e intents
         from app.application.services.intent_router import IntentRouter
         intents_available = [
@@ -315,6 +319,7 @@ def bot_config():
                 'temperature': openai_temperature,
                 'timeout': openai_timeout,
             },
+            'response_cache': response_cache_stats,
             'operational': {
                 'enabled': operational_enabled,
                 'api_base': operational_api_base if is_superadmin else None,
@@ -656,3 +661,27 @@ def bot_env_vars_update():
         }), 500
 
 
+@admin_bp.route('/bot/cache-stats', methods=['GET'])
+def bot_cache_stats():
+    """
+    Métricas de la cache de respuestas de OpenAI (hit rate, coalescencia, latencia).
+    """
+    if not session.get('admin_logged_in'):
+        return jsonify({'success': False, 'message': 'No autorizado'}), 401
+    
+    from app.infrastructure.external.openai_response_cache import get_openai_response_cache
+    return jsonify({'success': True, 'stats': get_openai_response_cache().stats()})
+
+
+@admin_bp.route('/bot/cache-clear', methods=['POST'])
+def bot_cache_clear():
+    """
+    Descarta las respuestas cacheadas (p. ej. tras corregir la programación del día).
+    """
+    if not session.get('admin_logged_in'):
+        return jsonify({'success': False, 'message': 'No autorizado'}), 401
+    
+    from app.infrastructure.external.openai_response_cache import get_openai_response_cache
+    get_openai_response_cache().clear()
+    current_app.logger.info(f"Cache de respuestas del bot limpiada por {session.get('admin_username')}")
+    return jsonify({'success': True, 'message': 'Cache de respuestas limpiada'})
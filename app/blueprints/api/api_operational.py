@@ -10,6 +10,7 @@ from app.models import db
 from app.models.pos_models import PosSale, PosSaleItem
 from app.models.delivery_models import Delivery, FraudAttempt
 from app.helpers.timezone_utils import CHILE_TZ
+from app.helpers.read_replica import read_only
 
 operational_api = Blueprint("operational_api", __name__, url_prefix="/api/v1/operational")
 
@@ -70,6 +71,7 @@ def parse_date(date_str):
 
 
 @operational_api.route('/sales/summary', methods=['GET'])
+@read_only
 def sales_summary():
     """
     Endpoint: Resumen de ventas del día
@@ -149,6 +151,7 @@ def sales_summary():
 
 
 @operational_api.route('/products/ranking', methods=['GET'])
+@read_only
 def products_ranking():
     """
     Endpoint: Ranking de productos del día
@@ -209,6 +212,7 @@ def products_ranking():
 
 
 @operational_api.route('/deliveries/summary', methods=['GET'])
+@read_only
 def deliveries_summary():
     """
     Endpoint: Resumen de entregas y bartenders
@@ -274,6 +278,7 @@ def deliveries_summary():
 
 
 @operational_api.route('/leaks/today', methods=['GET'])
+@read_only
 def leaks_today():
     """
     Endpoint: Fugas / Inconsistencias antifraude del día
@@ -343,6 +348,7 @@ def leaks_today():
 
 
 @operational_api.route('/summary', methods=['GET'])
+@read_only
 def operational_summary():
     """
     Endpoint: Estado operativo del día (resumen global)
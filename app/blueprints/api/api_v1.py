@@ -6,6 +6,9 @@ from app.application.services.programacion_service import ProgramacionService
 from app.infrastructure.external.openai_client import OpenAIAPIClient
 from app.infrastructure.external.dialogflow_client import DialogflowAPIClient
 from app.helpers.simple_rate_limiter import check_rate_limit
+from app.helpers.public_event_snapshots import (
+    get_public_event_snapshots, public_json_response, fecha_key, upcoming_key, hoy
+)
 
 api_v1 = Blueprint('api_v1', __name__, url_prefix='/api/v1')
 
@@ -26,19 +29,19 @@ def public_evento_hoy():
         }), 429
     
     try:
-        service = ProgramacionService()
-        evento_info = service.get_public_info_for_today()
+        snapshot = get_public_event_snapshots().get(fecha_key(hoy()))
+        evento_info = snapshot['payload']
         
         if not evento_info:
-            return jsonify({
+            return public_json_response(snapshot, {
                 "status": "no_event",
                 "evento": None
-            }), 200
+            })
         
-        return jsonify({
+        return public_json_response(snapshot, {
             "status": "ok",
             "evento": evento_info
-        }), 200
+        })
         
     except Exception as e:
         current_app.logger.error(f"Error en /api/v1/public/evento/hoy: {e}", exc_info=True)
@@ -66,13 +69,14 @@ def public_eventos_proximos():
     try:
         limit = request.args.get('limit', type=int) or 10
         
-        service = ProgramacionService()
-        eventos = service.get_upcoming_events(limit=limit)
+        # Materializados hasta UPCOMING_MAX eventos
+        snapshot = get_public_event_snapshots().get(upcoming_key())
+        eventos = snapshot['payload'][:max(limit, 0)]
         
-        return jsonify({
+        return public_json_response(snapshot, {
             "status": "ok",
             "eventos": eventos
-        }), 200
+        })
         
     except Exception as e:
         current_app.logger.error(f"Error en /api/v1/public/eventos/proximos: {e}", exc_info=True)
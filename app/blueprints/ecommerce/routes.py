@@ -24,7 +24,6 @@ try:
 except ImportError:
     create_getnet_payment_placetopay = None
 from app.helpers.rut_validator import validate_rut, format_rut, clean_rut
-from app.helpers.email_ticket_helper import send_ticket_email
 
 logger = logging.getLogger(__name__)
 
@@ -180,21 +179,13 @@ def landing():
             checkout_session.estado = 'completado'
             checkout_session.completed_at = datetime.utcnow()
             checkout_session.entrada_id = entrada.id
-            db.session.commit()
-            
-            # Enviar email de bienvenida al comprador (con QR y link de pago)
-            try:
-                from app.helpers.email_ticket_helper import send_resumen_compra_email
-                send_resumen_compra_email(entrada)
-                logger.info(f"Email de bienvenida enviado a {comprador_email}")
-            except Exception as email_error:
-                logger.warning(f"No se pudo enviar email de bienvenida: {email_error}")
             
-            # También enviar notificación al admin
-            try:
-                send_ticket_email(entrada)
-            except Exception as email_error:
-                logger.warning(f"No se pudo enviar email de notificación al admin: {email_error}")
+            # Emails (bienvenida al comprador con QR y link de pago + notificación al admin):
+            # se encolan en esta transacción y se envían después del commit
+            from app.helpers.outbox_channels import send_email_after_commit
+            send_email_after_commit('resumen_compra', entrada.id)
+            send_email_after_commit('ticket_admin', entrada.id)
+            db.session.commit()
             
             # Redirigir a confirmación
             return redirect(url_for('ecommerce.confirmation', ticket_code=entrada.ticket_code))
@@ -713,22 +704,13 @@ def _process_approved_payment(checkout_session: CheckoutSession, payment_status:
         checkout_session.estado = 'completado'
         checkout_session.completed_at = datetime.utcnow()
         checkout_session.entrada_id = entrada.id
-        db.session.commit()
-        
-        # Enviar email de bienvenida al comprador (con QR y link de pago)
-        try:
-            from app.helpers.email_ticket_helper import send_resumen_compra_email
-            send_resumen_compra_email(entrada)
-            logger.info(f"Email de bienvenida enviado a {entrada.comprador_email}")
-        except Exception as email_error:
-            logger.warning(f"No se pudo enviar email de bienvenida: {email_error}")
         
-        # También enviar notificación al admin
-        try:
-            from app.helpers.email_ticket_helper import send_ticket_email
-            send_ticket_email(entrada)
-        except Exception as email_error:
-            logger.warning(f"No se pudo enviar email de notificación al admin: {email_error}")
+        # Emails (bienvenida al comprador con QR y link de pago + notificación al admin):
+        # se encolan en esta transacción y se envían después del commit
+        from app.helpers.outbox_channels import send_email_after_commit
+        send_email_after_commit('resumen_compra', entrada.id)
+        send_email_after_commit('ticket_admin', entrada.id)
+        db.session.commit()
         
         # Redirigir a confirmación
         return redirect(url_for('ecommerce.confirmation', ticket_code=entrada.ticket_code))
@@ -4,6 +4,7 @@ Rutas para la gestión de Guardarropía
 from flask import render_template, request, redirect, session, url_for, flash, jsonify
 from flask import current_app
 from datetime import datetime
+import uuid
 from sqlalchemy import not_
 from app.application.services.service_factory import get_guardarropia_service
 from app.application.dto.guardarropia_dto import (
@@ -12,6 +13,7 @@ from app.application.dto.guardarropia_dto import (
     MarkLostRequest
 )
 from app.helpers.logger import get_logger
+from app.helpers.idempotency_helper import idempotent
 from app.helpers.pos_api import authenticate_employee
 from app.helpers.puesto_validator import puede_abrir_puesto, obtener_empleados_habilitados_para_puesto
 from app.helpers.session_manager import init_session
@@ -378,9 +380,11 @@ def confirmar_pago():
             flash("Debes seleccionar un método de pago", "error")
             return redirect(url_for('guardarropia.pos'))
         
-        # Mostrar página de confirmación
+        # Mostrar página de confirmación (la key evita depositar dos veces si
+        # el formulario se reenvía por doble click o recarga)
         return render_template(
             'guardarropia/confirmar_pago.html',
+            idempotency_key=uuid.uuid4().hex,
             customer_name=customer_name,
             customer_phone=customer_phone,
             description=description,
@@ -396,7 +400,13 @@ def confirmar_pago():
         return redirect(url_for('guardarropia.pos'))
 
 
+def _deposito_exitoso(response) -> bool:
+    """Solo se guarda la redirección al ticket (los errores redirigen al POS con flash)"""
+    return response.status_code == 302 and '/ticket/' in (response.location or '')
+
+
 @guardarropia_bp.route('/depositar', methods=['GET', 'POST'])
+@idempotent('guardarropia.deposit', success=_deposito_exitoso)
 def depositar():
     """Depositar una prenda en guardarropía (después de confirmar pago)"""
     # Permitir acceso a administradores, cajeros y empleados de guardarropía
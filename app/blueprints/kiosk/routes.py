@@ -8,9 +8,8 @@ import os
 from decimal import Decimal
 import io
 import base64
-import barcode
-from barcode.writer import ImageWriter
-import qrcode
+
+from ...helpers.startup_profiler import lazy_module
 
 from ...models import db
 from ...models.kiosk_models import Pago, PagoItem
@@ -18,6 +17,11 @@ from ...infrastructure.external.phppos_kiosk_client import PHPPosKioskClient
 from ...infrastructure.external.sumup_client import SumUpClient
 from . import kiosk_bp
 
+# Códigos de barra/QR del ticket: se cargan al generar el primer ticket
+barcode = lazy_module('barcode', 'Kiosko')
+barcode_writer = lazy_module('barcode.writer', 'Kiosko')
+qrcode = lazy_module('qrcode', 'Kiosko')
+
 logger = logging.getLogger(__name__)
 
 # Decorador para eximir funciones de CSRF (para webhooks)
@@ -40,30 +44,33 @@ def get_sumup_client():
     """Obtiene instancia del cliente SumUp"""
     return SumUpClient()
 
-# Cache de productos (se actualiza periódicamente)
+# Productos transformados por versión del catálogo compartido
 _productos_cache = None
-_productos_cache_time = None
-CACHE_DURATION = 300  # 5 minutos
+_productos_cache_version = None
 
 
 def get_productos():
-    """Obtiene lista de productos desde PHP POS API"""
-    global _productos_cache, _productos_cache_time
-    
-    # Verificar si el cache es válido
-    if _productos_cache and _productos_cache_time:
-        if datetime.now() - _productos_cache_time < timedelta(seconds=CACHE_DURATION):
-            logger.debug("Usando productos desde cache")
-            return _productos_cache
+    """
+    Obtiene lista de productos desde el catálogo compartido de PHP POS.
+    Nunca espera a la API: el catálogo se refresca en segundo plano y, si
+    aún no hay snapshot, se usa la lista de respaldo.
+    """
+    global _productos_cache, _productos_cache_version
     
     try:
-        phppos_client = get_phppos_client()
-        items = phppos_client.get_items(limit=1000)
+        from app.helpers.product_catalog import get_product_catalog, get_phppos_items
+        items = get_phppos_items()
+        version = get_product_catalog().version
         
         if not items:
-            logger.warning("No se obtuvieron productos desde PHP POS. Usando lista de respaldo.")
+            logger.warning("Catálogo de PHP POS aún sin productos. Usando lista de respaldo.")
             return _get_productos_fallback()
         
+        # Reutilizar la transformación mientras no cambie el snapshot
+        if _productos_cache is not None and _productos_cache_version == version:
+            logger.debug("Usando productos desde cache")
+            return _productos_cache
+        
         # Transformar items de PHP POS al formato esperado por el frontend
         productos = []
         for item in items:
@@ -95,11 +102,10 @@ def get_productos():
                     'categoria': categoria
                 })
         
-        # Actualizar cache (global ya declarado al inicio de la función)
         _productos_cache = productos
-        _productos_cache_time = datetime.now()
+        _productos_cache_version = version
         
-        logger.info(f"✅ Obtenidos {len(productos)} productos desde PHP POS")
+        logger.info(f"✅ {len(productos)} productos del catálogo PHP POS (versión {version})")
         return productos
         
     except Exception as e:
@@ -301,7 +307,7 @@ def get_ticket_barcode(ticket_code):
         logger.debug(f"Generando código de barras: '{barcode_text}' para ticket '{ticket_code}'")
         
         code128 = barcode.get_barcode_class('code128')
-        barcode_instance = code128(barcode_text, writer=ImageWriter())
+        barcode_instance = code128(barcode_text, writer=barcode_writer.ImageWriter())
         
         img_buffer = io.BytesIO()
         barcode_instance.write(img_buffer)
@@ -316,6 +322,37 @@ def get_ticket_barcode(ticket_code):
         return jsonify({'error': f'Error al generar código de barras: {str(e)}'}), 500
 
 
+# ============================================================================
+# PUSH DE ESTADO DE PAGO (Socket.IO /kiosk)
+# ============================================================================
+
+def pago_room(pago_id) -> str:
+    """Nombre de la sala Socket.IO de un pago"""
+    return f"pago_{pago_id}"
+
+
+def pago_status_payload(pago: Pago) -> dict:
+    """Payload de estado de pago (mismo formato que /api/pagos/status)"""
+    return {
+        'ok': True,
+        'pago_id': pago.id,
+        'estado': pago.estado,
+        'ticket_code': pago.ticket_code
+    }
+
+
+def _emit_pago_status(pago: Pago):
+    """
+    Empuja el estado actual del pago a los tótems suscritos a su sala.
+    Se llama desde webhook/callback justo después de cada commit de estado.
+    """
+    try:
+        from app import socketio
+        socketio.emit('pago_status', pago_status_payload(pago), room=pago_room(pago.id), namespace='/kiosk')
+    except Exception as e:
+        logger.warning(f"No se pudo emitir estado de pago {pago.id}: {e}")
+
+
 # ============================================================================
 # API ENDPOINTS
 # ============================================================================
@@ -324,7 +361,10 @@ def get_ticket_barcode(ticket_code):
 
 @kiosk_bp.route('/api/pagos/status', methods=['GET'])
 def api_pago_status():
-    """Obtiene el estado de un pago"""
+    """
+    Obtiene el estado de un pago.
+    Solo se usa como respaldo cuando el tótem no tiene conexión Socket.IO.
+    """
     try:
         pago_id = request.args.get('pago_id')
         if not pago_id:
@@ -332,11 +372,7 @@ def api_pago_status():
         
         pago = Pago.query.get_or_404(int(pago_id))
         
-        return jsonify({
-            'ok': True,
-            'estado': pago.estado,
-            'ticket_code': pago.ticket_code
-        })
+        return jsonify(pago_status_payload(pago))
         
     except Exception as e:
         logger.error(f"Error al obtener estado de pago: {e}")
@@ -528,6 +564,7 @@ def sumup_payment_callback(pago_id):
             # Pago aprobado
             pago.estado = 'PAID'
             db.session.commit()
+            _emit_pago_status(pago)
             
             # Sincronizar con PHP POS
             _sync_pago_to_phppos(pago)
@@ -538,6 +575,7 @@ def sumup_payment_callback(pago_id):
             # Pago rechazado o expirado
             pago.estado = 'FAILED'
             db.session.commit()
+            _emit_pago_status(pago)
             return redirect(url_for('kiosk.kiosk_checkout'))
         else:
             # Estado pendiente
@@ -581,6 +619,7 @@ def sumup_webhook():
             # Pago exitoso
             pago.estado = 'PAID'
             db.session.commit()
+            _emit_pago_status(pago)
             
             # Sincronizar con PHP POS
             _sync_pago_to_phppos(pago)
@@ -590,6 +629,7 @@ def sumup_webhook():
             # Pago fallido o expirado
             pago.estado = 'FAILED'
             db.session.commit()
+            _emit_pago_status(pago)
             logger.info(f"⚠️ Pago marcado como FAILED vía webhook: pago_id={pago.id}, checkout_id={checkout_id}")
         
         return jsonify({'ok': True})
@@ -637,6 +677,8 @@ def _sync_pago_to_phppos(pago: Pago):
                     pago.ticket_code = generate_ticket_code()
             
             db.session.commit()
+            # Segundo push: el tótem ya tiene el ticket_code definitivo
+            _emit_pago_status(pago)
             logger.info(f"✅ Pago {pago.id} sincronizado con PHP POS: sale_id={sale_id}")
         else:
             logger.error(f"Error al sincronizar pago {pago.id} con PHP POS: {sale_result.get('error')}")
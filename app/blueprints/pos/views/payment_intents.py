@@ -10,6 +10,8 @@ from app.blueprints.pos import caja_bp
 from app.models import db
 from app.models.pos_models import PaymentIntent, PosSale, PosSaleItem, PosRegister, PaymentAgent
 from app.helpers.rate_limiter import rate_limit
+from app.helpers.metrics import track_endpoint
+from app.helpers.idempotency_helper import idempotent
 from app.helpers.sale_security_validator import comprehensive_sale_validation
 from app.helpers.register_session_service import RegisterSessionService
 from app.helpers.financial_utils import to_decimal, round_currency
@@ -51,11 +53,16 @@ def verify_agent_auth() -> bool:
 
 
 @caja_bp.route('/api/payment/intents', methods=['POST'])
+@track_endpoint('payment_intents.create')
 @rate_limit(max_requests=30, window_seconds=60)
+@idempotent('pos.payment_intent')
 def create_payment_intent():
     """
     Crear PaymentIntent con status READY
     
+    Header opcional Idempotency-Key: un reintento con la misma clave recibe
+    el mismo intent_id sin crear otro PaymentIntent.
+    
     Body esperado:
     {
         "register_id": "1",
@@ -107,8 +114,11 @@ def create_payment_intent():
         employee_name = session.get('pos_employee_name', 'Cajero')
         register_session_id = session.get('pos_register_session_id')
         
-        # Obtener carrito del body o de la sesión
-        cart = data.get('cart') or session.get('pos_cart', [])
+        # Obtener carrito del body o el de la caja
+        cart = data.get('cart')
+        if not cart:
+            from app.helpers.pos_cart_store import get_cart_store, current_cart_key
+            cart = get_cart_store().get(current_cart_key())
         cart_json = None
         cart_hash = None
         if cart:
@@ -159,6 +169,7 @@ def create_payment_intent():
 
 
 @caja_bp.route('/api/payment/intents/<uuid:intent_id>/cancel', methods=['POST'])
+@track_endpoint('payment_intents.cancel')
 @rate_limit(max_requests=10, window_seconds=60)
 def cancel_payment_intent(intent_id):
     """Cancelar PaymentIntent si aún no está APPROVED"""
@@ -203,6 +214,7 @@ def cancel_payment_intent(intent_id):
 
 
 @caja_bp.route('/api/payment/intents/<uuid:intent_id>/status', methods=['GET'])
+@track_endpoint('payment_intents.status')
 @rate_limit(max_requests=60, window_seconds=60)
 def get_payment_intent_status(intent_id):
     """Obtener estado de PaymentIntent (para polling desde UI)"""
@@ -325,6 +337,7 @@ def _process_agent_result_payload(data: dict):
 
 
 @caja_bp.route('/api/payment/intents/<uuid:intent_id>', methods=['GET'])
+@track_endpoint('payment_intents.get')
 @rate_limit(max_requests=60, window_seconds=60)
 def get_payment_intent(intent_id):
     """
@@ -336,6 +349,7 @@ def get_payment_intent(intent_id):
 
 
 @caja_bp.route('/api/payment/agent/pending', methods=['GET'])
+@track_endpoint('payment_agent.pending')
 @rate_limit(max_requests=120, window_seconds=60)  # Aumentado para permitir polling cada 0.5s
 def agent_get_pending():
     """
@@ -402,6 +416,7 @@ def agent_get_pending():
 
 
 @caja_bp.route('/api/payment/agent/result', methods=['POST'])
+@track_endpoint('payment_agent.result')
 @rate_limit(max_requests=30, window_seconds=60)
 def agent_report_result():
     """
@@ -537,6 +552,7 @@ def getnet_result_compat():
 
 
 @caja_bp.route('/api/payment/agent/heartbeat', methods=['POST'])
+@track_endpoint('payment_agent.heartbeat')
 @rate_limit(max_requests=60, window_seconds=60)
 def agent_heartbeat():
     """
@@ -14,8 +14,9 @@ from app.helpers.register_lock_db import (
 from app.helpers.shift_manager_compat import get_shift_status, close_shift as close_shift_helper
 from app.helpers.register_close_db import save_register_close
 from app.helpers.sale_security_validator import validate_session_active, validate_cart_before_close
-from app.helpers.idempotency_helper import generate_close_idempotency_key
+from app.helpers.idempotency_helper import generate_close_idempotency_key, idempotent, bind_idempotency_key
 from app.helpers.register_session_service import RegisterSessionService
+from app.helpers.pos_cart_store import get_cart_store, current_cart_key
 from app.helpers.sos_drawer_helper import (
     save_sos_request, can_request_drawer, _get_sos_file_path
 )
@@ -250,38 +251,24 @@ def register():
                 try:
                     current_employee_id_str = str(employee_id) if employee_id else None
                     
-                    # Excluir ventas de test y canceladas al verificar acceso
-                    previous_sales = PosSale.query.filter(
-                        PosSale.register_id == str(register_id),
-                        PosSale.shift_date == shift_date,
-                        PosSale.is_test == False,
-                        PosSale.is_cancelled == False
-                    ).all()
+                    # Excluir ventas de test y canceladas al verificar acceso (una query agrupada)
+                    totals = RegisterSessionService.get_sales_totals(register_id, shift_date)
                     
-                    previous_sales_count = len(previous_sales)
-                    # CORRECCIÓN: Usar Decimal para suma de montos
-                    from app.helpers.financial_utils import to_decimal, round_currency
-                    previous_sales_total = round_currency(
-                        sum(to_decimal(sale.total_amount or 0) for sale in previous_sales)
-                    ) if previous_sales else 0.0
+                    previous_sales_count = totals['non_test']['count']
+                    previous_sales_total = round_currency(to_decimal(totals['non_test']['total'])) if previous_sales_count else 0.0
                     
                     # Verificar si hay ventas de otro cajero (excluyendo ventas de test y canceladas)
-                    if previous_sales:
-                        for sale in previous_sales:
-                            # Ignorar ventas de test y canceladas
-                            if sale.is_test or (hasattr(sale, 'is_cancelled') and sale.is_cancelled):
-                                continue
-                            
-                            # Ignorar ventas de TEST AGENT o empleados de prueba
-                            sale_employee_name = (sale.employee_name or '').upper()
-                            if 'TEST' in sale_employee_name or 'AGENT' in sale_employee_name:
-                                continue
-                            
-                            sale_employee_id = str(sale.employee_id) if sale.employee_id else None
-                            if sale_employee_id and sale_employee_id != current_employee_id_str:
-                                has_other_employee_sales = True
-                                other_employee_name = sale.employee_name
-                                break
+                    for seller in totals['employees']:
+                        # Ignorar ventas de TEST AGENT o empleados de prueba
+                        seller_name = (seller['employee_name'] or '').upper()
+                        if 'TEST' in seller_name or 'AGENT' in seller_name:
+                            continue
+                        
+                        seller_id = str(seller['employee_id']) if seller['employee_id'] else None
+                        if seller_id and seller_id != current_employee_id_str:
+                            has_other_employee_sales = True
+                            other_employee_name = seller['employee_name']
+                            break
                     
                     if has_other_employee_sales:
                         flash(f"Esta caja tiene ventas de {other_employee_name}. No puedes acceder.", "error")
@@ -554,7 +541,11 @@ def api_register_summary():
         except Exception as e:
             logger.debug(f"No se pudo obtener locked_at del bloqueo para resumen: {e}")
         
-        # P0-006, P0-016: Obtener ventas locales EXCLUYENDO cortesía, prueba y no_revenue
+        # P0-006, P0-016: Totales EXCLUYENDO canceladas, cortesía, prueba y no_revenue.
+        # Se suman payment_cash/debit/credit (una venta puede tener varios métodos) en SQL
+        totals = RegisterSessionService.get_sales_totals(register_id, shift_date)['billable']
+        
+        # Solo las primeras 50 ventas para el detalle (sin cargar el turno completo)
         register_sales = PosSale.query.filter_by(
             register_id=str(register_id),
             shift_date=shift_date
@@ -563,28 +554,22 @@ def api_register_summary():
             PosSale.no_revenue == False,  # P0-016: Excluir no revenue
             PosSale.is_courtesy == False,  # P0-006: Excluir cortesías
             PosSale.is_test == False  # P0-006: Excluir pruebas
-        ).all()
-        
-        # Usar los campos específicos de pago (payment_cash, payment_debit, payment_credit)
-        # en lugar de payment_type, ya que una venta puede tener múltiples métodos de pago
-        total_cash = sum(float(s.payment_cash or 0) for s in register_sales)
-        total_debit = sum(float(s.payment_debit or 0) for s in register_sales)
-        total_credit = sum(float(s.payment_credit or 0) for s in register_sales)
+        ).order_by(PosSale.id).limit(50).all()
         
         return jsonify({
             'success': True,
             'summary': {
-                'total_sales': len(register_sales),
-                'total_cash': total_cash,
-                'total_debit': total_debit,
-                'total_credit': total_credit,
-                'total_amount': total_cash + total_debit + total_credit,
+                'total_sales': totals['count'],
+                'total_cash': totals['cash'],
+                'total_debit': totals['debit'],
+                'total_credit': totals['credit'],
+                'total_amount': totals['total'],
                 'register_name': session.get('pos_register_name', 'Caja'),
                 'employee_name': session.get('pos_employee_name', 'Cajero'),
                 'shift_date': shift_date,
                 'opened_at': opened_at  # Ahora es el momento en que el trabajador abrió esta caja
             },
-            'sales': [s.to_dict() for s in register_sales[:50]] # Simplificado
+            'sales': [s.to_dict() for s in register_sales] # Simplificado
         })
     except Exception as e:
         logger.error(f"Error al obtener resumen de caja: {e}")
@@ -592,6 +577,7 @@ def api_register_summary():
 
 
 @caja_bp.route('/api/close-register', methods=['POST'])
+@idempotent('pos.close')
 def api_close_register():
     """API: Procesar cierre de caja"""
     if not session.get('pos_logged_in'):
@@ -602,7 +588,7 @@ def api_close_register():
         if not is_valid:
             return jsonify({'success': False, 'error': error}), 401
         
-        cart = session.get('pos_cart', [])
+        cart = get_cart_store().get(current_cart_key())
         is_valid, error = validate_cart_before_close(cart)
         if not is_valid:
             return jsonify({'success': False, 'error': error}), 400
@@ -619,7 +605,12 @@ def api_close_register():
         shift_date = active_session.shift_date
         idempotency_key_close = generate_close_idempotency_key(register_id, shift_date, employee_id)
         
-        # Verificar si ya existe cierre con esta key
+        # Si ya existe cierre con esta key, retornar la respuesta guardada
+        replay = bind_idempotency_key(idempotency_key_close)
+        if replay is not None:
+            return replay
+        
+        # Respaldo si no quedó respuesta guardada (p. ej. falló el almacén tras el commit)
         from app.models.pos_models import RegisterClose
         existing_close = RegisterClose.query.filter_by(
             register_id=register_id,
@@ -629,7 +620,6 @@ def api_close_register():
         ).first()
         
         if existing_close:
-            # Retornar cierre existente (idempotencia)
             logger.info(f"✅ Cierre duplicado detectado (idempotencia), retornando cierre existente: {existing_close.id}")
             return jsonify({
                 'success': True,
@@ -883,9 +873,9 @@ def api_close_register():
             logger.warning(f"⚠️ No se pudo desbloquear la caja {register_id} después del cierre.")
         
         # Limpiar sesión de caja pero mantener login
+        get_cart_store().clear(current_cart_key())
         session.pop('pos_register_id', None)
         session.pop('pos_register_name', None)
-        session.pop('pos_cart', None)
         
         # Emitir evento socket
         socketio.emit('register_closed', {
@@ -1231,31 +1221,21 @@ def session_close():
             return redirect(url_for('caja.session_close'))
     
     # GET: Mostrar formulario de cierre
-    # Obtener resumen de ventas para mostrar
-    from app.models.pos_models import PosSale
-    from sqlalchemy import func
-    
-    sales_summary = db.session.query(
-        func.count(PosSale.id).label('total_sales'),
-        func.sum(PosSale.payment_cash).label('total_cash'),
-        func.sum(PosSale.payment_debit).label('total_debit'),
-        func.sum(PosSale.payment_credit).label('total_credit')
-    ).filter_by(
-        register_id=register_session.register_id,
-        shift_date=register_session.shift_date
-    ).filter(
-        PosSale.is_cancelled == False,
-        PosSale.no_revenue == False
-    ).first()
+    # Resumen con la misma query (y ventana de la sesión) que usa close_session al cerrar
+    revenue = RegisterSessionService.get_sales_totals(
+        register_session.register_id,
+        register_session.shift_date,
+        since=register_session.opened_at
+    )['revenue']
     
     summary = {
-        'total_sales': sales_summary.total_sales or 0,
-        'total_cash': float(sales_summary.total_cash or 0),
-        'total_debit': float(sales_summary.total_debit or 0),
-        'total_credit': float(sales_summary.total_credit or 0),
-        'total_amount': float((sales_summary.total_cash or 0) + (sales_summary.total_debit or 0) + (sales_summary.total_credit or 0)),
+        'total_sales': revenue['count'],
+        'total_cash': revenue['cash'],
+        'total_debit': revenue['debit'],
+        'total_credit': revenue['credit'],
+        'total_amount': revenue['cash'] + revenue['debit'] + revenue['credit'],
         'initial_cash': float(register_session.initial_cash or 0),
-        'expected_cash': float((register_session.initial_cash or 0) + (sales_summary.total_cash or 0))
+        'expected_cash': float(register_session.initial_cash or 0) + revenue['cash']
     }
     
     return render_template('caja/session/close.html', register_session=register_session, register=register, summary=summary)
@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 import uuid
 from decimal import ROUND_HALF_UP
 from flask import render_template, request, jsonify, session, redirect, url_for, flash, current_app, send_file, send_from_directory
+from sqlalchemy.exc import IntegrityError
 from app.utils.timezone import CHILE_TZ
 from app.blueprints.pos import caja_bp
 from app.blueprints.pos.services import pos_service
@@ -11,6 +12,7 @@ from app.infrastructure.services.ticket_printer_service import TicketPrinterServ
 from app.models import PosSale, PosSaleItem, RegisterClose, db
 from app.models.pos_models import PaymentIntent
 from app.helpers.rate_limiter import rate_limit
+from app.helpers.metrics import track_endpoint
 from app.helpers.sale_security_validator import (
     validate_session_active, comprehensive_sale_validation,
     validate_payment_type, validate_quantities_reasonable, MAX_QUANTITY_PER_ITEM
@@ -19,12 +21,12 @@ from app.helpers.sale_audit_logger import SaleAuditLogger
 from app.helpers.session_manager import update_session_activity
 from app.helpers.shift_manager_compat import get_shift_status
 from app.helpers.register_lock_db import is_register_locked, get_register_lock
-from app.infrastructure.external.phppos_kiosk_client import PHPPosKioskClient
 from app.application.services.service_factory import get_shift_service
 from app import socketio
 from app.helpers.financial_utils import to_decimal, round_currency, safe_float
 from app.helpers.register_session_service import RegisterSessionService
-from app.helpers.idempotency_helper import generate_sale_idempotency_key
+from app.helpers.idempotency_helper import generate_sale_idempotency_key, idempotent, bind_idempotency_key
+from app.helpers.pos_cart_store import get_cart_store, current_cart_key
 from app.models.jornada_models import Jornada
 
 logger = logging.getLogger(__name__)
@@ -120,8 +122,9 @@ def sales():
     # Si el cajero es David Y no hay restricciones de caja, también obtener items normales de ENTRADAS (legacy)
     if is_david and not normalized_allowed:
         try:
-            php_pos_client = PHPPosKioskClient()
-            normal_items = php_pos_client.get_items(limit=1000)
+            # Catálogo compartido con el kiosko (no espera a la API de PHP POS)
+            from app.helpers.product_catalog import get_phppos_items
+            normal_items = [dict(item) for item in get_phppos_items()]
             
             # Normalizar y agregar items normales que sean de ENTRADAS
             for item in normal_items:
@@ -258,8 +261,8 @@ def sales():
     # Log para debugging
     logger.info(f"✅ Productos categorizados: {len(categorized_products_dict)} categorías, {sum(len(prods) for prods in categorized_products_dict.values())} productos totales")
     
-    # Obtener carrito de la sesión
-    cart = session.get('pos_cart', [])
+    # Obtener carrito de la caja
+    cart = get_cart_store().get(current_cart_key())
     
     # Asegurar que los subtotales del carrito sean números
     for item in cart:
@@ -350,7 +353,12 @@ def sales():
 
 @caja_bp.route('/api/cart/add', methods=['POST'])
 def api_add_to_cart():
-    """API: Agregar producto al carrito con validaciones de seguridad"""
+    """
+    API: Agregar productos al carrito.
+    Acepta un item ({item_id, quantity}) o un lote ({items: [{item_id, quantity, name, price}, ...]}).
+    Precio y disponibilidad se validan en lote al crear la venta; aquí solo se
+    consultan (en una query) los productos que llegan sin nombre/precio.
+    """
     if not session.get('pos_logged_in'):
         return jsonify({'success': False, 'error': 'No autenticado'}), 401
     
@@ -360,93 +368,52 @@ def api_add_to_cart():
         if not is_valid:
             return jsonify({'success': False, 'error': error}), 401
         
-        data = request.get_json()
-        item_id = data.get('item_id')
-        quantity = int(data.get('quantity', 1))
-        
-        if not item_id:
-            return jsonify({'success': False, 'error': 'item_id requerido'}), 400
-        
-        # Validar cantidad razonable
-        if quantity <= 0:
-            return jsonify({'success': False, 'error': 'La cantidad debe ser mayor a 0'}), 400
-        
-        if quantity > MAX_QUANTITY_PER_ITEM:
-            return jsonify({
-                'success': False,
-                'error': f'Cantidad excesiva. Máximo permitido: {MAX_QUANTITY_PER_ITEM}'
-            }), 400
-        
-        # Obtener información del producto desde PHP POS
-        # Puede ser un item normal o un item kit
-        product = pos_service.get_product(item_id)
-        is_kit = False
-        
-        if not product:
-            # Intentar buscar como item kit
-            product = pos_service.get_item_kit(item_id)
-            is_kit = product is not None
-        
-        if not product:
-            return jsonify({'success': False, 'error': 'Producto no encontrado'}), 404
-        
-        # Obtener precio
-        price = float(product.get('unit_price', 0) or product.get('price', 0))
-        
-        # DEBUG: Log el precio obtenido del backend
-        logger.info(f"🔍 DEBUG api_add_to_cart - precio obtenido: item_id={item_id}, price={price}, product={product.get('name', 'unknown')}")
-        
-        # Normalizar ID y determinar si es kit
-        if 'item_kit_id' in product:
-            product_id = str(product['item_kit_id'])
-            product['item_id'] = product_id  # Para compatibilidad
-            is_kit = True
-        else:
-            product_id = str(product.get('item_id', item_id))
-            is_kit = False
-        
-        # Obtener carrito actual
-        cart = session.get('pos_cart', [])
-        
-        # Verificar si el producto ya está en el carrito - normalizar IDs para comparación
-        item_found = False
-        item_id_str = str(item_id) if item_id else None
-        product_id_str = str(product_id) if product_id else None
+        data = request.get_json() or {}
+        requested = data.get('items') if isinstance(data.get('items'), list) else [data]
         
-        for item in cart:
-            item_cart_id = str(item.get('item_id', '')) if item.get('item_id') else None
-            # Comparar ambos IDs normalizados
-            if (item_cart_id and item_cart_id == item_id_str) or (item_cart_id and item_cart_id == product_id_str):
-                item['quantity'] += quantity
-                # Usar el precio que ya tiene el item si existe, sino usar el precio del backend
-                existing_price = item.get('price') or item.get('unit_price')
-                current_price = existing_price if existing_price and existing_price > 0 else price
-                
-                # DEBUG: Log el precio que se está usando
-                if existing_price and existing_price != price:
-                    logger.info(f"🔍 DEBUG api_add_to_cart - usando precio existente: item_id={item_id}, existing_price={existing_price}, backend_price={price}")
-                
-                item['price'] = current_price
-                item['unit_price'] = current_price  # Mantener sincronizado
-                item['subtotal'] = item['quantity'] * current_price
-                item_found = True
-                break
-        
-        # Si no está, agregarlo
-        if not item_found:
-            cart.append({
-                'item_id': product_id,  # Usar el ID normalizado
-                'name': product.get('name', 'Producto'),
+        lines = []
+        for entry in requested:
+            item_id = entry.get('item_id')
+            if not item_id:
+                return jsonify({'success': False, 'error': 'item_id requerido'}), 400
+            try:
+                quantity = int(entry.get('quantity', 1))
+            except (ValueError, TypeError):
+                return jsonify({'success': False, 'error': 'Cantidad inválida'}), 400
+            
+            # Validar cantidad razonable
+            if quantity <= 0:
+                return jsonify({'success': False, 'error': 'La cantidad debe ser mayor a 0'}), 400
+            
+            if quantity > MAX_QUANTITY_PER_ITEM:
+                return jsonify({
+                    'success': False,
+                    'error': f'Cantidad excesiva. Máximo permitido: {MAX_QUANTITY_PER_ITEM}'
+                }), 400
+            
+            lines.append({
+                'item_id': str(item_id),
                 'quantity': quantity,
-                'price': price,
-                'subtotal': quantity * price,
-                'is_kit': is_kit  # Marcar si es kit
+                'name': entry.get('name'),
+                'price': safe_float(entry['price']) if entry.get('price') is not None else None,
+                'is_kit': bool(entry.get('is_kit', False))
             })
         
-        # Guardar carrito en sesión
-        session['pos_cart'] = cart
-        
-        # Calcular nuevo total
+        # Completar nombre/precio de los items que no lo traen (una sola query)
+        missing = [line['item_id'] for line in lines if not line['name'] or line['price'] is None]
+        if missing:
+            products = pos_service.get_products_by_ids(missing)
+            for line in lines:
+                if line['name'] and line['price'] is not None:
+                    continue
+                product = products.get(line['item_id'])
+                if not product:
+                    return jsonify({'success': False, 'error': 'Producto no encontrado'}), 404
+                line['name'] = line['name'] or product.get('name', 'Producto')
+                if line['price'] is None:
+                    line['price'] = float(product.get('unit_price', 0) or product.get('price', 0))
+        
+        cart = get_cart_store().add_items(current_cart_key(), lines)
         total = pos_service.calculate_total(cart)
         
         return jsonify({
@@ -475,26 +442,8 @@ def api_remove_from_cart():
         if not item_id:
             return jsonify({'success': False, 'error': 'item_id requerido'}), 400
         
-        cart = session.get('pos_cart', [])
-        
-        # Buscar y actualizar/remover item - normalizar IDs para comparación
-        new_cart = []
-        item_id_str = str(item_id) if item_id else None
-        
-        for item in cart:
-            # Normalizar ambos IDs a string para comparación
-            item_id_from_cart = str(item.get('item_id', '')) if item.get('item_id') else None
-            
-            if item_id_from_cart == item_id_str:
-                if item.get('quantity', 0) > quantity:
-                    item['quantity'] -= quantity
-                    item['subtotal'] = item['quantity'] * item.get('price', 0)
-                    new_cart.append(item)
-                # Si quantity >= item['quantity'], no agregar (remover completamente)
-            else:
-                new_cart.append(item)
-        
-        session['pos_cart'] = new_cart
+        # Si quantity >= cantidad en el carrito, el item se remueve completamente
+        new_cart = get_cart_store().remove_item(current_cart_key(), str(item_id), quantity)
         
         total = pos_service.calculate_total(new_cart)
         
@@ -517,8 +466,7 @@ def api_clear_cart():
         return jsonify({'success': False, 'error': 'No autenticado'}), 401
     
     # Forzar limpieza completa del carro
-    session['pos_cart'] = []
-    session.modified = True  # Asegurar que la sesión se guarde
+    get_cart_store().clear(current_cart_key())
     
     logger.info(f"🧹 Carro limpiado completamente por API")
     
@@ -537,7 +485,7 @@ def api_get_cart():
         return jsonify({'success': False, 'error': 'No autenticado'}), 401
     
     try:
-        cart = session.get('pos_cart', [])
+        cart = get_cart_store().get(current_cart_key())
         total = pos_service.calculate_total(cart)
         
         return jsonify({
@@ -608,7 +556,9 @@ def api_validate_stock():
 
 
 @caja_bp.route('/api/sale/create', methods=['POST'])
+@track_endpoint('pos.api_create_sale')
 @rate_limit(max_requests=30, window_seconds=60)  # 30 ventas por minuto
+@idempotent('pos.sale')
 def api_create_sale():
     """API: Crear venta con validaciones de seguridad completas"""
     if not session.get('pos_logged_in'):
@@ -733,11 +683,11 @@ def api_create_sale():
                 cart = json.loads(intent.cart_json) if intent.cart_json else []
             except Exception:
                 cart = []
-            # Reflejar en sesión para compatibilidad con validaciones posteriores
-            session['pos_cart'] = cart
+            # Reflejar en el carrito de la caja para compatibilidad con validaciones posteriores
+            get_cart_store().replace(current_cart_key(), cart)
             payment_intent = intent
         else:
-            cart = session.get('pos_cart', [])
+            cart = get_cart_store().get(current_cart_key())
         
         # Calcular total
         total = pos_service.calculate_total(cart)
@@ -770,8 +720,11 @@ def api_create_sale():
             
             logger.warning(f"⚠️ Validación de seguridad falló: {error_message}")
             
-            # Si hay items corregidos (precios actualizados), devolverlos
+            # Si hay items corregidos (precios actualizados), guardarlos en el
+            # carrito de la caja para el reintento y devolverlos
             if validated_items:
+                if not payment_intent:
+                    get_cart_store().replace(current_cart_key(), validated_items)
                 return jsonify({
                     'success': False,
                     'error': error_message,
@@ -911,18 +864,12 @@ def api_create_sale():
         # ==========================================
         # P0-007: Idempotencia de venta
         # ==========================================
+        # La respuesta de la venta queda guardada bajo esta key (y bajo el header
+        # Idempotency-Key si vino); un reintento recibe la misma respuesta
         idempotency_key = generate_sale_idempotency_key(cart, register_id, employee_id, payment_type, total)
-        existing_sale = PosSale.query.filter_by(idempotency_key=idempotency_key).first()
-        if existing_sale:
-            # Retornar venta existente (idempotencia)
-            logger.info(f"✅ Venta duplicada detectada (idempotencia), retornando venta existente: {existing_sale.id}")
-            return jsonify({
-                'success': True,
-                'sale_id': existing_sale.id,
-                'sale_id_local': existing_sale.id,
-                'message': 'Venta ya procesada (idempotencia)',
-                'ticket_printed': 'no_intentado'
-            }), 200
+        replay = bind_idempotency_key(idempotency_key)
+        if replay is not None:
+            return replay
         
         # ==========================================
         # CREAR VENTA CON TRANSACCIÓN ATÓMICA
@@ -1114,17 +1061,6 @@ def api_create_sale():
             
             if ticket_created and ticket_obj:
                 logger.info(f"✅ Ticket QR generado: {ticket_obj.display_code} para venta {local_sale.id}")
-                # Emitir evento SocketIO para actualizar "Últimas entregas"
-                try:
-                    socketio.emit('ticket_created', {
-                        'ticket_id': ticket_obj.id,
-                        'display_code': ticket_obj.display_code,
-                        'sale_id': local_sale.id,
-                        'register_id': register_id,
-                        'created_at': datetime.now(CHILE_TZ).isoformat()
-                    }, namespace='/pos')
-                except Exception as e:
-                    logger.warning(f"Error al emitir evento ticket_created: {e}")
             elif not ticket_created:
                 logger.warning(f"⚠️  No se pudo crear ticket QR: {ticket_msg}")
             
@@ -1157,9 +1093,6 @@ def api_create_sale():
                     subtotal=item_data['subtotal']
                 )
                 db.session.add(sale_item)
-            
-            # Commit de la transacción
-            db.session.commit()
 
             # Si esta venta viene de un PaymentIntent, persistir vínculo en metadata_json (idempotencia)
             if payment_intent is not None:
@@ -1172,119 +1105,32 @@ def api_create_sale():
                 meta['sale_created_at'] = datetime.now(CHILE_TZ).isoformat()
                 payment_intent.metadata_json = json.dumps(meta, ensure_ascii=False)
                 payment_intent.updated_at = datetime.utcnow()
-                db.session.commit()
-            
-            # Si llegamos aquí, la transacción fue exitosa
-            logger.info(f"✅ Venta guardada localmente (ID local: {local_sale.id}, ID venta: {local_sale_id})")
-            
-            # ==========================================
-            # CREAR ESTADO DE ENTREGA (NO DESCONTAR INVENTARIO)
-            # ==========================================
-            # Según la lógica operativa de Club Bimba:
-            # - NO se descuenta inventario al vender
-            # - El inventario solo se descuenta al entregar (por bartender)
-            # - Crear estado de entrega para tracking
-            try:
-                from app.services.sale_delivery_service import get_sale_delivery_service
-                delivery_service = get_sale_delivery_service()
-                
-                # Crear estado de entrega para esta venta
-                delivery_status = delivery_service.create_delivery_status(local_sale)
-                logger.info(f"✅ Estado de entrega creado para venta {delivery_status.sale_id}")
-                
-            except Exception as e:
-                logger.error(f"⚠️ Error al crear estado de entrega (venta guardada igualmente): {e}", exc_info=True)
-                # No fallar la venta si hay error en el estado de entrega
-            
-            # Registrar auditoría
-            sale_data_for_audit = {
-                'total_amount': round_currency(to_decimal(total)),
-                'payment_type': payment_type_normalized,
-                'items': sale_items_data
-            }
-            SaleAuditLogger.log_sale_created(
-                sale_id=local_sale.id,
-                sale_data=sale_data_for_audit,
-                employee_id=employee_id,
-                employee_name=employee_name,
-                register_id=register_id
-            )
-            
-            # Auto-imprimir ticket
-            try:
-                printer_service = TicketPrinterService()
-                
-                # Si es pago en efectivo, abrir cajón de dinero
-                if payment_type_normalized == 'Efectivo':
-                    try:
-                        drawer_opened = printer_service.open_cash_drawer()
-                        if drawer_opened:
-                            logger.info(f"✅ Cajón de dinero abierto para venta {local_sale.id} (pago en efectivo)")
-                        else:
-                            logger.warning(f"⚠️  No se pudo abrir cajón de dinero para venta {local_sale.id}")
-                    except Exception as drawer_error:
-                        logger.error(f"Error al abrir cajón de dinero: {drawer_error}")
-                
-                # Preparar datos de venta para impresión
-                sale_data = {
-                    'sale_id': local_sale_id,
-                    'total': round_currency(to_decimal(total)),
-                    'items': cart,
-                    'payment_type': payment_type_normalized,
-                    'register_name': session.get('pos_register_name', 'POS'),
-                    'employee_name': employee_name
-                }
-                
-                # Si existe ticket QR (FASE 1), pasar qr_token/display_code al servicio de impresión
-                if ticket_created and ticket_obj:
-                    sale_data['qr_token'] = ticket_obj.qr_token
-                    sale_data['ticket_display_code'] = ticket_obj.display_code
-                
-                # NOTA: La impresión se hace desde el cliente Windows (navegador), no desde el servidor Linux
-                # El servidor solo genera la imagen del ticket con QR, que se abre en el navegador para imprimir
-                # Por lo tanto, siempre deshabilitamos auto_print en el servidor
-                print_status = "impresion_desde_cliente"
-                logger.info(f"📄 Ticket generado para venta {local_sale.id} - Se imprimirá desde el cliente Windows")
-            except Exception as e:
-                logger.error(f"❌ Error al imprimir ticket automáticamente: {e}", exc_info=True)
-                print_status = "error_impresion"
-            
-            # P0-015: Notificar en tiempo real SIN exponer datos sensibles
-            try:
-                # Evento público (sin datos sensibles)
-                socketio.emit('pos_sale_created', {
-                    'register_id': register_id,
-                    'event': 'sale_created',
-                    'sale_id': local_sale.id,
-                    'created_at': datetime.now(CHILE_TZ).isoformat()
-                }, namespace='/pos')
-                
-                # Evento privado para admin (solo si es admin)
-                is_admin = session.get('admin_logged_in', False)
-                if is_admin:
-                    socketio.emit('pos_sale_created_admin', {
-                        'sale': local_sale.to_dict(),
-                        'register_id': register_id,
-                        'register_name': session.get('pos_register_name')
-                    }, namespace='/admin')
-                
-                # FASE 8: Emitir evento de actividad para visor de cajas (sin datos sensibles)
-                socketio.emit('register_activity', {
+
+            # Tareas post-commit (outbox en la misma transacción): estado de entrega,
+            # auditoría, cajón de dinero, Socket.IO y n8n se ejecutan fuera del request.
+            # Según la lógica operativa de Club Bimba NO se descuenta inventario al vender:
+            # el estado de entrega solo sirve para tracking hasta que el bartender entrega.
+            from app.services.sale_post_commit import enqueue_sale_tasks
+            sale_total = round_currency(to_decimal(total))
+            enqueue_sale_tasks(
+                local_sale,
+                context={
                     'register_id': register_id,
-                    'action': 'sale_created',
-                    'sale_id': local_sale.id,
-                    'timestamp': datetime.now(CHILE_TZ).isoformat()
-                }, namespace='/admin')
-                
-                # Emitir actualización de métricas del dashboard
-                from app.helpers.dashboard_metrics_service import get_metrics_service
-                metrics_service = get_metrics_service()
-                metrics = metrics_service.get_all_metrics(use_cache=False)
-                socketio.emit('metrics_update', {'metrics': metrics}, namespace='/admin_stats')
-            except Exception as e:
-                logger.warning(f"Error al enviar notificación de venta: {e}")
+                    'register_name': session.get('pos_register_name'),
+                    'employee_id': employee_id,
+                    'employee_name': employee_name,
+                    'payment_type': payment_type_normalized,
+                    'total': sale_total,
+                    'items': sale_items_data,
+                    'is_admin': bool(session.get('admin_logged_in', False)),
+                    'ip_address': request.remote_addr,
+                    'session_id': session.get('session_id')
+                },
+                ticket={'ticket_id': ticket_obj.id, 'display_code': ticket_obj.display_code}
+                if ticket_created and ticket_obj else None
+            )
             
-            # Enviar evento a n8n (después de crear venta exitosamente)
+            # Evento a n8n en la misma transacción (outbox, se envía tras el commit)
             try:
                 from app.helpers.n8n_client import send_sale_created
                 send_sale_created(
@@ -1296,9 +1142,20 @@ def api_create_sale():
             except Exception as e:
                 logger.warning(f"Error enviando evento de venta a n8n: {e}")
             
+            # Commit de la transacción (venta + items + ticket + auditoría + tareas)
+            db.session.commit()
+            
+            # Si llegamos aquí, la transacción fue exitosa
+            logger.info(f"✅ Venta guardada localmente (ID local: {local_sale.id}, ID venta: {local_sale_id})")
+            
+            # NOTA: La impresión se hace desde el cliente Windows (navegador), no desde el servidor Linux
+            # El servidor solo genera la imagen del ticket con QR, que se abre en el navegador para imprimir
+            # Por lo tanto, siempre deshabilitamos auto_print en el servidor
+            print_status = "impresion_desde_cliente"
+            logger.info(f"📄 Ticket generado para venta {local_sale.id} - Se imprimirá desde el cliente Windows")
+            
             # Limpiar carrito
-            session['pos_cart'] = []
-            session.modified = True
+            get_cart_store().clear(current_cart_key())
             
             # Incluir información del ticket QR en la respuesta (FASE 1)
             ticket_info = None
@@ -1319,6 +1176,25 @@ def api_create_sale():
                 'ticket': ticket_info  # FASE 1: Información del ticket QR
             })
                     
+        except IntegrityError as e:
+            db.session.rollback()
+            # Respaldo: venta concurrente con la misma key (la columna única la rechazó)
+            existing_sale = PosSale.query.filter_by(idempotency_key=idempotency_key).first()
+            if not existing_sale:
+                logger.error(f"Error al guardar venta localmente: {e}", exc_info=True)
+                return jsonify({
+                    'success': False,
+                    'error': f'Error al guardar venta: {str(e)}'
+                }), 500
+            logger.info(f"✅ Venta duplicada detectada (idempotencia), retornando venta existente: {existing_sale.id}")
+            return jsonify({
+                'success': True,
+                'sale_id': existing_sale.id,
+                'sale_id_local': existing_sale.id,
+                'message': 'Venta ya procesada (idempotencia)',
+                'ticket_printed': 'no_intentado'
+            }), 200
+                    
         except Exception as e:
             logger.error(f"Error al guardar venta localmente: {e}", exc_info=True)
             db.session.rollback()
@@ -1642,11 +1518,11 @@ def api_venta_ok():
             )
             db.session.add(sale_item)
         
-        # Limpiar carrito de la sesión
-        session['pos_cart'] = []
-        
         db.session.commit()
         
+        # Limpiar carrito de la caja
+        get_cart_store().clear(current_cart_key())
+        
         logger.info(f"✅ Venta Getnet registrada: Sale ID {sale.id}, Ticket {ticket_code}, Total ${total}, Tipo {payment_type}")
         
         return jsonify({
@@ -9,6 +9,7 @@ from sqlalchemy import func, and_, or_, distinct, extract
 from app.helpers.timezone_utils import CHILE_TZ
 from app.models import db
 from app.helpers.thread_safe_cache import get_cached_shift_info, set_cached_shift_info
+from app.helpers.read_replica import read_only
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,6 +21,7 @@ class DashboardMetricsService:
     def __init__(self):
         self.cache_ttl = 30  # Cache de 30 segundos para métricas
     
+    @read_only
     def get_all_metrics(self, use_cache: bool = True) -> Dict[str, Any]:
         """
         Obtiene todas las métricas del dashboard
@@ -367,16 +367,16 @@ def get_index_stats() -> Dict[str, Any]:
 def get_connection_pool_stats() -> Dict[str, Any]:
     """Obtiene estadísticas del pool de conexiones de SQLAlchemy"""
     try:
-        engine = db.engine
-        pool = engine.pool
+        from app.helpers.db_pool import pool_stats
+        from app.helpers.health_scheduler import get_health_scheduler
         
-        return {
-            'size': pool.size() if hasattr(pool, 'size') else 0,
-            'checked_in': pool.checkedin() if hasattr(pool, 'checkedin') else 0,
-            'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else 0,
-            'overflow': pool.overflow() if hasattr(pool, 'overflow') else 0,
-            'invalid': pool.invalid() if hasattr(pool, 'invalid') else 0
-        }
+        stats = pool_stats(db.engine)
+        # Esperas y timeouts de la última evaluación del scheduler (ventana de ~10 s)
+        evaluacion = get_health_scheduler().snapshot(['db_pool']).get('db_pool', {})
+        for key in ('status', 'message', 'wait_p99_ms', 'wait_max_ms', 'timeouts', 'checkouts', 'checked_at'):
+            if key in evaluacion:
+                stats[key] = evaluacion[key]
+        return stats
     except Exception as e:
         current_app.logger.warning(f"Error al obtener estadísticas del pool: {e}")
         return {'error': str(e)}
@@ -0,0 +1,241 @@
+"""
+Perfiles de pool de conexiones y telemetría del pool
+Dimensiona el pool de SQLAlchemy según el entorno (Cloud Run / VM / dev) y la
+cantidad de workers de gunicorn y greenlets de eventlet, sin superar el
+presupuesto de conexiones de la instancia de base de datos.
+
+Variables de entorno:
+    DB_POOL_PROFILE          cloudrun | vm | dev (por defecto se detecta)
+    DB_MAX_CONNECTIONS       conexiones totales que puede usar esta instancia/VM
+    WEB_CONCURRENCY          workers de gunicorn (GUNICORN_WORKERS como alias)
+    GUNICORN_WORKER_CONNECTIONS  greenlets por worker (eventlet: 1000)
+    DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT / DB_POOL_RECYCLE  overrides
+    DB_EXTERNAL_POOLER       true si hay PgBouncer / pooler externo: sin pool local
+    DB_POOL_WAIT_ALERT_MS    p99 de espera por conexión que dispara alerta (250)
+
+El pool instrumentado registra la espera de cada checkout en
+db_pool_checkout_wait_seconds y los timeouts en db_pool_timeouts_total;
+check_pool_health() (ejecutado por el scheduler de health checks) evalúa la
+saturación y alerta solo cuando cambia el estado.
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.pool import NullPool, QueuePool
+
+from .logger import get_logger
+from .metrics import Histogram, metrics
+
+logger = get_logger(__name__)
+
+# Presupuesto de conexiones, timeout de espera y reciclaje por perfil
+POOL_PROFILES = {
+    # Cloud Run escala en instancias: pocas conexiones por instancia, LIFO para
+    # que las ociosas expiren y reciclaje corto (Cloud SQL corta conexiones viejas)
+    'cloudrun': {'max_connections': 20, 'pool_timeout': 10, 'pool_recycle': 1800, 'pool_use_lifo': True},
+    # VM dedicada: gunicorn con varios workers contra la BD local/privada
+    'vm': {'max_connections': 60, 'pool_timeout': 20, 'pool_recycle': 3600, 'pool_use_lifo': False},
+    # Desarrollo: valores chicos, espera larga para depurar con breakpoints
+    'dev': {'max_connections': 10, 'pool_timeout': 30, 'pool_recycle': 3600, 'pool_use_lifo': False},
+}
+
+POOL_WAIT_ALERT_SECONDS = float(os.environ.get('DB_POOL_WAIT_ALERT_MS', '250')) / 1000.0
+# Uso del pool (checked_out / capacidad) a partir del cual se alerta
+POOL_USAGE_WARNING = 0.85
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    try:
+        return int(value) if value not in (None, '') else None
+    except ValueError:
+        logger.warning(f"Valor inválido para {name}: {value!r}")
+        return None
+
+
+def _env_bool(name: str) -> bool:
+    return os.environ.get(name, 'false').lower() in ('1', 'true', 'yes')
+
+
+def detect_pool_profile(is_cloud_run: bool, is_production: bool) -> str:
+    profile = os.environ.get('DB_POOL_PROFILE', '').lower()
+    if profile in POOL_PROFILES:
+        return profile
+    if profile:
+        logger.warning(f"DB_POOL_PROFILE desconocido: {profile!r}; se detecta automáticamente")
+    if is_cloud_run:
+        return 'cloudrun'
+    return 'vm' if is_production else 'dev'
+
+
+def compute_pool_settings(profile: str) -> Dict[str, Any]:
+    """
+    Tamaño del pool por worker: el presupuesto de conexiones se reparte entre los
+    workers; 2/3 quedan fijas (pool_size) y el resto como overflow para picos.
+    Nunca más conexiones que greenlets concurrentes por worker.
+    """
+    base = POOL_PROFILES[profile]
+    workers = max(1, _env_int('WEB_CONCURRENCY') or _env_int('GUNICORN_WORKERS') or 1)
+    greenlets = max(1, _env_int('GUNICORN_WORKER_CONNECTIONS') or 1000)
+    budget = _env_int('DB_MAX_CONNECTIONS') or base['max_connections']
+
+    per_worker = max(2, min(budget // workers, greenlets))
+    pool_size = max(1, (per_worker * 2) // 3)
+    max_overflow = per_worker - pool_size
+
+    overrides = {
+        'pool_size': _env_int('DB_POOL_SIZE'),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW'),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT'),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE'),
+    }
+    settings = {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': base['pool_timeout'],
+        'pool_recycle': base['pool_recycle'],
+        'pool_use_lifo': base['pool_use_lifo'],
+    }
+    settings.update({k: v for k, v in overrides.items() if v is not None})
+    return settings
+
+
+def build_engine_options(db_type: Optional[str], is_cloud_run: bool, is_production: bool) -> Dict[str, Any]:
+    """
+    Opciones de pool para SQLALCHEMY_ENGINE_OPTIONS (se combinan con connect_args).
+    SQLite no usa perfil: mantiene el pool por defecto.
+    """
+    if db_type not in ('mysql', 'postgresql'):
+        return {'pool_pre_ping': True}
+
+    profile = detect_pool_profile(is_cloud_run, is_production)
+
+    if _env_bool('DB_EXTERNAL_POOLER'):
+        # PgBouncer / pooler externo: cada checkout abre una conexión contra el
+        # pooler y la suelta al terminar; el pooler es quien limita y reutiliza
+        logger.info(f"🔌 Pool de BD: pooler externo (NullPool), perfil {profile}")
+        return {
+            'poolclass': NullPool,
+            'pool_pre_ping': False,
+        }
+
+    settings = compute_pool_settings(profile)
+    logger.info(
+        f"🔌 Pool de BD perfil {profile}: pool_size={settings['pool_size']} "
+        f"max_overflow={settings['max_overflow']} timeout={settings['pool_timeout']}s"
+    )
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_pre_ping': True,
+        **settings,
+    }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mide la espera de cada checkout y cuenta los timeouts"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except exc.TimeoutError:
+            elapsed = time.perf_counter() - start
+            metrics.inc('db_pool_timeouts_total')
+            _record_wait(elapsed, timed_out=True)
+            raise
+        _record_wait(time.perf_counter() - start)
+        return entry
+
+
+# Ventana de esperas desde la última evaluación (check_pool_health)
+_window_lock = threading.Lock()
+_window = {'waits': Histogram(), 'timeouts': 0}
+_last_state = {'status': None}
+
+
+def _record_wait(elapsed: float, timed_out: bool = False) -> None:
+    metrics.observe('db_pool_checkout_wait_seconds', elapsed)
+    with _window_lock:
+        _window['waits'].observe(elapsed)
+        if timed_out:
+            _window['timeouts'] += 1
+
+
+def _take_window():
+    global _window
+    with _window_lock:
+        window = _window
+        _window = {'waits': Histogram(), 'timeouts': 0}
+    return window
+
+
+def pool_stats(engine) -> Dict[str, Any]:
+    """Estado actual del pool del engine (tamaño, en uso, overflow y capacidad)"""
+    pool = engine.pool
+    if isinstance(pool, NullPool):
+        return {'pool_class': 'NullPool', 'external_pooler': True, 'size': 0, 'checked_in': 0, 'checked_out': 0}
+
+    size = pool.size() if hasattr(pool, 'size') else 0
+    checked_out = pool.checkedout() if hasattr(pool, 'checkedout') else 0
+    max_overflow = getattr(pool, '_max_overflow', 0)
+    capacity = size + max(max_overflow, 0)
+    return {
+        'pool_class': type(pool).__name__,
+        'size': size,
+        'max_overflow': max_overflow,
+        'capacity': capacity,
+        'checked_in': pool.checkedin() if hasattr(pool, 'checkedin') else 0,
+        'checked_out': checked_out,
+        'overflow': max(pool.overflow(), 0) if hasattr(pool, 'overflow') else 0,
+        'timeout': getattr(pool, '_timeout', None),
+        'usage_percent': round(checked_out / capacity * 100, 1) if capacity else 0,
+    }
+
+
+def check_pool_health() -> Dict[str, Any]:
+    """
+    Evalúa la saturación del pool desde la última evaluación: timeouts, p99 de
+    espera por conexión y uso. Publica los gauges y alerta si cambia el estado.
+    """
+    from app.models import db
+
+    stats = pool_stats(db.engine)
+    window = _take_window()
+    waits = window['waits']
+    p99 = waits.percentile(99) if waits.count else None
+
+    stats.update({
+        'checkouts': waits.count,
+        'wait_p99_ms': round(p99 * 1000, 2) if p99 is not None else None,
+        'wait_max_ms': round(waits.max * 1000, 2) if waits.max is not None else None,
+        'timeouts': window['timeouts'],
+    })
+
+    if stats.get('external_pooler'):
+        status, message = 'healthy', 'Pool delegado a pooler externo'
+    elif window['timeouts']:
+        status = 'unhealthy'
+        message = f"{window['timeouts']} timeouts esperando conexión del pool"
+    elif (p99 is not None and p99 > POOL_WAIT_ALERT_SECONDS) or stats['usage_percent'] >= POOL_USAGE_WARNING * 100:
+        status = 'warning'
+        message = (f"Pool cerca de saturarse: {stats['checked_out']}/{stats['capacity']} en uso, "
+                   f"p99 de espera {stats['wait_p99_ms'] or 0:.0f} ms")
+    else:
+        status, message = 'healthy', 'Pool de conexiones OK'
+
+    if 'capacity' in stats:
+        metrics.set_gauge('db_pool_checked_out', stats['checked_out'], {'pid': os.getpid()})
+        metrics.set_gauge('db_pool_overflow', stats['overflow'], {'pid': os.getpid()})
+        metrics.set_gauge('db_pool_capacity', stats['capacity'], {'pid': os.getpid()})
+
+    if status != _last_state['status']:
+        if status == 'healthy' and _last_state['status'] is not None:
+            logger.info(f"✅ Pool de BD normalizado ({stats.get('checked_out', 0)} conexiones en uso)")
+        elif status != 'healthy':
+            logger.warning(f"⚠️ Pool de BD {status}: {message} ({stats})")
+        _last_state['status'] = status
+
+    return {'status': status, 'message': message, **stats}
@@ -11,6 +11,14 @@ from app.models.ecommerce_models import Entrada
 logger = logging.getLogger(__name__)
 
 
+def smtp_configurado() -> bool:
+    """True si hay servidor, usuario y contraseña SMTP (entorno o config de la app)"""
+    return all(
+        os.environ.get(key) or current_app.config.get(key)
+        for key in ('SMTP_SERVER', 'SMTP_USER', 'SMTP_PASSWORD')
+    )
+
+
 def send_ticket_email(entrada: Entrada) -> bool:
     """
     Envía email con el ticket de entrada al comprador
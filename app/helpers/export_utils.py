@@ -1,17 +1,95 @@
 """
 Utilidades para exportar datos del sistema
-Formato CSV, JSON y otros
+Formato CSV, JSON, NDJSON y XLSX
+
+Las exportaciones grandes (entregas, ventas de una temporada) se generan en
+streaming: las filas se leen de la BD por chunks (yield_per) y se escriben a la
+respuesta a medida que llegan, sin armar el archivo completo en memoria.
 """
 import csv
+import itertools
 import json
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence, Tuple, Union
 from io import StringIO
-from flask import Response
+from flask import Response, stream_with_context
+from sqlalchemy.exc import DisconnectionError, OperationalError
 from .logger import get_logger
 
 logger = get_logger(__name__)
 
+# Filas leídas por viaje a la BD y filas por bloque escrito a la respuesta
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '1000'))
+STREAM_FLUSH_ROWS = 500
+XLSX_READ_BLOCK = 64 * 1024
+
+# Formatos aceptados por DataExporter.stream
+STREAM_FORMATS = ('csv', 'ndjson', 'xlsx')
+
+Row = Union[Sequence[Any], Dict[str, Any]]
+
+
+def _export_filename(filename: str, extension: str) -> str:
+    return f'{filename}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def parse_date_range(desde: Optional[str], hasta: Optional[str]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Convierte parámetros ?desde=YYYY-MM-DD&hasta=YYYY-MM-DD en un rango [desde, hasta).
+
+    'hasta' es inclusivo (se extiende al inicio del día siguiente).
+
+    Raises:
+        ValueError: si alguna fecha no tiene formato YYYY-MM-DD
+    """
+    inicio = datetime.strptime(desde, '%Y-%m-%d') if desde else None
+    fin = datetime.strptime(hasta, '%Y-%m-%d') + timedelta(days=1) if hasta else None
+    return inicio, fin
+
+
+def iter_query(query, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Itera una query ORM por chunks (cursor server-side donde el driver lo soporta).
+    La query se ejecuta en la réplica de lectura si está disponible; el ruteo
+    solo cubre la ejecución, no queda activo entre yields. El llamador debe
+    agotar (o cerrar) el generador para liberar la conexión del cursor.
+    """
+    from app.models import db
+    from .read_replica import mark_replica_failed, read_replica
+
+    with read_replica() as routed:
+        try:
+            rows = iter(query.yield_per(chunk_size))
+        except (OperationalError, DisconnectionError) as e:
+            if not routed:
+                raise
+            mark_replica_failed(e)
+            db.session.rollback()
+            rows = None
+    if rows is None:
+        rows = iter(query.yield_per(chunk_size))
+    yield from rows
+
+
+def peek_rows(rows: Iterable[Row]) -> Tuple[Optional[Row], Iterator[Row]]:
+    """Primera fila y un iterador equivalente al original (para detectar exportaciones vacías)"""
+    iterator = iter(rows)
+    first = next(iterator, None)
+    if first is None:
+        return None, iterator
+    return first, itertools.chain([first], iterator)
+
 
 class DataExporter:
     """Exportador de datos en diferentes formatos"""
@@ -38,23 +116,7 @@ class DataExporter:
         # Obtener headers de las claves del primer elemento
         fieldnames = list(data[0].keys())
         
-        # Crear CSV en memoria
-        output = StringIO()
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(data)
-        
-        # Preparar respuesta
-        response = Response(
-            output.getvalue(),
-            mimetype='text/csv',
-            headers={
-                'Content-Disposition': f'attachment; filename="{filename}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-            }
-        )
-        
-        output.close()
-        return response
+        return DataExporter.stream_csv(data, fieldnames, filename)
     
     @staticmethod
     def export_to_json(data: List[Dict[str, Any]], filename: str = "export") -> Response:
@@ -106,21 +168,127 @@ class DataExporter:
         # Header esperado para logs
         header = ['sale_id', 'item_name', 'qty', 'bartender', 'barra', 'timestamp']
         
-        output = StringIO()
-        writer = csv.writer(output)
+        return DataExporter.stream_csv(logs, header, filename)
+    
+    @staticmethod
+    def _csv_chunks(rows: Iterable[Row], header: List[str]) -> Iterator[str]:
+        """Genera el CSV en bloques de STREAM_FLUSH_ROWS filas"""
+        buffer = StringIO()
+        writer = csv.writer(buffer)
         writer.writerow(header)
-        writer.writerows(logs)
+        pending = 0
+        for row in rows:
+            writer.writerow([row.get(col, '') for col in header] if isinstance(row, dict) else row)
+            pending += 1
+            if pending >= STREAM_FLUSH_ROWS:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+                pending = 0
+        yield buffer.getvalue()
+    
+    @staticmethod
+    def _ndjson_chunks(rows: Iterable[Row], header: List[str]) -> Iterator[str]:
+        """Un objeto JSON por línea (las filas tipo lista se nombran con header)"""
+        lines = []
+        for row in rows:
+            record = row if isinstance(row, dict) else dict(zip(header, row))
+            lines.append(json.dumps(record, ensure_ascii=False, default=_json_default))
+            if len(lines) >= STREAM_FLUSH_ROWS:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+    
+    @staticmethod
+    def _xlsx_chunks(rows: Iterable[Row], header: List[str], sheet_title: str) -> Iterator[bytes]:
+        """
+        XLSX con openpyxl en modo write-only (memoria constante): las filas se
+        escriben a un archivo temporal y el archivo se envía por bloques.
+        """
+        from openpyxl import Workbook
         
-        response = Response(
-            output.getvalue(),
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(title=sheet_title[:31])
+        sheet.append(header)
+        for row in rows:
+            values = [row.get(col) for col in header] if isinstance(row, dict) else list(row)
+            sheet.append([float(v) if isinstance(v, Decimal) else v for v in values])
+        
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        try:
+            workbook.save(path)
+            with open(path, 'rb') as f:
+                while True:
+                    block = f.read(XLSX_READ_BLOCK)
+                    if not block:
+                        break
+                    yield block
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    @staticmethod
+    def stream_csv(rows: Iterable[Row], header: List[str], filename: str = "export") -> Response:
+        """CSV en streaming: filas como listas (en orden de header) o diccionarios"""
+        return Response(
+            stream_with_context(DataExporter._csv_chunks(rows, header)),
             mimetype='text/csv',
-            headers={
-                'Content-Disposition': f'attachment; filename="{filename}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-            }
+            headers={'Content-Disposition': f'attachment; filename="{_export_filename(filename, "csv")}"'}
         )
+    
+    @staticmethod
+    def stream_ndjson(rows: Iterable[Row], header: List[str], filename: str = "export") -> Response:
+        """NDJSON en streaming (un registro por línea)"""
+        return Response(
+            stream_with_context(DataExporter._ndjson_chunks(rows, header)),
+            mimetype='application/x-ndjson',
+            headers={'Content-Disposition': f'attachment; filename="{_export_filename(filename, "ndjson")}"'}
+        )
+    
+    @staticmethod
+    def stream_xlsx(rows: Iterable[Row], header: List[str], filename: str = "export",
+                    sheet_title: str = "Datos") -> Response:
+        """XLSX generado en modo write-only y enviado por bloques"""
+        return Response(
+            stream_with_context(DataExporter._xlsx_chunks(rows, header, sheet_title)),
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            headers={'Content-Disposition': f'attachment; filename="{_export_filename(filename, "xlsx")}"'}
+        )
+    
+    @staticmethod
+    def stream(rows: Iterable[Row], header: List[str], filename: str = "export", fmt: str = 'csv') -> Response:
+        """
+        Exporta en streaming en el formato pedido ('csv', 'ndjson' o 'xlsx').
         
-        output.close()
-        return response
+        Args:
+            rows: Iterable de filas (listas en el orden de header, o diccionarios)
+            header: Columnas
+            filename: Nombre del archivo (sin extensión)
+            fmt: Formato
+            
+        Returns:
+            Flask Response en streaming (404 si no hay filas)
+            
+        Raises:
+            ValueError: si el formato no está en STREAM_FORMATS
+        """
+        fmt = (fmt or 'csv').lower()
+        if fmt not in STREAM_FORMATS:
+            raise ValueError(f"Formato de exportación no soportado: {fmt}")
+        
+        first, rows = peek_rows(rows)
+        if first is None:
+            return Response("No hay datos para exportar", mimetype='text/plain', status=404)
+        
+        if fmt == 'xlsx':
+            return DataExporter.stream_xlsx(rows, header, filename)
+        if fmt == 'ndjson':
+            return DataExporter.stream_ndjson(rows, header, filename)
+        return DataExporter.stream_csv(rows, header, filename)
 
 
 class MetricsExporter:
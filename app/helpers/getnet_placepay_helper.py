@@ -4,6 +4,7 @@ GetNet usa PlaceToPay como base, por lo que la estructura es similar
 """
 import logging
 import requests
+from app.infrastructure.external.http_client import get_http_client
 import hashlib
 import base64
 import secrets
@@ -287,8 +288,9 @@ def create_getnet_payment_placetopay(
         for endpoint in possible_endpoints:
             logger.info(f"Intentando endpoint: {endpoint}")
             try:
-                response = requests.post(
+                response = get_http_client().post(
                     endpoint,
+                    upstream='getnet_placepay',
                     json=payment_request,
                     headers=headers,
                     timeout=30,
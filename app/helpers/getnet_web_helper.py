@@ -3,6 +3,7 @@ Helper para integración con GetNet Web Checkout API
 """
 import logging
 import requests
+from app.infrastructure.external.http_client import get_http_client
 import hashlib
 import base64
 import secrets
@@ -147,8 +148,9 @@ def get_getnet_access_token(force_refresh: bool = False) -> Optional[str]:
         auth = (config['client_id'], config['client_secret'])
         
         logger.info(f"Obteniendo token OAuth2 de GetNet desde {auth_url}")
-        response = requests.post(
+        response = get_http_client().post(
             auth_url,
+            upstream='getnet',
             headers=headers,
             data=data,
             auth=auth,
@@ -314,8 +316,9 @@ def create_getnet_payment(
             return None
         
         try:
-            response = requests.post(
+            response = get_http_client().post(
                 payment_url,
+                upstream='getnet',
                 json=payment_data,
                 headers=headers,
                 timeout=30
@@ -445,8 +448,9 @@ def get_getnet_payment_status(payment_id: str) -> Optional[Dict[str, Any]]:
         payment_status_url = f"{config['api_base_url']}/v1/payments/{payment_id}"
         
         logger.debug(f"Consultando estado de pago GetNet: payment_id={payment_id}, endpoint={payment_status_url}")
-        response = requests.get(
+        response = get_http_client().get(
             payment_status_url,
+            upstream='getnet',
             headers=headers,
             timeout=10
         )
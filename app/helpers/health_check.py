@@ -5,7 +5,6 @@ Verifica el estado de componentes críticos
 from typing import Dict, Any, List
 from flask import current_app
 from .logger import get_logger
-from .service_status import get_all_services_status, check_api_status
 from .cache_utils import get_cache_info
 from app.infrastructure.rate_limiter import RateLimiter
 
@@ -30,8 +29,9 @@ def get_system_health() -> Dict[str, Any]:
         from datetime import datetime
         health['timestamp'] = datetime.now().isoformat()
         
-        # Verificar servicios del sistema
-        services = get_all_services_status()
+        # Verificar servicios del sistema (snapshot del scheduler, sin subprocesos en el request)
+        from .health_scheduler import get_health_scheduler
+        services = get_health_scheduler().services_status()
         health['components']['services'] = {
             'status': 'ok' if all(
                 s.get('running') or s.get('online') 
@@ -41,7 +41,7 @@ def get_system_health() -> Dict[str, Any]:
         }
         
         # Verificar API externa
-        api_status = check_api_status()
+        api_status = services.get('api', {})
         health['components']['external_api'] = {
             'status': 'ok' if api_status.get('online') else 'error',
             'details': api_status
@@ -122,18 +122,12 @@ def check_external_api() -> Dict[str, Any]:
         }
 
 
-def get_all_health_checks() -> Dict[str, Any]:
-    """Ejecuta todos los health checks y retorna el estado general"""
-    checks = {
-        'database': check_database(),
-        'cache': check_cache(),
-        'external_api': check_external_api()
-    }
-    
+def summarize_health_checks(checks: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Estado general a partir de los resultados de cada check"""
     # Estado general: healthy si todos los checks críticos están healthy
     critical_checks = ['database', 'cache']
     all_healthy = all(
-        checks[check]['status'] == 'healthy' 
+        checks.get(check, {}).get('status') == 'healthy'
         for check in critical_checks
     )
     
@@ -146,6 +140,13 @@ def get_all_health_checks() -> Dict[str, Any]:
     }
 
 
-
-
-
+def get_all_health_checks() -> Dict[str, Any]:
+    """
+    Ejecuta todos los health checks y retorna el estado general.
+    Los endpoints usan el snapshot de helpers/health_scheduler en lugar de esta función.
+    """
+    return summarize_health_checks({
+        'database': check_database(),
+        'cache': check_cache(),
+        'external_api': check_external_api()
+    })
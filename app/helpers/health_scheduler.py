@@ -0,0 +1,299 @@
+"""
+Scheduler de health checks en segundo plano
+Ejecuta los checks (BD, cache, API externa, systemctl/postfix/nginx) en paralelo,
+cada uno con su propio timeout y TTL, y guarda el último resultado en un snapshot.
+
+/api/health, /api/system/health, /api/health/detailed, /api/services/status y el
+dashboard de monitoreo leen el snapshot: un probe del load balancer no lanza
+subprocesos ni espera a la API externa.
+
+Uso:
+    from app.helpers.health_scheduler import get_health_scheduler
+    scheduler = get_health_scheduler()
+    scheduler.health_checks()      # mismo formato que get_all_health_checks()
+    scheduler.services_status()    # mismo formato que get_all_services_status()
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+
+from .logger import get_logger
+from .timezone_utils import CHILE_TZ
+
+logger = get_logger(__name__)
+
+HEALTH_CHECK_WORKERS = int(os.environ.get('HEALTH_CHECK_WORKERS', '6'))
+HEALTH_TICK_SECONDS = float(os.environ.get('HEALTH_TICK_SECONDS', '2'))
+# Espera máxima del primer refresco de cada worker (los checks lentos quedan en curso)
+HEALTH_FIRST_WAIT_SECONDS = float(os.environ.get('HEALTH_FIRST_WAIT_SECONDS', '3'))
+# Un resultado con más de STALE_FACTOR × TTL de antigüedad se marca como stale
+STALE_FACTOR = 3
+
+
+class HealthCheck:
+    """Definición de un check: función, TTL del resultado y timeout de ejecución"""
+
+    def __init__(self, name: str, func: Callable[[], Dict[str, Any]], ttl: float, timeout: float,
+                 app_context: bool = True):
+        self.name = name
+        self.func = func
+        self.ttl = ttl
+        self.timeout = timeout
+        self.app_context = app_context
+
+
+class HealthScheduler:
+    """Ejecuta los checks registrados en paralelo y mantiene el último resultado de cada uno"""
+
+    def __init__(self, max_workers: int = HEALTH_CHECK_WORKERS):
+        self.max_workers = max_workers
+        self._checks: Dict[str, HealthCheck] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._running: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._app = None
+        self._thread_pid: Optional[int] = None
+
+    def register(self, name: str, func: Callable[[], Dict[str, Any]], ttl: float = 30,
+                 timeout: float = 5, app_context: bool = True) -> None:
+        """Registra (o reemplaza) un check"""
+        with self._lock:
+            self._checks[name] = HealthCheck(name, func, ttl, timeout, app_context)
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # El pool se recrea tras el fork de gunicorn (los hilos no sobreviven al fork)
+        pid = os.getpid()
+        if self._executor is None or self._executor_pid != pid:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='health')
+            self._executor_pid = pid
+        return self._executor
+
+    def _run_check(self, check: HealthCheck) -> None:
+        started = time.perf_counter()
+        try:
+            if check.app_context and self._app is not None:
+                with self._app.app_context():
+                    result = check.func()
+            else:
+                result = check.func()
+            if not isinstance(result, dict):
+                result = {'status': 'unknown', 'message': str(result)}
+        except Exception as e:
+            logger.warning(f"Health check '{check.name}' falló: {e}")
+            result = {'status': 'unhealthy', 'error': str(e), 'message': f'Error en check {check.name}'}
+        self._store(check, result, time.perf_counter() - started)
+
+    def _store(self, check: HealthCheck, result: Dict[str, Any], elapsed: float, timed_out: bool = False) -> None:
+        entry = dict(result)
+        entry['_checked_at'] = time.time()
+        entry['_duration_ms'] = round(elapsed * 1000, 2)
+        entry['_timed_out'] = timed_out
+        with self._lock:
+            if timed_out:
+                # El check sigue en curso: no se relanza hasta que termine
+                if check.name in self._running:
+                    self._running[check.name]['timeout_reported'] = True
+            else:
+                self._running.pop(check.name, None)
+            self._results[check.name] = entry
+
+        try:
+            from .metrics import metrics
+            metrics.observe('health_check_duration_seconds', elapsed, labels={'check': check.name})
+        except Exception:
+            pass
+
+    def _submit(self, names: Iterable[str]) -> List[Tuple[Future, str]]:
+        """Lanza los checks indicados que no estén ya en curso. Retorna (future, nombre)."""
+        futures = []
+        executor = self._get_executor()
+        now = time.perf_counter()
+        with self._lock:
+            checks = [self._checks[n] for n in names if n in self._checks and n not in self._running]
+            for check in checks:
+                self._running[check.name] = {'started': now, 'timeout_reported': False}
+        for check in checks:
+            futures.append((executor.submit(self._run_check, check), check.name))
+        return futures
+
+    def _report_timeouts(self) -> None:
+        """Publica 'timeout' para los checks que exceden su límite (el hilo sigue hasta terminar)"""
+        now = time.perf_counter()
+        with self._lock:
+            vencidos = [
+                (self._checks[name], now - info['started'])
+                for name, info in self._running.items()
+                if not info['timeout_reported'] and now - info['started'] > self._checks[name].timeout
+            ]
+        for check, elapsed in vencidos:
+            logger.warning(f"Health check '{check.name}' excedió su timeout de {check.timeout:.0f}s")
+            self._store(check, {
+                'status': 'unhealthy',
+                'message': f'Timeout ({check.timeout:.0f}s) al verificar {check.name}',
+            }, elapsed, timed_out=True)
+
+    def _due(self) -> List[str]:
+        now = time.time()
+        with self._lock:
+            return [
+                name for name, check in self._checks.items()
+                if name not in self._running
+                and (name not in self._results or now - self._results[name]['_checked_at'] >= check.ttl)
+            ]
+
+    def refresh(self, names: Optional[Iterable[str]] = None, timeout: Optional[float] = None) -> None:
+        """
+        Ejecuta ya los checks indicados (todos por defecto), en paralelo.
+        Espera a cada check hasta su propio timeout y, en total, como máximo `timeout` segundos.
+        """
+        names = list(names) if names is not None else list(self._checks)
+        futures = self._submit(names)
+        if not futures:
+            return
+        now = time.perf_counter()
+        limite = now + timeout if timeout is not None else None
+        pendientes = {}
+        for future, name in futures:
+            deadline = now + self._checks[name].timeout
+            pendientes[future] = min(deadline, limite) if limite is not None else deadline
+        while pendientes:
+            now = time.perf_counter()
+            pendientes = {f: d for f, d in pendientes.items() if d > now and not f.done()}
+            if not pendientes:
+                break
+            wait(pendientes, timeout=min(pendientes.values()) - now, return_when=FIRST_COMPLETED)
+        self._report_timeouts()
+
+    def _loop(self) -> None:
+        pid = os.getpid()
+        while self._thread_pid == pid:
+            try:
+                self._report_timeouts()
+                due = self._due()
+                if due:
+                    self._submit(due)
+            except Exception as e:
+                logger.error(f"Error en scheduler de health checks: {e}", exc_info=True)
+            time.sleep(HEALTH_TICK_SECONDS)
+
+    def ensure_started(self, app=None) -> None:
+        """
+        Inicia el hilo de refresco en este proceso (se reinicia tras el fork de gunicorn).
+        La primera vez ejecuta los checks de inmediato para no servir un snapshot vacío.
+        """
+        pid = os.getpid()
+        if self._thread_pid == pid:
+            return
+        if app is None:
+            app = current_app._get_current_object()
+        with self._lock:
+            if self._thread_pid == pid:
+                return
+            self._app = app
+            self._running.clear()
+            self._thread_pid = pid
+        self.refresh(timeout=HEALTH_FIRST_WAIT_SECONDS)
+        thread = threading.Thread(target=self._loop, daemon=True, name='health-scheduler')
+        thread.start()
+        logger.info(f"✅ Scheduler de health checks iniciado ({len(self._checks)} checks)")
+
+    # ------------------------------------------------------------------
+    # Lectura del snapshot
+    # ------------------------------------------------------------------
+
+    def snapshot(self, names: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Último resultado de cada check, con su antigüedad.
+        Nunca ejecuta checks en el hilo del request (salvo el primer arranque del worker).
+        """
+        self.ensure_started()
+        now = time.time()
+        with self._lock:
+            names = list(names) if names is not None else list(self._checks)
+            resultado = {}
+            for name in names:
+                entry = self._results.get(name)
+                check = self._checks.get(name)
+                if entry is None or check is None:
+                    mensaje = 'Check en curso' if name in self._running else 'Check aún no ejecutado'
+                    resultado[name] = {'status': 'unknown', 'message': mensaje}
+                    continue
+                data = {k: v for k, v in entry.items() if not k.startswith('_')}
+                age = now - entry['_checked_at']
+                data['checked_at'] = datetime.fromtimestamp(entry['_checked_at'], CHILE_TZ).isoformat()
+                data['age_seconds'] = round(age, 1)
+                data['check_duration_ms'] = entry['_duration_ms']
+                if age > check.ttl * STALE_FACTOR:
+                    data['stale'] = True
+                resultado[name] = data
+            return resultado
+
+    def health_checks(self) -> Dict[str, Any]:
+        """Snapshot con el formato de health_checks.get_all_health_checks()"""
+        from .health_checks import summarize_health_checks
+        return summarize_health_checks(self.snapshot(['database', 'cache', 'external_api', 'db_pool']))
+
+    def services_status(self) -> Dict[str, Any]:
+        """Snapshot con el formato de service_status.get_all_services_status()"""
+        servicios = self.snapshot(['postfix', 'gunicorn', 'nginx', 'api'])
+        for data in servicios.values():
+            if 'checked_at' in data:
+                data['last_updated'] = data['checked_at']
+        return servicios
+
+
+def _check_api_with_history() -> Dict[str, Any]:
+    """Estado de la API PHP POS; solo registra en ApiConnectionLog cuando cambia el estado"""
+    from .service_status import check_api_status, _log_api_connection
+
+    result = check_api_status(checked_by='monitoring', log_connection=False)
+    anterior = get_health_scheduler()._results.get('api')
+    if anterior is None or anterior.get('status') != result.get('status'):
+        _log_api_connection(result, current_app.config.get('BASE_API_URL'), 'monitoring')
+    return result
+
+
+def _register_default_checks(scheduler: HealthScheduler) -> None:
+    from .health_checks import check_database, check_cache, check_external_api
+    from .db_pool import check_pool_health
+    from .read_replica import REPLICA_URL, REPLICA_BIND_KEY, check_replica
+    from .service_status import check_postfix_status, check_gunicorn_status, check_nginx_status
+
+    scheduler.register('database', check_database, ttl=10, timeout=3)
+    scheduler.register('cache', check_cache, ttl=10, timeout=1)
+    scheduler.register('db_pool', check_pool_health, ttl=10, timeout=1)
+    if REPLICA_URL:
+        scheduler.register(REPLICA_BIND_KEY, check_replica, ttl=5, timeout=3)
+    scheduler.register('external_api', check_external_api, ttl=60, timeout=6)
+    scheduler.register('api', _check_api_with_history, ttl=30, timeout=3)
+    # systemctl/postfix/nginx: subprocesos, no necesitan contexto de app
+    scheduler.register('postfix', check_postfix_status, ttl=60, timeout=12, app_context=False)
+    scheduler.register('gunicorn', check_gunicorn_status, ttl=60, timeout=12, app_context=False)
+    scheduler.register('nginx', check_nginx_status, ttl=60, timeout=12, app_context=False)
+
+
+_scheduler_instance: Optional[HealthScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_health_scheduler() -> HealthScheduler:
+    """Obtiene la instancia global del scheduler de health checks"""
+    global _scheduler_instance
+    if _scheduler_instance is None:
+        with _scheduler_lock:
+            if _scheduler_instance is None:
+                scheduler = HealthScheduler()
+                _register_default_checks(scheduler)
+                _scheduler_instance = scheduler
+    return _scheduler_instance
@@ -1,11 +1,73 @@
 """
-Helper para generar keys de idempotencia (P0-007, P0-011)
+Helper de idempotencia (P0-007, P0-011)
+Genera las keys de venta y cierre, y mantiene el almacén clave → respuesta
+(idempotency_records) con TTL y un frente LRU en memoria del proceso. Las
+operaciones de escritura se declaran con @idempotent(scope): un reintento con
+la misma clave (header Idempotency-Key, campo de formulario idempotency_key o
+clave derivada por la vista con bind_idempotency_key) recibe la respuesta
+guardada sin re-ejecutar la lógica ni consultar las tablas de negocio. Las
+columnas únicas idempotency_key* de esas tablas quedan solo como respaldo.
+
+Antes de ejecutar la vista la clave se reserva con una fila 'pending' (insert
+con PK única, en su propia transacción): un duplicado concurrente (doble click,
+reintento por timeout) espera hasta IDEMPOTENCY_WAIT_SECONDS a que termine la
+primera y recibe su respuesta, o un 409 si sigue en curso. Si la vista falla,
+la reserva se libera; si el proceso muere, vence a los IDEMPOTENCY_PENDING_SECONDS.
+
+Variables de entorno:
+    IDEMPOTENCY_TTL_SECONDS      vigencia de una respuesta guardada (86400)
+    IDEMPOTENCY_PENDING_SECONDS  vigencia de una reserva en curso (120)
+    IDEMPOTENCY_WAIT_SECONDS     espera de un duplicado concurrente antes del 409 (5)
+    IDEMPOTENCY_LRU_SIZE         respuestas recientes en memoria del proceso (5000)
+    IDEMPOTENCY_PURGE_SECONDS    cada cuánto se borran los registros vencidos (3600)
+
+Uso:
+    from app.helpers.idempotency_helper import idempotent, bind_idempotency_key
+
+    @caja_bp.route('/api/sale/create', methods=['POST'])
+    @idempotent('pos.sale')
+    def api_create_sale():
+        ...
+        replay = bind_idempotency_key(generate_sale_idempotency_key(...))
+        if replay is not None:
+            return replay
 """
 import hashlib
 import json
-from typing import List, Dict, Any
-from datetime import datetime
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from flask import current_app, g, jsonify, make_response, request, session
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
 from app.helpers.timezone_utils import CHILE_TZ
+from app.models import db
+from app.models.idempotency_models import IdempotencyRecord
+from .logger import get_logger
+from .metrics import metrics
+
+logger = get_logger(__name__)
+
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '86400'))
+IDEMPOTENCY_PENDING_SECONDS = int(os.environ.get('IDEMPOTENCY_PENDING_SECONDS', '120'))
+IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', '5'))
+IDEMPOTENCY_LRU_SIZE = int(os.environ.get('IDEMPOTENCY_LRU_SIZE', '5000'))
+IDEMPOTENCY_PURGE_SECONDS = float(os.environ.get('IDEMPOTENCY_PURGE_SECONDS', '3600'))
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_FORM_FIELD = 'idempotency_key'
+
+metrics.describe('idempotency_lookups_total', 'Búsquedas de claves de idempotencia por origen (memory, db, miss)')
+metrics.describe('idempotency_replays_total', 'Respuestas devueltas desde el almacén de idempotencia')
+metrics.describe('idempotency_conflicts_total', 'Duplicados rechazados (409) mientras la operación seguía en curso')
+# Intervalo de consulta mientras un duplicado espera a la operación en curso
+_WAIT_POLL_SECONDS = 0.2
 
 
 def generate_sale_idempotency_key(
@@ -77,4 +139,424 @@ def generate_close_idempotency_key(
     return hashlib.sha256(data_string.encode()).hexdigest()[:64]
 
 
+def _digest(key: str) -> str:
+    return hashlib.sha256(str(key).encode('utf-8')).hexdigest()
+
+
+def _as_record(row) -> Dict[str, Any]:
+    return {
+        'status': row.status,
+        'status_code': row.status_code,
+        'content_type': row.content_type,
+        'location': row.location,
+        'body': row.body,
+        'expires_at': row.expires_at,
+    }
+
+
+_COLUMNS = (
+    IdempotencyRecord.key, IdempotencyRecord.status, IdempotencyRecord.status_code,
+    IdempotencyRecord.content_type, IdempotencyRecord.location, IdempotencyRecord.body,
+    IdempotencyRecord.expires_at
+)
+
+
+class IdempotencyStore:
+    """
+    Respuestas por clave con TTL en BD + LRU de las completadas en memoria.
+    Las escrituras (reservar, completar, liberar) van en transacciones propias
+    sobre el engine, independientes de db.session de la vista.
+    """
+
+    def __init__(self, max_entries: int = IDEMPOTENCY_LRU_SIZE, ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS,
+                 pending_seconds: int = IDEMPOTENCY_PENDING_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.pending_seconds = pending_seconds
+        self._lock = threading.Lock()
+        # (scope, digest) -> {'status', 'status_code', 'content_type', 'location', 'body', 'expires_at'}
+        self._lru: 'OrderedDict[Tuple[str, str], Dict[str, Any]]' = OrderedDict()
+        self._last_purge = time.time()
+
+    def _remember(self, scope: str, digest: str, record: Dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._lru[(scope, digest)] = record
+            self._lru.move_to_end((scope, digest))
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def cached(self, scope: str, key: str) -> Optional[Dict[str, Any]]:
+        """Respuesta completada en memoria del proceso (sin ir a la BD)"""
+        now = datetime.utcnow()
+        cache_key = (scope, _digest(key))
+        with self._lock:
+            record = self._lru.get(cache_key)
+            if record is None:
+                return None
+            if record['expires_at'] <= now:
+                del self._lru[cache_key]
+                return None
+            self._lru.move_to_end(cache_key)
+        metrics.inc('idempotency_lookups_total', 1, {'scope': scope, 'source': 'memory'})
+        return record
+
+    def get_many(self, scope: str, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Respuestas completadas y vigentes de las claves indicadas. Resuelve desde
+        memoria y las que faltan con una sola consulta por PK. Ante un error de
+        BD retorna lo encontrado en memoria (la operación sigue su curso normal).
+        """
+        now = datetime.utcnow()
+        digests = {_digest(key): key for key in keys if key}
+        found: Dict[str, Dict[str, Any]] = {}
+        for digest, key in digests.items():
+            record = self.cached(scope, key)
+            if record is not None:
+                found[key] = record
+
+        missing = [digest for digest, key in digests.items() if key not in found]
+        if not missing:
+            return found
+        try:
+            with db.engine.connect() as conn:
+                rows = conn.execute(select(*_COLUMNS).where(
+                    IdempotencyRecord.scope == scope,
+                    IdempotencyRecord.key.in_(missing),
+                    IdempotencyRecord.status == IdempotencyRecord.STATUS_DONE,
+                    IdempotencyRecord.expires_at > now
+                )).all()
+        except Exception as e:
+            logger.warning(f"Error consultando claves de idempotencia ({scope}): {e}")
+            return found
+        for row in rows:
+            record = _as_record(row)
+            self._remember(scope, row.key, record)
+            found[digests[row.key]] = record
+        if rows:
+            metrics.inc('idempotency_lookups_total', len(rows), {'scope': scope, 'source': 'db'})
+        if len(missing) > len(rows):
+            metrics.inc('idempotency_lookups_total', len(missing) - len(rows), {'scope': scope, 'source': 'miss'})
+        return found
+
+    def get(self, scope: str, key: str) -> Optional[Dict[str, Any]]:
+        return self.get_many(scope, [key]).get(key)
+
+    def reserve(self, scope: str, key: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Reserva la clave con una fila 'pending'. Retorna (True, None) si quedó
+        reservada para este request, o (False, registro) con el registro vigente
+        ('pending' de otro request o 'done'). (False, None) si la BD falló: la
+        operación sigue sin idempotencia (las columnas únicas son el respaldo).
+        """
+        digest = _digest(key)
+        for _ in range(2):
+            now = datetime.utcnow()
+            try:
+                with db.engine.begin() as conn:
+                    # Una reserva o respuesta vencida aún no purgada se reemplaza
+                    conn.execute(delete(IdempotencyRecord).where(
+                        IdempotencyRecord.scope == scope,
+                        IdempotencyRecord.key == digest,
+                        IdempotencyRecord.expires_at <= now
+                    ))
+                with db.engine.begin() as conn:
+                    conn.execute(insert(IdempotencyRecord).values(
+                        scope=scope, key=digest, status=IdempotencyRecord.STATUS_PENDING,
+                        status_code=0, body='', created_at=now,
+                        expires_at=now + timedelta(seconds=self.pending_seconds)
+                    ))
+                return True, None
+            except IntegrityError:
+                try:
+                    with db.engine.connect() as conn:
+                        row = conn.execute(select(*_COLUMNS).where(
+                            IdempotencyRecord.scope == scope,
+                            IdempotencyRecord.key == digest
+                        )).first()
+                except Exception as e:
+                    logger.warning(f"Error consultando clave de idempotencia ({scope}): {e}")
+                    return False, None
+                if row is not None:
+                    record = _as_record(row)
+                    if record['status'] == IdempotencyRecord.STATUS_DONE:
+                        self._remember(scope, digest, record)
+                    return False, record
+                # Se liberó entre el insert y la lectura: reintentar la reserva
+            except Exception as e:
+                logger.warning(f"Error reservando clave de idempotencia ({scope}): {e}")
+                return False, None
+        return False, None
+
+    def complete(self, scope: str, keys: Iterable[str], body: str, status_code: int = 200,
+                 content_type: Optional[str] = 'application/json', location: Optional[str] = None,
+                 ttl_seconds: Optional[int] = None) -> bool:
+        """Guarda la respuesta en las reservas 'pending' de las claves (un solo UPDATE)"""
+        digests = sorted({_digest(key) for key in keys if key})
+        if not digests:
+            return False
+        now = datetime.utcnow()
+        record = {
+            'status': IdempotencyRecord.STATUS_DONE,
+            'status_code': status_code,
+            'content_type': content_type,
+            'location': location,
+            'body': body,
+            'expires_at': now + timedelta(seconds=ttl_seconds or self.ttl_seconds),
+        }
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(update(IdempotencyRecord).where(
+                    IdempotencyRecord.scope == scope,
+                    IdempotencyRecord.key.in_(digests),
+                    IdempotencyRecord.status == IdempotencyRecord.STATUS_PENDING
+                ).values(**record))
+        except Exception as e:
+            logger.warning(f"Error guardando respuesta de idempotencia ({scope}): {e}")
+            return False
+        for digest in digests:
+            self._remember(scope, digest, record)
+        self._maybe_purge()
+        return True
+
+    def release(self, scope: str, keys: Iterable[str]) -> None:
+        """Libera las reservas 'pending' (la operación falló: se puede reintentar)"""
+        digests = sorted({_digest(key) for key in keys if key})
+        if not digests:
+            return
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(delete(IdempotencyRecord).where(
+                    IdempotencyRecord.scope == scope,
+                    IdempotencyRecord.key.in_(digests),
+                    IdempotencyRecord.status == IdempotencyRecord.STATUS_PENDING
+                ))
+        except Exception as e:
+            logger.warning(f"Error liberando claves de idempotencia ({scope}): {e}")
+
+    def put(self, scope: str, keys: Union[str, Iterable[str]], body: str, status_code: int = 200,
+            content_type: Optional[str] = 'application/json', location: Optional[str] = None,
+            ttl_seconds: Optional[int] = None) -> bool:
+        """
+        Guarda directamente una respuesta completada (sin reserva previa), en un
+        solo insert. Si otro proceso guardó la misma clave antes, prevalece la
+        suya. Retorna False si no se pudo guardar (se registra y sigue).
+        """
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        digests = sorted({_digest(key) for key in keys if key})
+        if not digests:
+            return False
+        now = datetime.utcnow()
+        record = {
+            'status': IdempotencyRecord.STATUS_DONE,
+            'status_code': status_code,
+            'content_type': content_type,
+            'location': location,
+            'body': body,
+            'expires_at': now + timedelta(seconds=ttl_seconds or self.ttl_seconds),
+        }
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(delete(IdempotencyRecord).where(
+                    IdempotencyRecord.scope == scope,
+                    IdempotencyRecord.key.in_(digests),
+                    IdempotencyRecord.expires_at <= now
+                ))
+                vigentes = set(conn.execute(select(IdempotencyRecord.key).where(
+                    IdempotencyRecord.scope == scope,
+                    IdempotencyRecord.key.in_(digests)
+                )).scalars())
+                nuevos = [digest for digest in digests if digest not in vigentes]
+                if nuevos:
+                    conn.execute(insert(IdempotencyRecord), [
+                        dict(record, scope=scope, key=digest, created_at=now) for digest in nuevos
+                    ])
+        except IntegrityError:
+            # Otro proceso guardó la misma clave a la vez: se usa su respuesta
+            self.invalidate_local(scope, keys)
+            return False
+        except Exception as e:
+            logger.warning(f"Error guardando claves de idempotencia ({scope}): {e}")
+            return False
+        for digest in nuevos:
+            self._remember(scope, digest, record)
+        self._maybe_purge()
+        return True
+
+    def _maybe_purge(self) -> None:
+        if time.time() - self._last_purge <= IDEMPOTENCY_PURGE_SECONDS:
+            return
+        self._last_purge = time.time()
+        try:
+            self.purge_expired()
+        except Exception as e:
+            logger.warning(f"Error purgando claves de idempotencia vencidas: {e}")
+
+    def purge_expired(self) -> int:
+        """Elimina los registros vencidos, incluidas reservas abandonadas (BD y memoria)"""
+        now = datetime.utcnow()
+        with db.engine.begin() as conn:
+            deleted = conn.execute(delete(IdempotencyRecord).where(
+                IdempotencyRecord.expires_at <= now
+            )).rowcount
+        with self._lock:
+            for cache_key in [k for k, record in self._lru.items() if record['expires_at'] <= now]:
+                del self._lru[cache_key]
+        return deleted
+
+    def invalidate_local(self, scope: Optional[str] = None, keys: Optional[Iterable[str]] = None) -> None:
+        """Descarta la copia en memoria (todas, o las claves indicadas del scope)"""
+        with self._lock:
+            if scope is None:
+                self._lru.clear()
+                return
+            for key in keys or []:
+                self._lru.pop((scope, _digest(key)), None)
+
+
+def json_success(response) -> bool:
+    """Respuesta JSON 2xx que no reporta success=False"""
+    if not 200 <= response.status_code < 300 or not response.is_json:
+        return False
+    data = response.get_json(silent=True)
+    return not (isinstance(data, dict) and data.get('success') is False)
+
+
+def request_idempotency_key() -> Optional[str]:
+    """
+    Clave enviada por el cliente (header Idempotency-Key o campo de formulario
+    idempotency_key), acotada al usuario de la sesión. Sin sesión no se usa.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER) or request.form.get(IDEMPOTENCY_FORM_FIELD)
+    actor = (
+        session.get('pos_employee_id') or
+        session.get('guardarropia_employee_id') or
+        session.get('admin_username') or
+        session.get('admin_user')
+    )
+    if not key or not actor:
+        return None
+    return f"client:{actor}:{key.strip()[:200]}"
+
+
+def replay_response(record: Dict[str, Any]):
+    """Reconstruye la respuesta guardada"""
+    response = current_app.response_class(
+        record['body'], status=record['status_code'], content_type=record['content_type']
+    )
+    if record.get('location'):
+        response.headers['Location'] = record['location']
+    response.headers['Idempotent-Replay'] = 'true'
+    return response
+
+
+def _conflict_response():
+    response = jsonify({
+        'success': False,
+        'error': 'La misma operación ya se está procesando. Reintenta en unos segundos.'
+    })
+    response.status_code = 409
+    response.headers['Retry-After'] = '2'
+    return response
+
+
+def _acquire(scope: str, key: str):
+    """
+    Reserva la clave para este request. Retorna None si quedó reservada (o si
+    el almacén no está disponible) y, si no, la respuesta a devolver: la
+    guardada (replay) o un 409 si la operación original sigue en curso.
+    """
+    store = get_idempotency_store()
+    record = store.cached(scope, key)
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    while record is None:
+        reserved, record = store.reserve(scope, key)
+        if reserved:
+            g.idempotency['keys'].append(key)
+            return None
+        if record is None:
+            return None
+        if record['status'] == IdempotencyRecord.STATUS_PENDING:
+            if time.monotonic() >= deadline:
+                logger.warning(f"⚠️ Operación duplicada ({scope}) aún en curso: 409")
+                metrics.inc('idempotency_conflicts_total', 1, {'scope': scope})
+                return _conflict_response()
+            time.sleep(_WAIT_POLL_SECONDS)
+            record = None
+    logger.info(f"✅ Operación duplicada ({scope}), retornando respuesta guardada")
+    metrics.inc('idempotency_replays_total', 1, {'scope': scope})
+    return replay_response(record)
+
+
+def idempotent(scope: str, key_func: Callable[[], Optional[str]] = request_idempotency_key,
+               success: Callable[[Any], bool] = json_success, ttl_seconds: Optional[int] = None):
+    """
+    Declara una vista de escritura como idempotente. La clave del request
+    (key_func) y las derivadas (bind_idempotency_key) se reservan antes de
+    ejecutar la lógica; si ya tienen respuesta guardada se devuelve esa. Las
+    respuestas que cumplen `success` se guardan bajo todas las claves de la
+    operación; si no, o si la vista lanza una excepción, las reservas se liberan.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method in ('GET', 'HEAD', 'OPTIONS'):
+                return view(*args, **kwargs)
+            g.idempotency = {'scope': scope, 'keys': []}
+            key = key_func()
+            if key:
+                early = _acquire(scope, key)
+                if early is not None:
+                    return early
+
+            store = get_idempotency_store()
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                store.release(scope, g.idempotency['keys'])
+                raise
+            keys = g.idempotency['keys']
+            # Un replay de una clave derivada también completa la clave del cliente
+            if keys and success(response):
+                store.complete(
+                    scope, keys,
+                    body=response.get_data(as_text=True),
+                    status_code=response.status_code,
+                    content_type=response.content_type,
+                    location=response.headers.get('Location'),
+                    ttl_seconds=ttl_seconds
+                )
+            else:
+                store.release(scope, keys)
+            return response
+        return wrapper
+    return decorator
+
+
+def bind_idempotency_key(key: str):
+    """
+    Agrega a la operación @idempotent en curso una clave derivada por la vista
+    (p. ej. generate_sale_idempotency_key) y la reserva. Si esa clave ya tiene
+    respuesta guardada (o sigue en curso en otro request) retorna la respuesta
+    que la vista debe devolver tal cual; si no, retorna None y la respuesta
+    exitosa de la vista se guardará también bajo esta clave.
+    """
+    state = g.get('idempotency')
+    if state is None:
+        raise RuntimeError('bind_idempotency_key requiere una vista decorada con @idempotent')
+    return _acquire(state['scope'], key)
+
+
+_store: Optional[IdempotencyStore] = None
+_store_lock = threading.Lock()
+
 
+def get_idempotency_store() -> IdempotencyStore:
+    """Almacén de idempotencia compartido del proceso"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = IdempotencyStore()
+    return _store
@@ -10,8 +10,7 @@ from app.models.bartender_turno_models import (
     BartenderTurno, TurnoStockInicial, TurnoStockFinal,
     TurnoDesviacionInventario
 )
-from app.models.inventory_stock_models import InventoryMovement, Ingredient
-from app.models.sale_delivery_models import DeliveryItem
+from app.models.inventory_stock_models import Ingredient
 from decimal import Decimal
 
 
@@ -37,6 +36,9 @@ class InventarioTurnoHelper:
                          - CONSUMO_POR_RECETAS
                          - MERMAS_REGISTRADAS
         
+        Para todos los insumos del turno usar calcular_desviaciones_turno,
+        que carga los datos una sola vez.
+        
         Args:
             turno_id: ID del turno
             insumo_id: ID del insumo
@@ -45,83 +47,16 @@ class InventarioTurnoHelper:
             Decimal: Stock esperado
         """
         try:
+            from app.helpers.inventario_turno_engine import cargar_datos_turno, calcular_desviaciones, a_decimal
+            
             turno = BartenderTurno.query.get(turno_id)
             if not turno:
                 return Decimal('0.0')
             
-            # 1. Stock inicial del turno
-            stock_inicial_reg = TurnoStockInicial.query.filter_by(
-                turno_id=turno_id,
-                insumo_id=insumo_id
-            ).first()
-            
-            stock_inicial = Decimal('0.0')
-            if stock_inicial_reg:
-                stock_inicial = Decimal(str(stock_inicial_reg.cantidad_inicial))
-            
-            # 2. Transferencias entrantes (movimientos tipo 'entrada' o 'transferencia' durante el turno)
-            transferencias_entrantes = Decimal('0.0')
-            movimientos_entrada = InventoryMovement.query.filter(
-                InventoryMovement.ingredient_id == insumo_id,
-                InventoryMovement.location == turno.ubicacion,
-                InventoryMovement.turno_id == turno_id,
-                InventoryMovement.movement_type.in_(['entrada', 'transferencia']),
-                InventoryMovement.quantity > 0
-            ).all()
-            
-            for mov in movimientos_entrada:
-                transferencias_entrantes += Decimal(str(mov.quantity))
-            
-            # 3. Consumo por recetas (movimientos tipo 'venta' o 'delivery' durante el turno)
-            consumo_por_recetas = Decimal('0.0')
-            movimientos_consumo = InventoryMovement.query.filter(
-                InventoryMovement.ingredient_id == insumo_id,
-                InventoryMovement.location == turno.ubicacion,
-                InventoryMovement.turno_id == turno_id,
-                InventoryMovement.movement_type.in_(['venta', 'delivery']),
-                InventoryMovement.quantity < 0
-            ).all()
-            
-            for mov in movimientos_consumo:
-                # La cantidad es negativa, así que sumamos el valor absoluto
-                consumo_por_recetas += abs(Decimal(str(mov.quantity)))
-            
-            # También buscar en DeliveryItem directamente (por si no se registró en InventoryMovement)
-            from app.models.sale_delivery_models import SaleDeliveryStatus
-            entregas_turno = db.session.query(DeliveryItem).join(
-                SaleDeliveryStatus, DeliveryItem.sale_id == SaleDeliveryStatus.sale_id
-            ).filter(
-                DeliveryItem.location == turno.ubicacion,
-                DeliveryItem.delivered_at >= turno.fecha_hora_apertura,
-                DeliveryItem.delivered_at <= (turno.fecha_hora_cierre or datetime.utcnow())
-            ).all()
-            
-            # Sumar consumo de ingredientes desde entregas
-            for entrega in entregas_turno:
-                if entrega.ingredients_consumed:
-                    for consumo in entrega.ingredients_consumed:
-                        # Buscar insumo por nombre (si no tenemos ID directo)
-                        ingrediente_nombre = consumo.get('ingrediente', '')
-                        ingrediente = Ingredient.query.filter_by(name=ingrediente_nombre).first()
-                        if ingrediente and ingrediente.id == insumo_id:
-                            cantidad_consumida = Decimal(str(consumo.get('cantidad', 0)))
-                            consumo_por_recetas += cantidad_consumida
-            
-            # 4. Mermas registradas durante el turno
-            from app.models.bartender_turno_models import MermaInventario
-            mermas = MermaInventario.query.filter_by(
-                turno_id=turno_id,
-                insumo_id=insumo_id
-            ).all()
-            
-            mermas_registradas = Decimal('0.0')
-            for merma in mermas:
-                mermas_registradas += Decimal(str(merma.cantidad_mermada))
-            
-            # Calcular stock esperado
-            stock_esperado = stock_inicial + transferencias_entrantes - consumo_por_recetas - mermas_registradas
-            
-            return stock_esperado
+            datos = cargar_datos_turno(turno, insumo_ids=[insumo_id])
+            # El esperado no depende del stock final declarado
+            datos['stock_final'] = datos['stock_final'].fillna(0.0)
+            return a_decimal(calcular_desviaciones(datos).loc[insumo_id, 'stock_esperado'], 3)
             
         except Exception as e:
             current_app.logger.error(f"Error al calcular stock esperado: {e}", exc_info=True)
@@ -134,6 +69,10 @@ class InventarioTurnoHelper:
         """
         Calcula todas las desviaciones del turno comparando stock esperado vs final reportado.
         
+        Los datos del turno se cargan en bloque (una query por tabla) y el cálculo
+        es vectorizado (app/helpers/inventario_turno_engine.py); el resultado queda
+        guardado en TurnoDesviacionInventario al cerrar el turno.
+        
         Args:
             turno_id: ID del turno
             
@@ -141,6 +80,8 @@ class InventarioTurnoHelper:
             Tuple[bool, str, List[TurnoDesviacionInventario]]
         """
         try:
+            from app.helpers.inventario_turno_engine import cargar_datos_turno, calcular_desviaciones, a_decimal
+            
             turno = BartenderTurno.query.get(turno_id)
             if not turno:
                 return False, "Turno no encontrado", []
@@ -148,74 +89,40 @@ class InventarioTurnoHelper:
             if turno.estado != 'cerrado':
                 return False, "El turno debe estar cerrado para calcular desviaciones", []
             
-            # Obtener todos los insumos con stock inicial
-            stocks_iniciales = TurnoStockInicial.query.filter_by(turno_id=turno_id).all()
+            datos = cargar_datos_turno(turno)
+            sin_stock_final = datos.index[datos['stock_final'].isna()].tolist()
+            if sin_stock_final:
+                current_app.logger.warning(f"No hay stock final para insumos {sin_stock_final} en turno {turno_id}")
             
-            desviaciones = []
+            resultado = calcular_desviaciones(datos)
+            existentes = {
+                d.insumo_id: d
+                for d in TurnoDesviacionInventario.query.filter_by(turno_id=turno_id).all()
+            }
             
-            for stock_inicial in stocks_iniciales:
-                insumo_id = stock_inicial.insumo_id
-                
-                # Obtener stock final reportado
-                stock_final_reg = TurnoStockFinal.query.filter_by(
-                    turno_id=turno_id,
-                    insumo_id=insumo_id
-                ).first()
-                
-                if not stock_final_reg:
-                    current_app.logger.warning(f"No hay stock final para insumo {insumo_id} en turno {turno_id}")
-                    continue
-                
-                # Calcular stock esperado
-                stock_esperado = self.calcular_stock_esperado_turno(turno_id, insumo_id)
-                
-                # Obtener valores
-                stock_inicial_val = Decimal(str(stock_inicial.cantidad_inicial))
-                stock_esperado_val = stock_esperado
-                stock_final_val = Decimal(str(stock_final_reg.cantidad_final))
-                
-                # Calcular diferencia
-                diferencia_turno = stock_final_val - stock_esperado_val
-                
-                # Calcular diferencia porcentual (evitar división por cero)
-                if stock_esperado_val > 0:
-                    diferencia_porcentual = (diferencia_turno / stock_esperado_val) * Decimal('100')
-                else:
-                    diferencia_porcentual = Decimal('0.0') if diferencia_turno == 0 else Decimal('100.0')
-                
-                # Obtener costo unitario para calcular costo de diferencia
-                costo_unitario = self._get_costo_unitario_actual(insumo_id, turno.ubicacion)
-                costo_diferencia = diferencia_turno * costo_unitario
-                
-                # Determinar tipo de desviación
-                tipo = self._determinar_tipo_desviacion(diferencia_turno, diferencia_porcentual, costo_diferencia)
+            desviaciones = []
+            for insumo_id, fila in resultado.iterrows():
+                valores = {
+                    'stock_inicial_turno': a_decimal(fila['stock_inicial'], 3),
+                    'stock_esperado_turno': a_decimal(fila['stock_esperado'], 3),
+                    'stock_final_reportado': a_decimal(fila['stock_final'], 3),
+                    'diferencia_turno': a_decimal(fila['diferencia'], 3),
+                    'diferencia_porcentual_turno': a_decimal(fila['diferencia_porcentual'], 2),
+                    'costo_diferencia': a_decimal(fila['costo_diferencia'], 2),
+                    'tipo': fila['tipo'],
+                }
                 
                 # Crear o actualizar registro de desviación
-                desviacion = TurnoDesviacionInventario.query.filter_by(
-                    turno_id=turno_id,
-                    insumo_id=insumo_id
-                ).first()
-                
+                desviacion = existentes.get(insumo_id)
                 if desviacion:
-                    desviacion.stock_inicial_turno = stock_inicial_val
-                    desviacion.stock_esperado_turno = stock_esperado_val
-                    desviacion.stock_final_reportado = stock_final_val
-                    desviacion.diferencia_turno = diferencia_turno
-                    desviacion.diferencia_porcentual_turno = diferencia_porcentual
-                    desviacion.costo_diferencia = costo_diferencia
-                    desviacion.tipo = tipo
+                    for campo, valor in valores.items():
+                        setattr(desviacion, campo, valor)
                 else:
                     desviacion = TurnoDesviacionInventario(
                         turno_id=turno_id,
-                        insumo_id=insumo_id,
+                        insumo_id=int(insumo_id),
                         ubicacion=turno.ubicacion,
-                        stock_inicial_turno=stock_inicial_val,
-                        stock_esperado_turno=stock_esperado_val,
-                        stock_final_reportado=stock_final_val,
-                        diferencia_turno=diferencia_turno,
-                        diferencia_porcentual_turno=diferencia_porcentual,
-                        costo_diferencia=costo_diferencia,
-                        tipo=tipo
+                        **valores
                     )
                     db.session.add(desviacion)
                 
@@ -237,6 +144,9 @@ class InventarioTurnoHelper:
         """
         Calcula el resumen financiero completo del turno.
         
+        Un turno cerrado usa los valores que calcular_resumen_turno guardó en el
+        turno al cerrarlo; solo se recalcula (en bloque) si aún no existen.
+        
         Returns:
             Dict con valores calculados
         """
@@ -249,17 +159,26 @@ class InventarioTurnoHelper:
             valor_inicial = Decimal(str(turno.valor_inicial_barra_costo)) if turno.valor_inicial_barra_costo else Decimal('0.0')
             valor_final = Decimal(str(turno.valor_final_barra_costo)) if turno.valor_final_barra_costo else Decimal('0.0')
             
-            # Valor vendido (venta)
-            valor_vendido_venta = self._calcular_valor_vendido_venta(turno_id)
-            
-            # Valor vendido (costo teórico)
-            valor_vendido_costo = self._calcular_valor_vendido_costo(turno_id)
-            
-            # Valor de merma
-            valor_merma = self._calcular_valor_merma(turno_id)
-            
-            # Valor de pérdida no justificada (suma de costos de diferencia negativos)
-            valor_perdida_no_justificada = self._calcular_valor_perdida_no_justificada(turno_id)
+            guardados = (
+                turno.valor_vendido_venta, turno.valor_vendido_costo,
+                turno.valor_merma_costo, turno.valor_perdida_no_justificada_costo
+            )
+            if turno.estado == 'cerrado' and all(v is not None for v in guardados):
+                valor_vendido_venta, valor_vendido_costo, valor_merma, valor_perdida_no_justificada = (
+                    Decimal(str(v)) for v in guardados
+                )
+            else:
+                from app.helpers.inventario_turno_engine import (
+                    entregas_turno, valor_vendido_venta as calcular_venta,
+                    valor_vendido_costo as calcular_costo, totales_merma_y_perdida
+                )
+                
+                entregas = entregas_turno(turno, con_estado=False)
+                # Valor vendido (venta) y costo teórico
+                valor_vendido_venta = calcular_venta(entregas)
+                valor_vendido_costo = calcular_costo(entregas)
+                # Merma y pérdida no justificada (suma de costos de diferencia negativos)
+                valor_merma, valor_perdida_no_justificada = totales_merma_y_perdida(turno_id)
             
             return {
                 'valor_inicial_barra_costo': float(valor_inicial),
@@ -276,114 +195,6 @@ class InventarioTurnoHelper:
             current_app.logger.error(f"Error al calcular resumen financiero: {e}", exc_info=True)
             return {}
     
-    def _calcular_valor_vendido_venta(self, turno_id: int) -> Decimal:
-        """Calcula el valor de venta de productos entregados en el turno"""
-        try:
-            turno = BartenderTurno.query.get(turno_id)
-            if not turno:
-                return Decimal('0.0')
-            
-            # Buscar entregas del turno
-            entregas = DeliveryItem.query.filter(
-                DeliveryItem.location == turno.ubicacion,
-                DeliveryItem.delivered_at >= turno.fecha_hora_apertura,
-                DeliveryItem.delivered_at <= (turno.fecha_hora_cierre or datetime.utcnow())
-            ).all()
-            
-            valor_total = Decimal('0.0')
-            
-            # Obtener precios de productos desde PosSale
-            from app.models.pos_models import PosSale, PosSaleItem
-            
-            for entrega in entregas:
-                # Buscar venta asociada
-                sale = PosSale.query.filter_by(sale_id_phppos=entrega.sale_id).first()
-                if sale:
-                    # Buscar item en la venta
-                    item = PosSaleItem.query.filter_by(
-                        sale_id=sale.id,
-                        product_name=entrega.product_name
-                    ).first()
-                    
-                    if item:
-                        precio_unitario = Decimal(str(item.unit_price))
-                        cantidad = Decimal(str(entrega.quantity_delivered))
-                        valor_total += precio_unitario * cantidad
-            
-            return valor_total
-            
-        except Exception as e:
-            current_app.logger.error(f"Error al calcular valor vendido venta: {e}", exc_info=True)
-            return Decimal('0.0')
-    
-    def _calcular_valor_vendido_costo(self, turno_id: int) -> Decimal:
-        """Calcula el costo teórico de productos entregados usando recetas"""
-        try:
-            turno = BartenderTurno.query.get(turno_id)
-            if not turno:
-                return Decimal('0.0')
-            
-            # Sumar costos de ingredientes consumidos en entregas
-            entregas = DeliveryItem.query.filter(
-                DeliveryItem.location == turno.ubicacion,
-                DeliveryItem.delivered_at >= turno.fecha_hora_apertura,
-                DeliveryItem.delivered_at <= (turno.fecha_hora_cierre or datetime.utcnow())
-            ).all()
-            
-            valor_total = Decimal('0.0')
-            
-            for entrega in entregas:
-                if entrega.ingredients_consumed:
-                    for consumo in entrega.ingredients_consumed:
-                        ingrediente_nombre = consumo.get('ingrediente', '')
-                        cantidad = Decimal(str(consumo.get('cantidad', 0)))
-                        
-                        # Buscar insumo y su costo
-                        ingrediente = Ingredient.query.filter_by(name=ingrediente_nombre).first()
-                        if ingrediente:
-                            costo_unitario = self._get_costo_unitario_actual(ingrediente.id, turno.ubicacion)
-                            valor_total += cantidad * costo_unitario
-            
-            return valor_total
-            
-        except Exception as e:
-            current_app.logger.error(f"Error al calcular valor vendido costo: {e}", exc_info=True)
-            return Decimal('0.0')
-    
-    def _calcular_valor_merma(self, turno_id: int) -> Decimal:
-        """Calcula el valor total de merma registrada en el turno"""
-        try:
-            from app.models.bartender_turno_models import MermaInventario
-            
-            mermas = MermaInventario.query.filter_by(turno_id=turno_id).all()
-            
-            valor_total = Decimal('0.0')
-            for merma in mermas:
-                valor_total += Decimal(str(merma.costo_merma))
-            
-            return valor_total
-            
-        except Exception as e:
-            current_app.logger.error(f"Error al calcular valor merma: {e}", exc_info=True)
-            return Decimal('0.0')
-    
-    def _calcular_valor_perdida_no_justificada(self, turno_id: int) -> Decimal:
-        """Calcula el valor de pérdida no justificada (desviaciones negativas)"""
-        try:
-            desviaciones = TurnoDesviacionInventario.query.filter_by(turno_id=turno_id).all()
-            
-            valor_total = Decimal('0.0')
-            for desviacion in desviaciones:
-                # Solo sumar diferencias negativas (pérdidas)
-                if desviacion.diferencia_turno < 0:
-                    valor_total += abs(Decimal(str(desviacion.costo_diferencia)))
-            
-            return valor_total
-            
-        except Exception as e:
-            current_app.logger.error(f"Error al calcular valor pérdida no justificada: {e}", exc_info=True)
-            return Decimal('0.0')
-    
     def _get_costo_unitario_actual(self, insumo_id: int, ubicacion: str) -> Decimal:
         """Obtiene el costo unitario actual de un insumo"""
         try:
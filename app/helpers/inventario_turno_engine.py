@@ -0,0 +1,250 @@
+"""
+Motor de desviaciones de inventario por turno de bartender
+Carga en bloque todo lo que el cierre necesita (stock inicial/final,
+movimientos, entregas, mermas y costos unitarios) con una query por tabla y
+calcula esperado vs reportado para todos los insumos a la vez con pandas.
+
+Reemplaza los loops por insumo de InventarioTurnoHelper, que hacían varias
+queries por insumo (cientos al cerrar un turno de 80 insumos).
+
+Fórmula por insumo:
+    STOCK_ESPERADO = STOCK_INICIAL + ENTRADAS - CONSUMO - MERMAS
+    DIFERENCIA     = STOCK_FINAL_REPORTADO - STOCK_ESPERADO
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import case, func
+
+from app.models import db
+from app.models.bartender_turno_models import (
+    BartenderTurno, MermaInventario, TurnoStockFinal, TurnoStockInicial
+)
+from app.models.inventory_stock_models import Ingredient, InventoryMovement
+from app.models.sale_delivery_models import DeliveryItem, SaleDeliveryStatus
+
+# Umbrales de clasificación (mismos que InventarioTurnoHelper._determinar_tipo_desviacion)
+UMBRAL_PORCENTUAL = 5
+UMBRAL_COSTO = 10000
+
+COLUMNAS = [
+    'stock_inicial', 'stock_final', 'entradas', 'consumo_movimientos',
+    'consumo_entregas', 'mermas', 'costo_unitario'
+]
+
+
+def costos_unitarios(insumo_ids: Iterable[int]) -> Dict[int, Decimal]:
+    """Costo por unidad base de varios insumos en una query (0 si no existe o no tiene costo)"""
+    ids = {int(i) for i in insumo_ids if i is not None}
+    costos = {i: Decimal('0.0') for i in ids}
+    if not ids:
+        return costos
+    rows = db.session.query(Ingredient.id, Ingredient.cost_per_unit).filter(Ingredient.id.in_(ids)).all()
+    for insumo_id, costo in rows:
+        if costo:
+            costos[insumo_id] = Decimal(str(costo))
+    return costos
+
+
+def _ids_por_nombre(nombres: Iterable[str]) -> Dict[str, int]:
+    """Nombre de ingrediente -> id (el menor id si hay nombres repetidos)"""
+    nombres = {n for n in nombres if n}
+    if not nombres:
+        return {}
+    rows = db.session.query(Ingredient.name, func.min(Ingredient.id)).filter(
+        Ingredient.name.in_(nombres)
+    ).group_by(Ingredient.name).all()
+    return {nombre: insumo_id for nombre, insumo_id in rows}
+
+
+def entregas_turno(turno: BartenderTurno, con_estado: bool = True) -> List[DeliveryItem]:
+    """
+    Entregas de la ubicación durante la ventana del turno (una query).
+    con_estado=True solo considera entregas con SaleDeliveryStatus (cálculo de consumo).
+    """
+    query = db.session.query(DeliveryItem)
+    if con_estado:
+        query = query.join(SaleDeliveryStatus, DeliveryItem.sale_id == SaleDeliveryStatus.sale_id)
+    return query.filter(
+        DeliveryItem.location == turno.ubicacion,
+        DeliveryItem.delivered_at >= turno.fecha_hora_apertura,
+        DeliveryItem.delivered_at <= (turno.fecha_hora_cierre or datetime.utcnow())
+    ).all()
+
+
+def consumo_entregas(entregas: List[DeliveryItem]) -> pd.Series:
+    """Consumo por insumo declarado en ingredients_consumed de las entregas (por nombre)"""
+    consumos: List[Tuple[str, float]] = []
+    for entrega in entregas:
+        for consumo in entrega.ingredients_consumed or []:
+            consumos.append((consumo.get('ingrediente', ''), float(consumo.get('cantidad', 0) or 0)))
+    if not consumos:
+        return pd.Series(dtype='float64')
+
+    df = pd.DataFrame(consumos, columns=['nombre', 'cantidad'])
+    df['insumo_id'] = df['nombre'].map(_ids_por_nombre(df['nombre'].unique()))
+    df = df.dropna(subset=['insumo_id'])
+    return df.groupby(df['insumo_id'].astype(int))['cantidad'].sum()
+
+
+def cargar_datos_turno(
+    turno: BartenderTurno,
+    insumo_ids: Optional[Iterable[int]] = None,
+    entregas: Optional[List[DeliveryItem]] = None
+) -> pd.DataFrame:
+    """
+    DataFrame indexado por insumo_id con todas las entradas del cálculo.
+
+    Por defecto incluye los insumos con stock inicial en el turno. stock_final
+    queda NaN si el bartender no lo declaró.
+    """
+    inicial = dict(db.session.query(TurnoStockInicial.insumo_id, TurnoStockInicial.cantidad_inicial).filter(
+        TurnoStockInicial.turno_id == turno.id
+    ).all())
+    ids = sorted(inicial) if insumo_ids is None else sorted({int(i) for i in insumo_ids})
+    df = pd.DataFrame(index=pd.Index(ids, name='insumo_id'), columns=COLUMNAS, dtype='float64')
+    if not ids:
+        return df
+
+    df['stock_inicial'] = pd.Series({i: float(v) for i, v in inicial.items()}, dtype='float64')
+
+    final = db.session.query(TurnoStockFinal.insumo_id, TurnoStockFinal.cantidad_final).filter(
+        TurnoStockFinal.turno_id == turno.id,
+        TurnoStockFinal.insumo_id.in_(ids)
+    ).all()
+    df['stock_final'] = pd.Series({i: float(v) for i, v in final}, dtype='float64')
+
+    # Entradas y consumo desde movimientos del turno en una query agrupada
+    entrada = InventoryMovement.movement_type.in_(['entrada', 'transferencia']) & (InventoryMovement.quantity > 0)
+    salida = InventoryMovement.movement_type.in_(['venta', 'delivery']) & (InventoryMovement.quantity < 0)
+    movimientos = db.session.query(
+        InventoryMovement.ingredient_id,
+        func.sum(case((entrada, InventoryMovement.quantity), else_=0)),
+        func.sum(case((salida, -InventoryMovement.quantity), else_=0))
+    ).filter(
+        InventoryMovement.turno_id == turno.id,
+        InventoryMovement.location == turno.ubicacion,
+        InventoryMovement.ingredient_id.in_(ids)
+    ).group_by(InventoryMovement.ingredient_id).all()
+    df['entradas'] = pd.Series({i: float(e or 0) for i, e, _ in movimientos}, dtype='float64')
+    df['consumo_movimientos'] = pd.Series({i: float(c or 0) for i, _, c in movimientos}, dtype='float64')
+
+    if entregas is None:
+        entregas = entregas_turno(turno)
+    df['consumo_entregas'] = consumo_entregas(entregas)
+
+    mermas = db.session.query(MermaInventario.insumo_id, func.sum(MermaInventario.cantidad_mermada)).filter(
+        MermaInventario.turno_id == turno.id,
+        MermaInventario.insumo_id.in_(ids)
+    ).group_by(MermaInventario.insumo_id).all()
+    df['mermas'] = pd.Series({i: float(m or 0) for i, m in mermas}, dtype='float64')
+
+    df['costo_unitario'] = pd.Series({i: float(c) for i, c in costos_unitarios(ids).items()}, dtype='float64')
+
+    return df.fillna({c: 0.0 for c in COLUMNAS if c != 'stock_final'})
+
+
+def calcular_desviaciones(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrega stock_esperado, diferencia, diferencia_porcentual, costo_diferencia
+    y tipo a cada insumo (vectorizado). Los insumos sin stock final se omiten.
+    """
+    df = df.dropna(subset=['stock_final']).copy()
+    df['stock_esperado'] = (
+        df['stock_inicial'] + df['entradas']
+        - df['consumo_movimientos'] - df['consumo_entregas'] - df['mermas']
+    ).round(3)
+    df['diferencia'] = (df['stock_final'] - df['stock_esperado']).round(3)
+
+    esperado_positivo = df['stock_esperado'] > 0
+    df['diferencia_porcentual'] = np.where(
+        esperado_positivo,
+        df['diferencia'] / df['stock_esperado'].where(esperado_positivo, 1) * 100,
+        np.where(df['diferencia'] == 0, 0.0, 100.0)
+    ).round(2)
+    df['costo_diferencia'] = (df['diferencia'] * df['costo_unitario']).round(2)
+
+    porcentaje_alto = df['diferencia_porcentual'].abs() > UMBRAL_PORCENTUAL
+    df['tipo'] = np.select(
+        [
+            df['diferencia'] == 0,
+            (df['diferencia'] < 0) & (porcentaje_alto | (df['costo_diferencia'].abs() > UMBRAL_COSTO)),
+            df['diferencia'] < 0,
+            porcentaje_alto,
+        ],
+        ['normal', 'perdida_critica', 'perdida', 'ganancia_rara'],
+        default='ganancia'
+    )
+    return df
+
+
+def valor_vendido_venta(entregas: List[DeliveryItem]) -> Decimal:
+    """
+    Precio de venta de lo entregado: ventas por sale_id_phppos (o ID local en
+    formato BMB-...-<id>) e ítems por nombre de producto, en dos queries.
+    """
+    from app.models.pos_models import PosSale, PosSaleItem
+
+    if not entregas:
+        return Decimal('0.0')
+
+    sale_ids = {e.sale_id for e in entregas if e.sale_id}
+    ventas = dict(db.session.query(PosSale.sale_id_phppos, PosSale.id).filter(
+        PosSale.sale_id_phppos.in_(sale_ids)
+    ).all()) if sale_ids else {}
+    for sale_id in sale_ids - set(ventas):
+        # Fallback: ID local al final del código BMB-
+        partes = sale_id.split('-') if sale_id.startswith('BMB-') else []
+        if len(partes) >= 3 and partes[-1].isdigit():
+            ventas[sale_id] = int(partes[-1])
+
+    precios: Dict[Tuple[int, str], Decimal] = {}
+    if ventas:
+        items = db.session.query(PosSaleItem.sale_id, PosSaleItem.product_name, PosSaleItem.unit_price).filter(
+            PosSaleItem.sale_id.in_(set(ventas.values()))
+        ).order_by(PosSaleItem.id).all()
+        for sale_pk, nombre, precio in items:
+            precios.setdefault((sale_pk, nombre), Decimal(str(precio)))
+
+    total = Decimal('0.0')
+    for entrega in entregas:
+        precio = precios.get((ventas.get(entrega.sale_id), entrega.product_name))
+        if precio is not None:
+            total += precio * Decimal(str(entrega.quantity_delivered))
+    return total
+
+
+def valor_vendido_costo(entregas: List[DeliveryItem]) -> Decimal:
+    """Costo teórico de lo entregado según ingredients_consumed y el costo actual de cada insumo"""
+    consumo = consumo_entregas(entregas)
+    if consumo.empty:
+        return Decimal('0.0')
+    costos = costos_unitarios(consumo.index)
+    return sum(
+        (Decimal(str(cantidad)) * costos.get(int(insumo_id), Decimal('0.0')) for insumo_id, cantidad in consumo.items()),
+        Decimal('0.0')
+    )
+
+
+def totales_merma_y_perdida(turno_id: int) -> Tuple[Decimal, Decimal]:
+    """(costo de mermas del turno, pérdida no justificada = suma |costo| de desviaciones negativas)"""
+    from app.models.bartender_turno_models import TurnoDesviacionInventario
+
+    merma = db.session.query(func.coalesce(func.sum(MermaInventario.costo_merma), 0)).filter(
+        MermaInventario.turno_id == turno_id
+    ).scalar()
+    perdida = db.session.query(
+        func.coalesce(func.sum(func.abs(TurnoDesviacionInventario.costo_diferencia)), 0)
+    ).filter(
+        TurnoDesviacionInventario.turno_id == turno_id,
+        TurnoDesviacionInventario.diferencia_turno < 0
+    ).scalar()
+    return Decimal(str(merma or 0)), Decimal(str(perdida or 0))
+
+
+def a_decimal(valor: Any, decimales: int) -> Decimal:
+    """float de pandas -> Decimal redondeado para columnas Numeric"""
+    return Decimal(str(round(float(valor), decimales)))
@@ -5,15 +5,38 @@ from flask import current_app
 from .. import socketio
 from ..models import db
 from ..models.delivery_models import Delivery
+from .outbox_channels import emit_after_commit
 
 EXPECTED_LOG_HEADER = ['sale_id', 'item_name', 'qty', 'bartender', 'barra', 'timestamp']
 
 
-def load_logs():
-    """Carga logs desde la base de datos"""
+def _logs_query(desde=None, hasta=None):
+    query = Delivery.query
+    if desde:
+        query = query.filter(Delivery.timestamp >= desde)
+    if hasta:
+        query = query.filter(Delivery.timestamp < hasta)
+    return query.order_by(Delivery.timestamp.desc())
+
+
+def iter_logs(desde=None, hasta=None, chunk_size=None):
+    """
+    Itera logs (filas CSV) leyendo la BD por chunks, sin cargar todas las entregas.
+
+    Args:
+        desde: datetime inicial (inclusivo) o None
+        hasta: datetime final (exclusivo) o None
+        chunk_size: filas por viaje a la BD (default EXPORT_CHUNK_SIZE)
+    """
+    from .export_utils import EXPORT_CHUNK_SIZE, iter_query
+    for delivery in iter_query(_logs_query(desde, hasta), chunk_size or EXPORT_CHUNK_SIZE):
+        yield delivery.to_csv_row()
+
+
+def load_logs(desde=None, hasta=None):
+    """Carga logs desde la base de datos (opcionalmente filtrados por rango de fechas)"""
     try:
-        deliveries = Delivery.query.order_by(Delivery.timestamp.desc()).all()
-        return [delivery.to_csv_row() for delivery in deliveries]
+        return list(iter_logs(desde, hasta))
     except Exception as e:
         current_app.logger.error(f"Error al cargar logs desde BD: {e}")
         return []
@@ -45,9 +68,9 @@ def save_log(sale_id, item_name, qty, bartender, barra):
         )
         
         db.session.add(delivery)
-        db.session.commit()
+        db.session.flush()
         
-        # Enviar evento a n8n (después de commit exitoso)
+        # Eventos a n8n y Socket.IO en la misma transacción (outbox, se envían tras el commit)
         try:
             from app.helpers.n8n_client import send_delivery_created
             send_delivery_created(
@@ -64,13 +87,13 @@ def save_log(sale_id, item_name, qty, bartender, barra):
         entry = [sale_id, item_name, str(qty_int), bartender, barra, timestamp.strftime('%Y-%m-%d %H:%M:%S')]
         
         # Avisar a clientes admin conectados
-        socketio.emit('new_log', {'log_entry': entry}, namespace='/admin_logs')
+        emit_after_commit('new_log', {'log_entry': entry}, namespace='/admin_logs')
         
         # Calcular estadísticas rápidas y emitir para dashboard en tiempo real
         now = datetime.now()
         current_hour = now.hour
         
-        socketio.emit('stats_update', {
+        emit_after_commit('stats_update', {
             'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
             'hour': current_hour,
             'type': 'new_delivery',
@@ -80,6 +103,8 @@ def save_log(sale_id, item_name, qty, bartender, barra):
             'qty': str(qty_int)
         }, namespace='/admin_stats')
         
+        db.session.commit()
+        
         return True
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,551 @@
+"""
+Métricas de rendimiento con memoria constante
+Contadores, gauges e histogramas de buckets fijos (log-lineales, estilo HDR)
+para rutas calientes: venta POS, entregas del scanner, payment intents y
+tiempo de queries de BD.
+
+Cada worker de gunicorn escribe su snapshot en un directorio compartido
+(BIMBA_METRICS_DIR) y el endpoint de scrape suma los snapshots de todos los
+workers vivos: como los buckets son fijos, los histogramas se combinan sumando.
+
+Los snapshots de workers muertos (sin flush por más de BIMBA_METRICS_STALE_SECONDS,
+o pisados por un worker nuevo con el mismo pid) se retiran: sus contadores e
+histogramas se suman a una base acumulada (retired.json) y el archivo se borra,
+así los totales no retroceden al reciclar workers. Los gauges de un worker
+muerto se descartan.
+"""
+import functools
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .logger import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: un solo proceso, sin bloqueo entre workers
+    fcntl = None
+
+logger = get_logger(__name__)
+
+METRICS_DIR = os.environ.get(
+    'BIMBA_METRICS_DIR',
+    os.path.join(tempfile.gettempdir(), 'bimba_metrics')
+)
+FLUSH_INTERVAL = float(os.environ.get('BIMBA_METRICS_FLUSH_SECONDS', '10'))
+STALE_SECONDS = float(os.environ.get('BIMBA_METRICS_STALE_SECONDS', '600'))
+
+RETIRED_FILENAME = 'retired.json'
+LOCK_FILENAME = '.metrics.lock'
+
+# Buckets de histograma: 0.1 ms a ~2 min con error relativo < 4%
+HISTOGRAM_MIN = 0.0001
+HISTOGRAM_GROWTH = 1.08
+HISTOGRAM_BUCKETS = int(math.ceil(math.log(120.0 / HISTOGRAM_MIN) / math.log(HISTOGRAM_GROWTH))) + 1
+_LOG_GROWTH = math.log(HISTOGRAM_GROWTH)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, Any]]) -> LabelKey:
+    if not labels:
+        return ()
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    """
+    Histograma de buckets logarítmicos fijos.
+    Memoria constante sin importar cuántas observaciones reciba.
+    El bucket 0 acumula valores < HISTOGRAM_MIN y el último los que exceden el rango.
+    Los percentiles usan el punto medio geométrico del bucket: error relativo
+    <= sqrt(HISTOGRAM_GROWTH) - 1 (< 4% con crecimiento 1.08).
+    """
+
+    __slots__ = ('counts', 'count', 'sum', 'min', 'max')
+
+    def __init__(self):
+        self.counts: List[int] = [0] * (HISTOGRAM_BUCKETS + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    @staticmethod
+    def bucket_index(value: float) -> int:
+        if value < HISTOGRAM_MIN:
+            return 0
+        index = int(math.log(value / HISTOGRAM_MIN) / _LOG_GROWTH) + 1
+        return min(index, HISTOGRAM_BUCKETS)
+
+    @staticmethod
+    def bucket_upper(index: int) -> float:
+        """Límite superior del bucket"""
+        return HISTOGRAM_MIN * (HISTOGRAM_GROWTH ** index)
+
+    def observe(self, value: float) -> None:
+        self.counts[self.bucket_index(value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other: 'Histogram') -> None:
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Percentil aproximado (punto medio geométrico del bucket, acotado por min/max)"""
+        if not self.count:
+            return None
+        objetivo = max(1, int(math.ceil(self.count * p / 100.0)))
+        acumulado = 0
+        for i, c in enumerate(self.counts):
+            acumulado += c
+            if acumulado >= objetivo:
+                if i == 0:
+                    valor = self.min
+                else:
+                    valor = self.bucket_upper(i - 0.5)
+                return min(max(valor, self.min), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'avg': round(self.sum / self.count, 6) if self.count else None,
+            'min': round(self.min, 6) if self.min is not None else None,
+            'max': round(self.max, 6) if self.max is not None else None,
+            'p50': round(self.percentile(50), 6) if self.count else None,
+            'p95': round(self.percentile(95), 6) if self.count else None,
+            'p99': round(self.percentile(99), 6) if self.count else None,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'buckets': {str(i): c for i, c in enumerate(self.counts) if c},
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Histogram':
+        hist = cls()
+        for i, c in data.get('buckets', {}).items():
+            index = int(i)
+            if 0 <= index < len(hist.counts):
+                hist.counts[index] = int(c)
+        hist.count = int(data.get('count', 0))
+        hist.sum = float(data.get('sum', 0.0))
+        hist.min = data.get('min')
+        hist.max = data.get('max')
+        return hist
+
+
+class MetricsRegistry:
+    """Registro de métricas del proceso (thread-safe)"""
+
+    def __init__(self, metrics_dir: Optional[str] = METRICS_DIR):
+        self.metrics_dir = metrics_dir
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._flusher_pid: Optional[int] = None
+        self._flushed_pid: Optional[int] = None
+
+    # ------------------------------------------------------------------
+    # Registro
+    # ------------------------------------------------------------------
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1, labels: Optional[Dict[str, Any]] = None) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            serie = self._counters.setdefault(name, {})
+            serie[key] = serie.get(key, 0) + value
+        self._ensure_flusher()
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+        self._ensure_flusher()
+
+    def add_gauge(self, name: str, delta: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            serie = self._gauges.setdefault(name, {})
+            serie[key] = serie.get(key, 0) + delta
+        self._ensure_flusher()
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            serie = self._histograms.setdefault(name, {})
+            hist = serie.get(key)
+            if hist is None:
+                hist = serie[key] = Histogram()
+            hist.observe(value)
+        self._ensure_flusher()
+
+    @contextmanager
+    def timer(self, name: str, labels: Optional[Dict[str, Any]] = None):
+        """Context manager que registra la duración en segundos en un histograma"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    # ------------------------------------------------------------------
+    # Snapshots (por worker y agregados)
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Snapshot serializable de las métricas de este proceso"""
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'timestamp': time.time(),
+                'counters': {n: [[list(k), v] for k, v in s.items()] for n, s in self._counters.items()},
+                'gauges': {n: [[list(k), v] for k, v in s.items()] for n, s in self._gauges.items()},
+                'histograms': {n: [[list(k), h.to_dict()] for k, h in s.items()] for n, s in self._histograms.items()},
+            }
+
+    def _snapshot_path(self, pid: Optional[int] = None) -> str:
+        return os.path.join(self.metrics_dir, f"worker-{pid or os.getpid()}.json")
+
+    @contextmanager
+    def _dir_lock(self, exclusive: bool):
+        """Bloqueo del directorio: compartido al leer, exclusivo al retirar snapshots"""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        with open(os.path.join(self.metrics_dir, LOCK_FILENAME), 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _write_json(self, path: str, data: Dict[str, Any]) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.metrics_dir, prefix='.metrics-', suffix='.json')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def _retire(self, paths: List[str]) -> None:
+        """
+        Suma contadores e histogramas de los snapshots dados a la base retirada y
+        los borra. Debe llamarse con el bloqueo exclusivo tomado.
+        """
+        retired_path = os.path.join(self.metrics_dir, RETIRED_FILENAME)
+        snaps = []
+        for path in paths:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    snaps.append(json.load(f))
+            except (OSError, ValueError):
+                pass
+        if snaps:
+            if os.path.exists(retired_path):
+                with open(retired_path, 'r', encoding='utf-8') as f:
+                    snaps.append(json.load(f))
+            merged = _merge_snapshots(snaps)
+            self._write_json(retired_path, {
+                'timestamp': time.time(),
+                'counters': {n: [[list(k), v] for k, v in serie.items()] for n, serie in merged['counters'].items()},
+                'histograms': {n: [[list(k), h.to_dict()] for k, h in serie.items()]
+                               for n, serie in merged['histograms'].items()},
+            })
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _retire_previous_owner(self) -> None:
+        """Antes del primer flush de este proceso, un archivo con su pid es de un worker muerto"""
+        own_path = self._snapshot_path()
+        if self._flushed_pid != os.getpid() and os.path.exists(own_path):
+            with self._dir_lock(exclusive=True):
+                if os.path.exists(own_path):
+                    self._retire([own_path])
+
+    def _retire_stale(self) -> None:
+        """Retira snapshots de workers muertos y temporales huérfanos"""
+        now = time.time()
+        own_path = self._snapshot_path()
+        stale, huerfanos = [], []
+        for filename in os.listdir(self.metrics_dir):
+            path = os.path.join(self.metrics_dir, filename)
+            try:
+                if now - os.path.getmtime(path) <= STALE_SECONDS:
+                    continue
+            except OSError:
+                continue
+            if filename.startswith('worker-') and filename.endswith('.json') and path != own_path:
+                stale.append(path)
+            elif filename.startswith('.metrics-'):
+                huerfanos.append(path)
+        if not stale and not huerfanos:
+            return
+        with self._dir_lock(exclusive=True):
+            # Re-verificar bajo el bloqueo: otro worker pudo retirarlos ya
+            self._retire([p for p in stale if os.path.exists(p)])
+        for path in huerfanos:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def flush(self) -> None:
+        """Escribe el snapshot de este worker de forma atómica"""
+        if not self.metrics_dir:
+            return
+        try:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            self._retire_previous_owner()
+            self._write_json(self._snapshot_path(), self.snapshot())
+            self._flushed_pid = os.getpid()
+        except OSError as e:
+            logger.warning(f"No se pudo guardar snapshot de métricas: {e}")
+
+    def _ensure_flusher(self) -> None:
+        """Inicia el hilo de flush en este proceso (se reinicia tras el fork de gunicorn)"""
+        pid = os.getpid()
+        if self._flusher_pid == pid or not self.metrics_dir:
+            return
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            self._flusher_pid = pid
+        thread = threading.Thread(target=self._flush_loop, daemon=True, name='metrics-flush')
+        thread.start()
+
+    def _flush_loop(self) -> None:
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(FLUSH_INTERVAL)
+            self.flush()
+
+    def _load_snapshots(self) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Snapshots de los workers vivos (incluido este) y la base retirada"""
+        snaps = [self.snapshot()]
+        if not self.metrics_dir or not os.path.isdir(self.metrics_dir):
+            return snaps, None
+        self._retire_previous_owner()
+        self._retire_stale()
+        own_path = self._snapshot_path()
+        retired = None
+        # Bloqueo compartido: la base y los snapshots se leen sin un retiro a medias
+        with self._dir_lock(exclusive=False):
+            for filename in os.listdir(self.metrics_dir):
+                path = os.path.join(self.metrics_dir, filename)
+                try:
+                    if filename == RETIRED_FILENAME:
+                        with open(path, 'r', encoding='utf-8') as f:
+                            retired = json.load(f)
+                    elif filename.startswith('worker-') and filename.endswith('.json') and path != own_path:
+                        with open(path, 'r', encoding='utf-8') as f:
+                            snaps.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return snaps, retired
+
+    def collect(self) -> Dict[str, Any]:
+        """
+        Agrega las métricas de todos los workers más la base de workers retirados.
+        Contadores y gauges se suman; histogramas se combinan por bucket.
+        """
+        snaps, retired = self._load_snapshots()
+        data = _merge_snapshots(snaps + ([retired] if retired else []))
+        data['workers'] = len(snaps)
+        return data
+
+    # ------------------------------------------------------------------
+    # Exportación
+    # ------------------------------------------------------------------
+
+    def to_json(self) -> Dict[str, Any]:
+        data = self.collect()
+
+        def series(serie, fmt):
+            return [{'labels': dict(k), **fmt(v)} for k, v in sorted(serie.items())]
+
+        return {
+            'workers': data['workers'],
+            'counters': {n: series(s, lambda v: {'value': v}) for n, s in data['counters'].items()},
+            'gauges': {n: series(s, lambda v: {'value': v}) for n, s in data['gauges'].items()},
+            'histograms': {n: series(s, lambda h: h.summary()) for n, s in data['histograms'].items()},
+        }
+
+    def render_prometheus(self) -> str:
+        """Formato de texto de Prometheus (histogramas como summary con cuantiles)"""
+        data = self.collect()
+        lines = [f"bimba_metrics_workers {data['workers']}"]
+
+        def fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+            pares = list(key) + ([extra] if extra else [])
+            if not pares:
+                return ''
+            return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pares) + '}'
+
+        for tipo, origen in (('counter', data['counters']), ('gauge', data['gauges'])):
+            for name in sorted(origen):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {tipo}")
+                for key, value in sorted(origen[name].items()):
+                    lines.append(f"{name}{fmt_labels(key)} {value}")
+
+        for name in sorted(data['histograms']):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} summary")
+            for key, hist in sorted(data['histograms'][name].items()):
+                for q in (50, 95, 99):
+                    value = hist.percentile(q)
+                    lines.append(f"{name}{fmt_labels(key, ('quantile', str(q / 100)))} {value if value is not None else 'NaN'}")
+                lines.append(f"{name}_sum{fmt_labels(key)} {hist.sum}")
+                lines.append(f"{name}_count{fmt_labels(key)} {hist.count}")
+
+        return '\n'.join(lines) + '\n'
+
+
+def _merge_snapshots(snaps: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Suma contadores y gauges y combina histogramas de varios snapshots"""
+    counters: Dict[str, Dict[LabelKey, float]] = {}
+    gauges: Dict[str, Dict[LabelKey, float]] = {}
+    histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+    for snap in snaps:
+        for destino, origen in ((counters, snap.get('counters', {})), (gauges, snap.get('gauges', {}))):
+            for name, serie in origen.items():
+                acumulado = destino.setdefault(name, {})
+                for key, value in serie:
+                    key = tuple(tuple(par) for par in key)
+                    acumulado[key] = acumulado.get(key, 0) + value
+        for name, serie in snap.get('histograms', {}).items():
+            acumulado = histograms.setdefault(name, {})
+            for key, data in serie:
+                key = tuple(tuple(par) for par in key)
+                hist = acumulado.get(key)
+                if hist is None:
+                    hist = acumulado[key] = Histogram()
+                hist.merge(Histogram.from_dict(data))
+    return {'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Instancia compartida por el proceso
+metrics = MetricsRegistry()
+
+metrics.describe('http_request_duration_seconds', 'Duración de endpoints instrumentados')
+metrics.describe('http_requests_total', 'Requests de endpoints instrumentados por status')
+metrics.describe('http_requests_in_flight', 'Requests en curso de endpoints instrumentados')
+metrics.describe('db_query_duration_seconds', 'Duración de queries SQL por tipo de sentencia')
+metrics.describe('function_duration_seconds', 'Duración de funciones con PerformanceMonitor.track')
+
+
+def _status_code(result: Any) -> int:
+    if hasattr(result, 'status_code'):
+        return result.status_code
+    if isinstance(result, tuple) and len(result) > 1 and isinstance(result[1], int):
+        return result[1]
+    return 200
+
+
+def track_endpoint(name: str) -> Callable:
+    """
+    Decorador para vistas Flask: histograma de duración, contador por status
+    y gauge de requests en curso.
+
+    Usage:
+        @caja_bp.route('/api/sale/create', methods=['POST'])
+        @track_endpoint('pos.api_create_sale')
+        def api_create_sale():
+            ...
+    """
+    labels = {'endpoint': name}
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            status = 500
+            metrics.add_gauge('http_requests_in_flight', 1, labels)
+            try:
+                result = func(*args, **kwargs)
+                status = _status_code(result)
+                return result
+            finally:
+                metrics.add_gauge('http_requests_in_flight', -1, labels)
+                metrics.observe('http_request_duration_seconds', time.perf_counter() - start, labels)
+                metrics.inc('http_requests_total', 1, {'endpoint': name, 'status': status})
+        return wrapper
+    return decorator
+
+
+_sqlalchemy_instrumented = False
+
+
+def instrument_sqlalchemy() -> None:
+    """Registra el tiempo de cada query SQL (todas las engines del proceso)"""
+    global _sqlalchemy_instrumented
+    if _sqlalchemy_instrumented:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('_metrics_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement and statement.strip() else 'OTHER'
+        if verb not in ('SELECT', 'INSERT', 'UPDATE', 'DELETE'):
+            verb = 'OTHER'
+        metrics.observe('db_query_duration_seconds', elapsed, {'statement': verb})
+
+    @event.listens_for(Engine, 'handle_error')
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get('_metrics_query_start'):
+            conn.info['_metrics_query_start'].pop()
+
+    _sqlalchemy_instrumented = True
@@ -1,15 +1,23 @@
 """
 Cliente para enviar eventos a n8n
 Permite que la aplicación envíe eventos a n8n cuando ocurren acciones específicas
+
+Los envíos asíncronos pasan por el outbox (app/helpers/post_commit.py, canal
+'n8n'): el evento se inserta en la transacción del llamador y el despachador lo
+entrega en orden después del commit, con reintentos. Llamar ANTES del commit
+del cambio de negocio para que ambos queden en la misma transacción.
 """
 import requests
+from app.infrastructure.external.http_client import get_http_client, UpstreamUnavailable
 import logging
 import time
 import threading
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from flask import current_app
 
+from app.helpers.post_commit import enqueue, task
+
 logger = logging.getLogger(__name__)
 
 # Métricas de webhooks (thread-safe)
@@ -49,8 +57,22 @@ def get_webhook_metrics() -> Dict[str, Any]:
         return _webhook_metrics.copy()
 
 
+def _get_n8n_config() -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """(webhook_url, secret, api_key) desde SystemConfig, con fallback a la config de la app"""
+    try:
+        from app.models.system_config_models import SystemConfig
+        webhook_url = SystemConfig.get('n8n_webhook_url') or current_app.config.get('N8N_WEBHOOK_URL')
+        secret = SystemConfig.get('n8n_webhook_secret') or current_app.config.get('N8N_WEBHOOK_SECRET')
+        api_key = SystemConfig.get('n8n_api_key') or current_app.config.get('N8N_API_KEY')
+    except:
+        webhook_url = current_app.config.get('N8N_WEBHOOK_URL')
+        secret = current_app.config.get('N8N_WEBHOOK_SECRET')
+        api_key = current_app.config.get('N8N_API_KEY')
+    return webhook_url, secret, api_key
+
+
 def _send_to_n8n_sync(event_type: str, data: Dict[str, Any], workflow_id: Optional[str] = None, 
-                      max_retries: int = 3, timeout: int = 5) -> bool:
+                      max_retries: int = 3, timeout: int = 5, timestamp: Optional[str] = None) -> bool:
     """
     Envía un evento a n8n de forma síncrona con retry y backoff exponencial
     
@@ -60,20 +82,13 @@ def _send_to_n8n_sync(event_type: str, data: Dict[str, Any], workflow_id: Option
         workflow_id: ID del workflow específico (opcional)
         max_retries: Número máximo de reintentos
         timeout: Timeout en segundos
+        timestamp: Momento del evento (ISO); por defecto, ahora
         
     Returns:
         bool: True si el evento se envió correctamente, False en caso contrario
     """
     # Leer configuración desde SystemConfig primero
-    try:
-        from app.models.system_config_models import SystemConfig
-        webhook_url = SystemConfig.get('n8n_webhook_url') or current_app.config.get('N8N_WEBHOOK_URL')
-        secret = SystemConfig.get('n8n_webhook_secret') or current_app.config.get('N8N_WEBHOOK_SECRET')
-        api_key = SystemConfig.get('n8n_api_key') or current_app.config.get('N8N_API_KEY')
-    except:
-        webhook_url = current_app.config.get('N8N_WEBHOOK_URL')
-        secret = current_app.config.get('N8N_WEBHOOK_SECRET')
-        api_key = current_app.config.get('N8N_API_KEY')
+    webhook_url, secret, api_key = _get_n8n_config()
     
     if not webhook_url:
         logger.debug("N8N_WEBHOOK_URL no configurada, no se enviará evento a n8n")
@@ -88,7 +103,7 @@ def _send_to_n8n_sync(event_type: str, data: Dict[str, Any], workflow_id: Option
     
     payload = {
         'event_type': event_type,
-        'timestamp': datetime.utcnow().isoformat(),
+        'timestamp': timestamp or datetime.utcnow().isoformat(),
         'data': data
     }
     
@@ -106,8 +121,9 @@ def _send_to_n8n_sync(event_type: str, data: Dict[str, Any], workflow_id: Option
     last_error = None
     for attempt in range(max_retries):
         try:
-            response = requests.post(
+            response = get_http_client().post(
                 webhook_url,
+                upstream='n8n',
                 json=payload,
                 headers=headers,
                 timeout=timeout
@@ -126,6 +142,11 @@ def _send_to_n8n_sync(event_type: str, data: Dict[str, Any], workflow_id: Option
                 logger.error(f"Timeout enviando evento a n8n después de {max_retries} intentos: {event_type}")
                 _update_metrics(False, 'timeout', str(e))
                 return False
+        except UpstreamUnavailable as e:
+            # Circuito abierto: n8n viene fallando, no insistir
+            logger.warning(f"n8n no disponible, evento no enviado: {event_type} ({e})")
+            _update_metrics(False, 'circuit_open', str(e))
+            return False
         except requests.exceptions.RequestException as e:
             last_error = ('request_error', str(e))
             # Para errores 4xx (client errors), no reintentar
@@ -155,38 +176,56 @@ def _send_to_n8n_sync(event_type: str, data: Dict[str, Any], workflow_id: Option
 
 
 def send_to_n8n(event_type: str, data: Dict[str, Any], workflow_id: Optional[str] = None, 
-                async_mode: bool = True, max_retries: int = 3, timeout: int = 5) -> bool:
+                async_mode: bool = True, max_retries: int = 3, timeout: int = 5,
+                dedup_key: Optional[str] = None) -> bool:
     """
-    Envía un evento a n8n (síncrono o asíncrono)
+    Envía un evento a n8n (síncrono o vía outbox)
     
     Args:
         event_type: Tipo de evento (ej: 'delivery_created', 'inventory_updated', 'shift_closed')
         data: Datos del evento
         workflow_id: ID del workflow específico (opcional)
-        async_mode: Si True, envía en un thread separado (no bloquea)
-        max_retries: Número máximo de reintentos (default: 3)
+        async_mode: Si True, encola el evento en la transacción actual (se envía tras el commit)
+        max_retries: Número máximo de reintentos del envío síncrono (default: 3)
         timeout: Timeout en segundos (default: 5)
+        dedup_key: Clave para no encolar dos veces el mismo evento (opcional)
         
     Returns:
-        bool: True si se programó el envío (async) o se envió correctamente (sync), False en caso contrario
+        bool: True si se encoló (async) o se envió correctamente (sync), False en caso contrario
     """
     if async_mode:
-        # Enviar en un thread separado para no bloquear
-        def send_async():
-            try:
-                _send_to_n8n_sync(event_type, data, workflow_id, max_retries, timeout)
-            except Exception as e:
-                logger.error(f"Error en envío asíncrono a n8n: {event_type}, error: {e}")
-        
-        thread = threading.Thread(target=send_async, daemon=True)
-        thread.start()
-        logger.debug(f"Evento programado para envío asíncrono a n8n: {event_type}")
+        enqueue('n8n.event', {
+            'event_type': event_type,
+            'data': data,
+            'workflow_id': workflow_id,
+            'timeout': timeout,
+            'timestamp': datetime.utcnow().isoformat()
+        }, dedup_key=dedup_key)
+        logger.debug(f"Evento encolado para n8n: {event_type}")
         return True
     else:
         # Envío síncrono
         return _send_to_n8n_sync(event_type, data, workflow_id, max_retries, timeout)
 
 
+class N8nDeliveryError(Exception):
+    """n8n no aceptó el evento (el outbox lo reintenta con backoff)"""
+
+
+@task('n8n.event', max_attempts=8)
+def _deliver_outbox_event(payload: Dict[str, Any]) -> None:
+    """Handler del outbox: un intento por ejecución, los reintentos los maneja el pipeline"""
+    if not _get_n8n_config()[0]:
+        logger.debug(f"N8N_WEBHOOK_URL no configurada, evento descartado: {payload.get('event_type')}")
+        return
+    enviado = _send_to_n8n_sync(
+        payload['event_type'], payload.get('data') or {}, payload.get('workflow_id'),
+        max_retries=1, timeout=payload.get('timeout', 5), timestamp=payload.get('timestamp')
+    )
+    if not enviado:
+        raise N8nDeliveryError(f"Evento {payload['event_type']} no entregado a n8n")
+
+
 def send_delivery_created(delivery_id: int, item_name: str, quantity: int, bartender: str, barra: str):
     """
     Envía evento cuando se crea una entrega
@@ -204,7 +243,7 @@ def send_delivery_created(delivery_id: int, item_name: str, quantity: int, barte
         'quantity': quantity,
         'bartender': bartender,
         'barra': barra
-    })
+    }, dedup_key=f"n8n:delivery_created:{delivery_id}")
 
 
 def send_inventory_updated(ingredient_id: int, ingredient_name: str, quantity: float, location: str):
@@ -225,7 +264,8 @@ def send_inventory_updated(ingredient_id: int, ingredient_name: str, quantity: f
     })
 
 
-def send_shift_closed(shift_date: str, total_sales: float, total_deliveries: int):
+def send_shift_closed(shift_date: str, total_sales: float, total_deliveries: int,
+                      jornada_id: Optional[int] = None, closed_at: Optional[datetime] = None):
     """
     Envía evento cuando se cierra un turno
     
@@ -233,12 +273,16 @@ def send_shift_closed(shift_date: str, total_sales: float, total_deliveries: int
         shift_date: Fecha del turno
         total_sales: Total de ventas
         total_deliveries: Total de entregas
+        jornada_id: ID de la jornada cerrada (parte de la clave de deduplicación)
+        closed_at: Momento del cierre (cerrado_en); una jornada reabierta y vuelta
+            a cerrar, u otra jornada del mismo día, genera un evento distinto
     """
+    closed_key = closed_at.isoformat() if hasattr(closed_at, 'isoformat') else closed_at
     return send_to_n8n('shift_closed', {
         'shift_date': shift_date,
         'total_sales': total_sales,
         'total_deliveries': total_deliveries
-    })
+    }, dedup_key=f"n8n:shift_closed:{shift_date}:{jornada_id}:{closed_key}")
 
 
 def send_sale_created(sale_id: str, amount: float, payment_method: str, register_id: int):
@@ -256,7 +300,7 @@ def send_sale_created(sale_id: str, amount: float, payment_method: str, register
         'amount': amount,
         'payment_method': payment_method,
         'register_id': register_id
-    })
+    }, dedup_key=f"n8n:sale_created:{sale_id}")
 
 
 def send_custom_event(event_type: str, data: Dict[str, Any], workflow_id: Optional[str] = None):
@@ -17,6 +17,7 @@ class NotificationService:
     TYPE_FRAUDE = 'fraude'
     TYPE_TURNO_ABIERTO = 'turno_abierto'
     TYPE_TURNO_CERRADO = 'turno_cerrado'
+    TYPE_STOCK_BAJO = 'stock_bajo'
     TYPE_INFO = 'info'
     TYPE_SUCCESS = 'success'
     TYPE_WARNING = 'warning'
@@ -153,6 +154,28 @@ class NotificationService:
             action_url=f'/admin/turnos'
         )
     
+    @staticmethod
+    def notify_stock_alert(ingredient_name: str, location: str, state: str, message: str,
+                           data: Optional[Dict[str, Any]] = None):
+        """Notifica un cambio de estado de stock (bajo, negativo o normalizado)"""
+        titulos = {
+            'negative': '🚨 Stock Negativo',
+            'low': '⚠️ Stock Bajo',
+            'ok': 'Stock Normalizado',
+        }
+        prioridades = {
+            'negative': NotificationService.PRIORITY_CRITICAL,
+            'low': NotificationService.PRIORITY_HIGH,
+        }
+        return NotificationService.create_notification(
+            type=NotificationService.TYPE_STOCK_BAJO,
+            title=titulos.get(state, 'Alerta de Stock'),
+            message=message,
+            priority=prioridades.get(state, NotificationService.PRIORITY_LOW),
+            data={'ingredient_name': ingredient_name, 'location': location, 'state': state, **(data or {})},
+            action_url='/admin/inventario'
+        )
+    
     @staticmethod
     def notify_info(title: str, message: str, action_url: Optional[str] = None):
         """Notificación informativa"""
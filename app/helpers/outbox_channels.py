@@ -0,0 +1,87 @@
+"""
+Canales del outbox hacia Socket.IO y email
+Los eventos se insertan en outbox_events en la transacción del llamador y el
+despachador de app/helpers/post_commit.py los entrega en orden después del
+commit (at-least-once, con reintentos y backoff).
+
+Uso:
+    from app.helpers.outbox_channels import emit_after_commit, send_email_after_commit
+
+    emit_after_commit('new_log', {'log_entry': entry}, namespace='/admin_logs')
+    send_email_after_commit('resumen_compra', entrada.id)
+    db.session.commit()
+"""
+from typing import Any, Dict, Optional
+
+from app.models import db
+from .logger import get_logger
+from .post_commit import enqueue, task
+
+logger = get_logger(__name__)
+
+
+class EmailDeliveryError(Exception):
+    """El servidor SMTP no aceptó el email (el outbox lo reintenta con backoff)"""
+
+
+def emit_after_commit(event: str, data: Dict[str, Any], namespace: str = '/',
+                      room: Optional[str] = None, dedup_key: Optional[str] = None) -> None:
+    """Emite un evento Socket.IO cuando la transacción actual haga commit"""
+    enqueue('socketio.emit', {
+        'event': event,
+        'data': data,
+        'namespace': namespace,
+        'room': room
+    }, dedup_key=dedup_key)
+
+
+def send_email_after_commit(kind: str, entrada_id: int) -> None:
+    """
+    Envía un email de Entrada cuando la transacción actual haga commit.
+    kind: 'resumen_compra' (al comprador) o 'ticket_admin' (notificación interna)
+    """
+    enqueue(f'email.{kind}', {'entrada_id': entrada_id}, dedup_key=f'email:{kind}:{entrada_id}')
+
+
+@task('socketio.emit', max_attempts=3)
+def _emit(payload: Dict[str, Any]) -> None:
+    from app import socketio
+
+    kwargs = {'namespace': payload.get('namespace') or '/'}
+    if payload.get('room'):
+        kwargs['room'] = payload['room']
+    socketio.emit(payload['event'], payload.get('data'), **kwargs)
+
+
+def _load_entrada(entrada_id: int):
+    from app.models.ecommerce_models import Entrada
+    return db.session.get(Entrada, entrada_id)
+
+
+@task('email.resumen_compra', max_attempts=4)
+def _email_resumen_compra(payload: Dict[str, Any]) -> None:
+    from .email_ticket_helper import send_resumen_compra_email, smtp_configurado
+
+    entrada = _load_entrada(payload['entrada_id'])
+    if entrada is None or entrada.email_resumen_enviado or not entrada.comprador_email:
+        return
+    if not smtp_configurado():
+        logger.warning(f"⚠️ SMTP no configurado, resumen de {entrada.ticket_code} no enviado")
+        return
+    if not send_resumen_compra_email(entrada):
+        raise EmailDeliveryError(f"Resumen de compra {entrada.ticket_code} no enviado")
+    logger.info(f"Email de bienvenida enviado a {entrada.comprador_email}")
+
+
+@task('email.ticket_admin', max_attempts=4)
+def _email_ticket_admin(payload: Dict[str, Any]) -> None:
+    from .email_ticket_helper import send_ticket_email, smtp_configurado
+
+    entrada = _load_entrada(payload['entrada_id'])
+    if entrada is None:
+        return
+    if not smtp_configurado():
+        logger.warning(f"⚠️ SMTP no configurado, notificación de {entrada.ticket_code} no enviada")
+        return
+    if not send_ticket_email(entrada):
+        raise EmailDeliveryError(f"Notificación de compra {entrada.ticket_code} no enviada")
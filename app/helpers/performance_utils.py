@@ -3,18 +3,24 @@ Utilidades para monitoreo y optimización de rendimiento
 """
 import time
 import functools
+import threading
 from typing import Callable, Any, Dict
-from collections import defaultdict
 from .logger import get_logger
+from .metrics import Histogram, metrics
 
 logger = get_logger(__name__)
 
 
 class PerformanceMonitor:
-    """Monitor de rendimiento para funciones"""
+    """
+    Monitor de rendimiento para funciones.
+    Las duraciones se guardan en histogramas de memoria constante
+    (ver app/helpers/metrics.py) en vez de listas que crecen sin límite.
+    """
     
-    _call_stats: Dict[str, list] = defaultdict(list)
-    _call_count: Dict[str, int] = defaultdict(int)
+    _lock = threading.Lock()
+    _call_stats: Dict[str, Histogram] = {}
+    _last_time: Dict[str, float] = {}
     
     @classmethod
     def track(cls, func_name: str = None):
@@ -29,14 +35,13 @@ class PerformanceMonitor:
             
             @functools.wraps(func)
             def wrapper(*args, **kwargs) -> Any:
-                start_time = time.time()
+                start_time = time.perf_counter()
                 try:
                     result = func(*args, **kwargs)
-                    elapsed = time.time() - start_time
+                    elapsed = time.perf_counter() - start_time
                     
                     # Registrar estadísticas
-                    cls._call_stats[name].append(elapsed)
-                    cls._call_count[name] += 1
+                    cls._record(name, elapsed)
                     
                     # Log si es lento (>1 segundo)
                     if elapsed > 1.0:
@@ -47,7 +52,7 @@ class PerformanceMonitor:
                     
                     return result
                 except Exception as e:
-                    elapsed = time.time() - start_time
+                    elapsed = time.perf_counter() - start_time
                     logger.error(
                         f"Error en {name} después de {elapsed:.2f}s: {e}",
                         extra={'function': name, 'elapsed': elapsed, 'error': str(e)}
@@ -57,10 +62,20 @@ class PerformanceMonitor:
             return wrapper
         return decorator
     
+    @classmethod
+    def _record(cls, name: str, elapsed: float) -> None:
+        with cls._lock:
+            hist = cls._call_stats.get(name)
+            if hist is None:
+                hist = cls._call_stats[name] = Histogram()
+            hist.observe(elapsed)
+            cls._last_time[name] = elapsed
+        metrics.observe('function_duration_seconds', elapsed, {'function': name})
+    
     @classmethod
     def get_stats(cls, func_name: str = None) -> Dict[str, Any]:
         """
-        Obtiene estadísticas de rendimiento
+        Obtiene estadísticas de rendimiento (de este worker)
         
         Args:
             func_name: Nombre de función específica (None = todas)
@@ -69,38 +84,41 @@ class PerformanceMonitor:
             dict con estadísticas
         """
         if func_name:
-            if func_name not in cls._call_stats:
-                return {}
-            
-            times = cls._call_stats[func_name]
-            if not times:
-                return {}
+            with cls._lock:
+                hist = cls._call_stats.get(func_name)
+                if not hist or not hist.count:
+                    return {}
+                summary = hist.summary()
+                last_time = cls._last_time.get(func_name, 0)
             
             return {
                 'function': func_name,
-                'call_count': cls._call_count[func_name],
-                'total_time': sum(times),
-                'avg_time': sum(times) / len(times),
-                'min_time': min(times),
-                'max_time': max(times),
-                'last_time': times[-1] if times else 0
+                'call_count': summary['count'],
+                'total_time': summary['sum'],
+                'avg_time': summary['avg'],
+                'min_time': summary['min'],
+                'max_time': summary['max'],
+                'p50_time': summary['p50'],
+                'p95_time': summary['p95'],
+                'p99_time': summary['p99'],
+                'last_time': last_time
             }
         else:
             # Estadísticas de todas las funciones
-            all_stats = {}
-            for name in cls._call_stats.keys():
-                all_stats[name] = cls.get_stats(name)
-            return all_stats
+            with cls._lock:
+                names = list(cls._call_stats.keys())
+            return {name: cls.get_stats(name) for name in names}
     
     @classmethod
     def clear_stats(cls, func_name: str = None):
         """Limpia las estadísticas"""
-        if func_name:
-            cls._call_stats[func_name] = []
-            cls._call_count[func_name] = 0
-        else:
-            cls._call_stats.clear()
-            cls._call_count.clear()
+        with cls._lock:
+            if func_name:
+                cls._call_stats.pop(func_name, None)
+                cls._last_time.pop(func_name, None)
+            else:
+                cls._call_stats.clear()
+                cls._last_time.clear()
 
 
 def time_it(func: Callable) -> Callable:
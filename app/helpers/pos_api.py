@@ -1,4 +1,5 @@
 import requests
+from app.infrastructure.external.http_client import get_http_client
 from flask import current_app
 from .cache import cached, invalidate_sale_cache
 
@@ -26,7 +27,7 @@ def _get_sale_items_internal(numeric_sale_id):
     }
 
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
+        resp = get_http_client().get(url, upstream='phppos', headers=headers, timeout=10)
         resp.raise_for_status()
         data = resp.json()
 
@@ -64,7 +65,7 @@ def _get_entity_details_internal(entity_type, entity_id):
     }
 
     try:
-        resp = requests.get(url, headers=headers, timeout=5)
+        resp = get_http_client().get(url, upstream='phppos', headers=headers, timeout=5)
         resp.raise_for_status()
         return resp.json()
     except requests.exceptions.RequestException as e:
@@ -98,7 +99,7 @@ def _get_employees_internal(only_bartenders=False, only_cashiers=False):
     }
 
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
+        resp = get_http_client().get(url, upstream='phppos', headers=headers, timeout=10)
         resp.raise_for_status()
         data = resp.json()
         
@@ -269,7 +270,7 @@ def _get_entradas_sales_internal(limit=1000):
             'end_date': end_date,
             'limit': limit
         }
-        resp = requests.get(url, headers=headers, params=params, timeout=30)
+        resp = get_http_client().get(url, upstream='phppos', headers=headers, params=params, timeout=30)
         resp.raise_for_status()
         data = resp.json()
 
@@ -389,7 +390,7 @@ def _get_all_sales_internal(limit=100, max_results=100, use_pagination=False, st
             }
             
             try:
-                resp = requests.get(url, headers=headers, params=params, timeout=30)
+                resp = get_http_client().get(url, upstream='phppos', headers=headers, params=params, timeout=30)
                 
                 # Verificar que la respuesta es JSON antes de parsear
                 content_type = resp.headers.get('content-type', '').lower()
@@ -398,7 +399,7 @@ def _get_all_sales_internal(limit=100, max_results=100, use_pagination=False, st
                 if resp.status_code == 500:
                     current_app.logger.warning("Endpoint /sales devuelve 500, intentando método alternativo")
                     try:
-                        resp = requests.get(url, headers=headers, timeout=30)
+                        resp = get_http_client().get(url, upstream='phppos', headers=headers, timeout=30)
                         if resp.status_code != 200:
                             current_app.logger.warning(f"Endpoint /sales no disponible (status {resp.status_code})")
                             break
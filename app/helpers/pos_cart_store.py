@@ -0,0 +1,265 @@
+"""
+Carrito del POS del lado del servidor
+El carrito ya no viaja en la cookie firmada (session['pos_cart']): vive en un
+store indexado por sesión de caja y cada click del cajero es una mutación O(1)
+sin consultar productos. Los precios y el stock se validan una sola vez, en
+lote, al crear la venta (comprehensive_sale_validation).
+
+Variables de entorno:
+    POS_CART_STORE          db (por defecto: compartido entre workers de gunicorn)
+                            | memory (un solo worker, sin escrituras a la BD)
+    POS_CART_TTL_SECONDS    carros sin movimiento se descartan (12 horas)
+
+Uso:
+    from app.helpers.pos_cart_store import get_cart_store, current_cart_key
+
+    store = get_cart_store()
+    cart = store.add_items(current_cart_key(), [{'item_id': '12', 'name': 'Pisco', 'price': 5000, 'quantity': 2}])
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import session
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from .logger import get_logger
+from .metrics import metrics
+
+logger = get_logger(__name__)
+
+POS_CART_STORE = os.environ.get('POS_CART_STORE', 'db').lower()
+POS_CART_TTL_SECONDS = int(os.environ.get('POS_CART_TTL_SECONDS', str(12 * 3600)))
+MAX_CONFLICT_RETRIES = 5
+PURGE_INTERVAL_SECONDS = 600
+
+metrics.describe('pos_cart_mutations_total', 'Mutaciones del carrito del POS por operación')
+metrics.describe('pos_cart_conflicts_total', 'Reintentos por escrituras concurrentes al mismo carrito')
+
+Items = Dict[str, Dict[str, Any]]
+
+
+def current_cart_key() -> Optional[str]:
+    """Clave del carrito de la request: sesión de caja, o la caja si aún no hay sesión"""
+    register_session_id = session.get('pos_register_session_id')
+    if register_session_id:
+        return f"rs:{register_session_id}"
+    register_id = session.get('pos_register_id')
+    if register_id:
+        return f"reg:{register_id}"
+    employee_id = session.get('pos_employee_id')
+    return f"emp:{employee_id}" if employee_id else None
+
+
+def _line(item_id: str, name: str, quantity: int, price: float, is_kit: bool = False) -> Dict[str, Any]:
+    return {
+        'item_id': item_id,
+        'name': name,
+        'quantity': quantity,
+        'price': price,
+        'subtotal': quantity * price,
+        'is_kit': is_kit,
+    }
+
+
+def _to_items(cart: List[Dict[str, Any]]) -> Items:
+    items: Items = {}
+    for item in cart or []:
+        item_id = str(item.get('item_id') or item.get('product_id') or '')
+        if item_id:
+            items[item_id] = dict(item, item_id=item_id)
+    return items
+
+
+class PosCartStore:
+    """Carritos por clave (sesión de caja) con backend en memoria o tabla pos_carts"""
+
+    def __init__(self, backend: str = POS_CART_STORE, ttl: int = POS_CART_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self._carts: Dict[str, Tuple[int, Items, float]] = {}
+        self._lock = threading.Lock()
+        self._last_purge = time.time()
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> List[Dict[str, Any]]:
+        if not key:
+            return []
+        _, items = self._load(key)
+        if not items and 'pos_cart' in session:
+            # Carrito que quedó en una cookie anterior al store
+            legacy = session.pop('pos_cart', None) or []
+            if legacy:
+                return self.replace(key, legacy)
+        return list(items.values())
+
+    def add_items(self, key: str, lines: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Agrega un lote de items ({item_id, name, price, quantity, is_kit}).
+        Si el producto ya está en el carrito se suma la cantidad y se mantiene su precio.
+        """
+        def mutate(items: Items) -> None:
+            for line in lines:
+                item_id = str(line['item_id'])
+                quantity = int(line.get('quantity', 1))
+                existing = items.get(item_id)
+                if existing:
+                    existing['quantity'] += quantity
+                    price = existing.get('price') or line.get('price') or 0
+                    existing['price'] = price
+                    existing['unit_price'] = price
+                    existing['subtotal'] = existing['quantity'] * price
+                else:
+                    items[item_id] = _line(item_id, line.get('name', 'Producto'), quantity,
+                                           float(line.get('price') or 0), bool(line.get('is_kit')))
+        return self._mutate(key, mutate, 'add')
+
+    def remove_item(self, key: str, item_id: str, quantity: int = 1) -> List[Dict[str, Any]]:
+        """Resta cantidad; si llega a cero el item sale del carrito"""
+        def mutate(items: Items) -> None:
+            item = items.get(str(item_id))
+            if not item:
+                return
+            if item.get('quantity', 0) > quantity:
+                item['quantity'] -= quantity
+                item['subtotal'] = item['quantity'] * item.get('price', 0)
+            else:
+                del items[str(item_id)]
+        return self._mutate(key, mutate, 'remove')
+
+    def replace(self, key: str, cart: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Reemplaza el carrito completo (carrito congelado de un PaymentIntent, items corregidos)"""
+        nuevo = _to_items(cart)
+
+        def mutate(items: Items) -> None:
+            items.clear()
+            items.update(nuevo)
+        return self._mutate(key, mutate, 'replace')
+
+    def clear(self, key: Optional[str]) -> None:
+        session.pop('pos_cart', None)
+        if not key:
+            return
+        metrics.inc('pos_cart_mutations_total', 1, {'op': 'clear'})
+        if self.backend == 'memory':
+            with self._lock:
+                self._carts.pop(key, None)
+            return
+        from app.models import db, PosCart
+        with db.engine.begin() as conn:
+            conn.execute(delete(PosCart.__table__).where(PosCart.__table__.c.cart_key == key))
+
+    # ------------------------------------------------------------------
+    # Backends
+    # ------------------------------------------------------------------
+
+    def _mutate(self, key: str, mutate: Callable[[Items], None], op: str) -> List[Dict[str, Any]]:
+        if not key:
+            raise ValueError('No hay caja ni sesión de caja para asociar el carrito')
+        metrics.inc('pos_cart_mutations_total', 1, {'op': op})
+        self._maybe_purge()
+
+        if self.backend == 'memory':
+            with self._lock:
+                version, items, _ = self._carts.get(key, (0, {}, 0.0))
+                items = {k: dict(v) for k, v in items.items()}
+                mutate(items)
+                self._carts[key] = (version + 1, items, time.time())
+                return list(items.values())
+
+        # Control optimista: si otro worker escribió el mismo carrito entre la
+        # lectura y la escritura, se relee y se aplica de nuevo la mutación
+        for _ in range(MAX_CONFLICT_RETRIES):
+            version, items = self._load(key)
+            mutate(items)
+            if self._save(key, version, items):
+                return list(items.values())
+            metrics.inc('pos_cart_conflicts_total')
+        raise RuntimeError('El carrito fue modificado en paralelo, intenta nuevamente')
+
+    def _load(self, key: str) -> Tuple[Optional[int], Items]:
+        if self.backend == 'memory':
+            with self._lock:
+                version, items, touched = self._carts.get(key, (0, {}, 0.0))
+                if items and time.time() - touched > self.ttl:
+                    self._carts.pop(key, None)
+                    return 0, {}
+                return version, {k: dict(v) for k, v in items.items()}
+
+        from app.models import db, PosCart
+        table = PosCart.__table__
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                select(table.c.version, table.c.items_json).where(table.c.cart_key == key)
+            ).first()
+        if row is None:
+            return None, {}
+        try:
+            return row.version, _to_items(json.loads(row.items_json or '[]'))
+        except (TypeError, ValueError):
+            logger.warning(f"Carrito {key} con JSON inválido, se reinicia")
+            return row.version, {}
+
+    def _save(self, key: str, version: Optional[int], items: Items) -> bool:
+        from app.models import db, PosCart
+        table = PosCart.__table__
+        values = {
+            'items_json': json.dumps(list(items.values()), ensure_ascii=False),
+            'updated_at': datetime.utcnow(),
+        }
+        try:
+            with db.engine.begin() as conn:
+                if version is None:
+                    conn.execute(insert(table).values(cart_key=key, version=1, **values))
+                    return True
+                result = conn.execute(
+                    update(table)
+                    .where(table.c.cart_key == key, table.c.version == version)
+                    .values(version=version + 1, **values)
+                )
+                return result.rowcount == 1
+        except IntegrityError:
+            # Otro worker creó el carrito primero
+            return False
+
+    def _maybe_purge(self) -> None:
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        try:
+            if self.backend == 'memory':
+                with self._lock:
+                    for key in [k for k, (_, _, t) in self._carts.items() if now - t > self.ttl]:
+                        self._carts.pop(key, None)
+                return
+            from app.models import db, PosCart
+            table = PosCart.__table__
+            limite = datetime.utcnow() - timedelta(seconds=self.ttl)
+            with db.engine.begin() as conn:
+                borrados = conn.execute(delete(table).where(table.c.updated_at < limite)).rowcount
+            if borrados:
+                logger.info(f"🧹 {borrados} carritos del POS sin movimiento eliminados")
+        except Exception as e:
+            logger.warning(f"No se pudieron purgar carritos antiguos: {e}")
+
+
+_store: Optional[PosCartStore] = None
+_store_lock = threading.Lock()
+
+
+def get_cart_store() -> PosCartStore:
+    """Store de carritos del proceso"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PosCartStore()
+    return _store
@@ -0,0 +1,501 @@
+"""
+Pipeline de tareas post-commit (outbox transaccional)
+Los efectos secundarios de una operación se escriben como filas de
+outbox_events en la MISMA transacción que el cambio de negocio. Al hacer
+commit los IDs pasan a una cola en memoria atendida por hilos del proceso;
+si el worker muere o la tarea falla, un barrido periódico retoma las filas
+pendientes desde la BD (respaldo durable) con reintentos y backoff.
+
+Entrega at-least-once: los handlers deberían ser idempotentes (verificar si el
+efecto ya existe antes de crearlo). Los que no lo son (ej: 'sale.cash_drawer',
+'sale.realtime') se acotan con max_attempts: una tarea nunca se toma más
+veces que max_attempts, ni siquiera si su lease vence (worker muerto o
+colgado); el barrido marca esas filas como 'failed'.
+
+Canales ordenados (ORDERED_CHANNELS): los topics 'n8n.*', 'socketio.*' y
+'email.*' van a sistemas externos y se despachan por lotes en orden de
+creación por un hilo despachador. Una tarea en reintento bloquea las
+siguientes de su canal (orden garantizado); las agotadas ('failed') se saltan.
+
+Variables de entorno:
+    POST_COMMIT_WORKERS          hilos que ejecutan tareas (2; 0 = solo barrido de otro
+                                 proceso o process_pending)
+    POST_COMMIT_POLL_SECONDS     intervalo del barrido de pendientes en BD (5)
+    POST_COMMIT_LEASE_SECONDS    tiempo que una tarea queda tomada por un worker (60)
+    POST_COMMIT_BATCH_SIZE       tareas por barrido (50)
+    POST_COMMIT_RETENTION_DAYS   días que se conservan las tareas completadas (3)
+    POST_COMMIT_DISPATCH         hilo despachador de canales ordenados ('1'; '0' = no)
+
+Uso:
+    from app.helpers.post_commit import task, enqueue
+
+    @task('sale.delivery_status', max_attempts=5)
+    def crear_estado_entrega(payload):
+        ...
+
+    enqueue('sale.delivery_status', {'sale_id': sale.id}, dedup_key=f'sale:{sale.id}:delivery_status')
+    db.session.commit()   # la tarea se ejecuta después de este commit
+
+    # Canal ordenado (prefijo de ORDERED_CHANNELS)
+    enqueue('n8n.event', {'event_type': 'shift_closed', 'data': {...}})
+"""
+import importlib
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from flask import current_app
+from sqlalchemy import event, func, inspect, not_, or_
+from sqlalchemy.orm import Session
+
+from app.models import db
+from app.models.outbox_models import OutboxEvent
+from .logger import get_logger
+from .metrics import metrics
+
+logger = get_logger(__name__)
+
+POST_COMMIT_WORKERS = int(os.environ.get('POST_COMMIT_WORKERS', '2'))
+POST_COMMIT_POLL_SECONDS = float(os.environ.get('POST_COMMIT_POLL_SECONDS', '5'))
+POST_COMMIT_LEASE_SECONDS = float(os.environ.get('POST_COMMIT_LEASE_SECONDS', '60'))
+POST_COMMIT_BATCH_SIZE = int(os.environ.get('POST_COMMIT_BATCH_SIZE', '50'))
+POST_COMMIT_RETENTION_DAYS = int(os.environ.get('POST_COMMIT_RETENTION_DAYS', '3'))
+POST_COMMIT_DISPATCH = os.environ.get('POST_COMMIT_DISPATCH', '1').lower() in ('1', 'true', 'yes')
+DEFAULT_MAX_ATTEMPTS = 5
+# Backoff de reintentos: 2, 4, 8... segundos, con tope
+MAX_BACKOFF_SECONDS = 300
+# El barrido deja un margen a las tareas recién encoladas (las toma la cola en memoria)
+SWEEP_GRACE_SECONDS = 2
+PURGE_EVERY_SECONDS = 3600
+
+# Módulos que registran handlers con @task (se importan al iniciar los workers)
+HANDLER_MODULES = (
+    'app.services.sale_post_commit',
+    'app.helpers.n8n_client',
+    'app.helpers.outbox_channels',
+    'app.helpers.public_event_snapshots',
+)
+
+# Canales hacia sistemas externos: despacho en orden de creación (prefijo del topic)
+ORDERED_CHANNELS = ('n8n', 'socketio', 'email')
+
+_PENDING_KEY = 'post_commit_events'
+
+metrics.describe('post_commit_tasks_total', 'Tareas post-commit ejecutadas por topic y resultado')
+metrics.describe('post_commit_task_duration_seconds', 'Duración de tareas post-commit por topic')
+metrics.describe('post_commit_task_lag_seconds', 'Tiempo entre el commit y el inicio de la tarea por topic')
+metrics.describe('outbox_pending_events', 'Tareas pendientes en outbox_events por canal')
+metrics.describe('outbox_oldest_pending_seconds', 'Antigüedad de la tarea pendiente más antigua por canal')
+
+
+class TaskHandler:
+    """Handler registrado para un topic"""
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], None], max_attempts: int):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+
+
+_handlers: Dict[str, TaskHandler] = {}
+
+
+def task(name: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+    """Registra un handler idempotente para el topic `name`"""
+    def decorator(func: Callable[[Dict[str, Any]], None]) -> Callable[[Dict[str, Any]], None]:
+        _handlers[name] = TaskHandler(name, func, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue_many(tasks: Iterable[Tuple[str, Dict[str, Any], Optional[str]]]) -> List[OutboxEvent]:
+    """
+    Agrega tareas (topic, payload, dedup_key) a la transacción actual sin hacer commit.
+    Las dedup_key ya existentes se omiten (una sola query para todas).
+    """
+    tasks = list(tasks)
+    keys = [key for _, _, key in tasks if key]
+    existentes: Set[str] = set()
+    if keys:
+        existentes = {
+            key for (key,) in db.session.query(OutboxEvent.dedup_key).filter(OutboxEvent.dedup_key.in_(keys)).all()
+        }
+
+    now = datetime.utcnow()
+    events = []
+    for topic, payload, dedup_key in tasks:
+        if dedup_key and dedup_key in existentes:
+            continue
+        handler = _handlers.get(topic)
+        outbox_event = OutboxEvent(
+            topic=topic,
+            payload_json=json.dumps(payload or {}, default=str, ensure_ascii=False),
+            dedup_key=dedup_key,
+            status=OutboxEvent.STATUS_PENDING,
+            attempts=0,
+            max_attempts=handler.max_attempts if handler else DEFAULT_MAX_ATTEMPTS,
+            available_at=now,
+            created_at=now,
+        )
+        db.session.add(outbox_event)
+        events.append(outbox_event)
+        if dedup_key:
+            existentes.add(dedup_key)
+
+    if events:
+        db.session().info.setdefault(_PENDING_KEY, []).extend(events)
+        try:
+            get_post_commit_pipeline().ensure_started()
+        except RuntimeError:
+            # Sin app context: las tareas quedan en BD para el barrido de otro proceso
+            pass
+    return events
+
+
+def enqueue(topic: str, payload: Dict[str, Any], dedup_key: Optional[str] = None) -> Optional[OutboxEvent]:
+    """Agrega una tarea a la transacción actual (se ejecuta después del commit)"""
+    events = enqueue_many([(topic, payload, dedup_key)])
+    return events[0] if events else None
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session: Session) -> None:
+    """Pasa a la cola en memoria las tareas que quedaron confirmadas"""
+    events = session.info.pop(_PENDING_KEY, None)
+    if not events:
+        return
+    ids = []
+    ordered = False
+    for outbox_event in events:
+        state = inspect(outbox_event)
+        if state.persistent and state.identity:
+            if _is_ordered(outbox_event.topic):
+                ordered = True
+            else:
+                ids.append(state.identity[0])
+    pipeline = get_post_commit_pipeline()
+    if ids:
+        pipeline.submit(ids)
+    if ordered:
+        pipeline.wake_dispatcher()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session: Session) -> None:
+    """Descarta las tareas de la transacción revertida (las de un savepoint siguen pendientes)"""
+    events = session.info.get(_PENDING_KEY)
+    if events:
+        vigentes = [e for e in events if inspect(e).persistent or inspect(e).pending]
+        if vigentes:
+            session.info[_PENDING_KEY] = vigentes
+        else:
+            session.info.pop(_PENDING_KEY, None)
+
+
+def channel_of(topic: str) -> str:
+    """Canal de un topic ('n8n.event' -> 'n8n')"""
+    return topic.split('.', 1)[0]
+
+
+def _is_ordered(topic: str) -> bool:
+    return channel_of(topic) in ORDERED_CHANNELS
+
+
+def _ordered_filter():
+    return or_(*[OutboxEvent.topic.like(f'{channel}.%') for channel in ORDERED_CHANNELS])
+
+
+def _load_handlers() -> None:
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+
+def _backoff(attempts: int) -> float:
+    return min(2 ** attempts, MAX_BACKOFF_SECONDS)
+
+
+class PostCommitPipeline:
+    """Cola en memoria + barrido durable de outbox_events"""
+
+    def __init__(self, workers: int = POST_COMMIT_WORKERS, dispatch: bool = POST_COMMIT_DISPATCH):
+        self.workers = max(workers, 0)
+        self.dispatch = dispatch
+        self._queue: 'queue.Queue[int]' = queue.Queue()
+        self._dispatch_wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._app = None
+        self._thread_pid: Optional[int] = None
+        self._last_purge = 0.0
+        self._reported_channels: Set[str] = set()
+
+    def submit(self, ids: Iterable[int]) -> None:
+        """Encola IDs confirmados (si los workers no corren en este proceso, los toma el barrido)"""
+        if self._thread_pid != os.getpid():
+            return
+        for event_id in ids:
+            self._queue.put(event_id)
+
+    def wake_dispatcher(self) -> None:
+        """Avisa al despachador que hay tareas nuevas en canales ordenados"""
+        self._dispatch_wakeup.set()
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+
+    def _claim(self, event_id: int, now: datetime) -> bool:
+        """Toma la tarea con un UPDATE condicionado (un solo worker la ejecuta por lease)"""
+        claimed = OutboxEvent.query.filter(
+            OutboxEvent.id == event_id,
+            OutboxEvent.status.in_([OutboxEvent.STATUS_PENDING, OutboxEvent.STATUS_PROCESSING]),
+            OutboxEvent.available_at <= now,
+            OutboxEvent.attempts < OutboxEvent.max_attempts
+        ).update({
+            'status': OutboxEvent.STATUS_PROCESSING,
+            'attempts': OutboxEvent.attempts + 1,
+            'available_at': now + timedelta(seconds=POST_COMMIT_LEASE_SECONDS),
+        }, synchronize_session=False)
+        db.session.commit()
+        return bool(claimed)
+
+    def process(self, event_id: int) -> Optional[str]:
+        """
+        Ejecuta una tarea si está disponible. Retorna el estado final
+        ('done', 'pending' para reintento, 'failed') o None si no se tomó.
+        """
+        now = datetime.utcnow()
+        if not self._claim(event_id, now):
+            return None
+        outbox_event = db.session.get(OutboxEvent, event_id)
+        if outbox_event is None:
+            return None
+
+        topic = outbox_event.topic
+        metrics.observe('post_commit_task_lag_seconds', max((now - outbox_event.created_at).total_seconds(), 0),
+                        {'topic': topic})
+        started = time.perf_counter()
+        try:
+            handler = _handlers.get(topic)
+            if handler is None:
+                _load_handlers()
+                handler = _handlers.get(topic)
+            if handler is None:
+                raise LookupError(f"Sin handler registrado para '{topic}'")
+            handler.func(json.loads(outbox_event.payload_json or '{}'))
+            status, error = OutboxEvent.STATUS_DONE, None
+        except Exception as e:
+            db.session.rollback()
+            outbox_event = db.session.get(OutboxEvent, event_id)
+            error = f"{type(e).__name__}: {e}"
+            status = (OutboxEvent.STATUS_FAILED if outbox_event.attempts >= outbox_event.max_attempts
+                      else OutboxEvent.STATUS_PENDING)
+            log = logger.error if status == OutboxEvent.STATUS_FAILED else logger.warning
+            log(f"Tarea post-commit {topic} #{event_id} falló (intento {outbox_event.attempts}/"
+                f"{outbox_event.max_attempts}): {error}")
+
+        outbox_event.status = status
+        outbox_event.last_error = error[:2000] if error else None
+        if status == OutboxEvent.STATUS_PENDING:
+            outbox_event.available_at = datetime.utcnow() + timedelta(seconds=_backoff(outbox_event.attempts))
+        else:
+            outbox_event.processed_at = datetime.utcnow()
+        db.session.commit()
+
+        metrics.observe('post_commit_task_duration_seconds', time.perf_counter() - started, {'topic': topic})
+        metrics.inc('post_commit_tasks_total', 1, {'topic': topic, 'status': status})
+        return status
+
+    def fail_exhausted(self) -> int:
+        """
+        Marca 'failed' las tareas con lease vencido que ya agotaron sus intentos
+        (el worker murió o se colgó durante el último intento). No se reintentan.
+        """
+        now = datetime.utcnow()
+        failed = OutboxEvent.query.filter(
+            OutboxEvent.status == OutboxEvent.STATUS_PROCESSING,
+            OutboxEvent.available_at <= now,
+            OutboxEvent.attempts >= OutboxEvent.max_attempts
+        ).update({
+            'status': OutboxEvent.STATUS_FAILED,
+            'last_error': 'Lease vencido en el último intento (worker caído o colgado)',
+            'processed_at': now,
+        }, synchronize_session=False)
+        db.session.commit()
+        if failed:
+            logger.error(f"{failed} tareas post-commit quedaron 'failed' por lease vencido sin intentos restantes")
+        return failed
+
+    def due_ids(self, limit: int = POST_COMMIT_BATCH_SIZE, grace: float = SWEEP_GRACE_SECONDS) -> List[int]:
+        """IDs pendientes (o con lease vencido) de canales no ordenados, en orden de creación"""
+        limite = datetime.utcnow() - timedelta(seconds=grace)
+        rows = db.session.query(OutboxEvent.id).filter(
+            OutboxEvent.status.in_([OutboxEvent.STATUS_PENDING, OutboxEvent.STATUS_PROCESSING]),
+            OutboxEvent.available_at <= limite,
+            OutboxEvent.attempts < OutboxEvent.max_attempts,
+            not_(_ordered_filter())
+        ).order_by(OutboxEvent.id).limit(limit).all()
+        return [event_id for (event_id,) in rows]
+
+    def dispatch_channel(self, channel: str, limit: int = POST_COMMIT_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Despacha un lote del canal en orden de creación. Se detiene en la primera
+        tarea que no está disponible (en backoff, tomada por otro proceso o que
+        queda en reintento) para no adelantar las siguientes.
+        """
+        resultado: Dict[str, int] = {}
+        rows = db.session.query(OutboxEvent.id, OutboxEvent.available_at).filter(
+            OutboxEvent.status.in_([OutboxEvent.STATUS_PENDING, OutboxEvent.STATUS_PROCESSING]),
+            OutboxEvent.topic.like(f'{channel}.%')
+        ).order_by(OutboxEvent.id).limit(limit).all()
+        db.session.commit()
+        for event_id, available_at in rows:
+            if available_at > datetime.utcnow():
+                break
+            status = self.process(event_id)
+            if status:
+                resultado[status] = resultado.get(status, 0) + 1
+            if status in (None, OutboxEvent.STATUS_PENDING):
+                break
+        return resultado
+
+    def dispatch_ordered(self, limit: int = POST_COMMIT_BATCH_SIZE) -> Dict[str, int]:
+        """Un lote por cada canal ordenado"""
+        resultado: Dict[str, int] = {}
+        for channel in ORDERED_CHANNELS:
+            for status, count in self.dispatch_channel(channel, limit=limit).items():
+                resultado[status] = resultado.get(status, 0) + count
+        return resultado
+
+    def process_pending(self, limit: int = POST_COMMIT_BATCH_SIZE) -> Dict[str, int]:
+        """Ejecuta en este hilo las tareas pendientes (CLI, pruebas, recuperación manual)"""
+        resultado: Dict[str, int] = {}
+        self.fail_exhausted()
+        for event_id in self.due_ids(limit=limit, grace=0):
+            status = self.process(event_id)
+            if status:
+                resultado[status] = resultado.get(status, 0) + 1
+        for status, count in self.dispatch_ordered(limit=limit).items():
+            resultado[status] = resultado.get(status, 0) + count
+        return resultado
+
+    def backlog(self) -> Dict[str, Dict[str, float]]:
+        """
+        Pendientes por canal y antigüedad de la más antigua (una query agrupada por topic).
+        Publica los gauges outbox_pending_events / outbox_oldest_pending_seconds.
+        """
+        rows = db.session.query(
+            OutboxEvent.topic, func.count(OutboxEvent.id), func.min(OutboxEvent.created_at)
+        ).filter(
+            OutboxEvent.status.in_([OutboxEvent.STATUS_PENDING, OutboxEvent.STATUS_PROCESSING])
+        ).group_by(OutboxEvent.topic).all()
+        now = datetime.utcnow()
+        canales: Dict[str, Dict[str, float]] = {}
+        for topic, count, oldest in rows:
+            canal = canales.setdefault(channel_of(topic), {'pending': 0, 'oldest_seconds': 0.0})
+            canal['pending'] += count
+            if oldest is not None:
+                canal['oldest_seconds'] = max(canal['oldest_seconds'], (now - oldest).total_seconds())
+        for channel in set(ORDERED_CHANNELS) | set(canales) | self._reported_channels:
+            canal = canales.get(channel, {'pending': 0, 'oldest_seconds': 0.0})
+            metrics.set_gauge('outbox_pending_events', canal['pending'], {'channel': channel})
+            metrics.set_gauge('outbox_oldest_pending_seconds', canal['oldest_seconds'], {'channel': channel})
+        self._reported_channels |= set(canales)
+        return canales
+
+    def purge_completed(self, days: int = POST_COMMIT_RETENTION_DAYS) -> int:
+        """Elimina tareas completadas más antiguas que la retención"""
+        deleted = OutboxEvent.query.filter(
+            OutboxEvent.status == OutboxEvent.STATUS_DONE,
+            OutboxEvent.processed_at < datetime.utcnow() - timedelta(days=days)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    # ------------------------------------------------------------------
+    # Hilos
+    # ------------------------------------------------------------------
+
+    def _run(self, func: Callable[[], Any]) -> Any:
+        with self._app.app_context():
+            try:
+                return func()
+            finally:
+                db.session.remove()
+
+    def _worker_loop(self) -> None:
+        pid = os.getpid()
+        while self._thread_pid == pid:
+            try:
+                event_id = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                self._run(lambda: self.process(event_id))
+            except Exception as e:
+                logger.error(f"Error ejecutando tarea post-commit #{event_id}: {e}", exc_info=True)
+
+    def _sweep_loop(self) -> None:
+        pid = os.getpid()
+        while self._thread_pid == pid:
+            time.sleep(POST_COMMIT_POLL_SECONDS)
+            try:
+                self._run(self.fail_exhausted)
+                for event_id in self._run(self.due_ids):
+                    self._queue.put(event_id)
+                self._run(self.backlog)
+                if time.time() - self._last_purge > PURGE_EVERY_SECONDS:
+                    self._last_purge = time.time()
+                    self._run(self.purge_completed)
+            except Exception as e:
+                logger.error(f"Error en barrido de tareas post-commit: {e}", exc_info=True)
+
+    def _dispatch_loop(self) -> None:
+        pid = os.getpid()
+        while self._thread_pid == pid:
+            self._dispatch_wakeup.wait(POST_COMMIT_POLL_SECONDS)
+            self._dispatch_wakeup.clear()
+            try:
+                # Lotes completos: seguir mientras haya trabajo disponible
+                while sum(self._run(self.dispatch_ordered).values()) >= POST_COMMIT_BATCH_SIZE:
+                    pass
+            except Exception as e:
+                logger.error(f"Error despachando canales ordenados: {e}", exc_info=True)
+
+    def ensure_started(self, app=None) -> None:
+        """Inicia workers y barrido en este proceso (se reinician tras el fork de gunicorn)"""
+        pid = os.getpid()
+        if self._thread_pid == pid or self.workers == 0:
+            return
+        if app is None:
+            app = current_app._get_current_object()
+        with self._lock:
+            if self._thread_pid == pid:
+                return
+            _load_handlers()
+            self._app = app
+            self._queue = queue.Queue()
+            self._thread_pid = pid
+        for i in range(self.workers):
+            threading.Thread(target=self._worker_loop, daemon=True, name=f'post-commit-{i}').start()
+        threading.Thread(target=self._sweep_loop, daemon=True, name='post-commit-sweep').start()
+        if self.dispatch:
+            threading.Thread(target=self._dispatch_loop, daemon=True, name='post-commit-dispatch').start()
+        logger.info(f"✅ Pipeline post-commit iniciado ({self.workers} workers, despacho ordenado: {self.dispatch})")
+
+
+_pipeline: Optional[PostCommitPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_post_commit_pipeline() -> PostCommitPipeline:
+    """Pipeline post-commit compartido del proceso"""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = PostCommitPipeline()
+    return _pipeline
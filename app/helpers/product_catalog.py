@@ -0,0 +1,207 @@
+"""
+Catálogo de productos de PHP POS compartido por kiosko y POS.
+
+Stale-while-revalidate: las requests siempre leen el último snapshot bueno
+en memoria; cuando se acerca la expiración se dispara un refresco en segundo
+plano (uno a la vez). Si la API falla se mantiene el snapshot anterior.
+El snapshot también se guarda en disco para que los demás workers del mismo
+contenedor arranquen con datos y no repitan la llamada a la API.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CATALOG_TTL = int(os.environ.get('PRODUCT_CATALOG_TTL', '300'))  # 5 minutos
+REFRESH_RATIO = 0.8  # Refrescar en segundo plano al 80% del TTL
+MIN_RETRY_SECONDS = 30  # No reintentar la API más seguido que esto si falla
+SNAPSHOT_PATH = os.environ.get(
+    'PRODUCT_CATALOG_SNAPSHOT',
+    os.path.join(tempfile.gettempdir(), 'bimba_product_catalog.json')
+)
+
+
+class ProductCatalog:
+    """Snapshot de items de PHP POS con refresco en segundo plano"""
+
+    def __init__(self, ttl: int = CATALOG_TTL, snapshot_path: Optional[str] = SNAPSHOT_PATH):
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self._items: Optional[List[Dict[str, Any]]] = None
+        self._fetched_at: float = 0.0
+        self._version: int = 0
+        self._last_attempt: float = 0.0
+        self._last_error: Optional[str] = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Lectura (nunca espera a la API)
+    # ------------------------------------------------------------------
+
+    def get_items(self, fetcher: Optional[Callable[[], List[Dict[str, Any]]]] = None) -> List[Dict[str, Any]]:
+        """
+        Retorna el último snapshot de items (lista vacía si aún no hay ninguno).
+        Si el snapshot está por expirar, agenda un refresco en segundo plano.
+
+        Args:
+            fetcher: Función que obtiene los items desde la API. Se construye en el
+                     contexto de la request para que use la configuración de Flask.
+        """
+        if self._items is None:
+            self._load_snapshot()
+
+        if fetcher is not None and self.age() >= self.ttl * REFRESH_RATIO:
+            self.refresh_async(fetcher)
+
+        return self._items or []
+
+    @property
+    def version(self) -> int:
+        """Versión del snapshot (cambia cada vez que se actualiza)"""
+        return self._version
+
+    def age(self) -> float:
+        """Segundos desde el último snapshot bueno"""
+        if not self._fetched_at:
+            return float('inf')
+        return time.time() - self._fetched_at
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado del catálogo para diagnóstico"""
+        return {
+            'items': len(self._items or []),
+            'version': self._version,
+            'age_seconds': round(self.age(), 1) if self._fetched_at else None,
+            'ttl': self.ttl,
+            'refreshing': self._refreshing,
+            'last_error': self._last_error,
+        }
+
+    # ------------------------------------------------------------------
+    # Refresco
+    # ------------------------------------------------------------------
+
+    def refresh_async(self, fetcher: Callable[[], List[Dict[str, Any]]]) -> bool:
+        """
+        Lanza un refresco en segundo plano si no hay otro en curso.
+
+        Returns:
+            bool: True si se lanzó un refresco
+        """
+        with self._lock:
+            if self._refreshing:
+                return False
+            if self._last_error and time.time() - self._last_attempt < MIN_RETRY_SECONDS:
+                return False
+            self._refreshing = True
+            self._last_attempt = time.time()
+
+        thread = threading.Thread(target=self._refresh, args=(fetcher,), daemon=True)
+        thread.start()
+        return True
+
+    def refresh_now(self, fetcher: Callable[[], List[Dict[str, Any]]]) -> bool:
+        """Refresco síncrono (scripts/tests). Retorna True si se actualizó el snapshot"""
+        with self._lock:
+            self._refreshing = True
+            self._last_attempt = time.time()
+        return self._refresh(fetcher)
+
+    def _refresh(self, fetcher: Callable[[], List[Dict[str, Any]]]) -> bool:
+        try:
+            # Otro worker pudo haber refrescado el snapshot en disco recientemente
+            if self._load_snapshot(max_age=self.ttl * REFRESH_RATIO):
+                return True
+
+            items = fetcher()
+            if not items:
+                self._last_error = 'La API no retornó items'
+                logger.warning("⚠️ Catálogo: la API no retornó items, se mantiene el último snapshot")
+                return False
+
+            self._set_items(items, time.time())
+            self._save_snapshot()
+            self._last_error = None
+            logger.info(f"✅ Catálogo de productos actualizado: {len(items)} items")
+            return True
+        except Exception as e:
+            self._last_error = str(e)
+            logger.error(f"Error al refrescar catálogo de productos: {e}")
+            return False
+        finally:
+            self._refreshing = False
+
+    def _set_items(self, items: List[Dict[str, Any]], fetched_at: float) -> None:
+        with self._lock:
+            self._items = items
+            self._fetched_at = fetched_at
+            self._version += 1
+
+    # ------------------------------------------------------------------
+    # Snapshot en disco (compartido entre workers)
+    # ------------------------------------------------------------------
+
+    def _load_snapshot(self, max_age: Optional[float] = None) -> bool:
+        """Carga el snapshot de disco si es más nuevo que el de memoria"""
+        if not self.snapshot_path:
+            return False
+        try:
+            mtime = os.path.getmtime(self.snapshot_path)
+        except OSError:
+            return False
+        if mtime <= self._fetched_at:
+            return False
+        if max_age is not None and time.time() - mtime > max_age:
+            return False
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudo leer snapshot de catálogo: {e}")
+            return False
+        if not items:
+            return False
+        self._set_items(items, mtime)
+        logger.debug(f"Catálogo cargado desde snapshot en disco ({len(items)} items)")
+        return True
+
+    def _save_snapshot(self) -> None:
+        """Escribe el snapshot de forma atómica (archivo temporal + rename)"""
+        if not self.snapshot_path or not self._items:
+            return
+        try:
+            directory = os.path.dirname(self.snapshot_path) or '.'
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.catalog-', suffix='.json')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._items, f, ensure_ascii=False)
+            os.replace(tmp_path, self.snapshot_path)
+            os.utime(self.snapshot_path, (self._fetched_at, self._fetched_at))
+        except OSError as e:
+            logger.warning(f"No se pudo guardar snapshot de catálogo: {e}")
+
+
+# Instancia compartida por el proceso
+_catalog = ProductCatalog()
+
+
+def get_product_catalog() -> ProductCatalog:
+    """Obtiene el catálogo compartido del proceso"""
+    return _catalog
+
+
+def get_phppos_items() -> List[Dict[str, Any]]:
+    """
+    Items de PHP POS desde el catálogo compartido.
+    Nunca espera a la API: si el snapshot está viejo se refresca en segundo plano.
+    Llamar dentro de una request (el cliente toma su configuración de Flask).
+    """
+    from app.infrastructure.external.phppos_kiosk_client import PHPPosKioskClient
+
+    client = PHPPosKioskClient()
+    return _catalog.get_items(fetcher=lambda: client.get_items(limit=1000))
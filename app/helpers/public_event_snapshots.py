@@ -0,0 +1,308 @@
+"""
+Info pública de eventos materializada (programación para bots, n8n y sitio)
+Los payloads públicos (evento de una fecha, próximos eventos, eventos del mes)
+se guardan ya calculados en programacion_public_snapshots y se regeneran al
+crear/editar/eliminar un evento, vía tarea post-commit. Los endpoints públicos
+los sirven desde memoria del proceso con ETag, Last-Modified y Cache-Control,
+de modo que un CDN/proxy absorbe las ráfagas (p. ej. tras un post de Instagram)
+y la app solo revalida contra la BD cada PUBLIC_INFO_LOCAL_TTL_SECONDS.
+
+Los endpoints son públicos: un request solo materializa (escribe) snapshots
+dentro de la ventana [hoy - PUBLIC_INFO_PAST_DAYS, hoy + PUBLIC_INFO_FUTURE_DAYS];
+fuera de ella el payload se calcula al vuelo sin guardarlo. purge_stale()
+elimina los 'upcoming:' de días anteriores y los de fechas/meses ya fuera
+de la ventana.
+
+Variables de entorno:
+    PUBLIC_INFO_MAX_AGE_SECONDS      max-age/s-maxage de Cache-Control (60)
+    PUBLIC_INFO_STALE_SECONDS        stale-while-revalidate / stale-if-error (300)
+    PUBLIC_INFO_LOCAL_TTL_SECONDS    cada cuánto un proceso revalida su copia en memoria (15)
+    PUBLIC_INFO_PAST_DAYS            días hacia atrás que se materializan (7)
+    PUBLIC_INFO_FUTURE_DAYS          días hacia adelante que se materializan (400)
+
+Uso:
+    from app.helpers.public_event_snapshots import get_public_event_snapshots, public_json_response
+
+    snapshot = get_public_event_snapshots().get(fecha_key(fecha))
+    return public_json_response(snapshot, {'has_event': True, 'event': snapshot['payload']})
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import jsonify, request
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db
+from app.models.programacion_models import ProgramacionEvento, ProgramacionPublicSnapshot
+from .logger import get_logger
+from .metrics import metrics
+from .post_commit import enqueue, task
+from .timezone_utils import CHILE_TZ
+
+logger = get_logger(__name__)
+
+PUBLIC_INFO_MAX_AGE_SECONDS = int(os.environ.get('PUBLIC_INFO_MAX_AGE_SECONDS', '60'))
+PUBLIC_INFO_STALE_SECONDS = int(os.environ.get('PUBLIC_INFO_STALE_SECONDS', '300'))
+PUBLIC_INFO_LOCAL_TTL_SECONDS = float(os.environ.get('PUBLIC_INFO_LOCAL_TTL_SECONDS', '15'))
+PUBLIC_INFO_PAST_DAYS = int(os.environ.get('PUBLIC_INFO_PAST_DAYS', '7'))
+PUBLIC_INFO_FUTURE_DAYS = int(os.environ.get('PUBLIC_INFO_FUTURE_DAYS', '400'))
+# Próximos eventos materializados (los endpoints recortan según ?limit=)
+UPCOMING_MAX = 50
+
+metrics.describe('public_info_requests_total', 'Lecturas de info pública por origen (memory, db, build)')
+
+
+def hoy() -> date:
+    return datetime.now(CHILE_TZ).date()
+
+
+def fecha_key(fecha: date) -> str:
+    return f"fecha:{fecha.isoformat()}"
+
+
+def upcoming_key(desde: Optional[date] = None) -> str:
+    return f"upcoming:{(desde or hoy()).isoformat()}"
+
+
+def month_key(año: int, mes: int) -> str:
+    return f"month:{año:04d}-{mes:02d}"
+
+
+def keys_for_fechas(fechas: Iterable[date]) -> List[str]:
+    """Snapshots afectados por cambios en eventos de esas fechas"""
+    keys = {upcoming_key()}
+    for fecha in fechas:
+        keys.add(fecha_key(fecha))
+        keys.add(month_key(fecha.year, fecha.month))
+    return sorted(keys)
+
+
+def materializable(key: str) -> bool:
+    """True si un request puede guardar el snapshot (clave dentro de la ventana)"""
+    tipo, valor = key.split(':', 1)
+    inicio = hoy() - timedelta(days=PUBLIC_INFO_PAST_DAYS)
+    fin = hoy() + timedelta(days=PUBLIC_INFO_FUTURE_DAYS)
+    if tipo == 'fecha':
+        return inicio <= date.fromisoformat(valor) <= fin
+    if tipo == 'upcoming':
+        return date.fromisoformat(valor) == hoy()
+    if tipo == 'month':
+        año, mes = (int(parte) for parte in valor.split('-'))
+        return (año, mes) >= (inicio.year, inicio.month) and (año, mes) <= (fin.year, fin.month)
+    return False
+
+
+def _activos():
+    return ProgramacionEvento.query.filter(ProgramacionEvento.eliminado_en.is_(None))
+
+
+def build_payload(key: str) -> Any:
+    """Calcula el payload público de un snapshot (mismo contenido que ProgramacionService)"""
+    tipo, valor = key.split(':', 1)
+    if tipo == 'fecha':
+        evento = _activos().filter(ProgramacionEvento.fecha == date.fromisoformat(valor)).first()
+        if not evento or evento.estado_publico != 'publicado':
+            return None
+        return evento.to_public_dict()
+    if tipo == 'upcoming':
+        eventos = _activos().filter(
+            ProgramacionEvento.fecha >= date.fromisoformat(valor),
+            ProgramacionEvento.estado_publico == 'publicado'
+        ).order_by(ProgramacionEvento.fecha.asc()).limit(UPCOMING_MAX).all()
+        return [evento.to_public_dict() for evento in eventos]
+    if tipo == 'month':
+        año, mes = (int(parte) for parte in valor.split('-'))
+        inicio = date(año, mes, 1)
+        fin = date(año + 1, 1, 1) if mes == 12 else date(año, mes + 1, 1)
+        eventos = _activos().filter(
+            ProgramacionEvento.fecha >= inicio,
+            ProgramacionEvento.fecha < fin
+        ).order_by(ProgramacionEvento.fecha.asc()).all()
+        return [evento.to_public_dict() for evento in eventos]
+    raise ValueError(f"Snapshot desconocido: {key}")
+
+
+def _serialize(payload: Any) -> Tuple[str, str]:
+    body = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return body, hashlib.sha256(body.encode('utf-8')).hexdigest()[:32]
+
+
+class PublicEventSnapshots:
+    """Snapshots materializados + copia en memoria del proceso"""
+
+    def __init__(self, local_ttl: float = PUBLIC_INFO_LOCAL_TTL_SECONDS):
+        self.local_ttl = local_ttl
+        self._lock = threading.Lock()
+        # key -> (snapshot, monotonic de la última validación)
+        self._local: Dict[str, Tuple[Dict[str, Any], float]] = {}
+
+    def _remember(self, key: str, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._local[key] = (snapshot, time.monotonic())
+        return snapshot
+
+    def get(self, key: str) -> Dict[str, Any]:
+        """
+        Snapshot {'payload', 'etag', 'updated_at'}. Sirve la copia en memoria;
+        pasado local_ttl revalida el etag con una lectura por PK y, si no
+        existe (p. ej. primer request de un día nuevo), lo materializa.
+        """
+        with self._lock:
+            entry = self._local.get(key)
+        if entry and time.monotonic() - entry[1] < self.local_ttl:
+            metrics.inc('public_info_requests_total', 1, {'source': 'memory'})
+            return entry[0]
+
+        try:
+            row = db.session.query(
+                ProgramacionPublicSnapshot.etag, ProgramacionPublicSnapshot.updated_at
+            ).filter(ProgramacionPublicSnapshot.key == key).first()
+            if row is None:
+                metrics.inc('public_info_requests_total', 1, {'source': 'build'})
+                if not materializable(key):
+                    # Fuera de la ventana: se calcula sin guardar (ni en BD ni en memoria)
+                    payload = build_payload(key)
+                    return {'payload': payload, 'etag': _serialize(payload)[1],
+                            'updated_at': datetime.utcnow().replace(microsecond=0)}
+                self.refresh([key])
+                if key.startswith('upcoming:'):
+                    # Primer 'próximos eventos' del día: descartar los de días anteriores
+                    self.purge_stale()
+                with self._lock:
+                    entry = self._local.get(key)
+                if entry:
+                    return entry[0]
+                return self.get(key)
+            if entry and entry[0]['etag'] == row.etag:
+                metrics.inc('public_info_requests_total', 1, {'source': 'db'})
+                return self._remember(key, entry[0])
+            payload_json = db.session.query(ProgramacionPublicSnapshot.payload_json).filter(
+                ProgramacionPublicSnapshot.key == key
+            ).scalar()
+            metrics.inc('public_info_requests_total', 1, {'source': 'db'})
+            return self._remember(key, {
+                'payload': json.loads(payload_json),
+                'etag': row.etag,
+                'updated_at': row.updated_at,
+            })
+        except Exception as e:
+            db.session.rollback()
+            if entry:
+                logger.warning(f"Error revalidando info pública {key}, usando copia en memoria: {e}")
+                return entry[0]
+            raise
+
+    def refresh(self, keys: Iterable[str]) -> int:
+        """
+        Recalcula los snapshots indicados. Solo escribe (y cambia
+        ETag/Last-Modified) los que cambiaron. Retorna cuántos cambiaron.
+        """
+        keys = sorted(set(keys))
+        existentes = {
+            snapshot.key: snapshot
+            for snapshot in ProgramacionPublicSnapshot.query.filter(ProgramacionPublicSnapshot.key.in_(keys)).all()
+        }
+        now = datetime.utcnow().replace(microsecond=0)
+        cambiados = 0
+        resultado = {}
+        for key in keys:
+            payload = build_payload(key)
+            body, etag = _serialize(payload)
+            snapshot = existentes.get(key)
+            if snapshot is None:
+                snapshot = ProgramacionPublicSnapshot(key=key, payload_json=body, etag=etag, updated_at=now)
+                db.session.add(snapshot)
+                cambiados += 1
+            elif snapshot.etag != etag:
+                snapshot.payload_json = body
+                snapshot.etag = etag
+                snapshot.updated_at = now
+                cambiados += 1
+            resultado[key] = {'payload': payload, 'etag': snapshot.etag, 'updated_at': snapshot.updated_at}
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Otro proceso materializó la misma clave a la vez: se usa su versión
+            db.session.rollback()
+            self.invalidate_local(keys)
+            return 0
+        for key, snapshot in resultado.items():
+            self._remember(key, snapshot)
+        return cambiados
+
+    def purge_stale(self) -> int:
+        """Elimina 'upcoming:' de días anteriores y fechas/meses anteriores a la ventana"""
+        limite = hoy() - timedelta(days=PUBLIC_INFO_PAST_DAYS)
+        key = ProgramacionPublicSnapshot.key
+        obsoletos = or_(
+            and_(key.like('upcoming:%'), key < upcoming_key()),
+            and_(key.like('fecha:%'), key < fecha_key(limite)),
+            and_(key.like('month:%'), key < month_key(limite.year, limite.month)),
+        )
+        keys = [k for (k,) in db.session.query(key).filter(obsoletos).all()]
+        if keys:
+            ProgramacionPublicSnapshot.query.filter(key.in_(keys)).delete(synchronize_session=False)
+        db.session.commit()
+        self.invalidate_local(keys)
+        return len(keys)
+
+    def invalidate_local(self, keys: Optional[Iterable[str]] = None) -> None:
+        """Descarta la copia en memoria (todas o las indicadas)"""
+        with self._lock:
+            if keys is None:
+                self._local.clear()
+            else:
+                for key in keys:
+                    self._local.pop(key, None)
+
+
+def public_json_response(snapshot: Dict[str, Any], body: Dict[str, Any]):
+    """
+    JSON con ETag/Last-Modified del snapshot y Cache-Control público.
+    Responde 304 si el cliente/proxy ya tiene esa versión.
+    """
+    response = jsonify(body)
+    response.set_etag(snapshot['etag'])
+    response.last_modified = snapshot['updated_at']
+    response.headers['Cache-Control'] = (
+        f"public, max-age={PUBLIC_INFO_MAX_AGE_SECONDS}, s-maxage={PUBLIC_INFO_MAX_AGE_SECONDS}, "
+        f"stale-while-revalidate={PUBLIC_INFO_STALE_SECONDS}, stale-if-error={PUBLIC_INFO_STALE_SECONDS}"
+    )
+    return response.make_conditional(request)
+
+
+def refresh_after_commit(*fechas: date) -> None:
+    """Encola en la transacción actual la regeneración de los snapshots de esas fechas"""
+    enqueue('programacion.public_snapshots', {
+        'fechas': sorted({fecha.isoformat() for fecha in fechas if fecha})
+    })
+
+
+@task('programacion.public_snapshots')
+def _refresh_snapshots(payload: Dict[str, Any]) -> None:
+    fechas = [date.fromisoformat(valor) for valor in payload.get('fechas', [])]
+    snapshots = get_public_event_snapshots()
+    cambiados = snapshots.refresh(keys_for_fechas(fechas))
+    eliminados = snapshots.purge_stale()
+    logger.info(f"Info pública de programación regenerada ({cambiados} snapshots cambiaron, "
+                f"{eliminados} obsoletos eliminados)")
+
+
+_snapshots: Optional[PublicEventSnapshots] = None
+_snapshots_lock = threading.Lock()
+
+
+def get_public_event_snapshots() -> PublicEventSnapshots:
+    """Snapshots de info pública compartidos del proceso"""
+    global _snapshots
+    if _snapshots is None:
+        with _snapshots_lock:
+            if _snapshots is None:
+                _snapshots = PublicEventSnapshots()
+    return _snapshots
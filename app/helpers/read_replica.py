@@ -0,0 +1,227 @@
+"""
+Ruteo de lecturas a réplica de base de datos
+Los métodos de reportes y dashboards marcados como solo lectura ejecutan sus
+queries contra DATABASE_REPLICA_URL; ventas, entregas y toda escritura siguen
+en la base primaria.
+
+Variables de entorno:
+    DATABASE_REPLICA_URL         URL de la réplica (sin ella todo va a la primaria)
+    REPLICA_MAX_LAG_SECONDS      atraso máximo aceptado de la réplica (30)
+    REPLICA_COOLDOWN_SECONDS     tiempo sin usar la réplica tras un error (60)
+
+Uso:
+    from app.helpers.read_replica import read_only, read_replica
+
+    @read_only
+    def get_all_metrics(self): ...          # queries a la réplica si está al día
+
+    with read_replica():
+        filas = PosSale.query.filter(...).all()
+
+La réplica se usa solo si el último check del scheduler de health checks
+(replica) reporta un atraso dentro del límite; si no, si la sesión ya
+escribió en este request o si la réplica falla, se usa la primaria. Los
+errores de la réplica se detectan en el engine (handle_error), de modo que el
+fallback funciona aunque el método marcado capture sus propias excepciones y
+retorne un payload vacío.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, Optional
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DisconnectionError, OperationalError
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+REPLICA_BIND_KEY = 'replica'
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', '30'))
+REPLICA_COOLDOWN_SECONDS = float(os.environ.get('REPLICA_COOLDOWN_SECONDS', '60'))
+
+_state_lock = threading.Lock()
+_state = {'failed_until': 0.0}
+# Errores de la réplica vistos por este hilo (read_only compara antes/después)
+_local = threading.local()
+
+
+class RoutingSession(Session):
+    """
+    Sesión de Flask-SQLAlchemy que envía a la réplica las queries hechas dentro
+    de read_replica(). Los flush y las lecturas posteriores a una escritura
+    (read-your-writes) siempre van a la primaria.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if clause is not None and _is_write(clause):
+            self.info['has_writes'] = True
+        if (bind is None
+                and self.info.get('read_replica')
+                and not self._flushing
+                and not self.info.get('has_writes')):
+            engine = self._db.engines.get(REPLICA_BIND_KEY)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _is_write(clause) -> bool:
+    """INSERT/UPDATE/DELETE ejecutados directamente con session.execute()"""
+    if isinstance(clause, UpdateBase):
+        return True
+    if isinstance(clause, TextClause):
+        return not clause.text.lstrip().upper().startswith(('SELECT', 'WITH', 'SHOW', 'PRAGMA'))
+    return False
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_writes(session, flush_context):
+    session.info['has_writes'] = True
+
+
+@event.listens_for(Engine, 'handle_error')
+def _track_replica_error(context):
+    """Registra los errores de conexión/operación de la réplica en el hilo actual"""
+    from flask import has_app_context
+
+    if not has_app_context():
+        return
+    from app.models import db
+
+    if context.engine is None or context.engine is not db.engines.get(REPLICA_BIND_KEY):
+        return
+    if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+        _local.errors = getattr(_local, 'errors', 0) + 1
+        _local.last_error = context.sqlalchemy_exception or context.original_exception
+
+
+def _replica_errors() -> int:
+    return getattr(_local, 'errors', 0)
+
+
+def replica_engine_options(base_options: Dict[str, Any]) -> Dict[str, Any]:
+    """Entrada de SQLALCHEMY_BINDS para la réplica (mismo perfil de pool que la primaria)"""
+    return {'url': REPLICA_URL, **base_options}
+
+
+def replica_lag_seconds(engine) -> Optional[float]:
+    """Atraso de replicación en segundos (None si la BD no lo informa)"""
+    with engine.connect() as conn:
+        if engine.dialect.name == 'postgresql':
+            row = conn.execute(text(
+                "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+            )).fetchone()
+            return float(row[0]) if row and row[0] is not None else None
+        if engine.dialect.name == 'mysql':
+            try:
+                row = conn.execute(text('SHOW REPLICA STATUS')).mappings().fetchone()
+            except OperationalError:
+                # MySQL < 8.0.22
+                row = conn.execute(text('SHOW SLAVE STATUS')).mappings().fetchone()
+            if not row:
+                return None
+            lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+            return float(lag) if lag is not None else None
+        conn.execute(text('SELECT 1'))
+        return 0.0
+
+
+def check_replica() -> Dict[str, Any]:
+    """Health check de la réplica: conectividad y atraso (lo ejecuta el scheduler)"""
+    from app.models import db
+
+    engine = db.engines.get(REPLICA_BIND_KEY)
+    if engine is None:
+        return {'status': 'not_configured', 'message': 'Réplica de lectura no configurada'}
+
+    start = time.perf_counter()
+    lag = replica_lag_seconds(engine)
+    response_time = (time.perf_counter() - start) * 1000
+
+    if lag is None:
+        return {'status': 'unhealthy', 'lag_seconds': None, 'response_time_ms': round(response_time, 2),
+                'message': 'La réplica no informa estado de replicación'}
+    if lag > REPLICA_MAX_LAG_SECONDS:
+        return {'status': 'warning', 'lag_seconds': round(lag, 1), 'response_time_ms': round(response_time, 2),
+                'message': f'Réplica atrasada {lag:.0f}s (máximo {REPLICA_MAX_LAG_SECONDS:.0f}s): lecturas a la primaria'}
+    return {'status': 'healthy', 'lag_seconds': round(lag, 1), 'response_time_ms': round(response_time, 2),
+            'message': 'Réplica de lectura al día'}
+
+
+def mark_replica_failed(error: Exception) -> None:
+    """Deja de usar la réplica por REPLICA_COOLDOWN_SECONDS"""
+    with _state_lock:
+        _state['failed_until'] = time.time() + REPLICA_COOLDOWN_SECONDS
+    logger.warning(f"⚠️ Réplica de lectura falló, usando la primaria por {REPLICA_COOLDOWN_SECONDS:.0f}s: {error}")
+
+
+def replica_available() -> bool:
+    """True si hay réplica configurada, sin errores recientes y con atraso dentro del límite"""
+    if not REPLICA_URL or time.time() < _state['failed_until']:
+        return False
+    try:
+        from .health_scheduler import get_health_scheduler
+        estado = get_health_scheduler().snapshot([REPLICA_BIND_KEY]).get(REPLICA_BIND_KEY, {})
+    except Exception as e:
+        logger.debug(f"No se pudo leer el estado de la réplica: {e}")
+        return False
+    return estado.get('status') == 'healthy' and not estado.get('stale')
+
+
+@contextmanager
+def read_replica():
+    """
+    Ejecuta las queries del bloque en la réplica (si está disponible).
+    Retorna True si el bloque quedó ruteado a la réplica.
+    """
+    from app.models import db
+
+    if not replica_available():
+        yield False
+        return
+
+    session = db.session()
+    depth = session.info.get('read_replica', 0)
+    session.info['read_replica'] = depth + 1
+    try:
+        yield True
+    finally:
+        session.info['read_replica'] = depth
+
+
+def read_only(func):
+    """
+    Marca un método/función de solo lectura: sus queries van a la réplica.
+    Si la réplica falla a mitad de camino, se reintenta una vez en la primaria,
+    también cuando el método capturó el error y retornó un resultado vacío.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        from app.models import db
+
+        with read_replica() as routed:
+            if not routed:
+                return func(*args, **kwargs)
+            errores = _replica_errors()
+            try:
+                result = func(*args, **kwargs)
+            except (OperationalError, DisconnectionError) as e:
+                error = e
+            else:
+                if _replica_errors() == errores:
+                    return result
+                error = getattr(_local, 'last_error', None) or OperationalError('réplica', {}, None)
+        mark_replica_failed(error)
+        db.session.rollback()
+        return func(*args, **kwargs)
+    return wrapper
@@ -9,6 +9,7 @@ from app.models import db
 from app.models.pos_models import RegisterSession, PosRegister
 from app.models.jornada_models import Jornada
 from app.helpers.timezone_utils import CHILE_TZ
+from app.helpers.idempotency_helper import get_idempotency_store
 import hashlib
 import logging
 import json
@@ -87,10 +88,13 @@ class RegisterSessionService:
             key_data = f"{register_id}_{jornada_id}_{employee_id}_{datetime.now(CHILE_TZ).strftime('%Y%m%d%H%M')}"
             idempotency_key = hashlib.sha256(key_data.encode()).hexdigest()[:64]
             
-            # Verificar que no exista sesión con esta key
-            existing_key = RegisterSession.query.filter_by(idempotency_key_open=idempotency_key).first()
-            if existing_key:
-                return True, existing_key, "Sesión ya existe (idempotencia)"
+            # Verificar que no exista sesión con esta key (almacén de idempotencia)
+            store = get_idempotency_store()
+            opened = store.get('register_session.open', idempotency_key)
+            if opened:
+                existing_key = db.session.get(RegisterSession, json.loads(opened['body'])['session_id'])
+                if existing_key:
+                    return True, existing_key, "Sesión ya existe (idempotencia)"
             
             # Crear nueva sesión
             new_session = RegisterSession(
@@ -107,6 +111,7 @@ class RegisterSessionService:
             
             db.session.add(new_session)
             db.session.commit()
+            store.put('register_session.open', idempotency_key, json.dumps({'session_id': new_session.id}))
             
             # Registrar auditoría
             RegisterSessionService._log_audit(
@@ -197,6 +202,110 @@ class RegisterSessionService:
             logger.error(f"Error al iniciar cierre de sesión: {e}", exc_info=True)
             return False, f"Error: {str(e)}"
     
+    @staticmethod
+    def get_sales_totals(
+        register_id: str,
+        shift_date: str,
+        since: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Totales y conteos de ventas de una caja en UNA query agrupada
+        (GROUP BY provider + empleado, con SUM(CASE ...) por cada filtro).
+        La usan el resumen de caja, la selección de caja y el cierre de sesión.
+
+        Las ventas canceladas nunca cuentan. Cada bloque aplica el filtro de
+        su vista:
+        - revenue: sin no_revenue (cierre: payment_totals, ticket_count, providers)
+        - billable: además sin cortesías ni pruebas (resumen para el cajero)
+        - non_test: sin pruebas, incluye no_revenue (ventas previas al abrir caja)
+
+        Args:
+            register_id: ID de la caja
+            shift_date: Fecha del turno (YYYY-MM-DD)
+            since: Opcional, solo ventas creadas desde este momento (apertura de la sesión)
+
+        Returns:
+            Dict con 'revenue', 'billable', 'non_test' y 'employees'
+            ([{employee_id, employee_name, count}] de ventas non_test)
+        """
+        from app.models.pos_models import PosSale
+        from sqlalchemy import func, case, and_
+
+        revenue = PosSale.no_revenue == False
+        billable = and_(PosSale.no_revenue == False, PosSale.is_courtesy == False, PosSale.is_test == False)
+        non_test = PosSale.is_test == False
+
+        def total_if(condition, column):
+            return func.coalesce(func.sum(case((condition, column), else_=0)), 0)
+
+        def count_if(condition):
+            return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+        query = db.session.query(
+            PosSale.payment_provider,
+            PosSale.employee_id,
+            PosSale.employee_name,
+            count_if(revenue),
+            total_if(revenue, PosSale.payment_cash),
+            total_if(revenue, PosSale.payment_debit),
+            total_if(revenue, PosSale.payment_credit),
+            total_if(revenue, PosSale.total_amount),
+            count_if(billable),
+            total_if(billable, PosSale.payment_cash),
+            total_if(billable, PosSale.payment_debit),
+            total_if(billable, PosSale.payment_credit),
+            count_if(non_test),
+            total_if(non_test, PosSale.total_amount),
+        ).filter(
+            PosSale.register_id == str(register_id),
+            PosSale.shift_date == shift_date,
+            PosSale.is_cancelled == False
+        )
+        if since is not None:
+            if since.tzinfo:
+                since = since.replace(tzinfo=None)
+            query = query.filter(PosSale.created_at >= since)
+        rows = query.group_by(PosSale.payment_provider, PosSale.employee_id, PosSale.employee_name).all()
+
+        totals = {
+            'revenue': {'count': 0, 'cash': 0.0, 'debit': 0.0, 'credit': 0.0, 'total': 0.0,
+                        'by_provider': {}, 'count_by_provider': {}},
+            'billable': {'count': 0, 'cash': 0.0, 'debit': 0.0, 'credit': 0.0, 'total': 0.0},
+            'non_test': {'count': 0, 'total': 0.0},
+            'employees': [],
+        }
+        rev, bill, other = totals['revenue'], totals['billable'], totals['non_test']
+        sellers: Dict[tuple, Dict[str, Any]] = {}
+        for (provider, employee_id, employee_name,
+             rev_count, rev_cash, rev_debit, rev_credit, rev_total,
+             bill_count, bill_cash, bill_debit, bill_credit,
+             non_test_count, non_test_total) in rows:
+            rev['count'] += int(rev_count)
+            rev['cash'] += float(rev_cash)
+            rev['debit'] += float(rev_debit)
+            rev['credit'] += float(rev_credit)
+            rev['total'] += float(rev_total)
+            if rev_count:
+                provider = provider or 'NONE'
+                rev['by_provider'][provider] = rev['by_provider'].get(provider, 0.0) + float(rev_total)
+                rev['count_by_provider'][provider] = rev['count_by_provider'].get(provider, 0) + int(rev_count)
+            bill['count'] += int(bill_count)
+            bill['cash'] += float(bill_cash)
+            bill['debit'] += float(bill_debit)
+            bill['credit'] += float(bill_credit)
+            other['count'] += int(non_test_count)
+            other['total'] += float(non_test_total)
+            if non_test_count:
+                seller = sellers.setdefault((employee_id, employee_name), {
+                    'employee_id': employee_id,
+                    'employee_name': employee_name,
+                    'count': 0
+                })
+                seller['count'] += int(non_test_count)
+        bill['total'] = bill['cash'] + bill['debit'] + bill['credit']
+        totals['employees'] = list(sellers.values())
+        return totals
+
     @staticmethod
     def close_session(
         register_session_id: int,
@@ -229,128 +338,27 @@ class RegisterSessionService:
                 return False, f"La sesión no puede cerrarse (estado: {register_session.status})"
             
             # MVP1: Calcular totales y diferencias antes de cerrar
-            from app.models.pos_models import PosSale
-            from sqlalchemy import func
-            
-            # NOTA: PosSale NO tiene register_session_id FK
-            # Asociación por register_id + shift_date + ventana temporal (opened_at..closed_at)
-            # Esto permite calcular totales de la sesión específica incluso si hay múltiples sesiones del mismo día
-            
-            # Construir query base con filtros
-            base_filter = db.session.query(PosSale).filter(
-                PosSale.register_id == register_session.register_id,
-                PosSale.shift_date == register_session.shift_date,
-                PosSale.is_cancelled == False,
-                PosSale.no_revenue == False
-            )
-            
-            # Filtrar por ventana temporal de la sesión (opened_at hasta ahora)
-            # Esto asegura que solo contamos ventas de ESTA sesión específica
-            if register_session.opened_at:
-                opened_at_naive = register_session.opened_at
-                if opened_at_naive.tzinfo:
-                    opened_at_naive = opened_at_naive.replace(tzinfo=None)
-                base_filter = base_filter.filter(PosSale.created_at >= opened_at_naive)
-            
-            # Obtener ventas de esta sesión
-            sales_query = base_filter
-            
-            # BIMBA: Calcular totales por método de pago (cash/debit/credit)
-            payment_totals_result = db.session.query(
-                func.sum(PosSale.payment_cash).label('cash'),
-                func.sum(PosSale.payment_debit).label('debit'),
-                func.sum(PosSale.payment_credit).label('credit')
-            ).filter(
-                PosSale.register_id == register_session.register_id,
-                PosSale.shift_date == register_session.shift_date,
-                PosSale.is_cancelled == False,
-                PosSale.no_revenue == False
-            )
-            
-            # Aplicar ventana temporal también en agregación
-            if register_session.opened_at:
-                opened_at_naive = register_session.opened_at
-                if opened_at_naive.tzinfo:
-                    opened_at_naive = opened_at_naive.replace(tzinfo=None)
-                payment_totals_result = payment_totals_result.filter(PosSale.created_at >= opened_at_naive)
-            
-            payment_totals_result = payment_totals_result.first()
-            
+            # NOTA: Asociación por register_id + shift_date + ventana temporal (opened_at..ahora),
+            # así se cuentan solo las ventas de ESTA sesión aunque haya varias el mismo día.
+            # Una sola query agrupada entrega totales por método, por provider y conteos.
+            revenue = RegisterSessionService.get_sales_totals(
+                register_session.register_id,
+                register_session.shift_date,
+                since=register_session.opened_at
+            )['revenue']
+            
+            # BIMBA: Totales por método de pago (cash/debit/credit) y por provider (GETNET/KLAP/NONE)
             payment_totals = {
-                'cash': float(payment_totals_result.cash or 0) if payment_totals_result else 0.0,
-                'debit': float(payment_totals_result.debit or 0) if payment_totals_result else 0.0,
-                'credit': float(payment_totals_result.credit or 0) if payment_totals_result else 0.0
+                'cash': revenue['cash'],
+                'debit': revenue['debit'],
+                'credit': revenue['credit'],
+                'by_provider': revenue['by_provider']
             }
-            
-            # BIMBA: Calcular totales por provider (GETNET/KLAP/NONE) para conciliación
-            provider_totals_result = db.session.query(
-                PosSale.payment_provider,
-                func.sum(PosSale.total_amount).label('total')
-            ).filter(
-                PosSale.register_id == register_session.register_id,
-                PosSale.shift_date == register_session.shift_date,
-                PosSale.is_cancelled == False,
-                PosSale.no_revenue == False
-            )
-            
-            # Aplicar ventana temporal
-            if register_session.opened_at:
-                opened_at_naive = register_session.opened_at
-                if opened_at_naive.tzinfo:
-                    opened_at_naive = opened_at_naive.replace(tzinfo=None)
-                provider_totals_result = provider_totals_result.filter(PosSale.created_at >= opened_at_naive)
-            
-            provider_totals_result = provider_totals_result.group_by(PosSale.payment_provider).all()
-            
-            # Construir dict de totales por provider
-            provider_totals = {}
-            payment_provider_used_primary_count = 0
-            payment_provider_used_backup_count = 0
-            
-            for row in provider_totals_result:
-                provider = row.payment_provider or 'NONE'
-                total = float(row.total or 0)
-                provider_totals[provider] = total
-                
-                # Contar transacciones por provider
-                if provider == 'GETNET':
-                    payment_provider_used_primary_count = db.session.query(func.count(PosSale.id)).filter(
-                        PosSale.register_id == register_session.register_id,
-                        PosSale.shift_date == register_session.shift_date,
-                        PosSale.payment_provider == 'GETNET',
-                        PosSale.is_cancelled == False,
-                        PosSale.no_revenue == False
-                    )
-                    if register_session.opened_at:
-                        opened_at_naive = register_session.opened_at
-                        if opened_at_naive.tzinfo:
-                            opened_at_naive = opened_at_naive.replace(tzinfo=None)
-                        payment_provider_used_primary_count = payment_provider_used_primary_count.filter(
-                            PosSale.created_at >= opened_at_naive
-                        )
-                    payment_provider_used_primary_count = payment_provider_used_primary_count.scalar() or 0
-                elif provider == 'KLAP':
-                    payment_provider_used_backup_count = db.session.query(func.count(PosSale.id)).filter(
-                        PosSale.register_id == register_session.register_id,
-                        PosSale.shift_date == register_session.shift_date,
-                        PosSale.payment_provider == 'KLAP',
-                        PosSale.is_cancelled == False,
-                        PosSale.no_revenue == False
-                    )
-                    if register_session.opened_at:
-                        opened_at_naive = register_session.opened_at
-                        if opened_at_naive.tzinfo:
-                            opened_at_naive = opened_at_naive.replace(tzinfo=None)
-                        payment_provider_used_backup_count = payment_provider_used_backup_count.filter(
-                            PosSale.created_at >= opened_at_naive
-                        )
-                    payment_provider_used_backup_count = payment_provider_used_backup_count.scalar() or 0
-            
-            # Agregar provider_totals al payment_totals para reportes
-            payment_totals['by_provider'] = provider_totals
+            payment_provider_used_primary_count = revenue['count_by_provider'].get('GETNET', 0)
+            payment_provider_used_backup_count = revenue['count_by_provider'].get('KLAP', 0)
             
             # Contar tickets (número de ventas)
-            ticket_count = sales_query.count()
+            ticket_count = revenue['count']
             
             # Calcular diferencia de efectivo
             cash_difference = None
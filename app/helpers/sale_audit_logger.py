@@ -6,7 +6,7 @@ from typing import Dict, Any, Optional
 from datetime import datetime
 import logging
 import json
-from flask import current_app, session, request, request
+from flask import current_app, session, request, request, has_request_context
 
 logger = logging.getLogger(__name__)
 
@@ -20,10 +20,15 @@ class SaleAuditLogger:
         sale_data: Dict[str, Any],
         employee_id: str,
         employee_name: str,
-        register_id: str
+        register_id: str,
+        ip_address: Optional[str] = None,
+        session_id: Optional[str] = None
     ) -> None:
-        """Registra la creación de una venta"""
+        """Registra la creación de una venta (ip_address/session_id se toman del request si no se pasan)"""
         try:
+            if has_request_context():
+                ip_address = ip_address or request.remote_addr
+                session_id = session_id or session.get('session_id')
             audit_entry = {
                 'event_type': 'sale_created',
                 'sale_id': sale_id,
@@ -44,8 +49,8 @@ class SaleAuditLogger:
                     }
                     for item in sale_data.get('items', [])
                 ],
-                'ip_address': request.remote_addr if request else None,
-                'session_id': session.get('session_id'),
+                'ip_address': ip_address,
+                'session_id': session_id,
             }
             
             logger.info(
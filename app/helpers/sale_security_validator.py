@@ -30,9 +30,30 @@ class SaleSecurityValidationError(Exception):
     pass
 
 
+def load_cart_products(items: List[Dict[str, Any]], pos_service: Any) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Carga en una sola query todos los productos del carrito.
+    Retorna None si el servicio no soporta la carga en lote (se consulta item por item).
+    """
+    if not hasattr(pos_service, 'get_products_by_ids'):
+        return None
+    return pos_service.get_products_by_ids([str(item.get('item_id', '')) for item in items])
+
+
+def _lookup_product(item_id: str, pos_service: Any, products: Optional[Dict[str, Dict[str, Any]]]):
+    if products is not None:
+        return products.get(item_id)
+    product = pos_service.get_product(item_id)
+    # Si no se encuentra como item normal, buscar como kit
+    if not product:
+        product = pos_service.get_item_kit(item_id)
+    return product
+
+
 def validate_inventory_availability(
     items: List[Dict[str, Any]],
-    pos_service: Any
+    pos_service: Any,
+    products: Optional[Dict[str, Dict[str, Any]]] = None
 ) -> Tuple[bool, Optional[str]]:
     """
     Valida que los productos existan y estén disponibles antes de crear la venta
@@ -40,6 +61,7 @@ def validate_inventory_availability(
     Args:
         items: Lista de items del carrito
         pos_service: Instancia de PosService
+        products: Productos ya cargados con load_cart_products (opcional)
         
     Returns:
         Tuple[bool, Optional[str]]: (es_válido, mensaje_error)
@@ -54,11 +76,7 @@ def validate_inventory_availability(
                 return False, f"Producto sin ID: {item_name}"
             
             # Re-validar que el producto existe y está activo
-            product = pos_service.get_product(item_id)
-            
-            # Si no se encuentra como item normal, buscar como kit
-            if not product:
-                product = pos_service.get_item_kit(item_id)
+            product = _lookup_product(item_id, pos_service, products)
             
             if not product:
                 return False, f"Producto no encontrado o eliminado: {item_name} (ID: {item_id})"
@@ -76,6 +94,9 @@ def validate_inventory_availability(
             # Por ahora, solo validamos existencia y estado activo
             
             # VALIDACIÓN NUEVA: Verificar que productos kit tengan receta configurada
+            if product.get('is_kit') is False:
+                # Cargado en lote y no es kit: no requiere receta
+                continue
             try:
                 from app.models.product_models import Product
                 from app.helpers.product_validation_helper import can_sell_product
@@ -106,7 +127,8 @@ def validate_inventory_availability(
 
 def validate_prices_match_api(
     items: List[Dict[str, Any]],
-    pos_service: Any
+    pos_service: Any,
+    products: Optional[Dict[str, Dict[str, Any]]] = None
 ) -> Tuple[bool, Optional[str], Optional[List[Dict[str, Any]]]]:
     """
     Re-valida precios desde la API y compara con el carrito
@@ -114,6 +136,7 @@ def validate_prices_match_api(
     Args:
         items: Lista de items del carrito
         pos_service: Instancia de PosService
+        products: Productos ya cargados con load_cart_products (opcional)
         
     Returns:
         Tuple[bool, Optional[str], Optional[List]]: (es_válido, mensaje_error, items_corregidos)
@@ -129,9 +152,7 @@ def validate_prices_match_api(
             item_name = item.get('name', 'Producto desconocido')
             
             # Obtener precio actual desde la API
-            product = pos_service.get_product(item_id)
-            if not product:
-                product = pos_service.get_item_kit(item_id)
+            product = _lookup_product(item_id, pos_service, products)
             
             if not product:
                 return False, f"Producto no encontrado para validar precio: {item_name}", None
@@ -470,13 +491,16 @@ def comprehensive_sale_validation(
         if not is_valid:
             return False, error, None
         
-        # 7. Validar disponibilidad de productos (existen y están activos)
-        is_valid, error = validate_inventory_availability(items, pos_service)
+        # 7. Validar disponibilidad de productos (existen y están activos).
+        # El carrito no se valida al agregar items: todos los productos se
+        # cargan aquí en una sola query y la usan los pasos 7 y 8
+        products = load_cart_products(items, pos_service)
+        is_valid, error = validate_inventory_availability(items, pos_service, products)
         if not is_valid:
             return False, error, None
         
         # 8. Re-validar precios desde la API
-        is_valid, error, corrected_items = validate_prices_match_api(items, pos_service)
+        is_valid, error, corrected_items = validate_prices_match_api(items, pos_service, products)
         if not is_valid:
             return False, error, corrected_items
         
@@ -3,6 +3,7 @@ Helper para verificar el estado de los servicios del sistema
 """
 import subprocess
 import requests
+from app.infrastructure.external.http_client import get_http_client
 import os
 from flask import current_app
 from app.helpers.logger import get_logger
@@ -356,8 +357,10 @@ def check_api_status(checked_by='system', log_connection=True):
             "accept": "application/json"
         }
         
+        # Circuito propio: los timeouts del health check no deben abrir el
+        # breaker 'phppos' que protege las ventas
         start_time = time.time()
-        resp = requests.get(url, headers=headers, timeout=2)
+        resp = get_http_client().get(url, upstream='phppos_health', headers=headers, timeout=2, retries=0)
         resp.raise_for_status()
         elapsed_ms = (time.time() - start_time) * 1000
         
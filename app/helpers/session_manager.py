@@ -60,6 +60,11 @@ def init_session():
 
 def clear_expired_session():
     """Limpia datos de sesión expirada"""
+    from app.helpers.pos_cart_store import get_cart_store, current_cart_key
+    try:
+        get_cart_store().clear(current_cart_key())
+    except Exception as e:
+        logger.warning(f"No se pudo limpiar el carrito de la sesión expirada: {e}")
     session.pop('pos_logged_in', None)
     session.pop('pos_employee_id', None)
     session.pop('pos_employee_name', None)
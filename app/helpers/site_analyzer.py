@@ -6,12 +6,16 @@ import logging
 import requests
 from typing import Dict, List, Optional
 from datetime import datetime
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import re
 
+from .startup_profiler import lazy_module
+
 logger = logging.getLogger(__name__)
 
+# BeautifulSoup solo se usa al analizar el sitio (agente de redes sociales)
+bs4 = lazy_module('bs4', 'Agente de redes sociales')
+
 
 class SiteAnalyzer:
     """
@@ -101,19 +105,19 @@ class SiteAnalyzer:
             logger.error(f"Error en análisis del sitio: {e}", exc_info=True)
             return self.knowledge_base or knowledge
     
-    def _fetch_page(self, url: str) -> Optional[BeautifulSoup]:
+    def _fetch_page(self, url: str) -> Optional['bs4.BeautifulSoup']:
         """Obtiene y parsea una página HTML"""
         try:
             response = requests.get(url, timeout=10, headers={
                 'User-Agent': 'Mozilla/5.0 (compatible; SiteAnalyzer/1.0)'
             })
             response.raise_for_status()
-            return BeautifulSoup(response.text, 'html.parser')
+            return bs4.BeautifulSoup(response.text, 'html.parser')
         except Exception as e:
             logger.warning(f"Error obteniendo {url}: {e}")
             return None
     
-    def _extract_business_info(self, soup: BeautifulSoup) -> Dict:
+    def _extract_business_info(self, soup: 'bs4.BeautifulSoup') -> Dict:
         """Extrae información general del negocio"""
         info = {}
         
@@ -150,7 +154,7 @@ class SiteAnalyzer:
         
         return info
     
-    def _extract_contact_info(self, soup: BeautifulSoup) -> Dict:
+    def _extract_contact_info(self, soup: 'bs4.BeautifulSoup') -> Dict:
         """Extrae información de contacto"""
         contact = {}
         text = soup.get_text()
@@ -178,7 +182,7 @@ class SiteAnalyzer:
         
         return contact
     
-    def _extract_social_media(self, soup: BeautifulSoup) -> Dict:
+    def _extract_social_media(self, soup: 'bs4.BeautifulSoup') -> Dict:
         """Extrae enlaces a redes sociales"""
         social = {}
         
@@ -199,7 +203,7 @@ class SiteAnalyzer:
         
         return social
     
-    def _extract_products(self, soup: BeautifulSoup) -> List[Dict]:
+    def _extract_products(self, soup: 'bs4.BeautifulSoup') -> List[Dict]:
         """Extrae información de productos"""
         products = []
         
@@ -222,7 +226,7 @@ class SiteAnalyzer:
         
         return products
     
-    def _extract_events(self, soup: BeautifulSoup) -> List[Dict]:
+    def _extract_events(self, soup: 'bs4.BeautifulSoup') -> List[Dict]:
         """Extrae información de eventos"""
         events = []
         
@@ -244,7 +248,7 @@ class SiteAnalyzer:
         
         return events
     
-    def _extract_schedules(self, soup: BeautifulSoup) -> Dict:
+    def _extract_schedules(self, soup: 'bs4.BeautifulSoup') -> Dict:
         """Extrae horarios"""
         schedules = {}
         text = soup.get_text()
@@ -260,7 +264,7 @@ class SiteAnalyzer:
         
         return schedules
     
-    def _extract_main_text(self, soup: BeautifulSoup) -> str:
+    def _extract_main_text(self, soup: 'bs4.BeautifulSoup') -> str:
         """Extrae el texto principal de la página"""
         # Remover scripts y estilos
         for script in soup(["script", "style", "nav", "footer", "header"]):
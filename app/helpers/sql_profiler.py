@@ -0,0 +1,262 @@
+"""
+Profiler de SQL por request con detección de N+1
+Opt-in y muestreado: en cada request muestreada cuenta queries, tiempo total de
+BD y agrupa las sentencias por huella (SQL normalizado). Si una misma huella
+SELECT se repite muchas veces en una request se marca como probable N+1:
+se registra en el log y queda visible en /admin/panel_control/sql_profiler.
+
+Los agregados viven en memoria de cada worker: el panel muestra solo los del
+worker que atiende la request (campo pid) y se pierden al reciclarlo. Con
+varios workers, cada uno acumula su propia muestra.
+
+Configuración (variables de entorno):
+    SQL_PROFILER_ENABLED=true          Activa el profiler
+    SQL_PROFILER_SAMPLE_RATE=0.05      Fracción de requests perfiladas (0.0-1.0)
+    SQL_PROFILER_N1_THRESHOLD=5        Repeticiones de una huella para marcar N+1
+"""
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from flask import current_app, g, has_request_context, request
+
+from .logger import get_logger
+from .metrics import metrics
+
+logger = get_logger(__name__)
+
+PROFILER_ENABLED = os.environ.get('SQL_PROFILER_ENABLED', 'false').lower() in ('true', '1', 'yes')
+SAMPLE_RATE = float(os.environ.get('SQL_PROFILER_SAMPLE_RATE', '0.05'))
+N1_THRESHOLD = int(os.environ.get('SQL_PROFILER_N1_THRESHOLD', '5'))
+MAX_ENDPOINTS = 200
+MAX_FINGERPRINTS_PER_ENDPOINT = 20
+RECENT_FLAGGED = 50
+
+metrics.describe('sql_profiler_n_plus_one_total', 'Requests perfiladas con probable N+1 por endpoint')
+
+# Normalización de sentencias: literales y listas IN colapsadas, espacios simples
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_RE_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:\?|%\(\w+\)s|%s|:\w+|__\[POSTCOMPILE_\w+\])\s*,?)+\)', re.IGNORECASE)
+_RE_SPACES = re.compile(r'\s+')
+
+
+def fingerprint(statement: str) -> str:
+    """Huella de una sentencia SQL: misma forma = misma huella, sin importar parámetros"""
+    fp = _RE_STRING.sub('?', statement)
+    fp = _RE_NUMBER.sub('?', fp)
+    fp = _RE_SPACES.sub(' ', fp).strip()
+    return _RE_IN_LIST.sub('IN (...)', fp)
+
+
+class RequestProfile:
+    """Queries de una request perfilada"""
+
+    __slots__ = ('started_at', 'query_count', 'db_time', 'statements')
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.statements: Dict[str, List[float]] = {}  # huella -> [repeticiones, segundos]
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.query_count += 1
+        self.db_time += elapsed
+        fp = fingerprint(statement)
+        entry = self.statements.get(fp)
+        if entry is None:
+            self.statements[fp] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def n_plus_one(self, threshold: int = N1_THRESHOLD) -> List[Dict[str, Any]]:
+        """Huellas SELECT repetidas >= threshold veces (probables N+1)"""
+        sospechosas = [
+            {'fingerprint': fp, 'count': int(count), 'db_ms': round(seconds * 1000, 2)}
+            for fp, (count, seconds) in self.statements.items()
+            if count >= threshold and fp.upper().startswith('SELECT')
+        ]
+        return sorted(sospechosas, key=lambda s: s['count'], reverse=True)
+
+
+class SqlProfilerStore:
+    """Agregados por endpoint (acotados) de las requests perfiladas en este worker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+        self._recent = deque(maxlen=RECENT_FLAGGED)
+
+    def add(self, endpoint: str, method: str, path: str, profile: RequestProfile) -> List[Dict[str, Any]]:
+        sospechosas = profile.n_plus_one()
+        request_ms = (time.perf_counter() - profile.started_at) * 1000
+
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                if len(self._endpoints) >= MAX_ENDPOINTS:
+                    return sospechosas
+                stats = self._endpoints[endpoint] = {
+                    'endpoint': endpoint,
+                    'requests': 0,
+                    'queries': 0,
+                    'db_ms': 0.0,
+                    'max_queries': 0,
+                    'flagged_requests': 0,
+                    'n_plus_one': {},
+                }
+            stats['requests'] += 1
+            stats['queries'] += profile.query_count
+            stats['db_ms'] += profile.db_time * 1000
+            stats['max_queries'] = max(stats['max_queries'], profile.query_count)
+
+            if sospechosas:
+                stats['flagged_requests'] += 1
+                for s in sospechosas:
+                    fp = stats['n_plus_one'].get(s['fingerprint'])
+                    if fp is None:
+                        if len(stats['n_plus_one']) >= MAX_FINGERPRINTS_PER_ENDPOINT:
+                            continue
+                        fp = stats['n_plus_one'][s['fingerprint']] = {
+                            'fingerprint': s['fingerprint'], 'hits': 0, 'max_repeat': 0, 'last_seen': None
+                        }
+                    fp['hits'] += 1
+                    fp['max_repeat'] = max(fp['max_repeat'], s['count'])
+                    fp['last_seen'] = datetime.now().isoformat(timespec='seconds')
+
+                self._recent.append({
+                    'timestamp': datetime.now().isoformat(timespec='seconds'),
+                    'endpoint': endpoint,
+                    'method': method,
+                    'path': path,
+                    'queries': profile.query_count,
+                    'db_ms': round(profile.db_time * 1000, 2),
+                    'request_ms': round(request_ms, 2),
+                    'suspects': sospechosas[:3],
+                })
+        return sospechosas
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = []
+            for stats in self._endpoints.values():
+                requests = stats['requests'] or 1
+                endpoints.append({
+                    'endpoint': stats['endpoint'],
+                    'requests': stats['requests'],
+                    'avg_queries': round(stats['queries'] / requests, 1),
+                    'max_queries': stats['max_queries'],
+                    'avg_db_ms': round(stats['db_ms'] / requests, 2),
+                    'flagged_requests': stats['flagged_requests'],
+                    'n_plus_one': sorted(stats['n_plus_one'].values(), key=lambda f: f['max_repeat'], reverse=True),
+                })
+            recent = list(self._recent)
+
+        endpoints.sort(key=lambda e: (e['flagged_requests'], e['avg_queries']), reverse=True)
+        return {
+            'enabled': current_app.config.get('SQL_PROFILER_ACTIVE', False),
+            'sample_rate': current_app.config.get('SQL_PROFILER_SAMPLE_RATE', SAMPLE_RATE),
+            'n1_threshold': N1_THRESHOLD,
+            'pid': os.getpid(),
+            'endpoints': endpoints,
+            'recent_flagged': list(reversed(recent)),
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
+            self._recent.clear()
+
+
+_store = SqlProfilerStore()
+
+
+def get_sql_profiler_store() -> SqlProfilerStore:
+    """Agregados del profiler de este worker"""
+    return _store
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context() or g.get('_sql_profile') is None:
+        return
+    conn.info.setdefault('_sql_profiler_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_sql_profiler_start')
+    if not starts or not has_request_context():
+        return
+    profile = g.get('_sql_profile')
+    elapsed = time.perf_counter() - starts.pop()
+    if profile is not None:
+        profile.record(statement, elapsed)
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('_sql_profiler_start'):
+        conn.info['_sql_profiler_start'].pop()
+
+
+def _start_profile():
+    if request.endpoint and request.endpoint.startswith('static'):
+        return
+    if random.random() < current_app.config.get('SQL_PROFILER_SAMPLE_RATE', SAMPLE_RATE):
+        g._sql_profile = RequestProfile()
+
+
+def _finish_profile(response):
+    profile = g.pop('_sql_profile', None)
+    if profile is None or not profile.query_count:
+        return response
+
+    endpoint = request.endpoint or request.path
+    sospechosas = _store.add(endpoint, request.method, request.path, profile)
+    if sospechosas:
+        metrics.inc('sql_profiler_n_plus_one_total', 1, {'endpoint': endpoint})
+        principal = sospechosas[0]
+        logger.warning(
+            f"Probable N+1 en {endpoint}: {principal['count']}x «{principal['fingerprint'][:160]}» "
+            f"({profile.query_count} queries, {profile.db_time * 1000:.1f} ms de BD)",
+            extra={'endpoint': endpoint, 'queries': profile.query_count, 'suspects': sospechosas[:3]}
+        )
+    return response
+
+
+def init_sql_profiler(app, enabled: Optional[bool] = None, sample_rate: Optional[float] = None) -> bool:
+    """
+    Registra el profiler si está habilitado (SQL_PROFILER_ENABLED).
+
+    Args:
+        app: Aplicación Flask
+        enabled: Forzar activación (default: SQL_PROFILER_ENABLED)
+        sample_rate: Fracción de requests perfiladas (default: SQL_PROFILER_SAMPLE_RATE)
+
+    Returns:
+        bool: True si quedó activo
+    """
+    if not (PROFILER_ENABLED if enabled is None else enabled):
+        return False
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+    rate = SAMPLE_RATE if sample_rate is None else sample_rate
+    app.config['SQL_PROFILER_SAMPLE_RATE'] = rate
+    app.config['SQL_PROFILER_ACTIVE'] = True
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.logger.info(f"🔬 Profiler SQL activo (muestreo {rate:.0%}, umbral N+1: {N1_THRESHOLD})")
+    return True
@@ -0,0 +1,164 @@
+"""
+Profiler de arranque y carga diferida de subsistemas pesados
+Mide cuánto tarda cada etapa de create_app (tiempo y módulos importados) y
+permite declarar dependencias pesadas opcionales (OpenAI, PIL/qrcode/barcode,
+BeautifulSoup, ...) como módulos diferidos: se importan recién en el primer uso,
+no en el cold start de Cloud Run ni al reiniciar workers de gunicorn.
+
+Uso en un módulo:
+    from app.helpers.startup_profiler import lazy_module
+    openai = lazy_module('openai', 'OpenAI')      # se importa al primer openai.X
+
+Uso en create_app:
+    profiler = StartupProfiler()
+    ...
+    profiler.lap('base de datos')                # tiempo desde la marca anterior
+    ...
+    profiler.finish(app)
+
+El reporte queda en app.extensions['startup_profile'] y en /api/system/startup.
+Con STARTUP_PROFILE=true se loggea el detalle por etapa al arrancar.
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+STARTUP_PROFILE_LOG = os.environ.get('STARTUP_PROFILE', 'false').lower() in ('true', '1', 'yes')
+
+
+class StartupProfiler:
+    """Cronómetro por etapas del arranque de la aplicación"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self._last = self.started_at
+        self._last_modules = len(sys.modules)
+        self.phases: List[Dict[str, Any]] = []
+        self.total_seconds: Optional[float] = None
+
+    def lap(self, name: str) -> float:
+        """Cierra la etapa `name` (desde la marca anterior). Retorna sus segundos."""
+        now = time.perf_counter()
+        modules = len(sys.modules)
+        elapsed = now - self._last
+        self.phases.append({
+            'phase': name,
+            'seconds': round(elapsed, 4),
+            'modules_imported': modules - self._last_modules,
+        })
+        self._last = now
+        self._last_modules = modules
+        return elapsed
+
+    def report(self) -> Dict[str, Any]:
+        total = self.total_seconds if self.total_seconds is not None else time.perf_counter() - self.started_at
+        return {
+            'total_seconds': round(total, 4),
+            'phases': sorted(self.phases, key=lambda p: p['seconds'], reverse=True),
+            'deferred': deferred_subsystems(),
+            'pid': os.getpid(),
+        }
+
+    def finish(self, app) -> Dict[str, Any]:
+        """Cierra el perfil, lo deja en app.extensions y publica la métrica de arranque"""
+        self.total_seconds = time.perf_counter() - self.started_at
+        app.extensions['startup_profile'] = self
+
+        try:
+            from .metrics import metrics
+            metrics.set_gauge('app_startup_seconds', self.total_seconds)
+        except Exception:
+            pass
+
+        lentas = sorted(self.phases, key=lambda p: p['seconds'], reverse=True)[:3]
+        resumen = ', '.join(f"{p['phase']} {p['seconds'] * 1000:.0f} ms" for p in lentas)
+        app.logger.info(f"⏱️ create_app en {self.total_seconds:.2f} s (más lentas: {resumen})")
+        if STARTUP_PROFILE_LOG:
+            for p in self.phases:
+                app.logger.info(
+                    f"   ⏱️ {p['phase']:<32} {p['seconds'] * 1000:8.1f} ms  {p['modules_imported']:4d} módulos"
+                )
+        return self.report()
+
+
+class LazyModule:
+    """
+    Proxy de un módulo que se importa en el primer acceso a un atributo.
+    Registra el tiempo de la importación diferida (ver deferred_subsystems()).
+    """
+
+    def __init__(self, module_name: str, subsystem: str):
+        self.__dict__['_module_name'] = module_name
+        self.__dict__['_subsystem'] = subsystem
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is not None:
+            return module
+        with _deferred_lock:
+            module = self.__dict__['_module']
+            if module is None:
+                t0 = time.perf_counter()
+                module = importlib.import_module(self.__dict__['_module_name'])
+                elapsed = time.perf_counter() - t0
+                self.__dict__['_module'] = module
+                _deferred[self.__dict__['_module_name']].update({
+                    'loaded': True,
+                    'load_seconds': round(elapsed, 4),
+                    'loaded_at': datetime.now().isoformat(timespec='seconds'),
+                })
+                logger.info(
+                    f"📦 Subsistema diferido cargado: {self.__dict__['_subsystem']} "
+                    f"({self.__dict__['_module_name']}, {elapsed * 1000:.0f} ms)"
+                )
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __repr__(self):
+        estado = 'cargado' if self.__dict__['_module'] is not None else 'diferido'
+        return f"<LazyModule {self.__dict__['_module_name']} ({estado})>"
+
+
+_deferred: Dict[str, Dict[str, Any]] = {}
+_deferred_lock = threading.Lock()
+
+
+def lazy_module(module_name: str, subsystem: Optional[str] = None) -> LazyModule:
+    """
+    Declara un módulo pesado opcional como diferido.
+
+    Args:
+        module_name: Nombre importable (ej: 'openai', 'PIL.Image')
+        subsystem: Nombre legible del subsistema que lo usa (para el reporte)
+    """
+    with _deferred_lock:
+        info = _deferred.setdefault(module_name, {
+            'module': module_name,
+            'subsystems': [],
+            'loaded': module_name in sys.modules,
+            'load_seconds': None,
+            'loaded_at': None,
+        })
+        if subsystem and subsystem not in info['subsystems']:
+            info['subsystems'].append(subsystem)
+    return LazyModule(module_name, subsystem or module_name)
+
+
+def deferred_subsystems() -> List[Dict[str, Any]]:
+    """Estado de los módulos diferidos: si ya se cargaron y cuánto tardó la carga"""
+    with _deferred_lock:
+        return [dict(info, subsystems=list(info['subsystems'])) for info in _deferred.values()]
@@ -0,0 +1,378 @@
+"""
+Motor de alertas de stock bajo
+Evalúa en una sola query agrupada el stock, el umbral y el consumo promedio
+diario de todos los pares (ingrediente, ubicación), guarda el resultado en
+StockAlertState y notifica solo los cambios de estado (ok -> bajo -> negativo
+y la normalización).
+
+El dashboard de inventario y /admin/inventario/api/stock-alerts leen la tabla
+de estados en vez de recalcular ubicación por ubicación e ingrediente por
+ingrediente.
+
+Umbral (mismo criterio que InventoryStockService.get_stock_summary):
+    max(10% del consumo diario promedio de los últimos 7 días, 100 unidades base)
+
+Variables de entorno:
+    STOCK_ALERTS_ENABLED            hilo de evaluación periódica (true)
+    STOCK_ALERTS_INTERVAL_SECONDS   segundos entre evaluaciones (300)
+    STOCK_ALERTS_CONSUMPTION_DAYS   días del consumo promedio (7)
+    STOCK_ALERTS_MIN_THRESHOLD      umbral mínimo en unidad base (100)
+    STOCK_ALERTS_MAX_NOTIFICATIONS  notificaciones individuales por evaluación;
+                                    sobre eso se envía una sola de resumen (10)
+
+Uso:
+    from app.helpers.stock_alerts import get_stock_alert_engine
+
+    alerts = get_stock_alert_engine().get_alerts(location='Barra Pista')
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, func
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db
+from app.models.inventory_stock_models import (
+    Ingredient, IngredientStock, InventoryMovement, StockAlertState
+)
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+STOCK_ALERTS_ENABLED = os.environ.get('STOCK_ALERTS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+STOCK_ALERTS_INTERVAL_SECONDS = float(os.environ.get('STOCK_ALERTS_INTERVAL_SECONDS', '300'))
+STOCK_ALERTS_CONSUMPTION_DAYS = int(os.environ.get('STOCK_ALERTS_CONSUMPTION_DAYS', '7'))
+STOCK_ALERTS_MIN_THRESHOLD = float(os.environ.get('STOCK_ALERTS_MIN_THRESHOLD', '100'))
+STOCK_ALERTS_MAX_NOTIFICATIONS = int(os.environ.get('STOCK_ALERTS_MAX_NOTIFICATIONS', '10'))
+# Espera antes de la primera evaluación del hilo (no cargar la BD durante el arranque)
+STOCK_ALERTS_FIRST_DELAY_SECONDS = 30
+# Un snapshot con más de STALE_FACTOR × intervalo de antigüedad se recalcula en segundo plano al leerlo
+STALE_FACTOR = 2
+
+
+def compute_stock_levels(location: Optional[str] = None, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Stock, consumo promedio diario, umbral y estado de cada (ingrediente, ubicación)
+    en una query: stock agrupado LEFT JOIN consumo por ventas de los últimos N días.
+    """
+    now = now or datetime.utcnow()
+    days = max(STOCK_ALERTS_CONSUMPTION_DAYS, 1)
+
+    stock = db.session.query(
+        IngredientStock.ingredient_id.label('ingredient_id'),
+        IngredientStock.location.label('location'),
+        func.sum(IngredientStock.quantity).label('quantity')
+    )
+    if location:
+        stock = stock.filter(IngredientStock.location == location)
+    stock = stock.group_by(IngredientStock.ingredient_id, IngredientStock.location).subquery()
+
+    consumo = db.session.query(
+        InventoryMovement.ingredient_id.label('ingredient_id'),
+        InventoryMovement.location.label('location'),
+        func.sum(InventoryMovement.quantity).label('consumed')
+    ).filter(
+        InventoryMovement.movement_type == InventoryMovement.TYPE_SALE,
+        InventoryMovement.created_at >= now - timedelta(days=days),
+        InventoryMovement.created_at <= now
+    ).group_by(InventoryMovement.ingredient_id, InventoryMovement.location).subquery()
+
+    rows = db.session.query(
+        stock.c.ingredient_id, stock.c.location, stock.c.quantity,
+        Ingredient.name, Ingredient.base_unit, consumo.c.consumed
+    ).outerjoin(
+        Ingredient, Ingredient.id == stock.c.ingredient_id
+    ).outerjoin(
+        consumo, and_(consumo.c.ingredient_id == stock.c.ingredient_id, consumo.c.location == stock.c.location)
+    ).all()
+
+    levels = []
+    for ingredient_id, loc, quantity, name, unit, consumed in rows:
+        quantity = float(quantity or 0)
+        # Los movimientos de venta son negativos
+        avg_daily = abs(float(consumed or 0)) / days
+        low_threshold = max(avg_daily * 0.1, STOCK_ALERTS_MIN_THRESHOLD)
+        if quantity < 0:
+            state = StockAlertState.STATE_NEGATIVE
+        elif name is not None and quantity <= low_threshold:
+            state = StockAlertState.STATE_LOW
+        else:
+            state = StockAlertState.STATE_OK
+        levels.append({
+            'ingredient_id': ingredient_id,
+            'location': loc,
+            'ingredient_name': name or '?',
+            'unit': unit or 'ml',
+            'quantity': quantity,
+            'avg_daily_consumption': round(avg_daily, 3),
+            'low_threshold': low_threshold if quantity >= 0 and name is not None else None,
+            'state': state,
+        })
+    return levels
+
+
+def build_alert(level: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Alerta con el formato de InventoryStockService.get_low_stock_alerts (None si está ok)"""
+    name, quantity, unit = level['ingredient_name'], level['quantity'], level['unit']
+    alert = {
+        'location': level['location'],
+        'ingredient_id': level['ingredient_id'],
+        'ingredient_name': name,
+        'quantity': quantity,
+        'unit': unit,
+    }
+    if level['state'] == StockAlertState.STATE_NEGATIVE:
+        alert.update({
+            'type': 'negative',
+            'severity': 'critical',
+            'message': f"{name} tiene stock negativo ({quantity:.2f} {unit})"
+        })
+    elif level['state'] == StockAlertState.STATE_LOW:
+        threshold = level.get('low_threshold') or 0
+        alert.update({
+            'low_threshold': level.get('low_threshold'),
+            'type': 'low',
+            'severity': 'warning',
+            'message': f"{name} está bajo el umbral mínimo ({quantity:.2f} {unit} < {threshold:.2f} {unit})"
+        })
+    else:
+        return None
+    for key in ('since', 'evaluated_at'):
+        if level.get(key):
+            alert[key] = level[key]
+    return alert
+
+
+class StockAlertEngine:
+    """Evalúa las alertas de stock en segundo plano y sirve el último estado guardado"""
+
+    def __init__(self, interval: float = STOCK_ALERTS_INTERVAL_SECONDS):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._app = None
+        self._thread_pid: Optional[int] = None
+        self._refreshing = False
+
+    # ------------------------------------------------------------------
+    # Evaluación
+    # ------------------------------------------------------------------
+
+    def evaluate(self, now: Optional[datetime] = None, notify: bool = True) -> Dict[str, int]:
+        """
+        Recalcula todos los pares, guarda el estado y notifica los cambios.
+
+        Los cambios se aplican con UPDATE condicionado al estado anterior: si dos
+        workers evalúan a la vez, solo uno gana la transición y la notifica.
+        """
+        now = now or datetime.utcnow()
+        levels = compute_stock_levels(now=now)
+        states = {(s.ingredient_id, s.location): s for s in StockAlertState.query.all()}
+
+        changes: List[Tuple[Dict[str, Any], str]] = []
+        nuevos = []
+        for level in levels:
+            key = (level['ingredient_id'], level['location'])
+            values = {
+                'quantity': Decimal(str(round(level['quantity'], 3))),
+                'low_threshold': Decimal(str(round(level['low_threshold'], 3))) if level['low_threshold'] is not None else None,
+                'avg_daily_consumption': Decimal(str(level['avg_daily_consumption'])),
+                'evaluated_at': now,
+            }
+            state = states.pop(key, None)
+            if state is None:
+                nuevos.append(StockAlertState(
+                    ingredient_id=level['ingredient_id'], location=level['location'],
+                    state=level['state'], changed_at=now, **values
+                ))
+                if level['state'] != StockAlertState.STATE_OK:
+                    changes.append((level, StockAlertState.STATE_OK))
+            elif state.state == level['state']:
+                for field, value in values.items():
+                    setattr(state, field, value)
+            else:
+                previous = state.state
+                updated = StockAlertState.query.filter(
+                    StockAlertState.id == state.id,
+                    StockAlertState.state == previous
+                ).update({**values, 'state': level['state'], 'changed_at': now}, synchronize_session=False)
+                db.session.expire(state)
+                if updated:
+                    changes.append((level, previous))
+
+        # Pares que ya no tienen stock registrado
+        if states:
+            StockAlertState.query.filter(
+                StockAlertState.id.in_([s.id for s in states.values()])
+            ).delete(synchronize_session=False)
+
+        db.session.add_all(nuevos)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Otro worker insertó los mismos pares en paralelo: él notifica esta ronda
+            db.session.rollback()
+            logger.info("Evaluación de alertas de stock concurrente; se omite esta ronda")
+            return {'evaluated': len(levels), 'changes': 0, 'notified': 0}
+
+        notified = self._notify(changes) if notify else 0
+        if changes:
+            logger.info(f"Alertas de stock: {len(changes)} cambios de estado en {len(levels)} pares")
+        return {'evaluated': len(levels), 'changes': len(changes), 'notified': notified}
+
+    def _notify(self, changes: List[Tuple[Dict[str, Any], str]]) -> int:
+        """Una notificación por cambio; sobre STOCK_ALERTS_MAX_NOTIFICATIONS, una de resumen"""
+        if not changes:
+            return 0
+        from .notification_service import NotificationService
+
+        try:
+            if len(changes) > STOCK_ALERTS_MAX_NOTIFICATIONS:
+                negativos = sum(1 for level, _ in changes if level['state'] == StockAlertState.STATE_NEGATIVE)
+                bajos = sum(1 for level, _ in changes if level['state'] == StockAlertState.STATE_LOW)
+                NotificationService.create_notification(
+                    type=NotificationService.TYPE_STOCK_BAJO,
+                    title='⚠️ Alertas de Stock',
+                    message=f'{len(changes)} cambios de stock: {negativos} negativos, {bajos} bajo umbral',
+                    priority=NotificationService.PRIORITY_HIGH,
+                    data={'changes': len(changes), 'negative': negativos, 'low': bajos},
+                    action_url='/admin/inventario'
+                )
+                return 1
+
+            for level, previous in changes:
+                alert = build_alert(level)
+                if alert:
+                    message = alert['message']
+                else:
+                    message = (f"{level['ingredient_name']} volvió a stock normal en {level['location']} "
+                               f"({level['quantity']:.2f} {level['unit']})")
+                NotificationService.notify_stock_alert(
+                    level['ingredient_name'], level['location'], level['state'], message,
+                    data={'ingredient_id': level['ingredient_id'], 'previous_state': previous,
+                          'quantity': level['quantity']}
+                )
+            return len(changes)
+        except Exception as e:
+            logger.error(f"Error al notificar alertas de stock: {e}", exc_info=True)
+            return 0
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def get_alerts(self, location: Optional[str] = None, include_negative: bool = True) -> List[Dict[str, Any]]:
+        """
+        Alertas vigentes desde StockAlertState (una query). La lectura no escribe
+        ni notifica: un snapshot vencido (hilo detenido, CLI) se sirve igual y se
+        re-evalúa en segundo plano; sin snapshot (primer arranque) las alertas se
+        calculan en memoria con compute_stock_levels.
+        """
+        if STOCK_ALERTS_ENABLED:
+            self.ensure_started()
+        last = db.session.query(func.max(StockAlertState.evaluated_at)).scalar()
+        if last is None or datetime.utcnow() - last > timedelta(seconds=self.interval * STALE_FACTOR):
+            self.refresh_in_background()
+
+        estados = [StockAlertState.STATE_LOW]
+        if include_negative:
+            estados.append(StockAlertState.STATE_NEGATIVE)
+        if last is None:
+            levels = [level for level in compute_stock_levels(location=location) if level['state'] in estados]
+            levels.sort(key=lambda level: (level['location'], level['ingredient_name']))
+            return [build_alert(level) for level in levels]
+
+        query = db.session.query(StockAlertState, Ingredient.name, Ingredient.base_unit).outerjoin(
+            Ingredient, Ingredient.id == StockAlertState.ingredient_id
+        ).filter(StockAlertState.state.in_(estados))
+        if location:
+            query = query.filter(StockAlertState.location == location)
+
+        alerts = []
+        for state, name, unit in query.order_by(StockAlertState.location, Ingredient.name).all():
+            alerts.append(build_alert({
+                'ingredient_id': state.ingredient_id,
+                'location': state.location,
+                'ingredient_name': name or '?',
+                'unit': unit or 'ml',
+                'quantity': float(state.quantity or 0),
+                'low_threshold': float(state.low_threshold) if state.low_threshold is not None else None,
+                'state': state.state,
+                'since': state.changed_at.isoformat() if state.changed_at else None,
+                'evaluated_at': state.evaluated_at.isoformat() if state.evaluated_at else None,
+            }))
+        return alerts
+
+    def refresh_in_background(self) -> None:
+        """Lanza una evaluación en un hilo aparte (una a la vez por proceso)"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        app = current_app._get_current_object()
+
+        def _run():
+            try:
+                with app.app_context():
+                    try:
+                        self.evaluate()
+                    finally:
+                        db.session.remove()
+            except Exception as e:
+                logger.error(f"Error en re-evaluación de alertas de stock: {e}", exc_info=True)
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=_run, daemon=True, name='stock-alerts-refresh').start()
+
+    # ------------------------------------------------------------------
+    # Hilo de evaluación periódica
+    # ------------------------------------------------------------------
+
+    def _loop(self) -> None:
+        pid = os.getpid()
+        time.sleep(STOCK_ALERTS_FIRST_DELAY_SECONDS)
+        while self._thread_pid == pid:
+            try:
+                with self._app.app_context():
+                    try:
+                        self.evaluate()
+                    finally:
+                        db.session.remove()
+            except Exception as e:
+                logger.error(f"Error en evaluación periódica de alertas de stock: {e}", exc_info=True)
+            time.sleep(self.interval)
+
+    def ensure_started(self, app=None) -> None:
+        """Inicia el hilo de evaluación en este proceso (se reinicia tras el fork de gunicorn)"""
+        pid = os.getpid()
+        if self._thread_pid == pid:
+            return
+        if app is None:
+            app = current_app._get_current_object()
+        with self._lock:
+            if self._thread_pid == pid:
+                return
+            self._app = app
+            self._thread_pid = pid
+        thread = threading.Thread(target=self._loop, daemon=True, name='stock-alerts')
+        thread.start()
+        logger.info(f"✅ Evaluación de alertas de stock iniciada (cada {self.interval:.0f}s)")
+
+
+_engine: Optional[StockAlertEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_stock_alert_engine() -> StockAlertEngine:
+    """Motor de alertas de stock compartido del proceso"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = StockAlertEngine()
+    return _engine
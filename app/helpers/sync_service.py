@@ -170,14 +170,102 @@ def cleanup_old_backups(backups_dir, keep_last=10):
     except Exception as e:
         print(f"⚠️  Error al limpiar backups antiguos: {e}")
 
-def sync_table(prod_conn, local_conn, table_config, progress_callback=None):
-    """Sincroniza una tabla específica"""
+# Filas por chunk: lectura con cursor server-side y upsert por lote (una transacción por chunk).
+# Tope 900: cada chunk arma un IN (...) con sus ids y SQLite < 3.32 admite 999 variables
+SQLITE_MAX_CHUNK = 900
+SYNC_CHUNK_SIZE = min(int(os.environ.get('SYNC_CHUNK_SIZE', '900')), SQLITE_MAX_CHUNK)
+
+# Tabla local donde se guarda la marca de agua (watermark) de cada tabla sincronizada
+WATERMARKS_TABLE = '_sync_watermarks'
+
+
+def _local_columns(local_cursor, table_name):
+    """Columnas de la tabla local (orden de PRAGMA table_info)"""
+    local_cursor.execute(f'PRAGMA table_info({table_name})')
+    return [row[1] for row in local_cursor.fetchall()]
+
+
+def _watermark_column(table_config, local_columns):
+    """
+    Columna usada para sincronización incremental: updated_at, o la indicada en
+    'watermark' de la configuración de la tabla. Sin ella la tabla se sincroniza
+    completa siempre: una marca por id no re-enviaría filas editadas después de
+    sincronizarse (usar 'watermark': 'id' solo en tablas append-only).
+    """
+    if 'watermark' in table_config:
+        return table_config['watermark']
+    if 'updated_at' in local_columns:
+        return 'updated_at'
+    return None
+
+
+def _ensure_watermarks_table(local_cursor):
+    local_cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {WATERMARKS_TABLE} ('
+        'table_name TEXT PRIMARY KEY, column_name TEXT NOT NULL, value TEXT, value_type TEXT, synced_at TEXT)'
+    )
+
+
+def get_watermark(local_cursor, table_name, column):
+    """Última marca de agua guardada para la tabla (None si nunca se sincronizó con esa columna)"""
+    _ensure_watermarks_table(local_cursor)
+    local_cursor.execute(
+        f'SELECT value, value_type FROM {WATERMARKS_TABLE} WHERE table_name = ? AND column_name = ?',
+        (table_name, column)
+    )
+    row = local_cursor.fetchone()
+    if not row or row[0] is None:
+        return None
+    value, value_type = row
+    if value_type == 'datetime':
+        return datetime.fromisoformat(value)
+    if value_type == 'int':
+        return int(value)
+    return value
+
+
+def _save_watermark(local_cursor, table_name, column, value):
+    if value is None:
+        return
+    if isinstance(value, datetime):
+        stored, value_type = value.isoformat(), 'datetime'
+    elif isinstance(value, int):
+        stored, value_type = str(value), 'int'
+    else:
+        stored, value_type = str(value), 'str'
+    local_cursor.execute(
+        f'INSERT INTO {WATERMARKS_TABLE} (table_name, column_name, value, value_type, synced_at) '
+        'VALUES (?, ?, ?, ?, ?) ON CONFLICT(table_name) DO UPDATE SET '
+        'column_name = excluded.column_name, value = excluded.value, '
+        'value_type = excluded.value_type, synced_at = excluded.synced_at',
+        (table_name, column, stored, value_type, datetime.now().isoformat())
+    )
+
+
+def sync_table(prod_conn, local_conn, table_config, progress_callback=None, full=False, chunk_size=None):
+    """
+    Sincroniza una tabla específica en streaming.
+
+    Lee producción con cursor server-side en chunks de `chunk_size` filas y aplica
+    cada chunk con un solo executemany de INSERT ... ON CONFLICT(id) DO UPDATE,
+    en una transacción por chunk. En modo incremental (por defecto, si la tabla tiene
+    updated_at o 'watermark' configurado y ya tiene marca) solo trae filas con
+    updated_at mayor o igual a la última marca guardada en la tabla local
+    _sync_watermarks; las tablas sin columna de marca se sincronizan completas.
+
+    Args:
+        prod_conn: Conexión SQLAlchemy a producción
+        local_conn: Conexión sqlite3 a la BD local
+        table_config: Entrada de TABLES_TO_SYNC
+        progress_callback: callback(table_name, status, progress)
+        full: Ignorar la marca de agua y traer la tabla completa (con su where/limit)
+        chunk_size: Filas por chunk (default SYNC_CHUNK_SIZE)
+    """
     table_name = table_config['name']
-    description = table_config.get('description', table_name)
-    icon = table_config.get('icon', '📦')
     order_by = table_config.get('order_by', 'id')
     where_clause = table_config.get('where', '1=1')
     limit = table_config.get('limit')
+    chunk_size = min(chunk_size or SYNC_CHUNK_SIZE, SQLITE_MAX_CHUNK)
     
     try:
         # Actualizar estado
@@ -185,70 +273,105 @@ def sync_table(prod_conn, local_conn, table_config, progress_callback=None):
         if progress_callback:
             progress_callback(table_name, 'iniciando', 0)
         
-        # Construir query
-        query = f"SELECT * FROM {table_name} WHERE {where_clause} ORDER BY {order_by}"
-        if limit:
-            query += f" LIMIT {limit}"
-        
-        # Obtener datos de producción
-        result = prod_conn.execute(text(query))
-        rows = result.fetchall()
-        
-        if len(rows) == 0:
-            result_data = {'inserted': 0, 'updated': 0, 'total': 0, 'status': 'empty'}
-            if progress_callback:
-                progress_callback(table_name, 'completado', 0)
-            return result_data
+        local_cursor = local_conn.cursor()
+        _ensure_watermarks_table(local_cursor)
+        local_columns = _local_columns(local_cursor, table_name)
+        wm_column = _watermark_column(table_config, local_columns)
+        watermark = None if full or not wm_column else get_watermark(local_cursor, table_name, wm_column)
+        incremental = watermark is not None
         
-        # Obtener nombres de columnas
-        columns = [desc[0] for desc in result.description]
-        columns_str = ','.join(columns)
-        placeholders = ','.join(['?' for _ in columns])
+        # Construir query: incremental ordena por la marca de agua (ascendente) y no aplica limit
+        params = {}
+        if incremental:
+            operator = '>=' if wm_column != 'id' else '>'
+            where_sql = f"({where_clause}) AND {wm_column} {operator} :watermark"
+            params['watermark'] = watermark
+            query = f"SELECT * FROM {table_name} WHERE {where_sql} ORDER BY {wm_column}"
+        else:
+            where_sql = where_clause
+            query = f"SELECT * FROM {table_name} WHERE {where_sql} ORDER BY {order_by}"
+            if limit:
+                query += f" LIMIT {int(limit)}"
         
-        local_cursor = local_conn.cursor()
+        # Total esperado (solo para el porcentaje de progreso)
+        total_rows = prod_conn.execute(text(f"SELECT COUNT(*) FROM {table_name} WHERE {where_sql}"), params).scalar() or 0
+        if limit and not incremental:
+            total_rows = min(total_rows, int(limit))
         
         # Contar registros en local antes
         local_cursor.execute(f'SELECT COUNT(*) FROM {table_name}')
         local_count_before = local_cursor.fetchone()[0]
         
+        result = prod_conn.execution_options(stream_results=True, yield_per=chunk_size).execute(text(query), params)
+        prod_columns = list(result.keys())
+        # Solo columnas que existen en ambos lados (el esquema local puede ir atrasado)
+        columns = [col for col in prod_columns if col in local_columns] if local_columns else prod_columns
+        indexes = [prod_columns.index(col) for col in columns]
+        columns_str = ','.join(columns)
+        placeholders = ','.join(['?' for _ in columns])
+        
+        has_id = 'id' in columns
+        if has_id:
+            id_pos = columns.index('id')
+            updates = ','.join([f'{col} = excluded.{col}' for col in columns if col != 'id'])
+            upsert_query = (
+                f'INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders}) '
+                + (f'ON CONFLICT(id) DO UPDATE SET {updates}' if updates else 'ON CONFLICT(id) DO NOTHING')
+            )
+        else:
+            upsert_query = f'INSERT OR REPLACE INTO {table_name} ({columns_str}) VALUES ({placeholders})'
+        wm_pos = columns.index(wm_column) if wm_column in columns else None
+        
         inserted = 0
         updated = 0
-        total_rows = len(rows)
+        processed = 0
+        chunks = 0
+        max_watermark = watermark
         
-        for idx, row in enumerate(rows):
-            # Convertir row a tupla
-            row_tuple = tuple(row)
+        for partition in result.partitions(chunk_size):
+            batch = [tuple(row[i] for i in indexes) for row in partition]
             
-            # Actualizar progreso
-            if progress_callback and idx % 10 == 0:
-                progress = int((idx / total_rows) * 100)
-                progress_callback(table_name, 'procesando', progress)
-            
-            # Verificar si existe
-            if 'id' in columns:
-                id_index = columns.index('id')
-                id_value = row_tuple[id_index]
-                local_cursor.execute(f'SELECT id FROM {table_name} WHERE id = ?', (id_value,))
-                exists = local_cursor.fetchone()
-                
-                if exists:
-                    # Actualizar
-                    set_clause = ','.join([f'{col} = ?' for col in columns])
-                    update_query = f'UPDATE {table_name} SET {set_clause} WHERE id = ?'
-                    local_cursor.execute(update_query, row_tuple + (id_value,))
-                    updated += 1
-                else:
-                    # Insertar
-                    insert_query = f'INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})'
-                    local_cursor.execute(insert_query, row_tuple)
-                    inserted += 1
+            if has_id:
+                # Una sola consulta por chunk para distinguir insertados de actualizados
+                ids = [row[id_pos] for row in batch]
+                local_cursor.execute(
+                    f"SELECT COUNT(*) FROM {table_name} WHERE id IN ({','.join(['?'] * len(ids))})", ids
+                )
+                existing = local_cursor.fetchone()[0]
+                updated += existing
+                inserted += len(batch) - existing
             else:
-                # Si no hay columna 'id', solo insertar
-                insert_query = f'INSERT OR REPLACE INTO {table_name} ({columns_str}) VALUES ({placeholders})'
-                local_cursor.execute(insert_query, row_tuple)
-                inserted += 1
+                inserted += len(batch)
+            
+            local_cursor.executemany(upsert_query, batch)
+            
+            if wm_pos is not None:
+                chunk_max = max((row[wm_pos] for row in batch if row[wm_pos] is not None), default=None)
+                if chunk_max is not None and (max_watermark is None or chunk_max > max_watermark):
+                    max_watermark = chunk_max
+                # En incremental las filas vienen ordenadas por la marca: se puede avanzar por chunk
+                if incremental:
+                    _save_watermark(local_cursor, table_name, wm_column, max_watermark)
+            
+            local_conn.commit()
+            processed += len(batch)
+            chunks += 1
+            
+            if progress_callback:
+                progress = int((processed / total_rows) * 100) if total_rows else 100
+                progress_callback(table_name, 'procesando', min(progress, 99))
+        
+        # Sincronización completa: la marca solo se guarda al terminar (el orden no es por la marca)
+        if not incremental and wm_pos is not None:
+            _save_watermark(local_cursor, table_name, wm_column, max_watermark)
+            local_conn.commit()
         
-        local_conn.commit()
+        if processed == 0:
+            result_data = {'inserted': 0, 'updated': 0, 'total': 0, 'status': 'empty',
+                           'mode': 'incremental' if incremental else 'full'}
+            if progress_callback:
+                progress_callback(table_name, 'completado', 100)
+            return result_data
         
         # Contar después
         local_cursor.execute(f'SELECT COUNT(*) FROM {table_name}')
@@ -257,9 +380,12 @@ def sync_table(prod_conn, local_conn, table_config, progress_callback=None):
         result_data = {
             'inserted': inserted,
             'updated': updated,
-            'total': total_rows,
+            'total': processed,
             'local_before': local_count_before,
             'local_after': local_count_after,
+            'chunks': chunks,
+            'mode': 'incremental' if incremental else 'full',
+            'watermark': max_watermark.isoformat() if isinstance(max_watermark, datetime) else max_watermark,
             'status': 'success'
         }
         
@@ -270,13 +396,20 @@ def sync_table(prod_conn, local_conn, table_config, progress_callback=None):
         
     except Exception as e:
         error_msg = str(e)
-        current_app.logger.error(f"Error al sincronizar {table_name}: {error_msg}")
+        local_conn.rollback()
+        # Corre en un thread sin contexto de Flask: log simple
+        print(f"❌ Error al sincronizar {table_name}: {error_msg}")
         if progress_callback:
             progress_callback(table_name, 'error', 0)
         return {'error': error_msg, 'status': 'error'}
 
-def sync_all_data_async():
-    """Sincroniza todos los datos de forma asíncrona"""
+def sync_all_data_async(full=False):
+    """
+    Sincroniza todos los datos de forma asíncrona
+
+    Args:
+        full: Forzar sincronización completa ignorando las marcas de agua
+    """
     # Verificar que NO estamos en producción
     is_cloud_run = bool(os.environ.get('K_SERVICE') or os.environ.get('GAE_ENV') or os.environ.get('CLOUD_RUN_SERVICE'))
     is_production = os.environ.get('FLASK_ENV', '').lower() == 'production' or is_cloud_run
@@ -319,6 +452,7 @@ def sync_all_data_async():
             _sync_status['results'] = {}
             _sync_status['progress'] = {}
             _sync_status['backup'] = None
+            _sync_status['mode'] = 'full' if full else 'incremental'
 
             # Usar instance_path pasado como parámetro
             local_db = os.path.join(instance_path_param, "bimba.db")
@@ -417,7 +551,7 @@ def sync_all_data_async():
                     # Log simple sin usar current_app (no disponible en thread)
                     print(f"Sincronizando {table_name} ({idx+1}/{total_tables})...")
                     
-                    result = sync_table(prod_conn, local_conn, table_config, progress_callback)
+                    result = sync_table(prod_conn, local_conn, table_config, progress_callback, full=full)
                     
                     if 'error' not in result:
                         total_inserted += result.get('inserted', 0)
@@ -71,7 +71,18 @@ class TurnosBartenderHelper:
             db.session.add(turno)
             db.session.flush()  # Para obtener el ID
             
-            # Registrar stock inicial
+            # Registrar stock inicial: costos y stock teórico de la ubicación en bloque
+            insumo_ids = {item.get('insumo_id') for item in stock_inicial if item.get('insumo_id')}
+            costos, _ = self._costos_y_nombres(insumo_ids)
+            teoricos = {
+                ingredient_id: Decimal(str(quantity)) if quantity else Decimal('0.0')
+                for ingredient_id, quantity in db.session.query(
+                    IngredientStock.ingredient_id, IngredientStock.quantity
+                ).filter(
+                    IngredientStock.ingredient_id.in_(insumo_ids),
+                    IngredientStock.location == ubicacion
+                ).order_by(IngredientStock.id.desc()).all()
+            } if insumo_ids else {}
             valor_total_inicial = Decimal('0.0')
             
             for item in stock_inicial:
@@ -81,19 +92,17 @@ class TurnosBartenderHelper:
                 if not insumo_id or cantidad <= 0:
                     continue
                 
-                # Obtener insumo y su costo unitario
-                insumo = Ingredient.query.get(insumo_id)
-                if not insumo:
+                if int(insumo_id) not in costos:
                     current_app.logger.warning(f"Insumo {insumo_id} no encontrado, saltando...")
                     continue
                 
-                # Obtener costo unitario actual
-                costo_unitario = self._get_costo_unitario_actual(insumo_id, ubicacion)
+                # Costo unitario actual
+                costo_unitario = costos[int(insumo_id)]
                 valor_costo = cantidad * costo_unitario
                 valor_total_inicial += valor_costo
                 
-                # Obtener stock teórico actual de la ubicación
-                stock_teorico = self._get_stock_teorico_ubicacion(insumo_id, ubicacion)
+                # Stock teórico actual de la ubicación
+                stock_teorico = teoricos.get(int(insumo_id), Decimal('0.0'))
                 diferencia_con_teorico = cantidad - stock_teorico
                 
                 # Crear registro de stock inicial
@@ -152,7 +161,13 @@ class TurnosBartenderHelper:
             if stock_inicial_count == 0:
                 return False, "No se puede cerrar un turno sin stock inicial registrado", None
             
-            # Registrar stock final
+            # Registrar stock final: insumos, costos y registros previos en bloque
+            insumo_ids = {item.get('insumo_id') for item in stock_final if item.get('insumo_id')}
+            costos, _ = self._costos_y_nombres(insumo_ids)
+            registros = {
+                reg.insumo_id: reg
+                for reg in TurnoStockFinal.query.filter_by(turno_id=turno_id).all()
+            }
             valor_total_final = Decimal('0.0')
             
             for item in stock_final:
@@ -162,22 +177,17 @@ class TurnosBartenderHelper:
                 if not insumo_id:
                     continue
                 
-                # Obtener insumo
-                insumo = Ingredient.query.get(insumo_id)
-                if not insumo:
+                if int(insumo_id) not in costos:
                     current_app.logger.warning(f"Insumo {insumo_id} no encontrado, saltando...")
                     continue
                 
-                # Obtener costo unitario actual
-                costo_unitario = self._get_costo_unitario_actual(insumo_id, turno.ubicacion)
+                # Costo unitario actual
+                costo_unitario = costos[int(insumo_id)]
                 valor_costo = cantidad * costo_unitario
                 valor_total_final += valor_costo
                 
                 # Crear o actualizar registro de stock final
-                stock_final_reg = TurnoStockFinal.query.filter_by(
-                    turno_id=turno_id,
-                    insumo_id=insumo_id
-                ).first()
+                stock_final_reg = registros.get(int(insumo_id))
                 
                 if stock_final_reg:
                     stock_final_reg.cantidad_final = cantidad
@@ -190,6 +200,7 @@ class TurnosBartenderHelper:
                         valor_costo_final=valor_costo
                     )
                     db.session.add(stock_final_reg)
+                    registros[int(insumo_id)] = stock_final_reg
             
             # Actualizar turno
             turno.fecha_hora_cierre = datetime.utcnow()
@@ -247,6 +258,19 @@ class TurnosBartenderHelper:
             current_app.logger.error(f"Error al obtener stock sugerido: {e}", exc_info=True)
             return []
     
+    def _costos_y_nombres(self, insumo_ids) -> Tuple[Dict[int, Decimal], Dict[int, str]]:
+        """Costos unitarios y nombres de varios insumos en una query"""
+        ids = {int(i) for i in insumo_ids if i is not None}
+        costos: Dict[int, Decimal] = {}
+        nombres: Dict[int, str] = {}
+        if ids:
+            for insumo_id, nombre, costo in db.session.query(
+                Ingredient.id, Ingredient.name, Ingredient.cost_per_unit
+            ).filter(Ingredient.id.in_(ids)).all():
+                nombres[insumo_id] = nombre
+                costos[insumo_id] = Decimal(str(costo)) if costo else Decimal('0.0')
+        return costos, nombres
+    
     def _get_costo_unitario_actual(self, insumo_id: int, ubicacion: str) -> Decimal:
         """Obtiene el costo unitario actual de un insumo"""
         try:
@@ -443,8 +467,10 @@ class TurnosBartenderHelper:
             )
             from app.models.sale_delivery_models import DeliveryItem
             from app.models.inventory_stock_models import InventoryMovement
-            from app.models.pos_models import PosSale, PosSaleItem
             from app.models.product_models import Product
+            from app.helpers.inventario_turno_engine import (
+                costos_unitarios, valor_vendido_venta as calcular_valor_venta
+            )
             
             inventario_helper = get_inventario_turno_helper()
             
@@ -463,8 +489,6 @@ class TurnosBartenderHelper:
                     valor_final += Decimal(str(stock.valor_costo_final))
             
             # 3. Calcular valor_vendido_venta (precio de venta de productos entregados)
-            valor_vendido_venta = Decimal('0.0')
-            
             # Mapear ubicación del turno a formato de DeliveryItem
             # Los turnos usan: "barra_pista" o "barra_terraza"
             # DeliveryItem usa: "Barra Pista" o "Terraza"
@@ -484,31 +508,8 @@ class TurnosBartenderHelper:
             
             current_app.logger.info(f"📦 Encontradas {len(entregas)} entregas para turno {turno.id} en {ubicacion_delivery}")
             
-            for entrega in entregas:
-                # Buscar venta asociada
-                sale = PosSale.query.filter_by(sale_id_phppos=entrega.sale_id).first()
-                if not sale:
-                    # Intentar buscar por ID local si sale_id tiene formato BMB
-                    try:
-                        if entrega.sale_id.startswith('BMB-'):
-                            parts = entrega.sale_id.split('-')
-                            if len(parts) >= 3:
-                                local_id = int(parts[-1])
-                                sale = PosSale.query.get(local_id)
-                    except:
-                        pass
-                
-                if sale:
-                    # Buscar item en la venta
-                    item = PosSaleItem.query.filter_by(
-                        sale_id=sale.id,
-                        product_name=entrega.product_name
-                    ).first()
-                    
-                    if item:
-                        precio_unitario = Decimal(str(item.unit_price))
-                        cantidad = Decimal(str(entrega.quantity_delivered))
-                        valor_vendido_venta += precio_unitario * cantidad
+            # Ventas e ítems asociados en bloque (sale_id_phppos o ID local BMB-...)
+            valor_vendido_venta = calcular_valor_venta(entregas)
             
             # 4. Calcular valor_vendido_costo (costo de insumos usados en productos entregados)
             valor_vendido_costo = Decimal('0.0')
@@ -527,30 +528,39 @@ class TurnosBartenderHelper:
                 current_app.logger.info(f"📊 Método 2: Calculando costo desde entregas y recetas de BD")
                 
                 from app.models.inventory_stock_models import Recipe, RecipeIngredient
-                from app.models.product_models import Product
+                
+                # Productos, recetas e ingredientes en tres queries
+                productos = {}
+                for producto_id, nombre in db.session.query(Product.id, Product.name).filter(
+                    Product.name.in_({e.product_name for e in entregas})
+                ).order_by(Product.id).all():
+                    productos.setdefault(nombre, producto_id)
+                recetas = dict(db.session.query(Recipe.product_id, Recipe.id).filter(
+                    Recipe.product_id.in_(set(productos.values())),
+                    Recipe.is_active == True
+                ).all()) if productos else {}
+                ingredientes_por_receta = {}
+                for rec_ing in RecipeIngredient.query.filter(
+                    RecipeIngredient.recipe_id.in_(set(recetas.values()))
+                ).all() if recetas else []:
+                    ingredientes_por_receta.setdefault(rec_ing.recipe_id, []).append(rec_ing)
+                costos = costos_unitarios(
+                    r.ingredient_id for ings in ingredientes_por_receta.values() for r in ings
+                )
                 
                 for entrega in entregas:
-                    # Buscar producto
-                    producto = Product.query.filter_by(name=entrega.product_name).first()
-                    if not producto:
+                    receta_id = recetas.get(productos.get(entrega.product_name))
+                    if not receta_id:
                         continue
                     
-                    # Buscar receta del producto
-                    receta = Recipe.query.filter_by(product_id=producto.id, is_active=True).first()
-                    if not receta:
-                        continue
-                    
-                    # Obtener ingredientes de la receta
-                    ingredientes_receta = RecipeIngredient.query.filter_by(recipe_id=receta.id).all()
-                    
                     cantidad_productos = Decimal(str(entrega.quantity_delivered))
                     
-                    for rec_ing in ingredientes_receta:
+                    for rec_ing in ingredientes_por_receta.get(receta_id, []):
                         ingrediente = rec_ing.ingredient
                         if ingrediente:
                             cantidad_por_porcion = Decimal(str(rec_ing.quantity_per_portion))
                             cantidad_total = cantidad_por_porcion * cantidad_productos
-                            costo_unitario = self._get_costo_unitario_actual(ingrediente.id, turno.ubicacion)
+                            costo_unitario = costos.get(ingrediente.id, Decimal('0.0'))
                             costo_item = cantidad_total * costo_unitario
                             valor_vendido_costo += costo_item
                             
@@ -572,11 +582,12 @@ class TurnosBartenderHelper:
                 
                 current_app.logger.info(f"📊 Método 3: Encontrados {len(movimientos_por_referencia)} movimientos por referencia")
                 
+                costos = costos_unitarios(mov.ingredient_id for mov in movimientos_por_referencia)
                 for mov in movimientos_por_referencia:
                     if mov.turno_id is None:
                         mov.turno_id = turno.id
                     cantidad_abs = abs(Decimal(str(mov.quantity)))
-                    costo_unitario = self._get_costo_unitario_actual(mov.ingredient_id, turno.ubicacion)
+                    costo_unitario = costos.get(mov.ingredient_id, Decimal('0.0'))
                     costo_item = cantidad_abs * costo_unitario
                     valor_vendido_costo += costo_item
                 
@@ -599,9 +610,10 @@ class TurnosBartenderHelper:
                 current_app.logger.info(f"📊 Encontrados {len(movimientos_por_fecha)} movimientos por fecha/ubicación")
                 
                 # Asociar con turno y sumar costos
+                costos, nombres = self._costos_y_nombres(mov.ingredient_id for mov in movimientos_por_fecha)
                 for mov in movimientos_por_fecha:
                     cantidad_abs = abs(Decimal(str(mov.quantity)))
-                    costo_unitario = self._get_costo_unitario_actual(mov.ingredient_id, turno.ubicacion)
+                    costo_unitario = costos.get(mov.ingredient_id, Decimal('0.0'))
                     costo_item = cantidad_abs * costo_unitario
                     valor_vendido_costo += costo_item
                     
@@ -609,9 +621,8 @@ class TurnosBartenderHelper:
                     if mov.turno_id is None:
                         mov.turno_id = turno.id
                     
-                    ingrediente = Ingredient.query.get(mov.ingredient_id)
                     current_app.logger.info(
-                        f"  - {ingrediente.name if ingrediente else 'Desconocido'}: "
+                        f"  - {nombres.get(mov.ingredient_id, 'Desconocido')}: "
                         f"{float(cantidad_abs):.2f} × ${float(costo_unitario):.2f} = ${float(costo_item):.2f}"
                     )
                 
@@ -622,15 +633,15 @@ class TurnosBartenderHelper:
                 db.session.commit()
             else:
                 # Procesar movimientos con turno_id
+                costos, nombres = self._costos_y_nombres(mov.ingredient_id for mov in movimientos_consumo)
                 for mov in movimientos_consumo:
                     cantidad_abs = abs(Decimal(str(mov.quantity)))
-                    costo_unitario = self._get_costo_unitario_actual(mov.ingredient_id, turno.ubicacion)
+                    costo_unitario = costos.get(mov.ingredient_id, Decimal('0.0'))
                     costo_item = cantidad_abs * costo_unitario
                     valor_vendido_costo += costo_item
                     
-                    ingrediente = Ingredient.query.get(mov.ingredient_id)
                     current_app.logger.info(
-                        f"  - {ingrediente.name if ingrediente else 'Desconocido'}: "
+                        f"  - {nombres.get(mov.ingredient_id, 'Desconocido')}: "
                         f"{float(cantidad_abs):.2f} × ${float(costo_unitario):.2f} = ${float(costo_item):.2f}"
                     )
             
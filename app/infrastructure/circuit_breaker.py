@@ -2,6 +2,7 @@
 Circuit Breaker Pattern para APIs externas
 Previene sobrecargar APIs cuando están fallando
 """
+import threading
 import time
 from enum import Enum
 from typing import Callable, Any, Optional
@@ -25,6 +26,9 @@ class CircuitBreaker:
     Cuando un servicio falla repetidamente, el circuit breaker se abre
     y rechaza nuevas solicitudes. Después de un tiempo, intenta
     nuevamente (half-open). Si funciona, se cierra nuevamente.
+    
+    Es compartido entre hilos: los cambios de estado se hacen con lock
+    (la llamada protegida se ejecuta fuera del lock).
     """
     
     def __init__(
@@ -42,6 +46,7 @@ class CircuitBreaker:
         self.failure_threshold = failure_threshold
         self.recovery_timeout = recovery_timeout
         self.expected_exception = expected_exception
+        self._lock = threading.RLock()
         
         self.state = CircuitState.CLOSED
         self.failure_count = 0
@@ -65,17 +70,18 @@ class CircuitBreaker:
             Exception: Si la función falla
         """
         # Verificar estado del circuito
-        if self.state == CircuitState.OPEN:
-            # Verificar si es momento de intentar nuevamente
-            if time.time() - self.last_failure_time >= self.recovery_timeout:
-                logger.info(f"Circuit breaker intentando recuperación para {func.__name__}")
-                self.state = CircuitState.HALF_OPEN
-                self.failure_count = 0
-            else:
-                raise CircuitBreakerOpenError(
-                    f"Circuit breaker abierto. Intenta nuevamente en "
-                    f"{int(self.recovery_timeout - (time.time() - self.last_failure_time))}s"
-                )
+        with self._lock:
+            if self.state == CircuitState.OPEN:
+                # Verificar si es momento de intentar nuevamente
+                if time.time() - self.last_failure_time >= self.recovery_timeout:
+                    logger.info(f"Circuit breaker intentando recuperación para {func.__name__}")
+                    self.state = CircuitState.HALF_OPEN
+                    self.failure_count = 0
+                else:
+                    raise CircuitBreakerOpenError(
+                        f"Circuit breaker abierto. Intenta nuevamente en "
+                        f"{int(self.recovery_timeout - (time.time() - self.last_failure_time))}s"
+                    )
         
         # Intentar ejecutar la función
         try:
@@ -94,61 +100,65 @@ class CircuitBreaker:
     
     def _on_success(self, func_name: str):
         """Maneja éxito de la llamada"""
-        self.success_count += 1
-        self.last_success_time = time.time()
+        with self._lock:
+            self.success_count += 1
+            self.last_success_time = time.time()
         
-        if self.state == CircuitState.HALF_OPEN:
-            # Si estamos en half-open y tuvo éxito, cerrar el circuito
-            logger.info(f"Circuit breaker cerrado exitosamente para {func_name}")
-            self.state = CircuitState.CLOSED
-            self.failure_count = 0
-        elif self.state == CircuitState.CLOSED:
-            # Si está cerrado y funciona, resetear contador de fallos
-            if self.failure_count > 0:
-                self.failure_count = max(0, self.failure_count - 1)
+            if self.state == CircuitState.HALF_OPEN:
+                # Si estamos en half-open y tuvo éxito, cerrar el circuito
+                logger.info(f"Circuit breaker cerrado exitosamente para {func_name}")
+                self.state = CircuitState.CLOSED
+                self.failure_count = 0
+            elif self.state == CircuitState.CLOSED:
+                # Si está cerrado y funciona, resetear contador de fallos
+                if self.failure_count > 0:
+                    self.failure_count = max(0, self.failure_count - 1)
     
     def _on_failure(self, func_name: str, error: Exception):
         """Maneja fallo de la llamada"""
-        self.failure_count += 1
-        self.last_failure_time = time.time()
-        
-        logger.warning(
-            f"Falló {func_name} (fallos: {self.failure_count}/{self.failure_threshold}): {error}"
-        )
+        with self._lock:
+            self.failure_count += 1
+            self.last_failure_time = time.time()
         
-        if self.state == CircuitState.HALF_OPEN:
-            # Si falla en half-open, volver a abrir
-            logger.error(f"Circuit breaker vuelve a abrirse para {func_name}")
-            self.state = CircuitState.OPEN
-            self.failure_count = 0
-        elif self.failure_count >= self.failure_threshold:
-            # Si alcanza el umbral, abrir el circuito
-            logger.error(
-                f"Circuit breaker abierto para {func_name} "
-                f"después de {self.failure_count} fallos"
+            logger.warning(
+                f"Falló {func_name} (fallos: {self.failure_count}/{self.failure_threshold}): {error}"
             )
-            self.state = CircuitState.OPEN
+        
+            if self.state == CircuitState.HALF_OPEN:
+                # Si falla en half-open, volver a abrir
+                logger.error(f"Circuit breaker vuelve a abrirse para {func_name}")
+                self.state = CircuitState.OPEN
+                self.failure_count = 0
+            elif self.failure_count >= self.failure_threshold:
+                # Si alcanza el umbral, abrir el circuito
+                logger.error(
+                    f"Circuit breaker abierto para {func_name} "
+                    f"después de {self.failure_count} fallos"
+                )
+                self.state = CircuitState.OPEN
     
     def get_state(self) -> dict:
         """Retorna el estado actual del circuit breaker"""
-        return {
-            'state': self.state.value,
-            'failure_count': self.failure_count,
-            'success_count': self.success_count,
-            'last_failure_time': self.last_failure_time,
-            'last_success_time': self.last_success_time,
-            'failure_threshold': self.failure_threshold,
-            'recovery_timeout': self.recovery_timeout
-        }
+        with self._lock:
+            return {
+                'state': self.state.value,
+                'failure_count': self.failure_count,
+                'success_count': self.success_count,
+                'last_failure_time': self.last_failure_time,
+                'last_success_time': self.last_success_time,
+                'failure_threshold': self.failure_threshold,
+                'recovery_timeout': self.recovery_timeout
+            }
     
     def reset(self):
         """Resetea el circuit breaker manualmente"""
-        logger.info("Circuit breaker reseteado manualmente")
-        self.state = CircuitState.CLOSED
-        self.failure_count = 0
-        self.success_count = 0
-        self.last_failure_time = None
-        self.last_success_time = None
+        with self._lock:
+            logger.info("Circuit breaker reseteado manualmente")
+            self.state = CircuitState.CLOSED
+            self.failure_count = 0
+            self.success_count = 0
+            self.last_failure_time = None
+            self.last_success_time = None
 
 
 class CircuitBreakerOpenError(Exception):
@@ -158,6 +168,7 @@ class CircuitBreakerOpenError(Exception):
 
 # Circuit breakers globales por servicio
 _breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
 
 
 def get_circuit_breaker(service_name: str, **kwargs) -> CircuitBreaker:
@@ -171,9 +182,13 @@ def get_circuit_breaker(service_name: str, **kwargs) -> CircuitBreaker:
     Returns:
         CircuitBreaker para el servicio
     """
-    if service_name not in _breakers:
-        _breakers[service_name] = CircuitBreaker(**kwargs)
-    return _breakers[service_name]
+    breaker = _breakers.get(service_name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(service_name)
+            if breaker is None:
+                breaker = _breakers[service_name] = CircuitBreaker(**kwargs)
+    return breaker
 
 
 def circuit_breaker(
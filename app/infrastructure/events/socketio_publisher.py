@@ -131,6 +131,17 @@ class SocketIOEventPublisher(EventPublisher):
         except Exception as e:
             current_app.logger.error(f"Error al emitir evento de respuesta de encuesta: {e}")
     
+    def emit_survey_stats_update(self, stats_data: Dict[str, Any]) -> None:
+        """Emitir los resultados agregados de la sesión a los dashboards de encuestas"""
+        try:
+            self.socketio.emit(
+                'survey_stats',
+                stats_data,
+                namespace='/encuesta'
+            )
+        except Exception as e:
+            current_app.logger.error(f"Error al emitir estadísticas de encuestas: {e}")
+    
     def _emit_stats_update_for_delivery(self, delivery_data: Dict[str, Any]) -> None:
         """Emitir actualización de stats específica para una entrega"""
         try:
@@ -185,8 +196,6 @@ class NoOpEventPublisher(EventPublisher):
     
     def emit_survey_response_created(self, response_data: Dict[str, Any]) -> None:
         pass
-
-
-
-
-
+    
+    def emit_survey_stats_update(self, stats_data: Dict[str, Any]) -> None:
+        pass
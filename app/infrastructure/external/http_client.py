@@ -0,0 +1,236 @@
+"""
+Cliente HTTP compartido para integraciones externas
+GetNet, SumUp, PHP POS, n8n y la API operacional salen por aquí: una
+requests.Session por host (keep-alive, sin handshake TCP+TLS por llamada),
+timeouts por defecto, reintentos con backoff corto en la capa de conexión y
+un circuit breaker por upstream (app/infrastructure/circuit_breaker.py).
+
+Con el circuito abierto las llamadas fallan de inmediato con UpstreamUnavailable
+(subclase de requests.ConnectionError, así los manejadores existentes la
+capturan) en vez de dejar al worker esperando timeouts y reintentos.
+
+Variables de entorno:
+    HTTP_CONNECT_TIMEOUT       segundos para conectar (5)
+    HTTP_READ_TIMEOUT          segundos de lectura por defecto (15)
+    HTTP_POOL_MAXSIZE          conexiones keep-alive por host (10)
+    HTTP_RETRY_TOTAL           reintentos de conexión (2)
+    HTTP_RETRY_BACKOFF         factor de backoff en segundos (0.2 -> 0.2s, 0.4s)
+    HTTP_BREAKER_THRESHOLD     fallos seguidos para abrir el circuito (5)
+    HTTP_BREAKER_RECOVERY      segundos con el circuito abierto (30)
+
+Uso:
+    from app.infrastructure.external.http_client import get_http_client
+
+    response = get_http_client().post(url, upstream='sumup', json=payload, timeout=30)
+"""
+import os
+import threading
+from http import cookiejar
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.helpers.logger import get_logger
+from app.helpers.metrics import metrics
+from app.infrastructure.circuit_breaker import CircuitBreakerOpenError, get_circuit_breaker
+
+logger = get_logger(__name__)
+
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', '5'))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', '15'))
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', '10'))
+HTTP_RETRY_TOTAL = int(os.environ.get('HTTP_RETRY_TOTAL', '2'))
+HTTP_RETRY_BACKOFF = float(os.environ.get('HTTP_RETRY_BACKOFF', '0.2'))
+HTTP_BREAKER_THRESHOLD = int(os.environ.get('HTTP_BREAKER_THRESHOLD', '5'))
+HTTP_BREAKER_RECOVERY = float(os.environ.get('HTTP_BREAKER_RECOVERY', '30'))
+
+# Métodos que se pueden reintentar también ante 502/503/504 (no duplican efectos)
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+RETRY_STATUS = (502, 503, 504)
+
+metrics.describe('http_client_request_duration_seconds', 'Duración de llamadas HTTP salientes por upstream')
+metrics.describe('http_client_requests_total', 'Llamadas HTTP salientes por upstream y resultado')
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class UpstreamUnavailable(requests.exceptions.ConnectionError):
+    """Circuito abierto para el upstream: la llamada no se intentó"""
+
+
+class UpstreamServerError(Exception):
+    """Respuesta 5xx: cuenta como fallo en el circuit breaker (la respuesta se entrega igual)"""
+
+    def __init__(self, response: requests.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+class _NoCookies(cookiejar.DefaultCookiePolicy):
+    """Las sesiones son compartidas entre requests de distintos usuarios: no guardan cookies"""
+
+    def set_ok(self, cookie, request):
+        return False
+
+
+def _retry_policy(method: str, retries: Optional[int]) -> Retry:
+    total = HTTP_RETRY_TOTAL if retries is None else retries
+    idempotent = method.upper() in IDEMPOTENT_METHODS
+    return Retry(
+        total=total,
+        connect=total,
+        # Un POST que alcanzó a enviarse no se reintenta (pagos/checkout duplicados)
+        read=total if idempotent else 0,
+        status=total if idempotent else 0,
+        other=0,
+        status_forcelist=RETRY_STATUS if idempotent else (),
+        allowed_methods=None,
+        backoff_factor=HTTP_RETRY_BACKOFF,
+        raise_on_status=False,
+        respect_retry_after_header=False,
+    )
+
+
+class HttpClient:
+    """Sesiones HTTP por host con keep-alive, reintentos, circuit breaker y métricas"""
+
+    def __init__(self, pool_maxsize: int = HTTP_POOL_MAXSIZE):
+        self.pool_maxsize = pool_maxsize
+        self._sessions: Dict[Tuple[str, bool, Optional[int]], requests.Session] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def session_for(self, url: str, method: str = 'GET', retries: Optional[int] = None) -> requests.Session:
+        """
+        Session compartida para el host de la URL y la política de reintentos
+        del método (idempotente o no). Se recrean tras un fork.
+        """
+        parts = urlsplit(url)
+        host_key = f"{parts.scheme}://{parts.netloc}".lower()
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        key = (host_key, idempotent, retries)
+        with self._lock:
+            if self._pid != os.getpid():
+                # Conexiones heredadas del proceso padre: no compartir sockets
+                self._sessions = {}
+                self._pid = os.getpid()
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                session.cookies.set_policy(_NoCookies())
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize,
+                                      max_retries=_retry_policy(method, retries))
+                session.mount(f"{parts.scheme}://", adapter)
+                self._sessions[key] = session
+            return session
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        upstream: Optional[str] = None,
+        timeout: Optional[Timeout] = None,
+        retries: Optional[int] = None,
+        **kwargs: Any
+    ) -> requests.Response:
+        """
+        Ejecuta la llamada con la sesión del host.
+
+        Args:
+            upstream: Nombre lógico para métricas y circuit breaker (por defecto el host)
+            timeout: Segundos de lectura o (conexión, lectura); por defecto los del entorno
+            retries: Reintentos de conexión (por defecto HTTP_RETRY_TOTAL; 0 para ninguno)
+
+        Raises:
+            UpstreamUnavailable: si el circuito del upstream está abierto
+            requests.RequestException: errores de red, como requests.request
+        """
+        method = method.upper()
+        upstream = upstream or urlsplit(url).hostname or 'desconocido'
+        if timeout is None:
+            timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        elif isinstance(timeout, (int, float)):
+            timeout = (min(HTTP_CONNECT_TIMEOUT, timeout), timeout)
+
+        breaker = get_circuit_breaker(
+            f"http:{upstream}",
+            failure_threshold=HTTP_BREAKER_THRESHOLD,
+            recovery_timeout=HTTP_BREAKER_RECOVERY,
+            expected_exception=(requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                                UpstreamServerError),
+        )
+        labels = {'upstream': upstream, 'method': method}
+        start = time.perf_counter()
+        try:
+            def send() -> requests.Response:
+                return self._send(method, url, timeout, retries, **kwargs)
+            send.__name__ = f"{method} {upstream}"  # nombre en los logs del circuit breaker
+            response = breaker.call(send)
+        except CircuitBreakerOpenError as e:
+            metrics.inc('http_client_requests_total', 1, {**labels, 'status': 'circuit_open'})
+            raise UpstreamUnavailable(f"{upstream}: {e}") from e
+        except UpstreamServerError as e:
+            response = e.response
+        except requests.exceptions.Timeout:
+            self._record(labels, start, 'timeout')
+            raise
+        except requests.exceptions.RequestException:
+            self._record(labels, start, 'error')
+            raise
+        self._record(labels, start, str(response.status_code))
+        return response
+
+    def _send(self, method: str, url: str, timeout: Timeout, retries: Optional[int], **kwargs: Any) -> requests.Response:
+        session = self.session_for(url, method, retries)
+        response = session.request(method, url, timeout=timeout, **kwargs)
+        if response.status_code >= 500:
+            raise UpstreamServerError(response)
+        return response
+
+    @staticmethod
+    def _record(labels: Dict[str, str], start: float, status: str) -> None:
+        metrics.observe('http_client_request_duration_seconds', time.perf_counter() - start, labels)
+        metrics.inc('http_client_requests_total', 1, {**labels, 'status': status})
+
+    def get(self, url: str, upstream: Optional[str] = None, **kwargs: Any) -> requests.Response:
+        return self.request('GET', url, upstream=upstream, **kwargs)
+
+    def post(self, url: str, upstream: Optional[str] = None, **kwargs: Any) -> requests.Response:
+        return self.request('POST', url, upstream=upstream, **kwargs)
+
+    def put(self, url: str, upstream: Optional[str] = None, **kwargs: Any) -> requests.Response:
+        return self.request('PUT', url, upstream=upstream, **kwargs)
+
+    def delete(self, url: str, upstream: Optional[str] = None, **kwargs: Any) -> requests.Response:
+        return self.request('DELETE', url, upstream=upstream, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Por host: sesiones, conexiones abiertas y requests (requests/conexiones = reutilización)"""
+        with self._lock:
+            hosts: Dict[str, Dict[str, int]] = {}
+            for (host, _, _), session in self._sessions.items():
+                adapter = session.get_adapter(host + '/')
+                pools = [adapter.poolmanager.pools[k] for k in adapter.poolmanager.pools.keys()]
+                entry = hosts.setdefault(host, {'sessions': 0, 'connections_opened': 0, 'requests': 0})
+                entry['sessions'] += 1
+                entry['connections_opened'] += sum(p.num_connections for p in pools)
+                entry['requests'] += sum(p.num_requests for p in pools)
+            return {'pid': self._pid, 'hosts': hosts}
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Cliente HTTP compartido del proceso"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
@@ -2,10 +2,18 @@
 Cliente para OpenAI API
 Encapsula todo el acceso a la API de OpenAI para el agente de redes sociales.
 """
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
 from typing import Optional, List, Dict, Any
 from flask import current_app
-import openai
+
+from app.helpers.startup_profiler import lazy_module
+
+from app.infrastructure.external.openai_response_cache import get_openai_response_cache, CACHE_ENABLED
+
+# El SDK de OpenAI tarda ~0.7 s en importarse: se carga al primer uso, no al arrancar
+openai = lazy_module('openai', 'OpenAI')
 
 
 class OpenAIClient(ABC):
@@ -30,7 +38,13 @@ class OpenAIAPIClient(OpenAIClient):
     Usa la biblioteca oficial de OpenAI.
     """
     
-    def __init__(self, api_key: Optional[str] = None, organization: Optional[str] = None, project: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        organization: Optional[str] = None,
+        project: Optional[str] = None,
+        use_cache: bool = CACHE_ENABLED
+    ):
         """
         Inicializa el cliente de OpenAI.
         
@@ -38,10 +52,12 @@ class OpenAIAPIClient(OpenAIClient):
             api_key: API key de OpenAI (opcional, se puede obtener de config)
             organization: Organization ID de OpenAI (opcional)
             project: Project ID de OpenAI (opcional, requerido para Admin Keys)
+            use_cache: Usar la cache de respuestas compartida (ver openai_response_cache)
         """
         self._api_key = api_key
         self._organization = organization
         self._project = project
+        self._use_cache = use_cache
         self._client = None
     
     def _get_api_key(self) -> Optional[str]:
@@ -125,6 +141,8 @@ class OpenAIAPIClient(OpenAIClient):
     ) -> Optional[str]:
         """
         Genera una respuesta usando OpenAI.
+        Prompts equivalentes dentro del mismo contexto de evento se sirven desde
+        cache y los idénticos concurrentes comparten una sola llamada.
         
         Args:
             messages: Lista de mensajes en formato [{"role": "user", "content": "..."}]
@@ -151,6 +169,34 @@ class OpenAIAPIClient(OpenAIClient):
         
         formatted_messages.extend(messages)
         
+        call = lambda: self._create_completion(client, formatted_messages, model, temperature, max_tokens)
+        if not self._use_cache:
+            return call()
+        
+        # Cache semántica + single-flight + compuerta de concurrencia
+        cache = get_openai_response_cache()
+        context_key = self._get_event_context_key()
+        cache.set_context(context_key)
+        key = cache.build_key(context_key, messages, system_prompt, model, temperature, max_tokens)
+        return cache.get_or_compute(key, call)
+    
+    def _get_event_context_key(self) -> str:
+        """Contexto de evento actual al que se acota la cache de respuestas"""
+        try:
+            from app.application.services.operational_insights_service import OperationalInsightsService
+            return OperationalInsightsService.get_event_context_key()
+        except Exception:
+            return 'default'
+    
+    def _create_completion(
+        self,
+        client: openai.OpenAI,
+        formatted_messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Optional[str]:
+        """Llamada directa a la API (sin cache)"""
         try:
             # Timeout de 5 segundos para la llamada - si no responde rápido, fallback
             response = client.chat.completions.create(
@@ -0,0 +1,267 @@
+"""
+Cache de respuestas de OpenAI con coalescencia de requests
+Evita que ráfagas de preguntas repetidas ("qué hay hoy", precios, horarios)
+multipliquen llamadas a la API:
+
+- Cache por clave semántica (mensajes normalizados + prompt + parámetros),
+  acotada al contexto del evento actual: al cambiar el contexto se descarta.
+- Single-flight: prompts idénticos concurrentes esperan la misma llamada.
+- Compuerta de concurrencia: máximo N llamadas salientes simultáneas.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.environ.get('OPENAI_RESPONSE_CACHE_ENABLED', 'true').lower() != 'false'
+CACHE_TTL = int(os.environ.get('OPENAI_RESPONSE_CACHE_TTL', '300'))  # 5 minutos
+CACHE_MAX_ENTRIES = int(os.environ.get('OPENAI_RESPONSE_CACHE_MAX_ENTRIES', '500'))
+MAX_CONCURRENCY = int(os.environ.get('OPENAI_MAX_CONCURRENCY', '4'))
+GATE_TIMEOUT = 5.0  # Segundos máximos esperando un cupo de la compuerta
+FLIGHT_TIMEOUT = 8.0  # Segundos máximos esperando la llamada de otro request
+LATENCY_SAMPLES = 500
+
+
+def _normalizar_texto(texto: Any) -> str:
+    """
+    Normaliza un texto para la clave semántica: misma normalización que el
+    clasificador de intenciones, sin espacios repetidos.
+    """
+    # Import diferido: app.application.services importa el cliente OpenAI (ciclo)
+    from app.application.services.intent_matcher import normalize_message
+    return ' '.join(normalize_message(str(texto or '')).split())
+
+
+def _percentil(valores: List[float], p: float) -> Optional[float]:
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100.0 * (len(ordenados) - 1))))
+    return round(ordenados[indice], 1)
+
+
+class _Flight:
+    """Llamada en curso compartida por requests con la misma clave"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+
+
+class OpenAIResponseCache:
+    """Cache LRU con TTL, single-flight y compuerta de concurrencia"""
+
+    def __init__(
+        self,
+        ttl: int = CACHE_TTL,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_concurrency: int = MAX_CONCURRENCY
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_concurrency = max_concurrency
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # clave -> (respuesta, expira_en)
+        self._flights: Dict[str, _Flight] = {}
+        self._context: Optional[str] = None
+        self._lock = threading.Lock()
+        self._gate = threading.BoundedSemaphore(max_concurrency)
+        self._in_flight_calls = 0
+        self._counters = {
+            'requests': 0,
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'rejected': 0,
+            'errors': 0,
+            'api_calls': 0,
+            'context_resets': 0,
+        }
+        self._api_latency_ms = deque(maxlen=LATENCY_SAMPLES)
+        self._served_latency_ms = deque(maxlen=LATENCY_SAMPLES)
+
+    # ------------------------------------------------------------------
+    # Claves
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def build_key(
+        context_key: str,
+        messages: List[Dict[str, str]],
+        system_prompt: Optional[str],
+        model: str,
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        """
+        Construye la clave semántica de un prompt.
+
+        Los mensajes se normalizan (mayúsculas, acentos, signos, espacios) para que
+        "¿Qué hay hoy?" y "que hay hoy" compartan respuesta. El prompt del sistema
+        se usa tal cual: si cambia la programación o el canal, cambia la clave.
+        """
+        payload = json.dumps({
+            'ctx': context_key,
+            'model': model,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+            'system': system_prompt or '',
+            'messages': [(m.get('role'), _normalizar_texto(m.get('content'))) for m in messages],
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def set_context(self, context_key: str) -> None:
+        """Fija el contexto de evento actual; al cambiar se descartan las respuestas anteriores"""
+        with self._lock:
+            if context_key == self._context:
+                return
+            if self._context is not None:
+                self._counters['context_resets'] += 1
+                logger.info(f"Contexto de evento cambió ({self._context} → {context_key}), cache de OpenAI limpiada")
+            self._context = context_key
+            self._entries.clear()
+
+    # ------------------------------------------------------------------
+    # Lectura / cómputo
+    # ------------------------------------------------------------------
+
+    def get_or_compute(self, key: str, compute: Callable[[], Optional[str]]) -> Optional[str]:
+        """
+        Retorna la respuesta cacheada o la calcula una sola vez para todos los
+        requests concurrentes con la misma clave. Las respuestas None (errores,
+        timeouts, compuerta llena) no se cachean.
+        """
+        inicio = time.perf_counter()
+        with self._lock:
+            self._counters['requests'] += 1
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                self._served_latency_ms.append((time.perf_counter() - inicio) * 1000)
+                return entry[0]
+            if entry:
+                del self._entries[key]
+
+            flight = self._flights.get(key)
+            lider = flight is None
+            if lider:
+                flight = _Flight()
+                self._flights[key] = flight
+                self._counters['misses'] += 1
+            else:
+                self._counters['coalesced'] += 1
+
+        if not lider:
+            flight.done.wait(FLIGHT_TIMEOUT)
+            self._record_served(inicio)
+            return flight.result
+
+        try:
+            flight.result = self._call_gated(compute)
+            if flight.result is not None:
+                self._store(key, flight.result)
+            return flight.result
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+            self._record_served(inicio)
+
+    def _call_gated(self, compute: Callable[[], Optional[str]]) -> Optional[str]:
+        """Ejecuta la llamada saliente respetando la compuerta de concurrencia"""
+        if not self._gate.acquire(timeout=GATE_TIMEOUT):
+            with self._lock:
+                self._counters['rejected'] += 1
+            logger.warning("Compuerta de OpenAI llena: request descartado para usar fallback")
+            return None
+
+        with self._lock:
+            self._in_flight_calls += 1
+            self._counters['api_calls'] += 1
+        inicio = time.perf_counter()
+        try:
+            result = compute()
+        except Exception as e:
+            logger.error(f"Error en llamada a OpenAI: {e}")
+            result = None
+        finally:
+            self._gate.release()
+            with self._lock:
+                self._in_flight_calls -= 1
+                self._api_latency_ms.append((time.perf_counter() - inicio) * 1000)
+
+        if result is None:
+            with self._lock:
+                self._counters['errors'] += 1
+        return result
+
+    def _store(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _record_served(self, inicio: float) -> None:
+        with self._lock:
+            self._served_latency_ms.append((time.perf_counter() - inicio) * 1000)
+
+    # ------------------------------------------------------------------
+    # Administración
+    # ------------------------------------------------------------------
+
+    def clear(self) -> None:
+        """Descarta todas las respuestas cacheadas"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de hit rate, coalescencia y latencia"""
+        with self._lock:
+            counters = dict(self._counters)
+            api_latency = list(self._api_latency_ms)
+            served_latency = list(self._served_latency_ms)
+            entries = len(self._entries)
+            in_flight = self._in_flight_calls
+            context = self._context
+
+        requests_total = counters['requests']
+        ahorradas = counters['hits'] + counters['coalesced']
+        return {
+            'enabled': CACHE_ENABLED,
+            'context': context,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'max_concurrency': self.max_concurrency,
+            'in_flight_calls': in_flight,
+            **counters,
+            'hit_rate': round(counters['hits'] / requests_total * 100, 1) if requests_total else 0.0,
+            'saved_rate': round(ahorradas / requests_total * 100, 1) if requests_total else 0.0,
+            'api_latency_ms': {
+                'p50': _percentil(api_latency, 50),
+                'p95': _percentil(api_latency, 95),
+                'max': round(max(api_latency), 1) if api_latency else None,
+                'samples': len(api_latency),
+            },
+            'served_latency_ms': {
+                'p50': _percentil(served_latency, 50),
+                'p95': _percentil(served_latency, 95),
+                'samples': len(served_latency),
+            },
+        }
+
+
+# Instancia compartida por el proceso
+_response_cache = OpenAIResponseCache()
+
+
+def get_openai_response_cache() -> OpenAIResponseCache:
+    """Obtiene la cache de respuestas compartida del proceso"""
+    return _response_cache
@@ -3,6 +3,7 @@ Cliente extendido para PHP POS API con métodos para el kiosko
 Incluye create_sale que no está en el cliente base
 """
 import requests
+from app.infrastructure.external.http_client import get_http_client
 import logging
 from flask import current_app
 import os
@@ -109,8 +110,9 @@ class PHPPosKioskClient:
             
             logger.info(f"Creando venta en PHP POS: {url}")
             
-            response = requests.post(
+            response = get_http_client().post(
                 url,
+                upstream='phppos',
                 json=payload,
                 headers=self._get_headers(),
                 timeout=15
@@ -229,8 +231,9 @@ class PHPPosKioskClient:
         try:
             url = f"{self.base_url}/items/{item_id}"
             
-            response = requests.get(
+            response = get_http_client().get(
                 url,
+                upstream='phppos',
                 headers=self._get_headers(),
                 timeout=10
             )
@@ -263,8 +266,9 @@ class PHPPosKioskClient:
             if category:
                 params['category'] = category
             
-            response = requests.get(
+            response = get_http_client().get(
                 url,
+                upstream='phppos',
                 headers=self._get_headers(),
                 params=params,
                 timeout=15
@@ -301,8 +305,9 @@ class PHPPosKioskClient:
             for endpoint in endpoints:
                 try:
                     url = f"{self.base_url}/{endpoint}"
-                    response = requests.get(
+                    response = get_http_client().get(
                         url,
+                        upstream='phppos',
                         headers=self._get_headers(),
                         params={'limit': limit},
                         timeout=15
@@ -339,8 +344,9 @@ class PHPPosKioskClient:
         try:
             url = f"{self.base_url}/sales/{sale_id}"
             
-            response = requests.get(
+            response = get_http_client().get(
                 url,
+                upstream='phppos',
                 headers=self._get_headers(),
                 timeout=10
             )
@@ -2,6 +2,7 @@
 Cliente para interactuar con la API de SumUp
 """
 import requests
+from app.infrastructure.external.http_client import get_http_client, HTTP_CONNECT_TIMEOUT
 import logging
 from flask import current_app
 import os
@@ -121,32 +122,17 @@ class SumUpClient:
                 logger.warning(f"⚠️ No se pudo resolver DNS manualmente: {dns_error}")
                 # Continuar de todas formas, requests podría resolverlo
             
-            # Intentar conexión con retry para manejar problemas de DNS intermitentes
-            max_retries = 3
-            last_error = None
-            
-            for attempt in range(1, max_retries + 1):
-                try:
-                    # Usar timeout más largo para conexión y lectura (conexión: 30s, lectura: 30s)
-                    # Usar URL original con hostname (no IP) para que el certificado SSL funcione
-                    response = requests.post(
-                        url,
-                        json=payload,
-                        headers=self._get_headers(),
-                        timeout=(30, 30)  # (connect timeout, read timeout)
-                    )
-                    # Si llegamos aquí, la conexión fue exitosa
-                    break
-                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
-                    last_error = e
-                    if attempt < max_retries:
-                        wait_time = attempt * 2  # Backoff exponencial: 2s, 4s
-                        logger.warning(f"⚠️  Intento {attempt}/{max_retries} falló: {e}. Reintentando en {wait_time}s...")
-                        import time
-                        time.sleep(wait_time)
-                    else:
-                        logger.error(f"❌ Todos los intentos fallaron después de {max_retries} intentos")
-                        raise
+            # Los reintentos de conexión (DNS/handshake intermitentes) los hace el
+            # cliente HTTP compartido con backoff corto; un POST ya enviado no se
+            # reintenta para no duplicar el checkout.
+            # Usar URL original con hostname (no IP) para que el certificado SSL funcione
+            response = get_http_client().post(
+                url,
+                upstream='sumup',
+                json=payload,
+                headers=self._get_headers(),
+                timeout=(HTTP_CONNECT_TIMEOUT, 30)  # (connect timeout, read timeout)
+            )
             
             # Verificar Content-Type
             content_type = response.headers.get('Content-Type', '').lower()
@@ -235,10 +221,11 @@ class SumUpClient:
             url = f"{self.BASE_URL}/v0.1/checkouts/{checkout_id}"
             
             # Usar timeout más largo para conexión y lectura
-            response = requests.get(
+            response = get_http_client().get(
                 url,
+                upstream='sumup',
                 headers=self._get_headers(),
-                timeout=(30, 30)  # (connect timeout, read timeout)
+                timeout=(HTTP_CONNECT_TIMEOUT, 30)  # (connect timeout, read timeout)
             )
             
             response.raise_for_status()
@@ -300,11 +287,12 @@ class SumUpClient:
             payload = payment_data or {}
             
             # Usar timeout más largo para conexión y lectura
-            response = requests.post(
+            response = get_http_client().post(
                 url,
+                upstream='sumup',
                 json=payload,
                 headers=self._get_headers(),
-                timeout=(30, 30)  # (connect timeout, read timeout)
+                timeout=(HTTP_CONNECT_TIMEOUT, 30)  # (connect timeout, read timeout)
             )
             
             response.raise_for_status()
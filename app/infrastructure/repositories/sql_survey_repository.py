@@ -2,13 +2,16 @@
 Repositorio de Encuestas SQL
 Implementación de SurveyRepository usando SQLAlchemy.
 """
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta, date, time
 from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+import csv
 import json
 
 from app.models import db
-from app.models.survey_models import SurveyResponse, SurveySession
+from app.models.survey_models import SurveyAggregate, SurveyResponse, SurveySession
 from app.domain.survey import SurveyResponse as DomainSurveyResponse, SurveySession as DomainSurveySession
 from app.infrastructure.repositories.survey_repository import SurveyRepository
 
@@ -16,15 +19,21 @@ from app.infrastructure.repositories.survey_repository import SurveyRepository
 class SqlSurveyRepository(SurveyRepository):
     """
     Implementación SQL del repositorio de encuestas.
-    Usa los modelos SurveyResponse y SurveySession.
+    Usa los modelos SurveyResponse y SurveySession; cada respuesta actualiza
+    además su celda en SurveyAggregate (sesión, barra, hora).
     """
     
+    # Las tablas se verifican una vez por proceso, no en cada llamada
+    _tables_checked = False
+    
     def __init__(self):
         """Inicializa el repositorio"""
         pass
     
     def _ensure_tables_exist(self):
-        """Verifica que las tablas existen"""
+        """Verifica que las tablas existen (una vez por proceso)"""
+        if SqlSurveyRepository._tables_checked:
+            return
         try:
             from flask import has_app_context
             if not has_app_context():
@@ -34,11 +43,15 @@ class SqlSurveyRepository(SurveyRepository):
             try:
                 SurveyResponse.query.limit(1).all()
                 SurveySession.query.limit(1).all()
+                SurveyAggregate.query.limit(1).all()
+                SqlSurveyRepository._tables_checked = True
             except Exception as e:
                 # Si las tablas no existen, intentar crearlas
                 current_app.logger.warning(f"⚠️ Tablas de encuestas no encontradas, intentando crear: {e}")
                 try:
+                    db.session.rollback()
                     db.create_all()
+                    SqlSurveyRepository._tables_checked = True
                     current_app.logger.info("✅ Tablas de encuestas creadas exitosamente")
                 except Exception as create_error:
                     current_app.logger.error(f"❌ Error al crear tablas de encuestas: {create_error}")
@@ -108,6 +121,8 @@ class SqlSurveyRepository(SurveyRepository):
             )
             
             db.session.add(db_response)
+            # Misma transacción: la respuesta y su agregado se confirman juntos
+            self._increment_aggregate(fecha_sesion_date, response.barra, timestamp.hour, response.rating)
             db.session.commit()
             return True
         except Exception as e:
@@ -333,3 +348,220 @@ class SqlSurveyRepository(SurveyRepository):
                 logging.getLogger(__name__).error(error_msg, exc_info=True)
             return []
 
+    def _increment_aggregate(self, fecha_sesion: date, barra: str, hora: int, rating: int) -> None:
+        """
+        Suma una respuesta a la celda (sesión, barra, hora) con UPDATE atómico
+        (col = col + 1): dos tablets enviando a la vez no pierden conteos.
+        """
+        table = SurveyAggregate.__table__
+        where = (
+            (table.c.fecha_sesion == fecha_sesion)
+            & (table.c.barra == barra)
+            & (table.c.hora == hora)
+        )
+        rating_col = f'rating_{rating}'
+        increments = {
+            'total': table.c.total + 1,
+            'sum_rating': table.c.sum_rating + rating,
+            rating_col: table.c[rating_col] + 1,
+        }
+        if db.session.execute(table.update().where(where).values(**increments)).rowcount:
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(
+                    fecha_sesion=fecha_sesion, barra=barra, hora=hora,
+                    total=1, sum_rating=rating, **{rating_col: 1}
+                ))
+        except IntegrityError:
+            # Otro worker creó la celda entre el UPDATE y el INSERT
+            db.session.execute(table.update().where(where).values(**increments))
+    
+    def rebuild_session_aggregates(self, fecha_sesion: str) -> int:
+        """
+        Recalcula los agregados de una sesión desde survey_responses con un
+        GROUP BY (sesiones anteriores a la tabla o importadas desde CSV).
+        
+        Returns:
+            int: Celdas (barra, hora) escritas
+        """
+        try:
+            fecha_sesion_date = datetime.strptime(fecha_sesion, '%Y-%m-%d').date()
+        except (ValueError, TypeError):
+            return 0
+        
+        hora = func.extract('hour', SurveyResponse.timestamp)
+        rows = db.session.query(
+            SurveyResponse.barra, hora, SurveyResponse.rating, func.count(SurveyResponse.id)
+        ).filter(
+            SurveyResponse.fecha_sesion == fecha_sesion_date
+        ).group_by(SurveyResponse.barra, hora, SurveyResponse.rating).all()
+        
+        cells: Dict[tuple, Dict] = {}
+        for barra, hour, rating, count in rows:
+            if not (1 <= int(rating) <= 5):
+                continue
+            cell = cells.setdefault((barra, int(hour)), {
+                'fecha_sesion': fecha_sesion_date, 'barra': barra, 'hora': int(hour),
+                'total': 0, 'sum_rating': 0,
+                'rating_1': 0, 'rating_2': 0, 'rating_3': 0, 'rating_4': 0, 'rating_5': 0,
+            })
+            cell['total'] += count
+            cell['sum_rating'] += int(rating) * count
+            cell[f'rating_{int(rating)}'] += count
+        
+        try:
+            table = SurveyAggregate.__table__
+            db.session.execute(table.delete().where(table.c.fecha_sesion == fecha_sesion_date))
+            if cells:
+                db.session.execute(table.insert(), list(cells.values()))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(cells)
+    
+    def find_session_aggregates(self, fecha_sesion: str) -> List[Dict]:
+        """Agregados de la sesión desde survey_aggregates (filas = barras x horas)"""
+        try:
+            self._ensure_tables_exist()
+            
+            try:
+                fecha_sesion_date = datetime.strptime(fecha_sesion, '%Y-%m-%d').date()
+            except (ValueError, TypeError):
+                return []
+            
+            rows = SurveyAggregate.query.filter_by(fecha_sesion=fecha_sesion_date).all()
+            if not rows:
+                # Sesión con respuestas pero sin agregados (previa a la tabla): reconstruir una vez
+                has_responses = db.session.query(SurveyResponse.id).filter(
+                    SurveyResponse.fecha_sesion == fecha_sesion_date
+                ).limit(1).first()
+                if has_responses:
+                    self.rebuild_session_aggregates(fecha_sesion)
+                    rows = SurveyAggregate.query.filter_by(fecha_sesion=fecha_sesion_date).all()
+            
+            return [{
+                'barra': row.barra,
+                'hora': row.hora,
+                'total': row.total,
+                'sum_rating': row.sum_rating,
+                'ratings': {r: getattr(row, f'rating_{r}') for r in range(1, 6)}
+            } for row in rows]
+        except Exception as e:
+            error_msg = f"Error al obtener agregados de encuestas SQL: {e}"
+            try:
+                current_app.logger.error(error_msg, exc_info=True)
+            except RuntimeError:
+                import logging
+                logging.getLogger(__name__).error(error_msg, exc_info=True)
+            return []
+    
+    def find_recent_responses(self, fecha_sesion: str, limit: int = 50,
+                              barra: Optional[str] = None) -> List[DomainSurveyResponse]:
+        """Últimas respuestas de una sesión (LIMIT en la query), en orden cronológico"""
+        try:
+            self._ensure_tables_exist()
+            
+            try:
+                fecha_sesion_date = datetime.strptime(fecha_sesion, '%Y-%m-%d').date()
+            except (ValueError, TypeError):
+                return []
+            
+            query = SurveyResponse.query.filter_by(fecha_sesion=fecha_sesion_date)
+            if barra:
+                query = query.filter_by(barra=str(barra))
+            db_responses = query.order_by(SurveyResponse.timestamp.desc(), SurveyResponse.id.desc()).limit(limit).all()
+            
+            return [
+                DomainSurveyResponse(
+                    timestamp=db_resp.timestamp.strftime('%Y-%m-%d %H:%M:%S') if db_resp.timestamp else '',
+                    barra=db_resp.barra,
+                    rating=db_resp.rating,
+                    comment=db_resp.comment or '',
+                    fiesta_nombre=db_resp.fiesta_nombre or '',
+                    djs=db_resp.djs or '',
+                    bartender_nombre=db_resp.bartender_nombre or '',
+                    fecha_sesion=db_resp.fecha_sesion.isoformat() if db_resp.fecha_sesion else ''
+                )
+                for db_resp in reversed(db_responses)
+            ]
+        except Exception as e:
+            error_msg = f"Error al obtener respuestas recientes SQL: {e}"
+            try:
+                current_app.logger.error(error_msg, exc_info=True)
+            except RuntimeError:
+                import logging
+                logging.getLogger(__name__).error(error_msg, exc_info=True)
+            return []
+    
+    def import_legacy_csv(self, csv_path: str) -> Dict[str, int]:
+        """
+        Importa una vez el survey_responses.csv heredado a survey_responses y
+        reconstruye los agregados de las sesiones tocadas. Las filas que ya
+        existen (mismo timestamp, barra, rating y comentario) se omiten, así
+        que repetir la importación no duplica respuestas.
+        
+        Returns:
+            dict: {'imported', 'skipped', 'invalid', 'sessions'}
+        """
+        self._ensure_tables_exist()
+        
+        parsed = []
+        invalid = 0
+        with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                try:
+                    timestamp = datetime.strptime((row.get('timestamp') or '').strip(), '%Y-%m-%d %H:%M:%S')
+                    rating = int(row.get('rating') or 0)
+                    barra = (row.get('barra') or '').strip()
+                    if not barra or not (1 <= rating <= 5):
+                        raise ValueError('barra o rating inválido')
+                    fecha_raw = (row.get('fecha_sesion') or '').strip()
+                    if fecha_raw:
+                        fecha_sesion_date = datetime.strptime(fecha_raw, '%Y-%m-%d').date()
+                    elif timestamp.hour < 4 or (timestamp.hour == 4 and timestamp.minute < 30):
+                        fecha_sesion_date = (timestamp - timedelta(days=1)).date()
+                    else:
+                        fecha_sesion_date = timestamp.date()
+                except (ValueError, TypeError):
+                    invalid += 1
+                    continue
+                parsed.append((timestamp, barra, rating, row, fecha_sesion_date))
+        
+        fechas = {item[4] for item in parsed}
+        existing = set()
+        if fechas:
+            for ts, barra, rating, comment in db.session.query(
+                SurveyResponse.timestamp, SurveyResponse.barra, SurveyResponse.rating, SurveyResponse.comment
+            ).filter(SurveyResponse.fecha_sesion.in_(fechas)):
+                existing.add((ts, barra, rating, comment or ''))
+        
+        imported = skipped = 0
+        try:
+            for timestamp, barra, rating, row, fecha_sesion_date in parsed:
+                key = (timestamp, barra, rating, row.get('comment') or '')
+                if key in existing:
+                    skipped += 1
+                    continue
+                existing.add(key)
+                db.session.add(SurveyResponse(
+                    timestamp=timestamp,
+                    barra=barra,
+                    rating=rating,
+                    comment=row.get('comment') or '',
+                    fiesta_nombre=row.get('fiesta_nombre') or '',
+                    djs=row.get('djs') or '',
+                    bartender_nombre=row.get('bartender_nombre') or '',
+                    fecha_sesion=fecha_sesion_date
+                ))
+                imported += 1
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        for fecha_sesion_date in sorted(fechas):
+            self.rebuild_session_aggregates(fecha_sesion_date.isoformat())
+        
+        return {'imported': imported, 'skipped': skipped, 'invalid': invalid, 'sessions': len(fechas)}
@@ -45,6 +45,37 @@ class SurveyRepository(ABC):
         """Obtiene todas las sesiones"""
         pass
 
+    def find_session_aggregates(self, fecha_sesion: str) -> List[Dict]:
+        """
+        Agregados de una sesión por barra y hora:
+        [{'barra', 'hora', 'total', 'sum_rating', 'ratings': {1..5: n}}]
+
+        Implementación por defecto recorriendo las respuestas; el repositorio
+        SQL la sobreescribe leyendo la tabla survey_aggregates.
+        """
+        cells: Dict[tuple, Dict] = {}
+        for response in self.find_responses_by_session_date(fecha_sesion):
+            try:
+                hora = datetime.strptime(response.timestamp, '%Y-%m-%d %H:%M:%S').hour
+            except (ValueError, TypeError):
+                continue
+            cell = cells.setdefault((response.barra, hora), {
+                'barra': response.barra, 'hora': hora, 'total': 0, 'sum_rating': 0,
+                'ratings': {r: 0 for r in range(1, 6)}
+            })
+            cell['total'] += 1
+            cell['sum_rating'] += response.rating
+            cell['ratings'][response.rating] = cell['ratings'].get(response.rating, 0) + 1
+        return list(cells.values())
+
+    def find_recent_responses(self, fecha_sesion: str, limit: int = 50,
+                              barra: Optional[str] = None) -> List[SurveyResponse]:
+        """Últimas respuestas de una sesión, en orden cronológico"""
+        responses = self.find_responses_by_session_date(fecha_sesion)
+        if barra:
+            responses = [r for r in responses if r.barra == str(barra)]
+        return responses[-limit:]
+
 
 class CsvSurveyRepository(SurveyRepository):
     """
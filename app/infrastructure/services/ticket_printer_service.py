@@ -2,6 +2,8 @@
 Servicio de Impresión de Tickets
 Genera e imprime tickets con código de barras cuando se completa una venta
 """
+from __future__ import annotations
+
 import os
 import io
 import subprocess
@@ -9,12 +11,18 @@ import platform
 from typing import Optional, Dict, Any
 from datetime import datetime
 from flask import current_app
-import barcode
-from barcode.writer import ImageWriter
-from PIL import Image, ImageDraw, ImageFont
-import qrcode
 import logging
 
+from app.helpers.startup_profiler import lazy_module
+
+# PIL, qrcode y barcode se cargan al imprimir el primer ticket
+barcode = lazy_module('barcode', 'Impresora de tickets')
+barcode_writer = lazy_module('barcode.writer', 'Impresora de tickets')
+Image = lazy_module('PIL.Image', 'Impresora de tickets')
+ImageDraw = lazy_module('PIL.ImageDraw', 'Impresora de tickets')
+ImageFont = lazy_module('PIL.ImageFont', 'Impresora de tickets')
+qrcode = lazy_module('qrcode', 'Impresora de tickets')
+
 logger = logging.getLogger(__name__)
 
 
@@ -91,7 +99,7 @@ class TicketPrinterService:
         # Crear código de barras Code128 con SOLO el número
         # El scanner del bartender lee este número y busca la venta en PHP POS
         code128 = barcode.get_barcode_class('code128')
-        barcode_instance = code128(numeric_id, writer=ImageWriter())
+        barcode_instance = code128(numeric_id, writer=barcode_writer.ImageWriter())
         
         # Generar imagen
         img_buffer = io.BytesIO()
@@ -2,9 +2,10 @@
 Modelos de base de datos para el sistema BIMBA
 """
 from flask_sqlalchemy import SQLAlchemy
+from app.helpers.read_replica import RoutingSession
 
-# Instancia global de SQLAlchemy
-db = SQLAlchemy()
+# Instancia global de SQLAlchemy (la sesión rutea lecturas marcadas a la réplica)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # Importar modelos del kiosko
 from .kiosk_models import Pago, PagoItem
@@ -12,7 +13,7 @@ from .kiosk_models import Pago, PagoItem
 # Importar modelos del POS
 from .pos_models import (
     PosSession, PosSale, PosSaleItem, PosRegister, RegisterLock, RegisterSession, RegisterClose, 
-    SaleAuditLog, Employee, PaymentIntent, PaymentAgent, LogIntentoPago
+    SaleAuditLog, Employee, PaymentIntent, PaymentAgent, LogIntentoPago, PosCart
 )
 
 # Importar modelos de jornadas
@@ -52,7 +53,7 @@ from .recipe_models import LegacyIngredient, ProductRecipe
 # Importar modelos de inventario de stock (nuevo sistema)
 from .inventory_stock_models import (
     IngredientCategory, Ingredient as StockIngredient, IngredientStock,
-    Recipe, RecipeIngredient, InventoryMovement
+    Recipe, RecipeIngredient, InventoryMovement, StockAlertState
 )
 
 # Importar modelos de guardarropía
@@ -69,7 +70,7 @@ from .bartender_turno_models import (
 )
 
 # Importar modelos de programación de eventos
-from .programacion_models import ProgramacionEvento, ProgramacionAsignacion
+from .programacion_models import ProgramacionEvento, ProgramacionAsignacion, ProgramacionPublicSnapshot
 
 # Importar modelos de auditoría de caja superadmin
 from .superadmin_sale_audit_models import SuperadminSaleAudit
@@ -89,6 +90,12 @@ from .ecommerce_models import Entrada, CheckoutSession
 # Importar modelos de configuración del sistema
 from .system_config_models import SystemConfig
 
+# Importar outbox de tareas post-commit
+from .outbox_models import OutboxEvent
+
+# Importar almacén de claves de idempotencia
+from .idempotency_models import IdempotencyRecord
+
 
 __all__ = [
     'db', 
@@ -109,7 +116,7 @@ __all__ = [
     'LegacyIngredient', 'ProductRecipe',
     # Nuevos modelos de inventario de stock
     'IngredientCategory', 'StockIngredient', 'IngredientStock',
-    'Recipe', 'RecipeIngredient', 'InventoryMovement',
+    'Recipe', 'RecipeIngredient', 'InventoryMovement', 'StockAlertState',
     # Modelos de guardarropía
     'GuardarropiaItem',
     # Modelos de entregas y tracking
@@ -119,7 +126,7 @@ __all__ = [
     'BartenderTurno', 'TurnoStockInicial', 'TurnoStockFinal',
     'MermaInventario', 'TurnoDesviacionInventario', 'AlertaFugaTurno',
     # Modelos de programación de eventos
-    'ProgramacionEvento', 'ProgramacionAsignacion',
+    'ProgramacionEvento', 'ProgramacionAsignacion', 'ProgramacionPublicSnapshot',
     # Modelos de auditoría de caja superadmin
     'SuperadminSaleAudit',
     # Modelos de logs del bot
@@ -132,5 +139,9 @@ __all__ = [
     'Entrada', 'CheckoutSession',
     # Modelos de configuración del sistema
     'SystemConfig',
+    # Outbox de tareas post-commit
+    'OutboxEvent',
+    # Almacén de claves de idempotencia
+    'IdempotencyRecord',
 ]
 
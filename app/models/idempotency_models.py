@@ -0,0 +1,41 @@
+"""
+Modelos del almacén de claves de idempotencia
+Cada operación de escritura (venta, cierre, PaymentIntent, depósito de
+guardarropía) guarda su respuesta bajo la clave de idempotencia con un TTL;
+app/helpers/idempotency_helper.py la devuelve en los reintentos sin volver a
+ejecutar la lógica ni consultar las tablas de negocio.
+"""
+from datetime import datetime
+from . import db
+from sqlalchemy import Index
+
+
+class IdempotencyRecord(db.Model):
+    """Respuesta guardada de una operación ya procesada (clave → resultado)"""
+    __tablename__ = 'idempotency_records'
+    
+    # 'pending': reservada por un request en curso; 'done': respuesta guardada
+    STATUS_PENDING = 'pending'
+    STATUS_DONE = 'done'
+    
+    # Operación protegida (ej: 'pos.sale', 'pos.close') y SHA256 de la clave
+    scope = db.Column(db.String(50), primary_key=True)
+    key = db.Column(db.String(64), primary_key=True)
+    
+    status = db.Column(db.String(20), nullable=False, default='done')
+    status_code = db.Column(db.Integer, nullable=False, default=200)
+    content_type = db.Column(db.String(100), nullable=True)
+    # Destino de las respuestas de redirección (formularios HTML)
+    location = db.Column(db.String(500), nullable=True)
+    body = db.Column(db.Text, nullable=False, default='')
+    
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Vencimiento de la respuesta (TTL) o de la reserva en curso
+    expires_at = db.Column(db.DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index('ix_idempotency_records_expires_at', 'expires_at'),
+    )
+    
+    def __repr__(self):
+        return f'<IdempotencyRecord {self.scope} {self.key[:8]} {self.status}>'
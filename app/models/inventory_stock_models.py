@@ -291,28 +291,40 @@ class InventoryMovement(db.Model):
         return f'<InventoryMovement {self.movement_type} {sign}{self.quantity} @ {self.location}>'
 
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+class StockAlertState(db.Model):
+    """
+    Último estado de alerta de stock por (ingrediente, ubicación).
+    Lo actualiza el motor de alertas (app/helpers/stock_alerts.py) en segundo plano;
+    los dashboards leen esta tabla y solo los cambios de estado generan notificación.
+    """
+    __tablename__ = 'stock_alert_states'
+    
+    STATE_OK = 'ok'
+    STATE_LOW = 'low'
+    STATE_NEGATIVE = 'negative'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    ingredient_id = db.Column(db.Integer, db.ForeignKey('ingredients.id'), nullable=False, index=True)
+    location = db.Column(db.String(100), nullable=False, index=True)
+    
+    # Estado actual: 'ok', 'low', 'negative'
+    state = db.Column(db.String(20), nullable=False, default='ok', index=True)
+    
+    # Valores con los que se evaluó
+    quantity = db.Column(Numeric(12, 3), nullable=False, default=0.0)
+    low_threshold = db.Column(Numeric(12, 3), nullable=True)
+    avg_daily_consumption = db.Column(Numeric(12, 3), nullable=False, default=0.0)
+    
+    # Desde cuándo está en el estado actual y última evaluación
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    evaluated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    ingredient = db.relationship('Ingredient')
+    
+    __table_args__ = (
+        Index('uq_stock_alert_ingredient_location', 'ingredient_id', 'location', unique=True),
+    )
+    
+    def __repr__(self):
+        return f'<StockAlertState {self.ingredient_id} @ {self.location}: {self.state}>'
 
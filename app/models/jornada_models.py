@@ -213,22 +213,10 @@ class PlanillaTrabajador(db.Model):
                 # No lanzar error, solo registrar warning
                 return
             
-            # CONGELAR valores (snapshot)
-            self.sueldo_snapshot = config_cargo.sueldo_por_turno or 0.0
-            self.bono_snapshot = config_cargo.bono_fijo or 0.0
-            self.pago_total = float(self.sueldo_snapshot) + float(self.bono_snapshot)
-            
             # Buscar cargo_id si existe
             cargo_obj = Cargo.query.filter_by(nombre=cargo_buscar).first()
-            if cargo_obj:
-                self.cargo_id = cargo_obj.id
             
-            # Si no hay override, marcar como calculado automáticamente
-            if not self.override:
-                self.override = False
-                self.override_motivo = None
-                self.override_por = None
-                self.override_en = None
+            self.congelar_pago_desde_config(config_cargo, cargo_id=cargo_obj.id if cargo_obj else None)
             
             logger.info(
                 f"✅ Pago congelado para {self.nombre_empleado} (cargo: {cargo_buscar}): "
@@ -239,6 +227,31 @@ class PlanillaTrabajador(db.Model):
             logger.error(f"Error calculando y congelando pago para planilla {self.id}: {e}", exc_info=True)
             # No lanzar excepción, solo registrar error
     
+    def congelar_pago_desde_config(self, config_cargo, cargo_id: int = None):
+        """
+        Congela el pago usando una configuración de sueldo ya cargada.
+        Usado por calcular_y_congelar_pago y por la carga masiva de planilla
+        (PlanillaBulkService), que precarga todas las configuraciones en una sola query.
+        
+        Args:
+            config_cargo: CargoSalaryConfig del cargo
+            cargo_id: ID del cargo (opcional, solo se asigna si viene)
+        """
+        # CONGELAR valores (snapshot)
+        self.sueldo_snapshot = config_cargo.sueldo_por_turno or 0.0
+        self.bono_snapshot = config_cargo.bono_fijo or 0.0
+        self.pago_total = float(self.sueldo_snapshot) + float(self.bono_snapshot)
+        
+        if cargo_id:
+            self.cargo_id = cargo_id
+        
+        # Si no hay override, marcar como calculado automáticamente
+        if not self.override:
+            self.override = False
+            self.override_motivo = None
+            self.override_por = None
+            self.override_en = None
+    
     def calcular_costo_total(self):
         """
         Calcula el costo total basado en horas trabajadas.
@@ -0,0 +1,43 @@
+"""
+Modelos del outbox de tareas post-commit
+Cada efecto secundario de una operación (estado de entrega, auditoría,
+notificaciones, webhooks) se guarda como fila en la MISMA transacción que el
+cambio de negocio; app/helpers/post_commit.py lo ejecuta después del commit.
+"""
+from datetime import datetime
+from . import db
+from sqlalchemy import Index
+
+
+class OutboxEvent(db.Model):
+    """Tarea pendiente de ejecutar después del commit (at-least-once)"""
+    __tablename__ = 'outbox_events'
+    
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Nombre del handler registrado (ej: 'sale.delivery_status')
+    topic = db.Column(db.String(100), nullable=False, index=True)
+    payload_json = db.Column(db.Text, nullable=False, default='{}')
+    # Evita encolar dos veces el mismo efecto (ej: 'sale:123:delivery_status')
+    dedup_key = db.Column(db.String(200), nullable=True, unique=True)
+    
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    last_error = db.Column(db.Text, nullable=True)
+    
+    # Próximo intento (reintentos con backoff) o fin del lease mientras se procesa
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('ix_outbox_events_status_available', 'status', 'available_at'),
+    )
+    
+    def __repr__(self):
+        return f'<OutboxEvent {self.id} {self.topic} {self.status}>'
@@ -578,6 +578,16 @@ class RegisterLock(db.Model):
         }
 
 
+class PosCart(db.Model):
+    """Carrito del POS del lado del servidor (persistencia de app/helpers/pos_cart_store.py)"""
+    __tablename__ = 'pos_carts'
+    
+    cart_key = db.Column(db.String(100), primary_key=True)  # rs:<register_session_id> | reg:<register_id>
+    items_json = db.Column(Text, nullable=False, default='[]')
+    version = db.Column(db.Integer, nullable=False, default=0)  # Control de concurrencia optimista
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
 class RegisterSession(db.Model):
     """
     Sesión de caja con estado explícito (P0-001, P0-003, P0-010)
@@ -161,6 +161,25 @@ class ProgramacionEvento(db.Model):
         }
 
 
+class ProgramacionPublicSnapshot(db.Model):
+    """
+    Payload público materializado de la programación (hoy/fecha, próximos, mes).
+    Se regenera al cambiar un evento (app/helpers/public_event_snapshots.py);
+    los endpoints públicos lo sirven con ETag/Last-Modified sin recalcular.
+    """
+    __tablename__ = 'programacion_public_snapshots'
+    
+    # 'fecha:2026-10-19', 'upcoming:2026-10-19', 'month:2026-10'
+    key = db.Column(db.String(50), primary_key=True)
+    payload_json = db.Column(Text, nullable=False)
+    etag = db.Column(db.String(64), nullable=False)
+    # Último cambio real del payload (Last-Modified); no cambia si se regenera igual
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<ProgramacionPublicSnapshot {self.key} {self.etag[:8]}>'
+
+
 class ProgramacionAsignacion(db.Model):
     """
     Asignación de personal por turno en Programación.
@@ -106,3 +106,33 @@ class SurveySession(db.Model):
 
 
 
+
+
+class SurveyAggregate(db.Model):
+    """
+    Agregado incremental de respuestas por sesión, barra y hora.
+    Se actualiza en la misma transacción que cada respuesta (UPDATE con
+    incrementos atómicos), así /encuesta/api/results lee unas pocas filas
+    en vez de recorrer todas las respuestas de la noche.
+    """
+    __tablename__ = 'survey_aggregates'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    fecha_sesion = db.Column(db.Date, nullable=False)
+    barra = db.Column(db.String(100), nullable=False)
+    hora = db.Column(db.Integer, nullable=False)  # 0-23
+    total = db.Column(db.Integer, default=0, nullable=False)
+    sum_rating = db.Column(db.Integer, default=0, nullable=False)
+    rating_1 = db.Column(db.Integer, default=0, nullable=False)
+    rating_2 = db.Column(db.Integer, default=0, nullable=False)
+    rating_3 = db.Column(db.Integer, default=0, nullable=False)
+    rating_4 = db.Column(db.Integer, default=0, nullable=False)
+    rating_5 = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index('uq_survey_aggregates_sesion_barra_hora', 'fecha_sesion', 'barra', 'hora', unique=True),
+    )
+    
+    def __repr__(self):
+        return f'<SurveyAggregate {self.fecha_sesion} barra={self.barra} hora={self.hora}: {self.total}>'
@@ -146,7 +146,8 @@ POS (Puntos de Venta):
 
 APIS:
 - /api/v1/bot/responder - Respuesta del agente BIMBA
-- /api/system/export/logs - Exportación de logs
+- /api/system/export/logs - Exportación de logs de entregas (CSV/NDJSON/XLSX)
+- /api/system/export/sales - Exportación de ventas POS (CSV/NDJSON/XLSX)
 - /api/operational/* - APIs operativas internas
 
 ═══════════════════════════════════════════════════════════════
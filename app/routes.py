@@ -365,6 +365,26 @@ def admin_db_monitor():
         return redirect(url_for('routes.admin_panel_control'))
 
 
+@bp.route('/admin/panel_control/sql_profiler', methods=['GET', 'POST'])
+def admin_sql_profiler():
+    """Profiler SQL: queries por endpoint y probables N+1 (requests muestreadas de este worker)"""
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('auth.login_admin'))
+    
+    from app.helpers.sql_profiler import get_sql_profiler_store
+    store = get_sql_profiler_store()
+    
+    if request.method == 'POST':
+        store.reset()
+        flash('Estadísticas del profiler reiniciadas', 'success')
+        return redirect(url_for('routes.admin_sql_profiler'))
+    
+    report = store.report()
+    if request.args.get('format') == 'json':
+        return jsonify(report)
+    return render_template('admin/sql_profiler.html', report=report)
+
+
 @bp.route('/admin/api/database/switch', methods=['POST'])
 def admin_api_database_switch():
     """API para cambiar entre base de datos de desarrollo y producción"""
@@ -1491,40 +1511,53 @@ def cerrar_jornada():
         
         current_app.logger.info(f"🕐 Turno cerrado a las {hora_cierre_real} del {fecha_cierre_real}")
         
-        db.session.commit()
+        # Registrar turnos (EmployeeShift) de toda la planilla con un solo INSERT masivo
+        try:
+            # Savepoint: si falla el registro de turnos, el cierre de la jornada sigue
+            with db.session.begin_nested():
+                from app.application.services.planilla_bulk_service import PlanillaBulkService
+                PlanillaBulkService().materializar_turnos_cierre(jornada)
+        except Exception as e:
+            current_app.logger.error(f"Error registrando turnos de la planilla al cerrar jornada {jornada.id}: {e}", exc_info=True)
         
-        # Enviar evento a n8n (después de commit exitoso)
+        # Evento a n8n en la misma transacción (outbox, se envía tras el commit)
         try:
-            from app.helpers.n8n_client import send_shift_closed
-            from app.models.delivery_models import Delivery
-            from app.models.pos_models import PosSale
+            # Savepoint: un error calculando totales no invalida el cierre del turno
+            with db.session.begin_nested():
+                from app.helpers.n8n_client import send_shift_closed
+                from app.models.delivery_models import Delivery
+                from app.models.pos_models import PosSale
             
-            # Calcular totales del turno
-            shift_date = jornada.fecha_jornada.strftime('%Y-%m-%d') if hasattr(jornada.fecha_jornada, 'strftime') else str(jornada.fecha_jornada)
+                # Calcular totales del turno
+                shift_date = jornada.fecha_jornada.strftime('%Y-%m-%d') if hasattr(jornada.fecha_jornada, 'strftime') else str(jornada.fecha_jornada)
             
-            # Contar entregas del día
-            total_deliveries = Delivery.query.filter(
-                db.func.date(Delivery.timestamp) == jornada.fecha_jornada
-            ).count() if hasattr(jornada, 'fecha_jornada') else 0
+                # Contar entregas del día
+                total_deliveries = Delivery.query.filter(
+                    db.func.date(Delivery.timestamp) == jornada.fecha_jornada
+                ).count() if hasattr(jornada, 'fecha_jornada') else 0
             
-            # Calcular total de ventas del día
-            total_sales = 0.0
-            try:
-                sales = PosSale.query.filter(
-                    db.func.date(PosSale.created_at) == jornada.fecha_jornada
-                ).all() if hasattr(jornada, 'fecha_jornada') else []
-                total_sales = sum(float(sale.total_amount or 0) for sale in sales)
-            except:
-                pass
+                # Calcular total de ventas del día
+                total_sales = 0.0
+                try:
+                    sales = PosSale.query.filter(
+                        db.func.date(PosSale.created_at) == jornada.fecha_jornada
+                    ).all() if hasattr(jornada, 'fecha_jornada') else []
+                    total_sales = sum(float(sale.total_amount or 0) for sale in sales)
+                except:
+                    pass
             
-            send_shift_closed(
-                shift_date=shift_date,
-                total_sales=total_sales,
-                total_deliveries=total_deliveries
-            )
+                send_shift_closed(
+                    shift_date=shift_date,
+                    total_sales=total_sales,
+                    total_deliveries=total_deliveries,
+                    jornada_id=jornada.id,
+                    closed_at=getattr(jornada, 'cerrado_en', None)
+                )
         except Exception as e:
             current_app.logger.warning(f"Error enviando evento de cierre de turno a n8n: {e}")
         
+        db.session.commit()
+        
         # Emitir actualización de métricas del dashboard
         try:
             from app import socketio
@@ -2215,6 +2248,9 @@ def admin_programacion_eliminar(evento_id):
         evento.eliminado_en = datetime.now(CHILE_TZ)
         evento.eliminado_por = session.get('admin_username', session.get('admin_user', 'admin'))
         
+        # Regenerar info pública materializada tras el commit
+        from app.helpers.public_event_snapshots import refresh_after_commit
+        refresh_after_commit(evento.fecha)
         db.session.commit()
         
         flash('Evento eliminado correctamente', 'success')
@@ -2649,9 +2685,9 @@ def admin_api_services_status():
         return jsonify({'success': False, 'error': 'No autenticado'}), 401
     
     try:
-        from app.helpers.service_status import get_all_services_status
+        from app.helpers.health_scheduler import get_health_scheduler
         
-        services_status = get_all_services_status()
+        services_status = get_health_scheduler().services_status()
         
         # Agregar servicios adicionales que el template espera
         additional_services = {
@@ -2937,7 +2973,8 @@ def admin_api_sync_start():
                 'error': 'Ya hay una sincronización en curso'
             }), 400
         
-        result = sync_all_data_async()
+        data = request.get_json(silent=True) or {}
+        result = sync_all_data_async(full=bool(data.get('full')))
         return jsonify(result)
     except Exception as e:
         current_app.logger.error(f"Error al iniciar sincronización: {e}", exc_info=True)
@@ -3,9 +3,10 @@ Rutas de API
 Endpoints API para servicios, health checks, etc.
 """
 from flask import Blueprint, jsonify, request, session, current_app
+import hmac
 import requests
 import os
-from app.helpers.service_status import get_all_services_status, restart_service, get_postfix_queue
+from app.helpers.service_status import restart_service, get_postfix_queue
 from app.helpers.logger import get_logger
 from app.infrastructure.rate_limiter.decorators import rate_limit
 from app.application.exceptions.app_exceptions import ServiceUnavailableError, InternalServerError
@@ -40,32 +41,28 @@ def health_check():
             details={'debug': debug_info if current_app.config.get('DEBUG') else None}
         )
     
-    try:
-        # Intentar una llamada simple a la API
-        url = f"{base_url}/employees"
-        headers = {
-            "x-api-key": api_key,
-            "accept": "application/json"
-        }
-        resp = requests.get(url, headers=headers, timeout=5)
-        resp.raise_for_status()
-        
+    # Estado desde el snapshot del scheduler: el probe no llama a la API en el request
+    from app.helpers.health_scheduler import get_health_scheduler
+    api_status = get_health_scheduler().services_status().get('api', {})
+
+    if api_status.get('online'):
         return jsonify({
             'status': 'ok',
             'message': 'API conectada',
             'online': True,
-            'response_time_ms': resp.elapsed.total_seconds() * 1000
+            'response_time_ms': api_status.get('response_time_ms'),
+            'checked_at': api_status.get('checked_at'),
+            'age_seconds': api_status.get('age_seconds')
         })
-    except requests.exceptions.Timeout:
+    if 'timeout' in (api_status.get('message') or '').lower():
         raise ServiceUnavailableError(
             service="API",
             user_message="La API no responde. Por favor, intenta más tarde."
         )
-    except requests.exceptions.RequestException as e:
-        raise ServiceUnavailableError(
-            service="API",
-            user_message=f"Error de conexión con la API: {str(e)}"
-        )
+    raise ServiceUnavailableError(
+        service="API",
+        user_message=f"Error de conexión con la API: {api_status.get('message', 'estado desconocido')}"
+    )
 
 
 @api_bp.route('/system/health', methods=['GET'])
@@ -122,6 +119,36 @@ def performance_stats():
         }), 500
 
 
+@api_bp.route('/system/metrics', methods=['GET'])
+def metrics_scrape():
+    """
+    Métricas agregadas de todos los workers (histogramas p50/p95/p99, contadores, gauges).
+    Formato Prometheus por defecto; ?format=json para JSON.
+    Requiere sesión de admin o header Authorization: Bearer <METRICS_SCRAPE_TOKEN>.
+    """
+    scrape_token = os.environ.get('METRICS_SCRAPE_TOKEN')
+    auth_header = request.headers.get('Authorization', '')
+    token_ok = bool(scrape_token) and hmac.compare_digest(
+        auth_header.encode('utf-8'), f"Bearer {scrape_token}".encode('utf-8')
+    )
+    if not token_ok and not session.get('admin_logged_in'):
+        return jsonify({'error': 'No autorizado'}), 401
+    
+    try:
+        from app.helpers.metrics import metrics
+        if request.args.get('format') == 'json':
+            return jsonify(metrics.to_json()), 200
+        return current_app.response_class(
+            metrics.render_prometheus(),
+            mimetype='text/plain; version=0.0.4'
+        )
+    except Exception as e:
+        logger.error(f"Error al obtener métricas: {e}", exc_info=True)
+        return jsonify({
+            'error': f'Error al obtener métricas: {str(e)}'
+        }), 500
+
+
 @api_bp.route('/system/csv/stats', methods=['GET'])
 def csv_statistics():
     """Estadísticas de archivos CSV"""
@@ -172,18 +199,43 @@ def system_info():
         }), 500
 
 
+@api_bp.route('/system/startup', methods=['GET'])
+def startup_profile():
+    """Perfil de arranque de este worker: etapas de create_app y subsistemas diferidos (admin only)"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'No autorizado'}), 401
+
+    profiler = current_app.extensions.get('startup_profile')
+    if profiler is None:
+        return jsonify({'error': 'Perfil de arranque no disponible'}), 404
+    return jsonify(profiler.report()), 200
+
+
 @api_bp.route('/system/export/logs', methods=['GET'])
 def export_logs():
-    """Exporta logs en CSV"""
+    """
+    Exporta logs de entregas en streaming
+    
+    Query params:
+        format: csv (default), ndjson o xlsx
+        desde, hasta: rango de fechas YYYY-MM-DD (opcional, hasta inclusivo)
+    """
     if not session.get('admin_logged_in'):
         return jsonify({'error': 'No autorizado'}), 401
     
     try:
-        from app.helpers.logs import load_logs
-        from app.helpers.export_utils import DataExporter
+        from app.helpers.logs import iter_logs, EXPECTED_LOG_HEADER
+        from app.helpers.export_utils import DataExporter, STREAM_FORMATS, parse_date_range
         
-        logs = load_logs()
-        return DataExporter.export_logs_csv(logs, "logs")
+        fmt = request.args.get('format', 'csv').lower()
+        if fmt not in STREAM_FORMATS:
+            return jsonify({'error': f"Formato no soportado (use {', '.join(STREAM_FORMATS)})"}), 400
+        try:
+            desde, hasta = parse_date_range(request.args.get('desde'), request.args.get('hasta'))
+        except ValueError:
+            return jsonify({'error': 'Formato de fecha inválido (use YYYY-MM-DD)'}), 400
+        
+        return DataExporter.stream(iter_logs(desde, hasta), EXPECTED_LOG_HEADER, "logs", fmt)
     except Exception as e:
         logger.error(f"Error al exportar logs: {e}", exc_info=True)
         return jsonify({
@@ -191,6 +243,68 @@ def export_logs():
         }), 500
 
 
+SALES_EXPORT_HEADER = [
+    'id', 'created_at', 'shift_date', 'jornada_id', 'register_id', 'register_name',
+    'employee_id', 'employee_name', 'payment_type', 'total_amount',
+    'payment_cash', 'payment_debit', 'payment_credit', 'is_courtesy', 'is_cancelled'
+]
+
+
+@api_bp.route('/system/export/sales', methods=['GET'])
+def export_sales():
+    """
+    Exporta ventas POS en streaming
+    
+    Query params:
+        format: csv (default), ndjson o xlsx
+        desde, hasta: rango de fechas YYYY-MM-DD en hora de Chile sobre created_at
+            (opcional, hasta inclusivo; created_at se guarda y exporta en UTC)
+        jornada_id: filtrar por jornada (opcional)
+    """
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'No autorizado'}), 401
+    
+    try:
+        from app.models.pos_models import PosSale
+        from app.helpers.export_utils import DataExporter, STREAM_FORMATS, parse_date_range, iter_query
+        from app.helpers.timezone_utils import chile_to_utc
+        
+        fmt = request.args.get('format', 'csv').lower()
+        if fmt not in STREAM_FORMATS:
+            return jsonify({'error': f"Formato no soportado (use {', '.join(STREAM_FORMATS)})"}), 400
+        try:
+            desde, hasta = parse_date_range(request.args.get('desde'), request.args.get('hasta'))
+        except ValueError:
+            return jsonify({'error': 'Formato de fecha inválido (use YYYY-MM-DD)'}), 400
+        # Días de Chile -> límites UTC naive, como PosSale.created_at
+        desde = chile_to_utc(desde).replace(tzinfo=None) if desde else None
+        hasta = chile_to_utc(hasta).replace(tzinfo=None) if hasta else None
+        
+        columnas = [getattr(PosSale, col) for col in SALES_EXPORT_HEADER]
+        query = PosSale.query.with_entities(*columnas)
+        if desde:
+            query = query.filter(PosSale.created_at >= desde)
+        if hasta:
+            query = query.filter(PosSale.created_at < hasta)
+        jornada_id = request.args.get('jornada_id', type=int)
+        if jornada_id:
+            query = query.filter(PosSale.jornada_id == jornada_id)
+        query = query.order_by(PosSale.created_at.asc())
+        
+        def filas():
+            for row in iter_query(query):
+                fila = list(row)
+                fila[1] = row.created_at.strftime('%Y-%m-%d %H:%M:%S') if row.created_at else ''
+                yield fila
+        
+        return DataExporter.stream(filas(), SALES_EXPORT_HEADER, "ventas", fmt)
+    except Exception as e:
+        logger.error(f"Error al exportar ventas: {e}", exc_info=True)
+        return jsonify({
+            'error': f'Error al exportar: {str(e)}'
+        }), 500
+
+
 @api_bp.route('/system/circuit-breakers', methods=['GET'])
 def circuit_breaker_status():
     """Estado de los circuit breakers (admin only)"""
@@ -202,9 +316,11 @@ def circuit_breaker_status():
         for service_name, breaker in _breakers.items():
             breakers_status[service_name] = breaker.get_state()
         
+        from app.infrastructure.external.http_client import get_http_client
         return jsonify({
             'breakers': breakers_status,
-            'total': len(breakers_status)
+            'total': len(breakers_status),
+            'http_client': get_http_client().stats()
         }), 200
     except Exception as e:
         logger.error(f"Error al obtener estado de circuit breakers: {e}", exc_info=True)
@@ -220,7 +336,8 @@ def services_status():
         return jsonify({'error': 'No autorizado'}), 401
     
     try:
-        services_status = get_all_services_status()
+        from app.helpers.health_scheduler import get_health_scheduler
+        services_status = get_health_scheduler().services_status()
         return jsonify({
             'status': 'ok',
             'services': services_status
@@ -312,8 +429,8 @@ def detailed_health_check():
         return jsonify({'error': 'No autenticado'}), 401
     
     try:
-        from app.helpers.health_checks import get_all_health_checks
-        health_status = get_all_health_checks()
+        from app.helpers.health_scheduler import get_health_scheduler
+        health_status = get_health_scheduler().health_checks()
         
         status_code = 200 if health_status['status'] == 'healthy' else 503
         return jsonify(health_status), status_code
@@ -438,23 +555,26 @@ def agent_public_info_today():
     
     Returns:
         JSON con información pública del evento de hoy o mensaje si no hay evento
+        (materializada, con ETag/Last-Modified y Cache-Control público)
     """
     try:
-        from app.application.services.programacion_service import ProgramacionService
+        from app.helpers.public_event_snapshots import (
+            get_public_event_snapshots, public_json_response, fecha_key, hoy
+        )
         
-        service = ProgramacionService()
-        evento_info = service.get_public_info_for_today()
+        snapshot = get_public_event_snapshots().get(fecha_key(hoy()))
+        evento_info = snapshot['payload']
         
         if evento_info:
-            return jsonify({
+            return public_json_response(snapshot, {
                 'has_event': True,
                 'event': evento_info
-            }), 200
+            })
         else:
-            return jsonify({
+            return public_json_response(snapshot, {
                 'has_event': False,
                 'message': 'No hay evento cargado para hoy.'
-            }), 200
+            })
     except Exception as e:
         logger.error(f"Error en agent/public-info/today: {e}", exc_info=True)
         return jsonify({
@@ -479,7 +599,7 @@ def agent_public_info_date():
         JSON con información pública del evento o mensaje si no hay evento
     """
     try:
-        from app.application.services.programacion_service import ProgramacionService
+        from app.helpers.public_event_snapshots import get_public_event_snapshots, public_json_response, fecha_key
         from datetime import datetime
         
         fecha_str = request.args.get('fecha')
@@ -497,19 +617,19 @@ def agent_public_info_date():
                 'error': 'Formato de fecha inválido. Use YYYY-MM-DD'
             }), 400
         
-        service = ProgramacionService()
-        evento_info = service.get_public_info_for_fecha(fecha)
+        snapshot = get_public_event_snapshots().get(fecha_key(fecha))
+        evento_info = snapshot['payload']
         
         if evento_info:
-            return jsonify({
+            return public_json_response(snapshot, {
                 'has_event': True,
                 'event': evento_info
-            }), 200
+            })
         else:
-            return jsonify({
+            return public_json_response(snapshot, {
                 'has_event': False,
                 'message': f'No hay evento cargado para la fecha {fecha_str}.'
-            }), 200
+            })
     except Exception as e:
         logger.error(f"Error en agent/public-info/date: {e}", exc_info=True)
         return jsonify({
@@ -534,7 +654,7 @@ def agent_public_info_upcoming():
         JSON con lista de eventos futuros ordenados por fecha ascendente
     """
     try:
-        from app.application.services.programacion_service import ProgramacionService
+        from app.helpers.public_event_snapshots import get_public_event_snapshots, public_json_response, upcoming_key
         
         limit = request.args.get('limit', type=int) or 10
         
@@ -542,14 +662,14 @@ def agent_public_info_upcoming():
         if limit < 1 or limit > 50:
             limit = 10
         
-        service = ProgramacionService()
-        eventos = service.get_upcoming_events(limit=limit)
+        snapshot = get_public_event_snapshots().get(upcoming_key())
+        eventos = snapshot['payload'][:limit]
         
-        return jsonify({
+        return public_json_response(snapshot, {
             'success': True,
             'count': len(eventos),
             'events': eventos
-        }), 200
+        })
     except Exception as e:
         logger.error(f"Error en agent/public-info/upcoming: {e}", exc_info=True)
         return jsonify({
@@ -576,7 +696,7 @@ def agent_programacion_month_public():
         JSON con lista de eventos del mes (solo campos públicos)
     """
     try:
-        from app.application.services.programacion_service import ProgramacionService
+        from app.helpers.public_event_snapshots import get_public_event_snapshots, public_json_response, month_key
         
         año = request.args.get('year', type=int)
         mes = request.args.get('month', type=int)
@@ -593,19 +713,17 @@ def agent_programacion_month_public():
                 'error': 'Mes debe estar entre 1 y 12'
             }), 400
         
-        service = ProgramacionService()
-        eventos = service.get_eventos_mes(año, mes)
+        # Formato público materializado
+        snapshot = get_public_event_snapshots().get(month_key(año, mes))
+        eventos_publicos = snapshot['payload']
         
-        # Convertir a formato público
-        eventos_publicos = [evento.to_public_dict() for evento in eventos]
-        
-        return jsonify({
+        return public_json_response(snapshot, {
             'success': True,
             'year': año,
             'month': mes,
             'count': len(eventos_publicos),
             'events': eventos_publicos
-        }), 200
+        })
     except Exception as e:
         logger.error(f"Error en agent/programacion/month/public: {e}", exc_info=True)
         return jsonify({
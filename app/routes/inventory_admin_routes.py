@@ -38,12 +38,11 @@ def dashboard():
         alertas_stock_bajo = []
         
         for ubicacion in ubicaciones:
-            summary = service.get_stock_summary(ubicacion)
-            stock_por_ubicacion[ubicacion] = summary
-            
-            # MEJORA: Usar método mejorado para obtener alertas de stock
-            alerts = service.get_low_stock_alerts(location=ubicacion, include_negative=True)
-            for alert in alerts:
+            stock_por_ubicacion[ubicacion] = service.get_stock_summary(ubicacion)
+        
+        # Alertas guardadas por el motor de alertas (una query para todas las ubicaciones)
+        for alert in service.get_low_stock_alerts(include_negative=True):
+            if alert['location'] in ubicaciones:
                 alertas_stock_bajo.append({
                     'ubicacion': alert['location'],
                     'ingrediente': alert['ingredient_name'],
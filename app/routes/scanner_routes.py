@@ -11,6 +11,7 @@ from app.helpers.logger import get_logger, log_error
 from app.helpers.fraud_detection import save_fraud_attempt
 from app.helpers.pos_api import get_entity_details, get_employees, authenticate_employee
 from app.infrastructure.rate_limiter.decorators import rate_limit
+from app.helpers.metrics import track_endpoint
 
 scanner_bp = Blueprint('scanner', __name__)
 logger = get_logger(__name__)
@@ -269,6 +270,7 @@ def scanner():
 
 
 @scanner_bp.route('/entregar', methods=['POST'])
+@track_endpoint('scanner.entregar')
 @rate_limit(max_requests=50, per_seconds=60)
 def entregar():
     """Registrar una entrega - thin controller usando DeliveryService"""
@@ -6,10 +6,7 @@ from typing import Dict, Any, List
 from datetime import datetime
 from flask import current_app
 from app.helpers.timezone_utils import CHILE_TZ
-from app.helpers.health_checks import (
-    check_database, check_cache, check_external_api, get_all_health_checks
-)
-from app.helpers.service_status import get_all_services_status, check_api_status
+from app.helpers.health_scheduler import get_health_scheduler
 import time
 
 
@@ -35,20 +32,19 @@ class MonitoringService:
             return self.cached_status
         
         try:
-            # Health checks básicos
-            health_checks = get_all_health_checks()
-            
-            # Estado de servicios del sistema
-            system_services = get_all_services_status()
+            # Health checks y servicios desde el snapshot del scheduler (ejecutados en segundo plano)
+            scheduler = get_health_scheduler()
+            health_checks = scheduler.health_checks()
+            system_services = scheduler.services_status()
             
             # Estado de API externa (si está configurada)
-            api_status = check_api_status(checked_by='monitoring', log_connection=False)
+            api_status = system_services.get('api', {})
             
             # Información del sistema
             system_info = self._get_system_info()
             
             # Métricas de rendimiento
-            performance_metrics = self._get_performance_metrics()
+            performance_metrics = self._get_performance_metrics(health_checks)
             
             # Estado general
             overall_status = self._calculate_overall_status(
@@ -121,23 +117,24 @@ class MonitoringService:
                 'error': str(e)
             }
     
-    def _get_performance_metrics(self) -> Dict[str, Any]:
-        """Obtiene métricas de rendimiento"""
+    def _get_performance_metrics(self, health_checks: Dict[str, Any]) -> Dict[str, Any]:
+        """Obtiene métricas de rendimiento (tiempos medidos por el último health check)"""
         try:
             metrics = {}
+            checks = health_checks.get('checks', {})
             
             # Tiempo de respuesta de base de datos
-            db_check = check_database()
+            db_check = checks.get('database', {})
             if 'response_time_ms' in db_check:
                 metrics['database_response_time_ms'] = db_check['response_time_ms']
             
             # Tiempo de respuesta de cache
-            cache_check = check_cache()
+            cache_check = checks.get('cache', {})
             if 'response_time_ms' in cache_check:
                 metrics['cache_response_time_ms'] = cache_check['response_time_ms']
             
             # Tiempo de respuesta de API externa
-            api_check = check_external_api()
+            api_check = checks.get('external_api', {})
             if 'response_time_ms' in api_check:
                 metrics['api_response_time_ms'] = api_check['response_time_ms']
             
@@ -211,6 +208,15 @@ class MonitoringService:
                     'response_time_ms': check_result.get('response_time_ms'),
                     'icon': '💾'
                 })
+            elif check_name == 'db_pool':
+                categories['database'].append({
+                    'name': 'Pool de conexiones',
+                    'type': 'database',
+                    'status': check_result.get('status', 'unknown'),
+                    'message': check_result.get('message', ''),
+                    'response_time_ms': check_result.get('wait_p99_ms'),
+                    'icon': '🔌'
+                })
             elif check_name == 'external_api':
                 categories['external'].append({
                     'name': 'API Externa',
@@ -298,6 +304,13 @@ class MonitoringService:
                     'message': check_result.get('message', f'{check_name} no está funcionando'),
                     'timestamp': datetime.now(CHILE_TZ).isoformat()
                 })
+            elif check_result.get('status') == 'warning':
+                alerts.append({
+                    'level': 'warning',
+                    'service': check_name,
+                    'message': check_result.get('message', f'{check_name} con advertencias'),
+                    'timestamp': datetime.now(CHILE_TZ).isoformat()
+                })
             elif check_result.get('status') == 'not_configured' and check_name == 'external_api':
                 alerts.append({
                     'level': 'info',
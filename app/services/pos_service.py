@@ -81,6 +81,41 @@ class PosService:
             logger.error(f"Error al obtener producto local {item_id}: {e}")
             return None
     
+    def get_products_by_ids(self, item_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene varios productos en una sola query (validación en lote del carrito)
+
+        Returns:
+            Dict item_id -> producto (mismo formato que get_product + active/is_kit);
+            los IDs inexistentes o no numéricos no aparecen
+        """
+        ids = set()
+        for item_id in item_ids:
+            try:
+                ids.add(int(item_id))
+            except (ValueError, TypeError):
+                continue
+        if not ids:
+            return {}
+        try:
+            from app.models.product_models import Product
+            products = {}
+            for p in Product.query.filter(Product.id.in_(ids)).all():
+                products[str(p.id)] = {
+                    'item_id': str(p.id),
+                    'name': p.name,
+                    'category': p.category,
+                    'price': float(p.price) if p.price else 0.0,
+                    'cost_price': float(p.cost_price) if p.cost_price else 0.0,
+                    'quantity': p.stock_quantity,
+                    'active': p.is_active is not False,
+                    'is_kit': bool(p.is_kit),
+                }
+            return products
+        except Exception as e:
+            logger.error(f"Error al obtener productos locales {sorted(ids)}: {e}")
+            return {}
+
     def get_item_kit(self, kit_id: str) -> Optional[Dict[str, Any]]:
         """Compatibilidad: trata kits como productos normales"""
         return self.get_product(kit_id)
@@ -317,12 +317,11 @@ class SaleDeliveryService:
                 timestamp=datetime.utcnow()
             )
             db.session.add(delivery)
+            db.session.flush()
             
             delivery_item.delivery_id = delivery.id
             
-            db.session.commit()
-            
-            # Enviar evento a n8n (después de commit exitoso)
+            # Evento a n8n en la misma transacción (outbox, se envía tras el commit)
             try:
                 from app.helpers.n8n_client import send_delivery_created
                 send_delivery_created(
@@ -335,6 +334,8 @@ class SaleDeliveryService:
             except Exception as e:
                 current_app.logger.warning(f"Error enviando evento a n8n: {e}")
             
+            db.session.commit()
+            
             message = f"{quantity} x {product_name} entregado(s)"
             if ingredients_consumed:
                 ingredientes_str = ", ".join([
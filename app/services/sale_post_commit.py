@@ -0,0 +1,153 @@
+"""
+Tareas post-commit de una venta del POS
+api_create_sale solo escribe venta + items + ticket QR (+ auditoría superadmin)
+en una transacción y encola estas tareas en outbox_events (app/helpers/post_commit.py); se ejecutan
+después del commit, fuera del request, con reintentos.
+
+Estado de entrega, auditoría y ticket son idempotentes (verifican si el efecto
+ya existe antes de crearlo). 'sale.realtime' (emisiones Socket.IO) y
+'sale.cash_drawer' no lo son: un reintento repite el efecto, por eso el cajón
+usa max_attempts=1 (se ejecuta a lo más una vez).
+Los datos de la sesión HTTP (admin, IP, nombre de caja) viajan en el payload.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+
+from app.helpers.post_commit import enqueue_many, task
+from app.models import db
+from app.models.pos_models import PosSale
+from app.utils.timezone import CHILE_TZ
+
+
+def enqueue_sale_tasks(
+    sale: PosSale,
+    context: Dict[str, Any],
+    ticket: Optional[Dict[str, Any]] = None
+) -> None:
+    """
+    Encola en la transacción actual los efectos secundarios de la venta.
+    Llamar después de db.session.flush() (requiere sale.id) y antes del commit.
+
+    Args:
+        sale: Venta recién creada
+        context: Datos del request (register_id, register_name, employee_id,
+                 employee_name, payment_type, total, items, is_admin, ip_address, session_id)
+        ticket: Ticket QR creado (ticket_id, display_code) o None
+    """
+    prefix = f"sale:{sale.id}"
+    payload = {'sale_id': sale.id, **context}
+    tasks: List[tuple] = [
+        ('sale.delivery_status', {'sale_id': sale.id}, f"{prefix}:delivery_status"),
+        ('sale.audit_log', payload, f"{prefix}:audit_log"),
+        ('sale.realtime', payload, f"{prefix}:realtime"),
+    ]
+    if ticket:
+        tasks.append(('sale.ticket_created', {**ticket, 'sale_id': sale.id,
+                                              'register_id': context.get('register_id')}, f"{prefix}:ticket"))
+    if context.get('payment_type') == 'Efectivo':
+        tasks.append(('sale.cash_drawer', {'sale_id': sale.id}, f"{prefix}:cash_drawer"))
+    enqueue_many(tasks)
+
+
+@task('sale.delivery_status')
+def crear_estado_entrega(payload: Dict[str, Any]) -> None:
+    """Estado de entrega para tracking (NO descuenta inventario; eso ocurre al entregar)"""
+    from app.models.sale_delivery_models import SaleDeliveryStatus
+    from app.services.sale_delivery_service import get_sale_delivery_service
+
+    sale = db.session.get(PosSale, payload['sale_id'])
+    if sale is None:
+        return
+    delivery_service = get_sale_delivery_service()
+    if SaleDeliveryStatus.query.filter_by(sale_id=delivery_service._get_sale_id_for_tracking(sale)).first():
+        return
+    delivery_service.create_delivery_status(sale)
+
+
+@task('sale.audit_log')
+def registrar_auditoria(payload: Dict[str, Any]) -> None:
+    """Auditoría de venta creada"""
+    from app.helpers.sale_audit_logger import SaleAuditLogger
+
+    SaleAuditLogger.log_sale_created(
+        sale_id=payload['sale_id'],
+        sale_data={
+            'total_amount': payload.get('total', 0),
+            'payment_type': payload.get('payment_type'),
+            'items': payload.get('items', [])
+        },
+        employee_id=payload.get('employee_id'),
+        employee_name=payload.get('employee_name'),
+        register_id=payload.get('register_id'),
+        ip_address=payload.get('ip_address'),
+        session_id=payload.get('session_id')
+    )
+
+
+@task('sale.ticket_created')
+def emitir_ticket_creado(payload: Dict[str, Any]) -> None:
+    """Actualiza 'Últimas entregas' en el POS"""
+    from app import socketio
+
+    socketio.emit('ticket_created', {
+        'ticket_id': payload['ticket_id'],
+        'display_code': payload['display_code'],
+        'sale_id': payload['sale_id'],
+        'register_id': payload.get('register_id'),
+        'created_at': datetime.now(CHILE_TZ).isoformat()
+    }, namespace='/pos')
+
+
+@task('sale.realtime')
+def emitir_venta_creada(payload: Dict[str, Any]) -> None:
+    """P0-015: Notificaciones en tiempo real SIN exponer datos sensibles en el canal público"""
+    from app import socketio
+    from app.helpers.dashboard_metrics_service import get_metrics_service
+
+    sale_id = payload['sale_id']
+    register_id = payload.get('register_id')
+    now = datetime.now(CHILE_TZ).isoformat()
+
+    # Evento público (sin datos sensibles)
+    socketio.emit('pos_sale_created', {
+        'register_id': register_id,
+        'event': 'sale_created',
+        'sale_id': sale_id,
+        'created_at': now
+    }, namespace='/pos')
+
+    # Evento privado para admin (solo si quien vendió es admin)
+    if payload.get('is_admin'):
+        sale = db.session.get(PosSale, sale_id)
+        if sale is not None:
+            socketio.emit('pos_sale_created_admin', {
+                'sale': sale.to_dict(),
+                'register_id': register_id,
+                'register_name': payload.get('register_name')
+            }, namespace='/admin')
+
+    # FASE 8: Actividad para visor de cajas (sin datos sensibles)
+    socketio.emit('register_activity', {
+        'register_id': register_id,
+        'action': 'sale_created',
+        'sale_id': sale_id,
+        'timestamp': now
+    }, namespace='/admin')
+
+    # Métricas del dashboard
+    metrics = get_metrics_service().get_all_metrics(use_cache=False)
+    socketio.emit('metrics_update', {'metrics': metrics}, namespace='/admin_stats')
+
+
+@task('sale.cash_drawer', max_attempts=1)
+def abrir_cajon(payload: Dict[str, Any]) -> None:
+    """Abre el cajón de dinero en pagos en efectivo (sin reintentos: no es idempotente)"""
+    from app.infrastructure.services.ticket_printer_service import TicketPrinterService
+
+    sale_id = payload['sale_id']
+    if TicketPrinterService().open_cash_drawer():
+        current_app.logger.info(f"✅ Cajón de dinero abierto para venta {sale_id} (pago en efectivo)")
+    else:
+        current_app.logger.warning(f"⚠️  No se pudo abrir cajón de dinero para venta {sale_id}")
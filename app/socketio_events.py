@@ -1,5 +1,5 @@
 from flask import session, request, current_app
-from flask_socketio import emit
+from flask_socketio import emit, join_room, leave_room
 from threading import Thread
 import time
 
@@ -121,6 +121,44 @@ def register_socketio_events(socketio):
         with current_app.app_context():
             current_app.logger.info('Survey WebSocket desconectado')
     
+    # Kiosko: estado de pagos en tiempo real (una sala por pago_id)
+    @socketio.on('connect', namespace='/kiosk')
+    def kiosk_connect():
+        with current_app.app_context():
+            current_app.logger.debug('Kiosko WebSocket conectado')
+    
+    @socketio.on('join_pago', namespace='/kiosk')
+    def kiosk_join_pago(data):
+        """
+        Suscribe al cliente a los cambios de estado de un pago.
+        Responde con el estado actual una sola vez para cubrir cambios
+        ocurridos antes de la suscripción; luego solo recibe pushes.
+        """
+        with current_app.app_context():
+            try:
+                pago_id = int((data or {}).get('pago_id'))
+            except (TypeError, ValueError):
+                emit('error', {'message': 'pago_id inválido'})
+                return
+            
+            from app.blueprints.kiosk.routes import pago_room, pago_status_payload
+            from app.models.kiosk_models import Pago
+            
+            join_room(pago_room(pago_id))
+            pago = Pago.query.get(pago_id)
+            if pago:
+                emit('pago_status', pago_status_payload(pago))
+    
+    @socketio.on('leave_pago', namespace='/kiosk')
+    def kiosk_leave_pago(data):
+        with current_app.app_context():
+            try:
+                pago_id = int((data or {}).get('pago_id'))
+            except (TypeError, ValueError):
+                return
+            from app.blueprints.kiosk.routes import pago_room
+            leave_room(pago_room(pago_id))
+    
     # FASE 8: Namespace para visor de cajas en tiempo real
     @socketio.on('connect', namespace='/admin')
     def admin_connect():
@@ -11,47 +11,8 @@ from app.application.middleware.shift_guard import require_shift_open
 
 survey_bp = Blueprint('survey', __name__, url_prefix='/encuesta')
 
-
-def ensure_survey_file():
-    """Asegura que existe el archivo CSV de encuestas"""
-    from app.helpers.production_check import is_production, get_safe_instance_path, ensure_not_production
-    ensure_not_production("El sistema de encuestas desde archivo")
-    instance_path = get_safe_instance_path() or current_app.instance_path
-    survey_file = os.path.join(instance_path, 'survey_responses.csv')
-    expected_header = ['timestamp', 'barra', 'rating', 'comment', 'fiesta_nombre', 'djs', 'bartender_nombre', 'fecha_sesion']
-    
-    if not os.path.exists(survey_file):
-        os.makedirs(instance_path, exist_ok=True)
-        with open(survey_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(expected_header)
-    else:
-        # Verificar y actualizar header si es necesario
-        try:
-            with open(survey_file, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                header = next(reader, None)
-                if header != expected_header:
-                    # Leer todas las filas existentes
-                    rows = list(reader)
-                    # Reescribir con nuevo header
-                    with open(survey_file, 'w', newline='', encoding='utf-8') as f:
-                        writer = csv.writer(f)
-                        writer.writerow(expected_header)
-                        # Migrar datos antiguos (agregar columnas vacías si faltan)
-                        for row in rows:
-                            while len(row) < len(expected_header):
-                                row.append('')
-                            writer.writerow(row[:len(expected_header)])
-        except Exception as e:
-            current_app.logger.error(f"Error actualizando header de survey: {e}")
-            # Si hay error, crear nuevo archivo
-            os.rename(survey_file, survey_file + '.backup')
-            with open(survey_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(expected_header)
-    
-    return survey_file
+# Las respuestas viven en SQL (survey_responses + agregados en survey_aggregates).
+# El survey_responses.csv heredado se importa una vez con scripts/importar_encuestas_csv.py
 
 
 def ensure_sessions_file():
@@ -156,70 +117,6 @@ def is_survey_active():
     # return False
 
 
-def save_survey_response(barra, rating, comment='', fiesta_nombre='', djs='', bartender_nombre=''):
-    """Guarda una respuesta de encuesta"""
-    survey_file = ensure_survey_file()
-    session_date = get_current_session_date()
-    
-    # Si no se proporciona fiesta_nombre/djs, obtener de la sesión activa
-    if not fiesta_nombre or not djs:
-        session_info = get_active_session_info()
-        if session_info:
-            fiesta_nombre = fiesta_nombre or session_info.get('fiesta_nombre', '')
-            djs = djs or session_info.get('djs', '')
-    
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    try:
-        with open(survey_file, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow([timestamp, barra, rating, comment, fiesta_nombre, djs, bartender_nombre, session_date])
-        return True
-    except Exception as e:
-        current_app.logger.error(f"Error guardando respuesta de encuesta: {e}")
-        return False
-
-
-def load_survey_responses(barra=None, days=None, session_date=None):
-    """Carga las respuestas de encuestas"""
-    survey_file = ensure_survey_file()
-    
-    if not os.path.exists(survey_file):
-        return []
-    
-    responses = []
-    cutoff_date = None
-    if days:
-        cutoff_date = datetime.now() - timedelta(days=days)
-    
-    try:
-        with open(survey_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # Si hay filtro de barra, aplicar
-                if barra and row.get('barra') != barra:
-                    continue
-                
-                # Si hay filtro de sesión, aplicar
-                if session_date and row.get('fecha_sesion') != session_date:
-                    continue
-                
-                # Si hay filtro de días, aplicar
-                if cutoff_date:
-                    try:
-                        response_date = datetime.strptime(row.get('timestamp', ''), '%Y-%m-%d %H:%M:%S')
-                        if response_date < cutoff_date:
-                            continue
-                    except:
-                        pass
-                
-                responses.append(row)
-    except Exception as e:
-        current_app.logger.error(f"Error cargando respuestas: {e}")
-    
-    return responses
-
-
 @survey_bp.route('/barra/<int:barra_num>')
 def survey_tablet(barra_num):
     """Vista para tablet en barra específica"""
@@ -1,32 +1,30 @@
 from flask import Blueprint, request, jsonify
-from datetime import datetime
-from app.services.inventario import descontar
+from app.services.inventario import descontar_lote
+from app.services.tickets import crear_ticket, validar_ticket as validar, get_ticket, listar_tickets
 
 tickets_bp = Blueprint("tickets_bp", __name__)
 
-tickets_store = {}
-
 @tickets_bp.get("/api/ticket/lista")
 def lista_tickets():
-    return jsonify(tickets_store)
+    return jsonify(listar_tickets(request.args.get("estado"), request.args.get("evento")))
+
+@tickets_bp.get("/api/ticket/<ticket_id>")
+def ver_ticket(ticket_id):
+    ticket = get_ticket(ticket_id)
+    if not ticket:
+        return jsonify({"ok":False,"error":"ticket_inexistente"}),404
+    return jsonify({"ok":True,"ticket":ticket_id,**ticket})
 
 @tickets_bp.post("/api/ticket/nuevo")
 def nuevo_ticket():
     data = request.json
     
     ticket_id = data.get("ticket_id")
-    productos = data.get("productos")
-    total = data.get("total")
-    evento = data.get("evento")
-    hora = datetime.now().isoformat()
-
-    tickets_store[ticket_id] = {
-        "estado":"pendiente",
-        "productos":productos,
-        "total":total,
-        "evento":evento,
-        "hora":hora
-    }
+    if not ticket_id:
+        return jsonify({"ok":False,"error":"ticket_id_requerido"}),400
+
+    if not crear_ticket(ticket_id, data.get("productos"), data.get("total"), data.get("evento")):
+        return jsonify({"ok":False,"error":"ticket_existente"}),400
 
     return jsonify({"ok":True,"ticket":ticket_id})
 
@@ -36,26 +34,24 @@ def validar_ticket():
     ticket_id = data.get("ticket_id")
     bartender = data.get("bartender")
 
-    ticket = tickets_store.get(ticket_id)
-
-    if not ticket:
-        return jsonify({"ok":False,"error":"ticket_inexistente"}),400
-
-    if ticket["estado"] == "validado":
-        return jsonify({"ok":False,"error":"ticket_ya_validado"}),400
-
-    ticket["estado"] = "validado"
-    ticket["bartender"] = bartender
+    error = validar(ticket_id, bartender)
+    if error:
+        return jsonify({"ok":False,"error":error}),400
     
     return jsonify({"ok":True,"ticket":ticket_id,"estado":"validado"})
 
 @tickets_bp.post("/api/ticket/entregar")
 def entregar():
     data = request.json
-    ticket_id = data.get("ticket_id")
-    producto = data.get("producto")
-    cantidad = data.get("cantidad",1)
-
-    if descontar(producto, cantidad):
-        return jsonify({"ok":True,"producto":producto,"cantidad":cantidad})
-    return jsonify({"ok":False,"error":"receta_no_definida"})
+    # lote: {"items": [{"producto": "mojito", "cantidad": 2}, ...]} o un solo producto
+    if data.get("items"):
+        items = [(i.get("producto"), i.get("cantidad", 1)) for i in data["items"]]
+    else:
+        items = [(data.get("producto"), data.get("cantidad",1))]
+
+    sin_receta = descontar_lote(items)
+    if sin_receta:
+        return jsonify({"ok":False,"error":"receta_no_definida","productos":sin_receta})
+    if len(items) == 1:
+        return jsonify({"ok":True,"producto":items[0][0],"cantidad":items[0][1]})
+    return jsonify({"ok":True,"items":[{"producto":p,"cantidad":c} for p, c in items]})
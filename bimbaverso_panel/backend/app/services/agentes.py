@@ -1,6 +1,6 @@
-import json
-import os
+from app.services.store import kv_get_all, kv_set, kv_set_many
 
+# JSON legado: se importa la primera vez que el store está vacío
 STATE_FILE = "agentes_state.json"
 
 # estado inicial si no existe
@@ -11,19 +11,14 @@ default_state = {
 }
 
 def load_state():
-    if not os.path.exists(STATE_FILE):
-        save_state(default_state)
-    with open(STATE_FILE, "r") as f:
-        return json.load(f)
+    return kv_get_all("agentes", default_state, STATE_FILE)
 
 def save_state(state):
-    with open(STATE_FILE, "w") as f:
-        json.dump(state, f)
+    kv_set_many("agentes", state)
 
 def set_estado(agente, estado):
-    state = load_state()
-    state[agente] = estado
-    save_state(state)
+    # upsert de una sola clave: no pisa cambios concurrentes de otros agentes
+    kv_set("agentes", agente, estado)
 
 def get_estado():
     return load_state()
@@ -1,5 +1,6 @@
-import json, os
+from app.services.store import kv_get_all, kv_set, kv_set_many
 
+# JSON legado: se importa la primera vez que el store está vacío
 CONFIG_FILE = "config_prompts.json"
 
 default_config = {
@@ -10,20 +11,14 @@ default_config = {
 }
 
 def load_config():
-    if not os.path.exists(CONFIG_FILE):
-        save_config(default_config)
-    with open(CONFIG_FILE,"r") as f:
-        return json.load(f)
+    return kv_get_all("prompts", default_config, CONFIG_FILE)
 
 def save_config(cfg):
-    with open(CONFIG_FILE,"w") as f:
-        json.dump(cfg,f,indent=2)
+    kv_set_many("prompts", cfg)
 
 def set_prompt_agente(agente, prompt_id):
-    cfg = load_config()
-    cfg[agente] = prompt_id
-    save_config(cfg)
-    return cfg
+    kv_set("prompts", agente, prompt_id)
+    return load_config()
 
 def get_prompt_activo(agente=None):
     cfg = load_config()
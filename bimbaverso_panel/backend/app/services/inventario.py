@@ -1,20 +1,70 @@
-insumos = {
+from collections import defaultdict
+
+from app.services.store import get_conn, transaction
+
+# valores iniciales (se siembran una vez en el store)
+insumos_iniciales = {
     "ron": 3000,
     "vodka": 2500,
     "limon": 1500,
     "jarabe": 1800
 }
 
-recetas = {
+recetas_iniciales = {
     "mojito": {"ron":60,"limon":30,"jarabe":20},
     "pisco sour": {"vodka":60,"limon":30,"jarabe":25}
 }
 
-def descontar(producto, cantidad=1):
-    if producto not in recetas:
-        return False
+def _sembrar():
+    conn = get_conn()
+    if conn.execute("SELECT 1 FROM insumos LIMIT 1").fetchone():
+        return
+    with transaction() as tx:
+        tx.executemany("INSERT OR IGNORE INTO insumos (nombre, stock) VALUES (?, ?)",
+                       list(insumos_iniciales.items()))
+        tx.executemany("INSERT OR IGNORE INTO recetas (producto, insumo, ml) VALUES (?, ?, ?)",
+                       [(p, i, ml) for p, receta in recetas_iniciales.items() for i, ml in receta.items()])
+
+def get_insumos():
+    _sembrar()
+    return {row["nombre"]: row["stock"] for row in get_conn().execute("SELECT nombre, stock FROM insumos")}
+
+def get_recetas():
+    _sembrar()
+    recetas = defaultdict(dict)
+    for row in get_conn().execute("SELECT producto, insumo, ml FROM recetas"):
+        recetas[row["producto"]][row["insumo"]] = row["ml"]
+    return dict(recetas)
 
-    for insumo, ml in recetas[producto].items():
-        insumos[insumo] -= ml*cantidad
-        
-    return True
+def descontar_lote(items):
+    """
+    Descuenta varios productos en una sola transacción.
+    items: [(producto, cantidad), ...]. Retorna los productos sin receta (no se descuenta nada si hay alguno).
+    """
+    _sembrar()
+    with transaction() as tx:
+        productos = {p for p, _ in items}
+        marcadores = ",".join("?" * len(productos))
+        filas = tx.execute(
+            f"SELECT producto, insumo, ml FROM recetas WHERE producto IN ({marcadores})", tuple(productos)
+        ).fetchall() if productos else []
+
+        con_receta = {row["producto"] for row in filas}
+        sin_receta = sorted(productos - con_receta)
+        if sin_receta:
+            return sin_receta
+
+        # agregar por insumo: un UPDATE por insumo aunque el lote tenga muchos productos
+        cantidades = defaultdict(int)
+        for producto, cantidad in items:
+            cantidades[producto] += cantidad
+        consumo = defaultdict(float)
+        for row in filas:
+            consumo[row["insumo"]] += row["ml"] * cantidades[row["producto"]]
+
+        tx.executemany("UPDATE insumos SET stock = stock - ? WHERE nombre = ?",
+                       [(ml, insumo) for insumo, ml in consumo.items()])
+    return []
+
+def descontar(producto, cantidad=1):
+    return not descontar_lote([(producto, cantidad)])
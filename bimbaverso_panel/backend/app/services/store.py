@@ -0,0 +1,127 @@
+"""
+Store transaccional del panel (SQLite en modo WAL)
+Estado de agentes, prompts activos, tickets e inventario compartidos entre
+workers y persistentes entre reinicios. Una conexión por hilo; las escrituras
+van en transacciones BEGIN IMMEDIATE.
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Por defecto en bimbaverso_panel/backend/, sin depender del directorio de trabajo
+DB_PATH = os.environ.get("BIMBAVERSO_DB") or os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "bimbaverso.db")
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    namespace TEXT NOT NULL,
+    clave TEXT NOT NULL,
+    valor TEXT,
+    PRIMARY KEY (namespace, clave)
+);
+CREATE TABLE IF NOT EXISTS tickets (
+    ticket_id TEXT PRIMARY KEY,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    productos TEXT,
+    total NUMERIC,
+    evento TEXT,
+    hora TEXT NOT NULL,
+    bartender TEXT,
+    validado_en TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_estado ON tickets (estado);
+CREATE INDEX IF NOT EXISTS idx_tickets_evento ON tickets (evento, estado);
+CREATE TABLE IF NOT EXISTS insumos (
+    nombre TEXT PRIMARY KEY,
+    stock REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS recetas (
+    producto TEXT NOT NULL,
+    insumo TEXT NOT NULL REFERENCES insumos (nombre),
+    ml REAL NOT NULL,
+    PRIMARY KEY (producto, insumo)
+);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+def get_conn():
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != DB_PATH:
+        # autocommit: las transacciones se abren explícitamente con transaction()
+        conn = sqlite3.connect(DB_PATH, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA foreign_keys=ON")
+        _local.conn = conn
+        _local.path = DB_PATH
+    _ensure_schema(conn)
+    return conn
+
+
+def _ensure_schema(conn):
+    if DB_PATH in _initialized:
+        return
+    with _init_lock:
+        if DB_PATH in _initialized:
+            return
+        conn.executescript(SCHEMA)
+        _initialized.add(DB_PATH)
+
+
+@contextmanager
+def transaction():
+    """Transacción de escritura: toma el lock de escritura al inicio (sin deadlocks de upgrade)"""
+    conn = get_conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    else:
+        conn.execute("COMMIT")
+
+
+def kv_get_all(namespace, defaults=None, legacy_file=None):
+    """Todas las claves del namespace; la primera vez siembra defaults (o el JSON legado)"""
+    conn = get_conn()
+    rows = conn.execute("SELECT clave, valor FROM kv WHERE namespace = ?", (namespace,)).fetchall()
+    if not rows and (defaults or legacy_file):
+        iniciales = dict(defaults or {})
+        if legacy_file and os.path.exists(legacy_file):
+            with open(legacy_file, "r") as f:
+                iniciales.update(json.load(f))
+        with transaction() as tx:
+            tx.executemany(
+                "INSERT OR IGNORE INTO kv (namespace, clave, valor) VALUES (?, ?, ?)",
+                [(namespace, k, json.dumps(v)) for k, v in iniciales.items()]
+            )
+        rows = conn.execute("SELECT clave, valor FROM kv WHERE namespace = ?", (namespace,)).fetchall()
+    return {row["clave"]: json.loads(row["valor"]) for row in rows}
+
+
+def kv_set(namespace, clave, valor):
+    with transaction() as tx:
+        tx.execute(
+            "INSERT INTO kv (namespace, clave, valor) VALUES (?, ?, ?) "
+            "ON CONFLICT (namespace, clave) DO UPDATE SET valor = excluded.valor",
+            (namespace, clave, json.dumps(valor))
+        )
+
+
+def kv_set_many(namespace, valores):
+    with transaction() as tx:
+        tx.executemany(
+            "INSERT INTO kv (namespace, clave, valor) VALUES (?, ?, ?) "
+            "ON CONFLICT (namespace, clave) DO UPDATE SET valor = excluded.valor",
+            [(namespace, k, json.dumps(v)) for k, v in valores.items()]
+        )
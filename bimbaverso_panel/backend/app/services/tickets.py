@@ -0,0 +1,59 @@
+import json
+from datetime import datetime
+
+from app.services.store import get_conn, transaction
+
+def _a_dict(row):
+    ticket = {
+        "estado": row["estado"],
+        "productos": json.loads(row["productos"]) if row["productos"] else None,
+        "total": row["total"],
+        "evento": row["evento"],
+        "hora": row["hora"],
+    }
+    if row["bartender"] is not None:
+        ticket["bartender"] = row["bartender"]
+        ticket["validado_en"] = row["validado_en"]
+    return ticket
+
+def crear_ticket(ticket_id, productos, total, evento):
+    """Retorna False si el ticket ya existía (no se sobrescribe)"""
+    with transaction() as tx:
+        cur = tx.execute(
+            "INSERT INTO tickets (ticket_id, estado, productos, total, evento, hora) "
+            "VALUES (?, 'pendiente', ?, ?, ?, ?) ON CONFLICT (ticket_id) DO NOTHING",
+            (ticket_id, json.dumps(productos), total, evento, datetime.now().isoformat())
+        )
+        return cur.rowcount == 1
+
+def validar_ticket(ticket_id, bartender):
+    """
+    Transición atómica pendiente -> validado.
+    Retorna None si se validó, o 'ticket_inexistente' / 'ticket_ya_validado'.
+    """
+    with transaction() as tx:
+        cur = tx.execute(
+            "UPDATE tickets SET estado = 'validado', bartender = ?, validado_en = ? "
+            "WHERE ticket_id = ? AND estado = 'pendiente'",
+            (bartender, datetime.now().isoformat(), ticket_id)
+        )
+        if cur.rowcount == 1:
+            return None
+        existe = tx.execute("SELECT 1 FROM tickets WHERE ticket_id = ?", (ticket_id,)).fetchone()
+        return "ticket_ya_validado" if existe else "ticket_inexistente"
+
+def get_ticket(ticket_id):
+    row = get_conn().execute("SELECT * FROM tickets WHERE ticket_id = ?", (ticket_id,)).fetchone()
+    return _a_dict(row) if row else None
+
+def listar_tickets(estado=None, evento=None):
+    filtros, params = [], []
+    if estado:
+        filtros.append("estado = ?")
+        params.append(estado)
+    if evento:
+        filtros.append("evento = ?")
+        params.append(evento)
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+    rows = get_conn().execute(f"SELECT * FROM tickets {where} ORDER BY hora", params)
+    return {row["ticket_id"]: _a_dict(row) for row in rows}
@@ -0,0 +1,35 @@
+-- ============================================================================
+-- MIGRACIÓN: IdempotencyRecord - Almacén de claves de idempotencia con TTL
+-- Fecha: 2026-10-19
+-- Descripción: Respuestas de operaciones de escritura (ventas, cierres,
+--              PaymentIntents, depósitos de guardarropía) guardadas por clave
+--              para devolverlas en reintentos sin re-ejecutar la lógica. Una
+--              fila 'pending' reserva la clave mientras la operación está en curso.
+--              Reemplaza las búsquedas por pos_sales.idempotency_key,
+--              register_closes.idempotency_key_close y
+--              register_sessions.idempotency_key_open (las columnas únicas se
+--              mantienen como respaldo).
+-- Compatibilidad: PostgreSQL (idempotente; en MySQL/SQLite la crea db.create_all())
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS idempotency_records (
+    scope VARCHAR(50) NOT NULL,
+    key VARCHAR(64) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'done',
+    status_code INTEGER NOT NULL DEFAULT 200,
+    content_type VARCHAR(100),
+    location VARCHAR(500),
+    body TEXT NOT NULL DEFAULT '',
+    created_at TIMESTAMP NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (scope, key)
+);
+
+-- Despliegues que ya crearon la tabla sin reservas 'pending'
+ALTER TABLE idempotency_records ADD COLUMN IF NOT EXISTS status VARCHAR(20) NOT NULL DEFAULT 'done';
+
+CREATE INDEX IF NOT EXISTS ix_idempotency_records_expires_at ON idempotency_records (expires_at);
+
+COMMIT;
@@ -0,0 +1,29 @@
+-- ============================================================================
+-- MIGRACIÓN: OutboxEvent - Tareas post-commit (outbox transaccional)
+-- Fecha: 2026-10-19
+-- Descripción: Efectos secundarios (tareas de venta, eventos a n8n, Socket.IO y
+--              email) escritos en la misma transacción que el cambio de negocio
+--              y ejecutados después del commit por app/helpers/post_commit.py.
+-- Compatibilidad: PostgreSQL (idempotente; en MySQL/SQLite la crea db.create_all())
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS outbox_events (
+    id SERIAL PRIMARY KEY,
+    topic VARCHAR(100) NOT NULL,
+    payload_json TEXT NOT NULL DEFAULT '{}',
+    dedup_key VARCHAR(200) UNIQUE,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    last_error TEXT,
+    available_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    processed_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_outbox_events_topic ON outbox_events (topic);
+CREATE INDEX IF NOT EXISTS ix_outbox_events_status_available ON outbox_events (status, available_at);
+
+COMMIT;
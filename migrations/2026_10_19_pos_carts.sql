@@ -0,0 +1,19 @@
+-- ============================================================================
+-- MIGRACIÓN: PosCart - Carrito del POS del lado del servidor
+-- Fecha: 2026-10-19
+-- Descripción: Carritos por sesión de caja (reemplaza session['pos_cart'] en la cookie)
+-- Compatibilidad: PostgreSQL (idempotente; en MySQL/SQLite la crea db.create_all())
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS pos_carts (
+    cart_key VARCHAR(100) PRIMARY KEY,  -- rs:<register_session_id> | reg:<register_id>
+    items_json TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_pos_carts_updated_at ON pos_carts (updated_at);
+
+COMMIT;
@@ -0,0 +1,20 @@
+-- ============================================================================
+-- MIGRACIÓN: ProgramacionPublicSnapshot - Payloads públicos materializados
+-- Fecha: 2026-10-19
+-- Descripción: Info pública de eventos (hoy/fecha, próximos, mes) precalculada
+--              al crear/editar/eliminar un evento. Los endpoints públicos para
+--              bots, n8n y el sitio la sirven con ETag/Last-Modified y
+--              Cache-Control (app/helpers/public_event_snapshots.py).
+-- Compatibilidad: PostgreSQL (idempotente; en MySQL/SQLite la crea db.create_all())
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS programacion_public_snapshots (
+    key VARCHAR(50) PRIMARY KEY,
+    payload_json TEXT NOT NULL,
+    etag VARCHAR(64) NOT NULL,
+    updated_at TIMESTAMP NOT NULL
+);
+
+COMMIT;
@@ -0,0 +1,32 @@
+-- ============================================================================
+-- MIGRACIÓN: StockAlertState - Estado de alertas de stock por ingrediente y ubicación
+-- Fecha: 2026-10-19
+-- Descripción: El motor de alertas (app/helpers/stock_alerts.py) evalúa stock,
+--              umbral y consumo promedio de 7 días de todos los pares en una
+--              query y guarda aquí el resultado; el dashboard de inventario lee
+--              esta tabla y solo los cambios de estado generan notificación.
+-- Compatibilidad: PostgreSQL (idempotente; en MySQL/SQLite la crea db.create_all())
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS stock_alert_states (
+    id SERIAL PRIMARY KEY,
+    ingredient_id INTEGER NOT NULL REFERENCES ingredients(id),
+    location VARCHAR(100) NOT NULL,
+    state VARCHAR(20) NOT NULL DEFAULT 'ok',
+    quantity NUMERIC(12, 3) NOT NULL DEFAULT 0,
+    low_threshold NUMERIC(12, 3),
+    avg_daily_consumption NUMERIC(12, 3) NOT NULL DEFAULT 0,
+    changed_at TIMESTAMP NOT NULL,
+    evaluated_at TIMESTAMP NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_stock_alert_ingredient_location
+    ON stock_alert_states (ingredient_id, location);
+CREATE INDEX IF NOT EXISTS ix_stock_alert_states_ingredient_id ON stock_alert_states (ingredient_id);
+CREATE INDEX IF NOT EXISTS ix_stock_alert_states_location ON stock_alert_states (location);
+CREATE INDEX IF NOT EXISTS ix_stock_alert_states_state ON stock_alert_states (state);
+CREATE INDEX IF NOT EXISTS ix_stock_alert_states_evaluated_at ON stock_alert_states (evaluated_at);
+
+COMMIT;
@@ -0,0 +1,54 @@
+-- ============================================================================
+-- MIGRACIÓN: SurveyAggregate - Agregados incrementales de encuestas
+-- Fecha: 2026-10-19
+-- Descripción: Conteos por sesión, barra y hora (histograma de ratings) que
+--              sirven /encuesta/api/results sin recorrer survey_responses.
+--              Se rellena desde survey_responses al aplicarla; una sesión con
+--              respuestas y sin filas de agregados se reconstruye al leerla.
+-- Compatibilidad: PostgreSQL (idempotente; en MySQL/SQLite la crea db.create_all())
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS survey_aggregates (
+    id SERIAL PRIMARY KEY,
+    fecha_sesion DATE NOT NULL,
+    barra VARCHAR(100) NOT NULL,
+    hora INTEGER NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    sum_rating INTEGER NOT NULL DEFAULT 0,
+    rating_1 INTEGER NOT NULL DEFAULT 0,
+    rating_2 INTEGER NOT NULL DEFAULT 0,
+    rating_3 INTEGER NOT NULL DEFAULT 0,
+    rating_4 INTEGER NOT NULL DEFAULT 0,
+    rating_5 INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_survey_aggregates_sesion_barra_hora
+    ON survey_aggregates (fecha_sesion, barra, hora);
+
+-- Backfill: recalcula todas las celdas desde las respuestas existentes
+INSERT INTO survey_aggregates (
+    fecha_sesion, barra, hora, total, sum_rating,
+    rating_1, rating_2, rating_3, rating_4, rating_5, updated_at
+)
+SELECT fecha_sesion, barra, CAST(EXTRACT(HOUR FROM timestamp) AS INTEGER),
+       COUNT(*), SUM(rating),
+       COUNT(*) FILTER (WHERE rating = 1), COUNT(*) FILTER (WHERE rating = 2),
+       COUNT(*) FILTER (WHERE rating = 3), COUNT(*) FILTER (WHERE rating = 4),
+       COUNT(*) FILTER (WHERE rating = 5), NOW()
+FROM survey_responses
+WHERE rating BETWEEN 1 AND 5
+GROUP BY fecha_sesion, barra, CAST(EXTRACT(HOUR FROM timestamp) AS INTEGER)
+ON CONFLICT (fecha_sesion, barra, hora) DO UPDATE SET
+    total = EXCLUDED.total,
+    sum_rating = EXCLUDED.sum_rating,
+    rating_1 = EXCLUDED.rating_1,
+    rating_2 = EXCLUDED.rating_2,
+    rating_3 = EXCLUDED.rating_3,
+    rating_4 = EXCLUDED.rating_4,
+    rating_5 = EXCLUDED.rating_5,
+    updated_at = EXCLUDED.updated_at;
+
+COMMIT;
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Importación única del survey_responses.csv heredado a SQL
+- Inserta las respuestas que aún no están en survey_responses (re-ejecutable sin duplicar)
+- Reconstruye survey_aggregates de cada sesión importada
+- Renombra el CSV a .importado para que no se vuelva a leer
+
+Uso:
+    python scripts/importar_encuestas_csv.py [ruta/al/survey_responses.csv]
+"""
+import os
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app
+from app.infrastructure.repositories.sql_survey_repository import SqlSurveyRepository
+
+
+def main():
+    """Ejecuta la importación"""
+    app = create_app()
+    with app.app_context():
+        csv_path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(app.instance_path) / 'survey_responses.csv'
+        print("=" * 60)
+        print("📋 IMPORTACIÓN DE ENCUESTAS DESDE CSV")
+        print("=" * 60)
+
+        if not csv_path.exists():
+            print(f"  ⏭️  No existe {csv_path}, nada que importar")
+            return 0
+
+        try:
+            result = SqlSurveyRepository().import_legacy_csv(str(csv_path))
+        except Exception as e:
+            print(f"  ❌ Error importando {csv_path}: {e}")
+            return 1
+
+        print(f"  ✅ Respuestas importadas: {result['imported']}")
+        print(f"  ✓ Ya existentes (omitidas): {result['skipped']}")
+        print(f"  ⚠️  Filas inválidas: {result['invalid']}")
+        print(f"  ✅ Sesiones con agregados reconstruidos: {result['sessions']}")
+
+        imported_path = csv_path.with_name(csv_path.name + '.importado')
+        os.replace(csv_path, imported_path)
+        print(f"\n  📦 CSV renombrado a {imported_path}")
+        print("=" * 60)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
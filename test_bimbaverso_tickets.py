@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Prueba de la validación de tickets del panel bimbaverso
+(bimbaverso_panel/backend/app/services/tickets.py sobre store.py): un ticket
+se valida una sola vez, también con intentos simultáneos desde conexiones y
+procesos distintos.
+
+El backend del panel es una app aparte cuyo paquete también se llama `app`,
+así que cada escenario corre en su propio intérprete con el paquete del panel
+(sin su app Flask, que el store no necesita).
+
+Uso:
+    python -m pytest test_bimbaverso_tickets.py -q
+"""
+import sys
+import os
+import json
+import subprocess
+import tempfile
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bimbaverso_panel', 'backend')
+
+# Carga app.services del panel sin ejecutar app/__init__.py (crea la app Flask con CORS)
+_PRELUDIO = f"""
+import json, os, sys, threading, types
+paquete = types.ModuleType('app')
+paquete.__path__ = [os.path.join({BACKEND!r}, 'app')]
+sys.modules['app'] = paquete
+from app.services import tickets
+"""
+
+_CARRERA = _PRELUDIO + """
+barrera = threading.Barrier(int(sys.argv[2]))
+resultados = []
+
+def validar(n):
+    barrera.wait()
+    resultados.append(tickets.validar_ticket(sys.argv[1], f'bartender-{n}'))
+
+hilos = [threading.Thread(target=validar, args=(n,)) for n in range(int(sys.argv[2]))]
+for hilo in hilos:
+    hilo.start()
+for hilo in hilos:
+    hilo.join()
+print(json.dumps(resultados))
+"""
+
+
+def _correr(codigo, db_path, *args):
+    resultado = subprocess.run(
+        [sys.executable, '-c', codigo, *args], cwd=BACKEND, capture_output=True, text=True, timeout=60,
+        env={**os.environ, 'BIMBAVERSO_DB': db_path}
+    )
+    assert resultado.returncode == 0, resultado.stderr
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def test_ticket_se_valida_una_sola_vez():
+    with tempfile.TemporaryDirectory() as directorio:
+        db_path = os.path.join(directorio, 'bimbaverso.db')
+        codigo = _PRELUDIO + """
+creado = tickets.crear_ticket('T-1', [{'producto': 'Pisco Sour', 'cantidad': 2}], 11000, 'noche')
+duplicado = tickets.crear_ticket('T-1', [], 0, 'otra')
+primero = tickets.validar_ticket('T-1', 'ana')
+segundo = tickets.validar_ticket('T-1', 'beto')
+print(json.dumps([creado, duplicado, primero, segundo, tickets.validar_ticket('T-404', 'ana'), tickets.get_ticket('T-1')]))
+"""
+        creado, duplicado, primero, segundo, inexistente, ticket = _correr(codigo, db_path)
+        assert creado and not duplicado
+        assert primero is None and segundo == 'ticket_ya_validado'
+        assert inexistente == 'ticket_inexistente'
+        assert ticket['estado'] == 'validado' and ticket['bartender'] == 'ana' and ticket['total'] == 11000
+
+
+def test_validaciones_simultaneas_en_conexiones_y_procesos_distintos():
+    with tempfile.TemporaryDirectory() as directorio:
+        db_path = os.path.join(directorio, 'bimbaverso.db')
+        _correr(_PRELUDIO + """
+print(json.dumps([tickets.crear_ticket('T-1', [], 5000, 'noche'), tickets.crear_ticket('T-2', [], 5000, 'noche')]))
+""", db_path)
+
+        # Un hilo por intento: cada hilo usa su propia conexión SQLite
+        resultados = _correr(_CARRERA, db_path, 'T-1', '8')
+        assert resultados.count(None) == 1
+        assert sorted(r for r in resultados if r) == ['ticket_ya_validado'] * 7
+
+        # Dos procesos a la vez sobre el mismo ticket
+        procesos = [
+            subprocess.Popen([sys.executable, '-c', _CARRERA, 'T-2', '4'], cwd=BACKEND, text=True,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             env={**os.environ, 'BIMBAVERSO_DB': db_path})
+            for _ in range(2)
+        ]
+        resultados = []
+        for proceso in procesos:
+            salida, error = proceso.communicate(timeout=60)
+            assert proceso.returncode == 0, error
+            resultados.extend(json.loads(salida.strip().splitlines()[-1]))
+        assert resultados.count(None) == 1 and len(resultados) == 8
+
+
+if __name__ == '__main__':
+    test_ticket_se_valida_una_sola_vez()
+    test_validaciones_simultaneas_en_conexiones_y_procesos_distintos()
+    print("✅ Tickets bimbaverso OK")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Prueba de los perfiles de pool y del pool instrumentado (app/helpers/db_pool.py)
+
+Uso:
+    python -m pytest test_db_pool.py -q
+"""
+import sys
+import os
+import tempfile
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import NullPool
+
+from app.helpers import db_pool
+from app.helpers.db_pool import InstrumentedQueuePool, build_engine_options, compute_pool_settings, pool_stats
+
+VARIABLES = ('DB_POOL_PROFILE', 'DB_MAX_CONNECTIONS', 'WEB_CONCURRENCY', 'GUNICORN_WORKERS',
+             'GUNICORN_WORKER_CONNECTIONS', 'DB_POOL_SIZE', 'DB_MAX_OVERFLOW', 'DB_EXTERNAL_POOLER')
+
+
+def _con_entorno(**valores):
+    anteriores = {k: os.environ.pop(k, None) for k in VARIABLES}
+    os.environ.update({k: str(v) for k, v in valores.items()})
+    return anteriores
+
+
+def _restaurar(anteriores):
+    for k in VARIABLES:
+        os.environ.pop(k, None)
+        if anteriores[k] is not None:
+            os.environ[k] = anteriores[k]
+
+
+def test_perfiles_reparten_el_presupuesto():
+    anteriores = _con_entorno(WEB_CONCURRENCY=4, DB_MAX_CONNECTIONS=60)
+    try:
+        settings = compute_pool_settings('vm')
+        assert settings['pool_size'] + settings['max_overflow'] == 15
+        assert settings['pool_size'] == 10
+
+        os.environ['DB_POOL_SIZE'] = '3'
+        assert compute_pool_settings('vm')['pool_size'] == 3
+
+        opciones = build_engine_options('postgresql', is_cloud_run=True, is_production=True)
+        assert opciones['poolclass'] is InstrumentedQueuePool
+        assert opciones['pool_use_lifo'] is True
+
+        os.environ['DB_EXTERNAL_POOLER'] = 'true'
+        assert build_engine_options('postgresql', True, True)['poolclass'] is NullPool
+        assert 'poolclass' not in build_engine_options('sqlite', False, False)
+    finally:
+        _restaurar(anteriores)
+
+
+def test_pool_instrumentado_cuenta_timeouts():
+    with tempfile.TemporaryDirectory() as directorio:
+        engine = create_engine(f"sqlite:///{os.path.join(directorio, 'pool.db')}",
+                               poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.1)
+        db_pool._take_window()
+        conn = engine.connect()
+        try:
+            engine.connect()
+            assert False, 'debió agotar el pool'
+        except exc.TimeoutError:
+            pass
+
+        stats = pool_stats(engine)
+        assert stats['checked_out'] == 1 and stats['capacity'] == 1
+        assert stats['usage_percent'] == 100
+
+        ventana = db_pool._take_window()
+        assert ventana['timeouts'] == 1
+        assert ventana['waits'].count == 2
+        assert ventana['waits'].max >= 0.1
+        conn.close()
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    test_perfiles_reparten_el_presupuesto()
+    test_pool_instrumentado_cuenta_timeouts()
+    print("✅ Pool de conexiones OK")
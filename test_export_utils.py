@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Prueba de las exportaciones en streaming (app/helpers/export_utils.py)
+
+Uso:
+    python -m pytest test_export_utils.py -q
+"""
+import sys
+import os
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from app.helpers.export_utils import DataExporter, parse_date_range, STREAM_FLUSH_ROWS
+
+HEADER = ['sale_id', 'item_name', 'qty']
+
+
+def _filas(n):
+    for i in range(n):
+        yield [f'BMB {i}', 'Piscola', Decimal('2')]
+
+
+def _respuesta(fmt, filas):
+    app = Flask(__name__)
+    with app.test_request_context():
+        response = DataExporter.stream(filas, HEADER, 'prueba', fmt)
+        assert response.is_streamed or response.status_code == 404
+        return response.status_code, response.mimetype, response.get_data()
+
+
+def test_csv_en_bloques():
+    consumidas = []
+
+    def filas():
+        for fila in _filas(STREAM_FLUSH_ROWS * 2 + 3):
+            consumidas.append(fila)
+            yield fila
+
+    app = Flask(__name__)
+    with app.test_request_context():
+        response = DataExporter.stream(filas(), HEADER, 'prueba', 'csv')
+        assert len(consumidas) == 1  # solo se leyó la primera fila para detectar vacío
+        bloques = list(response.iter_encoded())
+    assert len(bloques) == 3
+    lineas = b''.join(bloques).decode().splitlines()
+    assert lineas[0] == 'sale_id,item_name,qty'
+    assert len(lineas) == STREAM_FLUSH_ROWS * 2 + 4
+
+
+def test_ndjson_y_vacio():
+    status, mimetype, cuerpo = _respuesta('ndjson', _filas(3))
+    assert status == 200 and mimetype == 'application/x-ndjson'
+    registros = [json.loads(linea) for linea in cuerpo.decode().splitlines()]
+    assert registros[2] == {'sale_id': 'BMB 2', 'item_name': 'Piscola', 'qty': 2.0}
+
+    status, _, _ = _respuesta('csv', iter([]))
+    assert status == 404
+
+
+def test_xlsx_write_only():
+    from openpyxl import load_workbook
+
+    status, _, cuerpo = _respuesta('xlsx', _filas(50))
+    assert status == 200
+    hoja = load_workbook(io.BytesIO(cuerpo), read_only=True).active
+    filas = list(hoja.iter_rows(values_only=True))
+    assert filas[0] == tuple(HEADER)
+    assert len(filas) == 51
+
+
+def test_rango_de_fechas():
+    desde, hasta = parse_date_range('2025-01-01', '2025-01-31')
+    assert desde == datetime(2025, 1, 1)
+    assert hasta == datetime(2025, 2, 1)
+    assert parse_date_range(None, None) == (None, None)
+    try:
+        parse_date_range('01/01/2025', None)
+        assert False, 'debió fallar'
+    except ValueError:
+        pass
+
+
+def test_formato_no_soportado():
+    app = Flask(__name__)
+    with app.test_request_context():
+        try:
+            DataExporter.stream(_filas(1), HEADER, 'prueba', 'json')
+            assert False, 'debió fallar'
+        except ValueError:
+            pass
+
+
+if __name__ == '__main__':
+    test_csv_en_bloques()
+    test_ndjson_y_vacio()
+    test_xlsx_write_only()
+    test_rango_de_fechas()
+    test_formato_no_soportado()
+    print("✅ Exportaciones OK")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Prueba del scheduler de health checks (app/helpers/health_scheduler.py):
+ejecución en paralelo, timeout por check y lectura desde el snapshot.
+
+Uso:
+    python -m pytest test_health_scheduler.py -q
+"""
+import sys
+import os
+import time
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from app.helpers.health_scheduler import HealthScheduler
+
+
+def _lento(segundos, status='healthy'):
+    def check():
+        time.sleep(segundos)
+        return {'status': status, 'message': f'{segundos}s'}
+    return check
+
+
+def test_checks_en_paralelo_y_timeout():
+    scheduler = HealthScheduler(max_workers=4)
+    scheduler.register('database', _lento(0.3), ttl=60, timeout=2)
+    scheduler.register('cache', _lento(0.3), ttl=60, timeout=2)
+    scheduler.register('nginx', _lento(1.5), ttl=60, timeout=0.5, app_context=False)
+
+    t0 = time.perf_counter()
+    scheduler.ensure_started(Flask(__name__))
+    assert time.perf_counter() - t0 < 1.4  # no espera al check lento más allá del primer refresco
+
+    snapshot = scheduler.snapshot()
+    assert snapshot['database']['status'] == 'healthy'
+    assert snapshot['cache']['status'] == 'healthy'
+    assert snapshot['nginx']['status'] == 'unhealthy'
+    assert 'Timeout' in snapshot['nginx']['message']
+
+    resumen = scheduler.health_checks()
+    assert resumen['status'] == 'healthy'
+    assert set(resumen['checks']) == {'database', 'cache', 'external_api', 'db_pool'}
+
+    # Cuando el check lento termina, su resultado reemplaza al timeout
+    time.sleep(1.2)
+    assert scheduler.snapshot(['nginx'])['nginx']['status'] == 'healthy'
+
+
+def test_snapshot_no_ejecuta_checks():
+    llamadas = []
+
+    def contar():
+        llamadas.append(1)
+        return {'status': 'healthy'}
+
+    scheduler = HealthScheduler(max_workers=2)
+    scheduler.register('database', contar, ttl=60, timeout=1)
+    scheduler.ensure_started(Flask(__name__))
+
+    for _ in range(20):
+        scheduler.snapshot()
+    assert len(llamadas) == 1
+    assert scheduler.snapshot()['database']['age_seconds'] < 60
+
+
+if __name__ == '__main__':
+    test_checks_en_paralelo_y_timeout()
+    test_snapshot_no_ejecuta_checks()
+    print("✅ Scheduler de health checks OK")
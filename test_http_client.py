@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Prueba del cliente HTTP compartido (app/infrastructure/external/http_client.py):
+keep-alive por host, reintentos solo en métodos idempotentes y circuit breaker.
+
+Uso:
+    python -m pytest test_http_client.py -q
+"""
+import sys
+import os
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.infrastructure.circuit_breaker import CircuitBreaker, _breakers
+from app.infrastructure.external.http_client import HttpClient, UpstreamUnavailable
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    hits = 0
+
+    def _responder(self):
+        _Upstream.hits += 1
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        body = b'{"ok": true}'
+        self.send_response(503 if self.path == '/falla' else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Set-Cookie', 'sesion=otro-usuario')
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _responder
+    do_POST = _responder
+
+    def log_message(self, *args):
+        pass
+
+
+def _servidor():
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), _Upstream)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_port}"
+
+
+def test_keep_alive_y_sin_cookies_compartidas():
+    servidor, base = _servidor()
+    try:
+        cliente = HttpClient()
+        for _ in range(3):
+            assert cliente.get(f"{base}/ok", upstream='prueba_ok').json() == {'ok': True}
+
+        host = cliente.stats()['hosts'][base]
+        assert host['connections_opened'] == 1 and host['requests'] == 3
+        assert len(cliente.session_for(base).cookies) == 0
+    finally:
+        servidor.shutdown()
+        _breakers.pop('http:prueba_ok', None)
+
+
+def test_reintentos_y_circuit_breaker():
+    servidor, base = _servidor()
+    try:
+        cliente = HttpClient()
+        _Upstream.hits = 0
+        assert cliente.get(f"{base}/falla", upstream='prueba_falla').status_code == 503
+        assert _Upstream.hits == 3  # GET: 1 + 2 reintentos
+
+        _Upstream.hits = 0
+        assert cliente.post(f"{base}/falla", upstream='prueba_falla').status_code == 503
+        assert _Upstream.hits == 1  # POST enviado no se reintenta
+
+        for _ in range(3):
+            cliente.get(f"{base}/falla", upstream='prueba_falla', retries=0)
+        _Upstream.hits = 0
+        try:
+            cliente.get(f"{base}/falla", upstream='prueba_falla')
+            assert False, 'el circuito debió abrirse'
+        except UpstreamUnavailable:
+            pass
+        assert _Upstream.hits == 0
+    finally:
+        servidor.shutdown()
+        _breakers.pop('http:prueba_falla', None)
+
+
+def test_circuit_breaker_compartido_entre_hilos():
+    breaker = CircuitBreaker(failure_threshold=10_000, recovery_timeout=30)
+
+    def fallar():
+        raise ConnectionError('timeout')
+
+    def golpear():
+        for _ in range(200):
+            try:
+                breaker.call(fallar)
+            except ConnectionError:
+                pass
+
+    hilos = [threading.Thread(target=golpear) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert breaker.get_state()['failure_count'] == 1600
+
+
+if __name__ == '__main__':
+    test_keep_alive_y_sin_cookies_compartidas()
+    test_reintentos_y_circuit_breaker()
+    test_circuit_breaker_compartido_entre_hilos()
+    print("✅ Cliente HTTP compartido OK")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Prueba del almacén de idempotencia (app/helpers/idempotency_helper.py): las
+respuestas se guardan por clave con TTL, los reintentos las reciben sin
+re-ejecutar la vista, los duplicados concurrentes chocan con la reserva
+'pending' y las respuestas recientes se sirven desde memoria.
+
+Uso:
+    python -m pytest test_idempotency_store.py -q
+"""
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, jsonify
+from sqlalchemy import event
+
+from app.models import db
+from app.models.idempotency_models import IdempotencyRecord
+from app.helpers import idempotency_helper
+from app.helpers.idempotency_helper import IdempotencyStore, bind_idempotency_key, idempotent
+
+
+def test_almacen_y_decorador():
+    with tempfile.TemporaryDirectory() as directorio:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directorio, 'idempotencia.db')}"
+        app.secret_key = 'prueba'
+        db.init_app(app)
+        ejecuciones = []
+
+        @app.route('/venta', methods=['POST'])
+        @idempotent('prueba.venta')
+        def venta():
+            ejecuciones.append('venta')
+            replay = bind_idempotency_key('carrito-1')
+            if replay is not None:
+                return replay
+            return jsonify({'success': True, 'sale_id': len(ejecuciones)}), 201
+
+        @app.route('/falla', methods=['POST'])
+        @idempotent('prueba.falla')
+        def falla():
+            ejecuciones.append('falla')
+            raise RuntimeError('impresora desconectada')
+
+        @app.route('/rechazo', methods=['POST'])
+        @idempotent('prueba.rechazo')
+        def rechazo():
+            ejecuciones.append('rechazo')
+            return jsonify({'success': False, 'error': 'Caja cerrada'}), 200
+
+        store, idempotency_helper._store = idempotency_helper._store, IdempotencyStore()
+        try:
+            with app.app_context():
+                IdempotencyRecord.__table__.create(db.engine)
+                motor = idempotency_helper._store
+                cliente = app.test_client()
+
+                # Con sesión de cajero el header Idempotency-Key es la clave del cliente
+                with cliente.session_transaction() as sesion:
+                    sesion['pos_employee_id'] = '7'
+                primera = cliente.post('/venta', headers={'Idempotency-Key': 'abc'})
+                assert primera.status_code == 201 and ejecuciones == ['venta']
+
+                # Reintento con el mismo header: respuesta guardada, la vista no corre
+                consultas = []
+                event.listen(db.engine, 'before_cursor_execute', lambda *args: consultas.append(args[2]))
+                repetida = cliente.post('/venta', headers={'Idempotency-Key': 'abc'})
+                assert repetida.status_code == 201
+                assert repetida.get_json() == primera.get_json()
+                assert repetida.headers['Idempotent-Replay'] == 'true'
+                assert ejecuciones == ['venta'] and consultas == []
+
+                # Sin header, la clave derivada por la vista también devuelve la venta guardada
+                derivada = cliente.post('/venta')
+                assert derivada.get_json() == primera.get_json()
+                assert ejecuciones == ['venta', 'venta']
+
+                # Las respuestas con success=False no se guardan
+                cliente.post('/rechazo', headers={'Idempotency-Key': 'xyz'})
+                cliente.post('/rechazo', headers={'Idempotency-Key': 'xyz'})
+                assert ejecuciones.count('rechazo') == 2
+
+                # Duplicado concurrente: la clave está reservada por un request en curso
+                reservada, _ = motor.reserve('prueba.venta', 'client:7:en-curso')
+                assert reservada
+                espera, idempotency_helper.IDEMPOTENCY_WAIT_SECONDS = idempotency_helper.IDEMPOTENCY_WAIT_SECONDS, 0
+                try:
+                    conflicto = cliente.post('/venta', headers={'Idempotency-Key': 'en-curso'})
+                finally:
+                    idempotency_helper.IDEMPOTENCY_WAIT_SECONDS = espera
+                assert conflicto.status_code == 409
+                assert ejecuciones.count('venta') == 2
+                # Al completarse, el duplicado recibe la respuesta original
+                motor.complete('prueba.venta', ['client:7:en-curso'], '{"success": true, "sale_id": 9}')
+                assert cliente.post('/venta', headers={'Idempotency-Key': 'en-curso'}).get_json()['sale_id'] == 9
+
+                # Si la vista lanza una excepción la reserva se libera y se puede reintentar
+                assert cliente.post('/falla', headers={'Idempotency-Key': 'f1'}).status_code == 500
+                assert cliente.post('/falla', headers={'Idempotency-Key': 'f1'}).status_code == 500
+                assert ejecuciones.count('falla') == 2
+                assert IdempotencyRecord.query.filter_by(scope='prueba.falla').count() == 0
+
+                # Otro proceso (sin memoria) lee las claves en lote desde la BD
+                otro = IdempotencyStore(max_entries=0)
+                encontrados = otro.get_many('prueba.venta', ['carrito-1', 'client:7:abc', 'desconocida'])
+                assert set(encontrados) == {'carrito-1', 'client:7:abc'}
+                assert encontrados['carrito-1']['status_code'] == 201
+
+                # TTL: un registro vencido no se devuelve y se purga
+                assert otro.put('prueba.cierre', 'caja-1', '{"success": true}')
+                IdempotencyRecord.query.filter_by(scope='prueba.cierre').update(
+                    {'expires_at': datetime.utcnow() - timedelta(seconds=1)}
+                )
+                db.session.commit()
+                assert otro.get('prueba.cierre', 'caja-1') is None
+                assert otro.purge_expired() == 1
+                assert IdempotencyRecord.query.count() == 3
+                db.engine.dispose()
+        finally:
+            idempotency_helper._store = store
+
+
+if __name__ == '__main__':
+    test_almacen_y_decorador()
+    print("✅ Almacén de idempotencia OK")
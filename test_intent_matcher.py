@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Prueba de exactitud y benchmark del clasificador de intenciones compilado
+(IntentRouter y BimbaBotEngine comparten app/application/services/intent_matcher.py)
+
+Uso:
+    python -m pytest test_intent_matcher.py -q
+    python test_intent_matcher.py        # muestra el benchmark
+"""
+import sys
+import os
+import time
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.application.services.intent_router import IntentRouter
+from app.application.services.bimba_bot_engine import BimbaBotEngine
+
+# (mensaje, intent de IntentRouter, intent de BimbaBotEngine)
+CORPUS = [
+    ('Hola', 'saludo', 'saludo'),
+    ('hola!', 'saludo', 'saludo'),
+    ('Buenas noches', 'saludo', 'saludo'),
+    ('hola amigo', 'saludo', 'saludo'),
+    ('holi', 'unknown', 'saludo'),
+    ('hey que tal', 'unknown', 'saludo'),
+    ('Hola, ¿qué hay hoy?', 'evento_hoy', 'evento_hoy'),
+    ('¿Qué hay hoy?', 'evento_hoy', 'evento_hoy'),
+    ('q hay esta noche', 'evento_hoy', 'evento_hoy'),
+    ('que pasa hoy en bimba', 'evento_hoy', 'evento_hoy'),
+    ('hay algo hoy?', 'evento_hoy', 'evento_hoy'),
+    ('tienen fiesta hoy', 'unknown', None),
+    ('evento de hoy', 'evento_hoy', 'evento_hoy'),
+    ('¿Cuál es el evento del sábado?', 'evento_hoy', 'evento_hoy'),
+    ('¿Cómo va la noche?', 'estado_noche', 'estado_noche'),
+    ('como esta todo', 'estado_noche', 'estado_noche'),
+    ('como andamos hoy', 'estado_noche', 'estado_noche'),
+    ('cómo está el ambiente?', 'estado_noche', 'estado_noche'),
+    ('¿Próximos eventos?', 'proximos_eventos', 'proximos_eventos'),
+    ('que viene la otra semana', 'proximos_eventos', 'proximos_eventos'),
+    ('qué sigue después', 'proximos_eventos', 'proximos_eventos'),
+    ('siguientes fiestas', 'proximos_eventos', 'proximos_eventos'),
+    ('¿Cuánto cuesta la entrada?', 'precios', 'precios'),
+    ('precios', 'precios', 'precios'),
+    ('tarifa general', 'precios', 'precios'),
+    ('cuanto vale', 'precios', 'precios'),
+    ('entradas preventa', 'precios', 'precios'),
+    ('¿A qué hora abren?', 'horario', 'horario'),
+    ('horario', 'horario', 'horario'),
+    ('hasta que hora es', 'horario', 'horario'),
+    ('cuándo abren', 'horario', 'horario'),
+    ('lista de espera', 'lista', 'lista'),
+    ('quiero reservar una mesa', 'lista', 'lista'),
+    ('reservas para 6', 'lista', 'lista'),
+    ('¿Quién toca hoy?', 'djs', 'djs'),
+    ('que dj hay', 'djs', 'djs'),
+    ('qué música ponen', 'djs', 'djs'),
+    ('djs del viernes', 'djs', 'djs'),
+    ('como funciona el sistema', 'como_funciona', 'como_funciona'),
+    ('como se pide', 'como_funciona', None),
+    ('explicame el qr', 'unknown', None),
+    ('que es una jornada', 'unknown', None),
+    ('flujo de ventas', 'unknown', None),
+    ('gracias', 'unknown', None),
+    ('ok', 'unknown', None),
+    ('jajaja', 'unknown', None),
+    ('me encanta bimba', 'unknown', None),
+    ('dónde queda el local', 'unknown', None),
+    # Mensajes con varias intenciones: gana la de mayor prioridad
+    ('hola, cuanto cuesta la entrada y a que hora abren?', 'precios', 'precios'),
+    ('buenas, quien toca esta noche?', 'djs', 'djs'),
+    ('hey, hay lista?', 'lista', 'lista'),
+    ('que hay hoy y cuanto cuesta', 'evento_hoy', 'evento_hoy'),
+    ('a que hora es el evento de hoy', 'evento_hoy', 'evento_hoy'),
+    ('el dj de la proxima fiesta', 'djs', 'djs'),
+    ('hola que tal', 'unknown', 'saludo'),
+    ('saludos', 'saludo', 'saludo'),
+    ('hi', 'saludo', 'saludo'),
+    ('hello compa', 'saludo', 'saludo'),
+]
+
+# Presupuesto por mensaje en la ruta de reglas (milisegundos)
+MAX_MS_POR_MENSAJE = 1.0
+
+
+def test_exactitud_corpus():
+    """Cada mensaje del corpus debe clasificarse con la intención esperada"""
+    errores = []
+    for mensaje, esperado_router, esperado_engine in CORPUS:
+        router = IntentRouter.detectar_intent(mensaje)
+        engine = BimbaBotEngine._detect_intent(mensaje)
+        if router != esperado_router or engine != esperado_engine:
+            errores.append((mensaje, router, esperado_router, engine, esperado_engine))
+    assert not errores, f"Clasificaciones incorrectas: {errores}"
+
+
+def test_mensaje_vacio():
+    assert IntentRouter.detectar_intent('') == IntentRouter.INTENT_UNKNOWN
+    assert IntentRouter.detectar_intent('   ') == IntentRouter.INTENT_UNKNOWN
+
+
+def benchmark(repeticiones=200):
+    """Retorna (ms promedio por mensaje de IntentRouter, ms promedio de BimbaBotEngine)"""
+    mensajes = [m for m, _, _ in CORPUS]
+    total = len(mensajes) * repeticiones
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for mensaje in mensajes:
+            IntentRouter.detectar_intent(mensaje)
+    router_ms = (time.perf_counter() - inicio) * 1000 / total
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for mensaje in mensajes:
+            BimbaBotEngine._detect_intent(mensaje)
+    engine_ms = (time.perf_counter() - inicio) * 1000 / total
+
+    return router_ms, engine_ms
+
+
+def test_benchmark_sub_milisegundo():
+    router_ms, engine_ms = benchmark(repeticiones=50)
+    assert router_ms < MAX_MS_POR_MENSAJE, f"IntentRouter: {router_ms:.4f} ms/mensaje"
+    assert engine_ms < MAX_MS_POR_MENSAJE, f"BimbaBotEngine: {engine_ms:.4f} ms/mensaje"
+
+
+if __name__ == '__main__':
+    test_exactitud_corpus()
+    print(f"✅ Exactitud: {len(CORPUS)} mensajes clasificados correctamente")
+    router_ms, engine_ms = benchmark()
+    print(f"⏱️  IntentRouter:   {router_ms * 1000:.1f} µs/mensaje")
+    print(f"⏱️  BimbaBotEngine: {engine_ms * 1000:.1f} µs/mensaje")
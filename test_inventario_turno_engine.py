@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Prueba del motor de desviaciones por turno (app/helpers/inventario_turno_engine.py):
+esperado vs reportado de todos los insumos con un número fijo de queries.
+
+Uso:
+    python -m pytest test_inventario_turno_engine.py -q
+"""
+import sys
+import os
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from sqlalchemy import event
+
+from app.models import db
+from app.models.bartender_turno_models import (
+    BartenderTurno, TurnoStockInicial, TurnoStockFinal, MermaInventario, TurnoDesviacionInventario
+)
+from app.models.inventory_stock_models import Ingredient, InventoryMovement
+from app.models.sale_delivery_models import DeliveryItem, SaleDeliveryStatus
+from app.helpers.inventario_turno import InventarioTurnoHelper
+
+TABLAS = [
+    Ingredient, BartenderTurno, TurnoStockInicial, TurnoStockFinal, MermaInventario,
+    TurnoDesviacionInventario, InventoryMovement, SaleDeliveryStatus, DeliveryItem
+]
+
+
+def _poblar():
+    ron = Ingredient(name='Ron', base_unit='ml', cost_per_unit=100)
+    limon = Ingredient(name='Limón', base_unit='unidad', cost_per_unit=2)
+    hielo = Ingredient(name='Hielo', base_unit='gr', cost_per_unit=0)
+    turno = BartenderTurno(
+        bartender_id='b1', bartender_name='Bartender', ubicacion='barra_pista', estado='cerrado',
+        fecha_hora_apertura=datetime(2026, 10, 18, 22, 0), fecha_hora_cierre=datetime(2026, 10, 19, 4, 0)
+    )
+    db.session.add_all([ron, limon, hielo, turno])
+    db.session.flush()
+
+    for insumo, inicial, final in ((ron, 10, 10), (limon, 5, 5), (hielo, 100, None)):
+        db.session.add(TurnoStockInicial(turno_id=turno.id, insumo_id=insumo.id,
+                                         cantidad_inicial=inicial, valor_costo_inicial=0))
+        if final is not None:
+            db.session.add(TurnoStockFinal(turno_id=turno.id, insumo_id=insumo.id,
+                                           cantidad_final=final, valor_costo_final=0))
+    db.session.add_all([
+        InventoryMovement(ingredient_id=ron.id, location='barra_pista', movement_type='entrada',
+                          quantity=5, turno_id=turno.id),
+        InventoryMovement(ingredient_id=ron.id, location='barra_pista', movement_type='venta',
+                          quantity=-3, turno_id=turno.id),
+        MermaInventario(insumo_id=ron.id, ubicacion='barra_pista', turno_id=turno.id, cantidad_mermada=1,
+                        motivo='rotura', costo_merma=100, usuario_id='u1'),
+        SaleDeliveryStatus(sale_id='BMB-1-1'),
+        DeliveryItem(sale_id='BMB-1-1', product_name='Mojito', quantity_delivered=1, bartender_id='b1',
+                     location='barra_pista', delivered_at=datetime(2026, 10, 18, 23, 0),
+                     ingredients_consumed=[{'ingrediente': 'Limón', 'cantidad': 1}]),
+    ])
+    db.session.commit()
+    return turno.id, ron.id, limon.id
+
+
+def test_desviaciones_en_bloque():
+    with tempfile.TemporaryDirectory() as directorio:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directorio, 'turnos.db')}"
+        db.init_app(app)
+        with app.app_context():
+            for modelo in TABLAS:
+                modelo.__table__.create(db.engine)
+            turno_id, ron_id, limon_id = _poblar()
+            helper = InventarioTurnoHelper()
+
+            consultas = []
+            event.listen(db.engine, 'before_cursor_execute', lambda *args: consultas.append(args[2]))
+            ok, _, desviaciones = helper.calcular_desviaciones_turno(turno_id)
+            assert ok
+            # Carga en bloque: no crece con la cantidad de insumos
+            assert len(consultas) <= 12
+
+            por_insumo = {d.insumo_id: d for d in desviaciones}
+            assert set(por_insumo) == {ron_id, limon_id}  # Hielo sin stock final
+
+            # Ron: 10 + 5 - 3 - 1 merma = 11 esperado, 10 reportado
+            ron = por_insumo[ron_id]
+            assert ron.stock_esperado_turno == Decimal('11.0')
+            assert ron.diferencia_turno == Decimal('-1.0')
+            assert ron.costo_diferencia == Decimal('-100.0')
+            assert ron.tipo == 'perdida_critica'
+
+            # Limón: 5 - 1 consumido en entrega = 4 esperado, 5 reportado
+            limon = por_insumo[limon_id]
+            assert limon.stock_esperado_turno == Decimal('4.0')
+            assert limon.diferencia_porcentual_turno == Decimal('25.0')
+            assert limon.tipo == 'ganancia_rara'
+
+            assert helper.calcular_stock_esperado_turno(turno_id, ron_id) == Decimal('11.0')
+
+            # Recalcular actualiza los mismos registros
+            helper.calcular_desviaciones_turno(turno_id)
+            assert TurnoDesviacionInventario.query.filter_by(turno_id=turno_id).count() == 2
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    test_desviaciones_en_bloque()
+    print("✅ Desviaciones de turno OK")
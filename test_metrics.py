@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Prueba de los histogramas de memoria constante y la agregación entre workers
+(app/helpers/metrics.py)
+
+Uso:
+    python -m pytest test_metrics.py -q
+"""
+import sys
+import os
+import json
+import random
+import tempfile
+import time
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.helpers.metrics import Histogram, MetricsRegistry, HISTOGRAM_GROWTH, STALE_SECONDS
+from app.helpers.performance_utils import PerformanceMonitor
+
+
+def test_percentiles_con_error_acotado():
+    random.seed(7)
+    valores = [random.lognormvariate(-3, 1) for _ in range(20000)]
+    hist = Histogram()
+    for v in valores:
+        hist.observe(v)
+
+    ordenados = sorted(valores)
+    for p in (50, 95, 99):
+        exacto = ordenados[int(len(ordenados) * p / 100) - 1]
+        aproximado = hist.percentile(p)
+        assert abs(aproximado - exacto) / exacto < HISTOGRAM_GROWTH - 1, (p, exacto, aproximado)
+
+
+def test_memoria_constante():
+    hist = Histogram()
+    buckets = len(hist.counts)
+    for i in range(50000):
+        hist.observe((i % 1000) / 1000.0)
+    assert len(hist.counts) == buckets
+    assert hist.count == 50000
+
+
+def test_agregacion_entre_workers():
+    with tempfile.TemporaryDirectory() as directorio:
+        worker_a = MetricsRegistry(metrics_dir=directorio)
+        worker_b = MetricsRegistry(metrics_dir=directorio)
+        for _ in range(10):
+            worker_a.observe('latencia', 0.010, {'endpoint': 'venta'})
+            worker_b.observe('latencia', 0.100, {'endpoint': 'venta'})
+        worker_a.inc('ventas', 3)
+        worker_b.inc('ventas', 2)
+
+        # Simular otro proceso: el snapshot de B queda en disco con otro pid
+        snapshot_b = worker_b.snapshot()
+        snapshot_b['pid'] = 999999
+        with open(os.path.join(directorio, 'worker-999999.json'), 'w') as f:
+            json.dump(snapshot_b, f)
+
+        data = worker_a.to_json()
+        assert data['workers'] == 2
+        assert data['counters']['ventas'][0]['value'] == 5
+        latencia = data['histograms']['latencia'][0]
+        assert latencia['count'] == 20
+        assert latencia['p50'] < 0.011
+        assert latencia['p95'] > 0.09
+
+        texto = worker_a.render_prometheus()
+        assert 'latencia{endpoint="venta",quantile="0.99"}' in texto
+        assert 'ventas 5' in texto
+
+
+def _escribir_worker(directorio, registro, pid, antiguedad=0):
+    snapshot = registro.snapshot()
+    snapshot['pid'] = pid
+    path = os.path.join(directorio, f'worker-{pid}.json')
+    with open(path, 'w') as f:
+        json.dump(snapshot, f)
+    if antiguedad:
+        momento = time.time() - antiguedad
+        os.utime(path, (momento, momento))
+    return path
+
+
+def test_workers_muertos_pasan_a_la_base_retirada():
+    with tempfile.TemporaryDirectory() as directorio:
+        vivo = MetricsRegistry(metrics_dir=directorio)
+        vivo.inc('ventas', 1)
+        muerto = MetricsRegistry(metrics_dir=None)
+        muerto.inc('ventas', 4)
+        muerto.observe('latencia', 0.05)
+        muerto.set_gauge('en_curso', 3)
+        path = _escribir_worker(directorio, muerto, 999998, antiguedad=STALE_SECONDS + 60)
+
+        data = vivo.to_json()
+        assert not os.path.exists(path)
+        assert os.path.exists(os.path.join(directorio, 'retired.json'))
+        assert data['workers'] == 1
+        assert data['counters']['ventas'][0]['value'] == 5
+        assert data['histograms']['latencia'][0]['count'] == 1
+        assert 'en_curso' not in data['gauges']
+
+        # Otro worker muerto se suma a la base sin perder el anterior
+        _escribir_worker(directorio, muerto, 999997, antiguedad=STALE_SECONDS + 60)
+        assert vivo.to_json()['counters']['ventas'][0]['value'] == 9
+
+        # Worker nuevo que reutiliza el pid de uno muerto: el archivo viejo se retira antes de pisarlo
+        _escribir_worker(directorio, muerto, os.getpid())
+        vivo.flush()
+        data = vivo.to_json()
+        assert data['counters']['ventas'][0]['value'] == 13
+        assert data['histograms']['latencia'][0]['count'] == 3
+
+
+def test_performance_monitor_usa_histogramas():
+    PerformanceMonitor.clear_stats()
+
+    @PerformanceMonitor.track('prueba.suma')
+    def suma(a, b):
+        return a + b
+
+    for i in range(1000):
+        suma(i, i)
+
+    stats = PerformanceMonitor.get_stats('prueba.suma')
+    assert stats['call_count'] == 1000
+    assert stats['p99_time'] is not None
+    assert isinstance(PerformanceMonitor._call_stats['prueba.suma'], Histogram)
+    PerformanceMonitor.clear_stats()
+
+
+if __name__ == '__main__':
+    test_percentiles_con_error_acotado()
+    test_memoria_constante()
+    test_agregacion_entre_workers()
+    test_workers_muertos_pasan_a_la_base_retirada()
+    test_performance_monitor_usa_histogramas()
+    print("✅ Métricas OK")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Prueba de la cache de respuestas de OpenAI: clave semántica, single-flight,
+compuerta de concurrencia y contexto de evento (sin llamar a la API)
+
+Uso:
+    python -m pytest test_openai_response_cache.py -q
+"""
+import sys
+import os
+import threading
+import time
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.infrastructure.external.openai_response_cache import OpenAIResponseCache
+
+
+def _clave(cache, mensaje, contexto='jornada-1'):
+    return cache.build_key(contexto, [{'role': 'user', 'content': mensaje}], 'prompt', 'gpt-4o-mini', 0.3, 200)
+
+
+def test_clave_semantica():
+    cache = OpenAIResponseCache()
+    assert _clave(cache, '¿Qué hay HOY?') == _clave(cache, 'que  hay hoy')
+    assert _clave(cache, 'que hay hoy') != _clave(cache, 'que hay mañana')
+    assert _clave(cache, 'que hay hoy') != _clave(cache, 'que hay hoy', contexto='jornada-2')
+
+
+def test_single_flight_y_cache():
+    cache = OpenAIResponseCache(max_concurrency=2)
+    llamadas = []
+
+    def compute():
+        llamadas.append(1)
+        time.sleep(0.2)
+        return 'Hoy tenemos fiesta 💜'
+
+    clave = _clave(cache, 'que hay hoy')
+    resultados = []
+    hilos = [
+        threading.Thread(target=lambda: resultados.append(cache.get_or_compute(clave, compute)))
+        for _ in range(10)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(llamadas) == 1
+    assert resultados == ['Hoy tenemos fiesta 💜'] * 10
+
+    # La siguiente pregunta equivalente sale de cache
+    assert cache.get_or_compute(clave, compute) == 'Hoy tenemos fiesta 💜'
+    stats = cache.stats()
+    assert stats['api_calls'] == 1
+    assert stats['coalesced'] == 9
+    assert stats['hits'] == 1
+
+
+def test_errores_no_se_cachean():
+    cache = OpenAIResponseCache()
+    clave = _clave(cache, 'precios')
+    assert cache.get_or_compute(clave, lambda: None) is None
+    assert cache.get_or_compute(clave, lambda: 'Entrada $5.000') == 'Entrada $5.000'
+    assert cache.stats()['errors'] == 1
+
+
+def test_compuerta_de_concurrencia():
+    cache = OpenAIResponseCache(max_concurrency=2)
+    activos = []
+    maximo = []
+    lock = threading.Lock()
+
+    def compute():
+        with lock:
+            activos.append(1)
+            maximo.append(len(activos))
+        time.sleep(0.05)
+        with lock:
+            activos.pop()
+        return 'ok'
+
+    hilos = [
+        threading.Thread(target=cache.get_or_compute, args=(_clave(cache, f'pregunta {i}'), compute))
+        for i in range(8)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert max(maximo) <= 2
+    assert cache.stats()['api_calls'] == 8
+
+
+def test_cambio_de_contexto_limpia_cache():
+    cache = OpenAIResponseCache()
+    cache.set_context('jornada-1')
+    cache.get_or_compute(_clave(cache, 'horario'), lambda: 'Abrimos 23:00')
+    assert cache.stats()['entries'] == 1
+
+    cache.set_context('jornada-2')
+    stats = cache.stats()
+    assert stats['entries'] == 0
+    assert stats['context_resets'] == 1
+
+
+if __name__ == '__main__':
+    test_clave_semantica()
+    test_single_flight_y_cache()
+    test_errores_no_se_cachean()
+    test_compuerta_de_concurrencia()
+    test_cambio_de_contexto_limpia_cache()
+    print("✅ Cache de respuestas de OpenAI OK")
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Prueba de la carga masiva de planilla (app/application/services/planilla_bulk_service.py):
+la planilla de apertura y los turnos de cierre deben quedar iguales a los que
+arma el camino fila por fila (calcular_costo_total + calcular_y_congelar_pago,
+EmployeeShift con sus propios cálculos).
+
+Uso:
+    python -m pytest test_planilla_bulk_service.py -q
+"""
+import sys
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytz
+from flask import Flask
+
+from app.models import db
+from app.models.cargo_models import Cargo
+from app.models.cargo_salary_models import CargoSalaryConfig
+from app.models.employee_shift_models import EmployeeShift
+from app.models.jornada_models import Jornada, PlanillaTrabajador
+from app.models.pos_models import Employee
+from app.models.programacion_models import ProgramacionAsignacion
+from app.helpers.timezone_utils import CHILE_TZ
+from app.application.services.planilla_bulk_service import PlanillaBulkService
+
+FECHA = '2026-10-17'
+CAMPOS_PLANILLA = ('id_empleado', 'nombre_empleado', 'rol', 'hora_inicio', 'hora_fin', 'costo_hora',
+                   'costo_total', 'area', 'cargo_id', 'sueldo_snapshot', 'bono_snapshot', 'pago_total', 'origen')
+CAMPOS_TURNO = ('employee_id', 'employee_name', 'jornada_id', 'fecha_turno', 'tipo_turno', 'cargo',
+                'hora_inicio', 'hora_fin', 'horas_trabajadas', 'sueldo_por_turno', 'sueldo_turno', 'bonos')
+
+
+def _app(directorio):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directorio, 'planilla.db')}"
+    db.init_app(app)
+    with app.app_context():
+        for modelo in (Cargo, CargoSalaryConfig, Employee, Jornada, ProgramacionAsignacion,
+                       PlanillaTrabajador, EmployeeShift):
+            modelo.__table__.create(db.engine)
+    return app
+
+
+def _sembrar():
+    bartender = Cargo(nombre='Bartender')
+    guardia = Cargo(nombre='Guardia')
+    db.session.add_all([bartender, guardia])
+    db.session.flush()
+    db.session.add_all([
+        CargoSalaryConfig(cargo='Bartender', sueldo_por_turno=35000, bono_fijo=5000),
+        CargoSalaryConfig(cargo='SEGURIDAD', sueldo_por_turno=30000, bono_fijo=0),
+        # Guardia sin configuración: el pago queda sin congelar
+        Employee(id='1', name='Ana'),
+        Employee(id='2', name='Beto'),
+        Employee(id='3', name='Caro'),
+    ])
+    jornada = Jornada(fecha_jornada=FECHA, tipo_turno='Noche', nombre_fiesta='Prueba',
+                      horario_apertura_programado='22:00')
+    db.session.add(jornada)
+    db.session.flush()
+    fecha = date(2026, 10, 17)
+    db.session.add_all([
+        ProgramacionAsignacion(fecha=fecha, tipo_turno='NOCHE', cargo_id=bartender.id, trabajador_id='1'),
+        ProgramacionAsignacion(fecha=fecha, tipo_turno='NOCHE', cargo_id=bartender.id, trabajador_id='2'),
+        ProgramacionAsignacion(fecha=fecha, tipo_turno='NOCHE', cargo_id=guardia.id, trabajador_id='3'),
+        # Trabajador inexistente: se salta
+        ProgramacionAsignacion(fecha=fecha, tipo_turno='NOCHE', cargo_id=guardia.id, trabajador_id='99'),
+    ])
+    db.session.commit()
+    return jornada
+
+
+def _resumen(objetos, campos):
+    """Tuplas comparables: numéricos (Decimal/float) redondeados a 2 decimales"""
+    def valor(v):
+        if v is None or isinstance(v, (str, datetime, bool)):
+            return v
+        return round(float(v), 2)
+    return sorted(tuple(valor(getattr(o, c)) for c in campos) for o in objetos)
+
+
+def _planilla_fila_por_fila(hora_inicio, hora_fin):
+    """Camino anterior: un PlanillaTrabajador por asignación y un INSERT por fila (en otra jornada)"""
+    jornada = Jornada(fecha_jornada=FECHA, tipo_turno='Noche', nombre_fiesta='Referencia',
+                      horario_apertura_programado='22:00')
+    db.session.add(jornada)
+    db.session.flush()
+    filas = []
+    for asignacion in ProgramacionAsignacion.query.order_by(ProgramacionAsignacion.id).all():
+        trabajador = db.session.get(Employee, asignacion.trabajador_id)
+        if not trabajador:
+            continue
+        costo_hora = 0.0
+        config_cargo = CargoSalaryConfig.query.filter_by(cargo=asignacion.cargo.nombre).first()
+        if config_cargo and config_cargo.sueldo_por_turno:
+            inicio = datetime.strptime(hora_inicio, '%H:%M')
+            fin = datetime.strptime(hora_fin, '%H:%M')
+            if fin < inicio:
+                fin += timedelta(days=1)
+            costo_hora = float(config_cargo.sueldo_por_turno) / ((fin - inicio).total_seconds() / 3600.0)
+        fila = PlanillaTrabajador(
+            jornada_id=jornada.id,
+            id_empleado=str(asignacion.trabajador_id).strip(),
+            nombre_empleado=trabajador.name,
+            rol=asignacion.cargo.nombre.upper(),
+            hora_inicio=hora_inicio,
+            hora_fin=hora_fin,
+            costo_hora=costo_hora,
+            area=asignacion.cargo.nombre.upper(),
+            cargo_id=asignacion.cargo_id,
+            origen='programacion'
+        )
+        fila.calcular_costo_total()
+        fila.calcular_y_congelar_pago(cargo_nombre=asignacion.cargo.nombre)
+        db.session.add(fila)
+        filas.append(fila)
+    db.session.commit()
+    return _resumen(filas, CAMPOS_PLANILLA)
+
+
+def _turnos_fila_por_fila(jornada):
+    """Un EmployeeShift por fila de planilla, con horas y sueldo calculados por el modelo"""
+    turnos = []
+    for fila in PlanillaTrabajador.query.filter_by(jornada_id=jornada.id).all():
+        inicio = datetime.strptime(f"{jornada.fecha_jornada} {fila.hora_inicio}", '%Y-%m-%d %H:%M')
+        fin = datetime.strptime(f"{jornada.fecha_jornada} {fila.hora_fin}", '%Y-%m-%d %H:%M')
+        if fin < inicio:
+            fin += timedelta(days=1)
+        turno = EmployeeShift(
+            employee_id=fila.id_empleado, employee_name=fila.nombre_empleado, jornada_id=jornada.id,
+            fecha_turno=jornada.fecha_jornada, tipo_turno=jornada.tipo_turno, cargo=fila.rol,
+            hora_inicio=CHILE_TZ.localize(inicio).astimezone(pytz.UTC).replace(tzinfo=None),
+            hora_fin=CHILE_TZ.localize(fin).astimezone(pytz.UTC).replace(tzinfo=None),
+            bonos=0.0, descuentos=0.0, pagado=False
+        )
+        if fila.pago_total is not None:
+            turno.sueldo_por_turno = fila.sueldo_snapshot
+            turno.bonos = fila.bono_snapshot or 0
+        else:
+            config = CargoSalaryConfig.query.filter_by(cargo=fila.rol).first()
+            turno.sueldo_por_turno = config.sueldo_por_turno if config else 0
+            turno.bonos = config.bono_fijo if config else 0
+        turno.horas_trabajadas = turno.calcular_horas_trabajadas()
+        turno.sueldo_turno = turno.calcular_sueldo_turno()
+        turnos.append(turno)
+    return _resumen(turnos, CAMPOS_TURNO)
+
+
+def test_planilla_masiva_igual_a_fila_por_fila():
+    with tempfile.TemporaryDirectory() as directorio:
+        app = _app(directorio)
+        with app.app_context():
+            jornada = _sembrar()
+            esperado = _planilla_fila_por_fila('22:00', '05:00')
+
+            servicio = PlanillaBulkService()
+            assert servicio.materializar_planilla_desde_programacion(jornada, FECHA, 'Noche', '22:00', '05:00') == 3
+            # Segunda vez: los trabajadores ya están en la planilla
+            assert servicio.materializar_planilla_desde_programacion(jornada, FECHA, 'Noche', '22:00', '05:00') == 0
+            db.session.commit()
+
+            filas = PlanillaTrabajador.query.filter_by(jornada_id=jornada.id).all()
+            obtenido = _resumen(filas, CAMPOS_PLANILLA)
+            assert obtenido == esperado
+            assert {f.id_empleado: f.pago_total and float(f.pago_total) for f in filas} == {'1': 40000.0, '2': 40000.0, '3': None}
+            db.engine.dispose()
+
+
+def test_turnos_de_cierre_iguales_a_fila_por_fila():
+    with tempfile.TemporaryDirectory() as directorio:
+        app = _app(directorio)
+        with app.app_context():
+            jornada = _sembrar()
+            servicio = PlanillaBulkService()
+            servicio.materializar_planilla_desde_programacion(jornada, FECHA, 'Noche', '22:00', '05:00')
+            # Fila manual sin pago congelado: toma la configuración del rol al cerrar
+            db.session.add(PlanillaTrabajador(jornada_id=jornada.id, id_empleado='4', nombre_empleado='Dani',
+                                              rol='SEGURIDAD', hora_inicio='23:00', hora_fin='04:30',
+                                              costo_hora=0, costo_total=0))
+            db.session.commit()
+            esperado = _turnos_fila_por_fila(jornada)
+
+            assert servicio.materializar_turnos_cierre(jornada) == 4
+            # Idempotente por empleado
+            assert servicio.materializar_turnos_cierre(jornada) == 0
+            db.session.commit()
+
+            turnos = EmployeeShift.query.filter_by(jornada_id=jornada.id).all()
+            assert _resumen(turnos, CAMPOS_TURNO) == esperado
+            assert {t.employee_id: float(t.horas_trabajadas) for t in turnos} == {'1': 7.0, '2': 7.0, '3': 7.0, '4': 5.5}
+            assert all(t.estado == 'completo' for t in turnos)
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    test_planilla_masiva_igual_a_fila_por_fila()
+    test_turnos_de_cierre_iguales_a_fila_por_fila()
+    print("✅ Planilla masiva OK")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Prueba del carrito del POS del lado del servidor (app/helpers/pos_cart_store.py)
+y de la validación en lote al crear la venta.
+
+Uso:
+    python -m pytest test_pos_cart_store.py -q
+"""
+import sys
+import os
+import tempfile
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, session
+
+from app.models import db, PosCart
+from app.helpers.pos_cart_store import PosCartStore, current_cart_key
+from app.helpers.sale_security_validator import validate_inventory_availability, validate_prices_match_api
+
+
+def _app(directorio):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directorio, 'carts.db')}"
+    db.init_app(app)
+    with app.app_context():
+        PosCart.__table__.create(db.engine)
+    return app
+
+
+def _mutaciones(store, key):
+    store.add_items(key, [{'item_id': '1', 'name': 'Pisco', 'price': 5000, 'quantity': 2},
+                          {'item_id': '2', 'name': 'Cerveza', 'price': 3000, 'quantity': 1}])
+    cart = store.add_items(key, [{'item_id': '1', 'name': 'Pisco', 'price': 4000, 'quantity': 1}])
+    pisco = next(item for item in cart if item['item_id'] == '1')
+    assert pisco['quantity'] == 3 and pisco['price'] == 5000  # mantiene el precio del carrito
+    assert pisco['subtotal'] == 15000
+
+    cart = store.remove_item(key, '2', 5)
+    assert [item['item_id'] for item in cart] == ['1']
+    assert store.get(key) == cart
+
+    store.clear(key)
+    assert store.get(key) == []
+
+
+def test_carrito_en_memoria_y_en_bd():
+    with tempfile.TemporaryDirectory() as directorio:
+        app = _app(directorio)
+        with app.test_request_context():
+            session['pos_register_id'] = '3'
+            session['pos_register_session_id'] = 17
+            key = current_cart_key()
+            assert key == 'rs:17'
+
+            _mutaciones(PosCartStore(backend='memory'), key)
+            _mutaciones(PosCartStore(backend='db'), key)
+
+            # Dos workers comparten el carrito a través de la tabla pos_carts
+            PosCartStore(backend='db').add_items(key, [{'item_id': '9', 'name': 'Agua', 'price': 1000, 'quantity': 1}])
+            assert PosCartStore(backend='db').get(key)[0]['item_id'] == '9'
+
+            # Un carrito que quedó en la cookie se migra al store una vez
+            session['pos_cart'] = [{'item_id': '4', 'name': 'Ron', 'price': 6000, 'quantity': 1, 'subtotal': 6000}]
+            otro = PosCartStore(backend='memory')
+            assert otro.get('rs:99')[0]['item_id'] == '4'
+            assert 'pos_cart' not in session
+            db.engine.dispose()
+
+
+class _CatalogoContado:
+    """Servicio de productos que cuenta consultas"""
+
+    def __init__(self, productos):
+        self.productos = productos
+        self.consultas = 0
+
+    def get_products_by_ids(self, ids):
+        self.consultas += 1
+        return {i: self.productos[i] for i in ids if i in self.productos}
+
+    def get_product(self, item_id):
+        self.consultas += 1
+        return self.productos.get(item_id)
+
+    def get_item_kit(self, item_id):
+        return self.get_product(item_id)
+
+
+def test_validacion_en_lote_una_consulta():
+    servicio = _CatalogoContado({
+        '1': {'item_id': '1', 'name': 'Pisco', 'price': 5000.0, 'active': True, 'is_kit': False},
+        '2': {'item_id': '2', 'name': 'Cerveza', 'price': 3500.0, 'active': True, 'is_kit': False},
+    })
+    carrito = [{'item_id': '1', 'name': 'Pisco', 'price': 5000, 'quantity': 2},
+               {'item_id': '2', 'name': 'Cerveza', 'price': 3000, 'quantity': 1}]
+
+    productos = servicio.get_products_by_ids(['1', '2'])
+    assert validate_inventory_availability(carrito, servicio, productos) == (True, None)
+    valido, error, corregidos = validate_prices_match_api(carrito, servicio, productos)
+    assert not valido and 'Cerveza' in error
+    assert corregidos[1]['price'] == 3500.0
+    assert servicio.consultas == 1
+
+    inactivo = dict(servicio.productos['2'], active=False)
+    valido, error = validate_inventory_availability(carrito, servicio, {'1': productos['1'], '2': inactivo})
+    assert not valido and 'inactivo' in error
+
+
+if __name__ == '__main__':
+    test_carrito_en_memoria_y_en_bd()
+    test_validacion_en_lote_una_consulta()
+    print("✅ Carrito del POS OK")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Prueba del pipeline post-commit (app/helpers/post_commit.py): las tareas se
+escriben en la transacción, solo corren si hubo commit, se deduplican y se
+reintentan con backoff hasta max_attempts. Los canales ordenados (n8n,
+Socket.IO, email) se despachan en orden de creación.
+
+Uso:
+    python -m pytest test_post_commit.py -q
+"""
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from app.models import db
+from app.models.outbox_models import OutboxEvent
+from app.helpers import post_commit
+from app.helpers.post_commit import PostCommitPipeline, enqueue, enqueue_many, task
+
+
+def test_outbox_commit_dedup_y_reintentos():
+    ejecutadas = []
+    fallos = {'restantes': 1}
+
+    @task('prueba.ok')
+    def _ok(payload):
+        ejecutadas.append(payload['n'])
+
+    @task('prueba.falla', max_attempts=2)
+    def _falla(payload):
+        if fallos['restantes']:
+            fallos['restantes'] -= 1
+            raise ConnectionError('n8n caído')
+        ejecutadas.append('recuperada')
+
+    @task('prueba.siempre_falla', max_attempts=1)
+    def _siempre_falla(payload):
+        raise ValueError('sin impresora')
+
+    with tempfile.TemporaryDirectory() as directorio:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directorio, 'outbox.db')}"
+        db.init_app(app)
+        pipeline, post_commit._pipeline = post_commit._pipeline, PostCommitPipeline(workers=0)
+        try:
+            with app.app_context():
+                OutboxEvent.__table__.create(db.engine)
+                motor = post_commit._pipeline
+
+                # Rollback: la tarea no queda
+                enqueue('prueba.ok', {'n': 0}, dedup_key='venta:0')
+                db.session.rollback()
+                assert OutboxEvent.query.count() == 0
+
+                enqueue_many([
+                    ('prueba.ok', {'n': 1}, 'venta:1'),
+                    ('prueba.ok', {'n': 1}, 'venta:1'),
+                    ('prueba.falla', {}, 'venta:2'),
+                    ('prueba.siempre_falla', {}, 'venta:3'),
+                ])
+                db.session.commit()
+                # Dedup dentro del lote y contra la BD
+                assert enqueue('prueba.ok', {'n': 1}, dedup_key='venta:1') is None
+                assert OutboxEvent.query.count() == 3
+
+                assert motor.process_pending() == {'done': 1, 'pending': 1, 'failed': 1}
+                assert ejecutadas == [1]
+                reintento = OutboxEvent.query.filter_by(dedup_key='venta:2').one()
+                assert reintento.attempts == 1 and 'n8n caído' in reintento.last_error
+                assert reintento.available_at > datetime.utcnow()
+
+                # Backoff vencido: se reintenta y se completa
+                reintento.available_at = datetime.utcnow() - timedelta(seconds=1)
+                db.session.commit()
+                assert motor.process_pending() == {'done': 1}
+                assert ejecutadas == [1, 'recuperada']
+                assert OutboxEvent.query.filter_by(status=OutboxEvent.STATUS_FAILED).count() == 1
+
+                # Una tarea completada no se vuelve a ejecutar
+                hecha = OutboxEvent.query.filter_by(dedup_key='venta:1').one()
+                assert motor.process(hecha.id) is None
+                hecha.processed_at = datetime.utcnow() - timedelta(days=10)
+                db.session.commit()
+                assert motor.purge_completed() == 1
+
+                # Lease vencido en el único intento (worker caído): no se vuelve a ejecutar
+                enqueue('prueba.siempre_falla', {}, dedup_key='venta:4')
+                db.session.commit()
+                colgada = OutboxEvent.query.filter_by(dedup_key='venta:4').one()
+                colgada.status = OutboxEvent.STATUS_PROCESSING
+                colgada.attempts = 1
+                colgada.available_at = datetime.utcnow() - timedelta(seconds=1)
+                db.session.commit()
+                assert motor.process(colgada.id) is None
+                assert motor.due_ids(grace=0) == []
+                assert motor.fail_exhausted() == 1
+                assert OutboxEvent.query.filter_by(dedup_key='venta:4').one().status == OutboxEvent.STATUS_FAILED
+                db.engine.dispose()
+        finally:
+            post_commit._pipeline = pipeline
+            for nombre in ('prueba.ok', 'prueba.falla', 'prueba.siempre_falla'):
+                post_commit._handlers.pop(nombre, None)
+
+
+def test_canales_ordenados():
+    entregados = []
+    fallos = {'restantes': 1}
+
+    @task('socketio.prueba')
+    def _emitir(payload):
+        if payload['n'] == 1 and fallos['restantes']:
+            fallos['restantes'] -= 1
+            raise ConnectionError('sin conexión')
+        entregados.append(payload['n'])
+
+    with tempfile.TemporaryDirectory() as directorio:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directorio, 'outbox.db')}"
+        db.init_app(app)
+        pipeline, post_commit._pipeline = post_commit._pipeline, PostCommitPipeline(workers=0)
+        try:
+            with app.app_context():
+                OutboxEvent.__table__.create(db.engine)
+                motor = post_commit._pipeline
+
+                enqueue_many([('socketio.prueba', {'n': n}, None) for n in (1, 2, 3)])
+                db.session.commit()
+                assert motor.due_ids(grace=0) == []
+                assert motor.backlog()['socketio']['pending'] == 3
+
+                # El primero queda en reintento y bloquea a los siguientes
+                assert motor.dispatch_ordered() == {'pending': 1}
+                assert entregados == []
+                OutboxEvent.query.update({'available_at': datetime.utcnow() - timedelta(seconds=1)})
+                db.session.commit()
+                assert motor.dispatch_ordered() == {'done': 3}
+                assert entregados == [1, 2, 3]
+                assert motor.backlog() == {}
+
+                # n8n: el envío asíncrono solo inserta en el outbox (dedup por venta)
+                from app.helpers.n8n_client import send_sale_created
+                send_sale_created(sale_id='7', amount=1000.0, payment_method='Efectivo', register_id=1)
+                send_sale_created(sale_id='7', amount=1000.0, payment_method='Efectivo', register_id=1)
+                db.session.commit()
+                assert OutboxEvent.query.filter_by(topic='n8n.event').count() == 1
+                # Sin N8N_WEBHOOK_URL configurada el evento se descarta sin reintentos
+                assert motor.process_pending() == {'done': 1}
+                db.engine.dispose()
+        finally:
+            post_commit._pipeline = pipeline
+            post_commit._handlers.pop('socketio.prueba', None)
+
+
+if __name__ == '__main__':
+    test_outbox_commit_dedup_y_reintentos()
+    test_canales_ordenados()
+    print("✅ Pipeline post-commit OK")
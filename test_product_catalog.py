@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Prueba del catálogo compartido de PHP POS (app/helpers/product_catalog.py):
+lecturas desde el snapshot (mismos items que la llamada directa a la API que
+reemplaza), refresco en segundo plano al acercarse el TTL, fallos que conservan
+el snapshot y snapshot en disco compartido entre workers.
+
+Uso:
+    python -m pytest test_product_catalog.py -q
+"""
+import sys
+import os
+import tempfile
+import threading
+import time
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.helpers import product_catalog
+from app.helpers.product_catalog import ProductCatalog
+
+
+class ApiFalsa:
+    """Fuente de items con la forma de PHPPosKioskClient.get_items (cuenta llamadas)"""
+
+    def __init__(self, items):
+        self.items = items
+        self.llamadas = 0
+        self.falla = False
+        self.puerta = None  # threading.Event: la llamada espera hasta que se abra
+
+    def get_items(self, limit=1000):
+        self.llamadas += 1
+        if self.puerta is not None:
+            self.puerta.wait(2)
+        if self.falla:
+            raise ConnectionError('PHP POS no responde')
+        return [dict(item) for item in self.items[:limit]]
+
+
+def _esperar(condicion, timeout=2.0):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        if condicion():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_lecturas_iguales_a_la_api_y_sin_llamadas_repetidas():
+    with tempfile.TemporaryDirectory() as directorio:
+        api = ApiFalsa([{'item_id': 1, 'name': 'Pisco Sour', 'unit_price': '5500'},
+                        {'item_id': 2, 'name': 'Mojito', 'unit_price': '6000'}])
+        catalogo = ProductCatalog(ttl=60, snapshot_path=os.path.join(directorio, 'catalogo.json'))
+        fetcher = lambda: api.get_items(limit=1000)
+
+        # Sin snapshot: lista vacía (nunca espera a la API) y un refresco en segundo plano
+        assert catalogo.get_items(fetcher) == []
+        assert _esperar(lambda: catalogo.version == 1)
+        directo = ApiFalsa(api.items).get_items(limit=1000)
+        assert catalogo.get_items(fetcher) == directo
+
+        # Snapshot fresco: muchas lecturas concurrentes, ninguna llamada extra a la API
+        hilos = [threading.Thread(target=lambda: catalogo.get_items(fetcher)) for _ in range(20)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        assert api.llamadas == 1
+        assert catalogo.stats()['items'] == 2
+
+
+def test_refresco_al_vencer_y_fallos_conservan_snapshot():
+    with tempfile.TemporaryDirectory() as directorio:
+        api = ApiFalsa([{'item_id': 1, 'name': 'Pisco Sour'}])
+        catalogo = ProductCatalog(ttl=60, snapshot_path=os.path.join(directorio, 'catalogo.json'))
+        fetcher = lambda: api.get_items()
+        assert catalogo.refresh_now(fetcher)
+
+        # Cerca del TTL: se sirve el snapshot actual y el nuevo llega en segundo plano
+        api.items = [{'item_id': 1, 'name': 'Pisco Sour'}, {'item_id': 3, 'name': 'Gin Tonic'}]
+        catalogo._fetched_at -= 60 * product_catalog.REFRESH_RATIO
+        os.utime(catalogo.snapshot_path, (catalogo._fetched_at, catalogo._fetched_at))
+        api.puerta = threading.Event()
+        assert [i['name'] for i in catalogo.get_items(fetcher)] == ['Pisco Sour']
+        assert catalogo.stats()['refreshing']
+        api.puerta.set()
+        assert _esperar(lambda: catalogo.version == 2)
+        assert [i['name'] for i in catalogo.get_items(fetcher)] == ['Pisco Sour', 'Gin Tonic']
+
+        # La API falla: se mantiene el último snapshot y no se reintenta antes de MIN_RETRY_SECONDS
+        api.falla = True
+        catalogo._fetched_at -= 60
+        os.utime(catalogo.snapshot_path, (catalogo._fetched_at, catalogo._fetched_at))
+        assert not catalogo.refresh_now(fetcher)
+        assert catalogo.stats()['last_error'] == 'PHP POS no responde'
+        assert len(catalogo.get_items(fetcher)) == 2
+        assert catalogo.refresh_async(fetcher) is False
+        llamadas = api.llamadas
+
+        # Respuesta vacía tampoco invalida el snapshot
+        api.falla = False
+        api.items = []
+        catalogo._last_attempt = 0
+        assert not catalogo.refresh_now(fetcher)
+        assert api.llamadas == llamadas + 1
+        assert len(catalogo.get_items()) == 2
+
+
+def test_snapshot_en_disco_compartido_entre_workers():
+    with tempfile.TemporaryDirectory() as directorio:
+        path = os.path.join(directorio, 'catalogo.json')
+        api = ApiFalsa([{'item_id': 7, 'name': 'Michelada'}])
+        worker_a = ProductCatalog(ttl=60, snapshot_path=path)
+        assert worker_a.refresh_now(lambda: api.get_items())
+
+        # Otro worker arranca con el snapshot de disco y no llama a la API
+        worker_b = ProductCatalog(ttl=60, snapshot_path=path)
+        assert worker_b.get_items(lambda: api.get_items()) == [{'item_id': 7, 'name': 'Michelada'}]
+        assert worker_b.version == 1 and api.llamadas == 1
+
+        # Un snapshot más nuevo en disco reemplaza al de memoria en el siguiente refresco
+        api.items = [{'item_id': 8, 'name': 'Caipiriña'}]
+        worker_b._fetched_at -= 60
+        assert worker_b.refresh_now(lambda: api.get_items())
+        assert worker_a.refresh_now(lambda: api.get_items())
+        assert worker_a.get_items() == [{'item_id': 8, 'name': 'Caipiriña'}]
+        assert api.llamadas == 2
+
+
+if __name__ == '__main__':
+    test_lecturas_iguales_a_la_api_y_sin_llamadas_repetidas()
+    test_refresco_al_vencer_y_fallos_conservan_snapshot()
+    test_snapshot_en_disco_compartido_entre_workers()
+    print("✅ Catálogo de productos OK")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Prueba de la info pública materializada (app/helpers/public_event_snapshots.py):
+se regenera al cambiar un evento, se sirve desde memoria y responde 304 con ETag.
+
+Uso:
+    python -m pytest test_public_event_snapshots.py -q
+"""
+import sys
+import os
+import tempfile
+from datetime import date, timedelta
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from sqlalchemy import event
+
+from app.models import db
+from app.models.outbox_models import OutboxEvent
+from app.models.programacion_models import ProgramacionEvento, ProgramacionPublicSnapshot
+from app.application.services.programacion_service import ProgramacionService
+from app.helpers import post_commit, public_event_snapshots
+from app.helpers.post_commit import PostCommitPipeline
+from app.helpers.public_event_snapshots import (
+    PublicEventSnapshots, fecha_key, hoy, month_key, public_json_response, upcoming_key
+)
+
+
+def test_snapshots_publicos():
+    with tempfile.TemporaryDirectory() as directorio:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directorio, 'programacion.db')}"
+        db.init_app(app)
+        pipeline, post_commit._pipeline = post_commit._pipeline, PostCommitPipeline(workers=0)
+        snapshots, public_event_snapshots._snapshots = public_event_snapshots._snapshots, PublicEventSnapshots()
+        try:
+            with app.app_context():
+                for modelo in (ProgramacionEvento, ProgramacionPublicSnapshot, OutboxEvent):
+                    modelo.__table__.create(db.engine)
+                motor = public_event_snapshots._snapshots
+                service = ProgramacionService()
+                evento = service.crear_evento({
+                    'fecha': hoy(), 'nombre_evento': 'Noche Techno', 'estado_publico': 'publicado'
+                }, creado_por='admin')
+
+                # El cambio encola la regeneración; la tarea materializa hoy, mes y próximos
+                assert post_commit._pipeline.process_pending() == {'done': 1}
+                claves = {s.key for s in ProgramacionPublicSnapshot.query.all()}
+                assert claves == {fecha_key(hoy()), month_key(hoy().year, hoy().month), upcoming_key()}
+
+                consultas = []
+                event.listen(db.engine, 'before_cursor_execute', lambda *args: consultas.append(args[2]))
+                snapshot = motor.get(fecha_key(hoy()))
+                assert snapshot['payload']['nombre_evento'] == 'Noche Techno'
+                assert motor.get(upcoming_key())['payload'][0]['nombre_evento'] == 'Noche Techno'
+                assert consultas == []
+
+                with app.test_request_context(headers={'If-None-Match': f'"{snapshot["etag"]}"'}):
+                    respuesta = public_json_response(snapshot, {'event': snapshot['payload']})
+                    assert respuesta.status_code == 304
+                with app.test_request_context():
+                    respuesta = public_json_response(snapshot, {'event': snapshot['payload']})
+                    assert respuesta.status_code == 200
+                    assert respuesta.headers['ETag'] == f'"{snapshot["etag"]}"'
+                    assert 'public' in respuesta.headers['Cache-Control']
+                    assert respuesta.headers['Last-Modified']
+
+                # Editar cambia el ETag; regenerar sin cambios no lo toca
+                service.actualizar_evento(evento.id, {'nombre_evento': 'Noche House'}, actualizado_por='admin')
+                assert post_commit._pipeline.process_pending() == {'done': 1}
+                nuevo = motor.get(fecha_key(hoy()))
+                assert nuevo['payload']['nombre_evento'] == 'Noche House'
+                assert nuevo['etag'] != snapshot['etag']
+                assert motor.refresh([fecha_key(hoy())]) == 0
+
+                # Otro proceso (sin copia en memoria) lee el snapshot sin recalcular
+                otro = PublicEventSnapshots(local_ttl=0)
+                assert otro.get(fecha_key(hoy()))['etag'] == nuevo['etag']
+
+                # Fechas fuera de la ventana se calculan sin escribir en la BD
+                total = ProgramacionPublicSnapshot.query.count()
+                assert motor.get(fecha_key(date(1999, 1, 1)))['payload'] is None
+                assert motor.get(month_key(2999, 12))['payload'] == []
+                assert ProgramacionPublicSnapshot.query.count() == total
+
+                # Los 'próximos eventos' de días anteriores se purgan
+                db.session.add(ProgramacionPublicSnapshot(
+                    key=upcoming_key(hoy() - timedelta(days=1)), payload_json='[]', etag='viejo'
+                ))
+                db.session.commit()
+                assert motor.purge_stale() == 1
+                assert ProgramacionPublicSnapshot.query.count() == total
+                db.engine.dispose()
+        finally:
+            post_commit._pipeline = pipeline
+            public_event_snapshots._snapshots = snapshots
+
+
+if __name__ == '__main__':
+    test_snapshots_publicos()
+    print("✅ Info pública materializada OK")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Prueba del ruteo de lecturas a réplica (app/helpers/read_replica.py):
+lecturas marcadas a la réplica, read-your-writes y fallback a la primaria.
+
+Uso:
+    python -m pytest test_read_replica.py -q
+"""
+import sys
+import os
+import sqlite3
+import tempfile
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from sqlalchemy import text
+
+from app.models import db
+from app.helpers import read_replica
+from app.helpers.read_replica import read_only, check_replica
+
+
+def _crear_base(ruta, valor):
+    conn = sqlite3.connect(ruta)
+    conn.execute('CREATE TABLE prueba (valor TEXT)')
+    conn.execute('INSERT INTO prueba VALUES (?)', (valor,))
+    conn.commit()
+    conn.close()
+
+
+def _app(directorio, con_tabla_en_replica=True):
+    primaria = os.path.join(directorio, 'primaria.db')
+    replica = os.path.join(directorio, 'replica.db')
+    _crear_base(primaria, 'primaria')
+    if con_tabla_en_replica:
+        _crear_base(replica, 'replica')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{primaria}'
+    app.config['SQLALCHEMY_BINDS'] = {'replica': f'sqlite:///{replica}'}
+    db.init_app(app)
+    return app
+
+
+@read_only
+def _leer():
+    return db.session.execute(text('SELECT valor FROM prueba')).scalar()
+
+
+@read_only
+def _leer_capturando_errores():
+    # Como los servicios de dashboard: capturan el error y retornan vacío
+    try:
+        return db.session.execute(text('SELECT valor FROM prueba')).scalar()
+    except Exception:
+        db.session.rollback()
+        return None
+
+
+def test_lecturas_marcadas_van_a_la_replica():
+    disponible = read_replica.replica_available
+    read_replica.replica_available = lambda: True
+    try:
+        with tempfile.TemporaryDirectory() as directorio:
+            app = _app(directorio)
+            with app.app_context():
+                assert check_replica()['status'] == 'healthy'
+                assert _leer() == 'replica'
+                assert db.session.execute(text('SELECT valor FROM prueba')).scalar() == 'primaria'
+                db.session.remove()
+
+            with app.app_context():
+                # Después de escribir, la misma sesión lee de la primaria (read-your-writes)
+                db.session.execute(text("INSERT INTO prueba VALUES ('nueva')"))
+                assert db.session.info.get('has_writes') is True
+                assert _leer() == 'primaria'
+                db.session.rollback()
+                db.session.remove()
+                for engine in db.engines.values():
+                    engine.dispose()
+    finally:
+        read_replica.replica_available = disponible
+
+
+def test_fallback_a_primaria_si_la_replica_falla():
+    disponible = read_replica.replica_available
+    read_replica.replica_available = lambda: True
+    read_replica._state['failed_until'] = 0.0
+    try:
+        with tempfile.TemporaryDirectory() as directorio:
+            app = _app(directorio, con_tabla_en_replica=False)
+            with app.app_context():
+                assert _leer() == 'primaria'
+                assert read_replica._state['failed_until'] > 0
+                db.session.remove()
+
+            # El método captura la excepción: igual se detecta y se reintenta en la primaria
+            read_replica._state['failed_until'] = 0.0
+            with app.app_context():
+                assert _leer_capturando_errores() == 'primaria'
+                assert read_replica._state['failed_until'] > 0
+                db.session.remove()
+                for engine in db.engines.values():
+                    engine.dispose()
+    finally:
+        read_replica.replica_available = disponible
+        read_replica._state['failed_until'] = 0.0
+
+
+if __name__ == '__main__':
+    test_lecturas_marcadas_van_a_la_replica()
+    test_fallback_a_primaria_si_la_replica_falla()
+    print("✅ Réplica de lectura OK")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Prueba de RegisterSessionService.get_sales_totals: una sola query agrupada
+con los totales del resumen de caja, la selección de caja y el cierre.
+
+Uso:
+    python -m pytest test_register_sales_totals.py -q
+"""
+import sys
+import os
+import tempfile
+from datetime import datetime
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from sqlalchemy import event
+
+from app.models import db, PosSale
+from app.helpers.register_session_service import RegisterSessionService
+
+
+def _venta(total, cash=0, debit=0, credit=0, provider=None, employee=('7', 'Ana'), created_at=None, **flags):
+    return PosSale(
+        total_amount=total, payment_type='mixto', payment_cash=cash, payment_debit=debit, payment_credit=credit,
+        employee_id=employee[0], employee_name=employee[1], register_id='3', register_name='Caja 3',
+        shift_date='2026-10-18', jornada_id=1, payment_provider=provider,
+        created_at=created_at or datetime(2026, 10, 18, 23, 0), **flags
+    )
+
+
+def test_totales_en_una_query():
+    with tempfile.TemporaryDirectory() as directorio:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directorio, 'ventas.db')}"
+        db.init_app(app)
+        with app.app_context():
+            PosSale.__table__.create(db.engine)
+            db.session.add_all([
+                _venta(5000, cash=5000),
+                _venta(8000, debit=8000, provider='GETNET'),
+                _venta(6000, credit=6000, provider='KLAP', created_at=datetime(2026, 10, 18, 20, 0)),
+                _venta(0, is_courtesy=True),
+                _venta(3000, cash=3000, no_revenue=True, employee=('9', 'Beto')),
+                _venta(9000, cash=9000, is_test=True, employee=('1', 'TEST AGENT')),
+                _venta(4000, cash=4000, is_cancelled=True, employee=('9', 'Beto')),
+            ])
+            db.session.commit()
+
+            consultas = []
+            event.listen(db.engine, 'before_cursor_execute', lambda *args: consultas.append(args[2]))
+            totals = RegisterSessionService.get_sales_totals('3', '2026-10-18')
+            assert len(consultas) == 1
+
+            # Cierre: sin canceladas ni no_revenue (cortesías y pruebas cuentan como ticket)
+            revenue = totals['revenue']
+            assert revenue['count'] == 5
+            assert (revenue['cash'], revenue['debit'], revenue['credit']) == (14000.0, 8000.0, 6000.0)
+            assert revenue['by_provider'] == {'NONE': 14000.0, 'GETNET': 8000.0, 'KLAP': 6000.0}
+            assert revenue['count_by_provider'] == {'NONE': 3, 'GETNET': 1, 'KLAP': 1}
+
+            # Resumen del cajero: además sin cortesías ni pruebas
+            billable = totals['billable']
+            assert billable['count'] == 3 and billable['total'] == 19000.0
+
+            # Selección de caja: sin pruebas, incluye no_revenue
+            assert totals['non_test'] == {'count': 5, 'total': 22000.0}
+            assert {e['employee_id']: e['count'] for e in totals['employees']} == {'7': 4, '9': 1}
+
+            # Ventana de la sesión (desde la apertura)
+            since = RegisterSessionService.get_sales_totals('3', '2026-10-18', since=datetime(2026, 10, 18, 22, 0))
+            assert since['revenue']['count'] == 4 and 'KLAP' not in since['revenue']['by_provider']
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    test_totales_en_una_query()
+    print("✅ Totales de caja OK")
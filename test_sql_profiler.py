@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Prueba del profiler SQL por request (app/helpers/sql_profiler.py): conteo de
+queries y tiempo de BD por endpoint, huellas normalizadas y detección de N+1.
+
+Uso:
+    python -m pytest test_sql_profiler.py -q
+"""
+import sys
+import os
+import tempfile
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, jsonify
+from sqlalchemy import text
+
+from app.models import db
+from app.helpers.sql_profiler import fingerprint, get_sql_profiler_store, init_sql_profiler, N1_THRESHOLD
+
+
+def _app(directorio, sample_rate):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directorio, 'profiler.db')}"
+    db.init_app(app)
+    with app.app_context():
+        db.session.execute(text('CREATE TABLE productos (id INTEGER PRIMARY KEY, nombre TEXT)'))
+        db.session.execute(text("INSERT INTO productos VALUES (1, 'Pisco'), (2, 'Ron'), (3, 'Gin')"))
+        db.session.commit()
+
+    @app.route('/lista')
+    def lista():
+        ids = [row[0] for row in db.session.execute(text('SELECT id FROM productos'))]
+        # N+1: una query por producto, repetida hasta superar el umbral
+        nombres = [db.session.execute(text('SELECT nombre FROM productos WHERE id = :id'), {'id': ids[i % len(ids)]}).scalar()
+                   for i in range(N1_THRESHOLD + 1)]
+        return jsonify(nombres)
+
+    @app.route('/detalle')
+    def detalle():
+        return jsonify(db.session.execute(text("SELECT nombre FROM productos WHERE nombre = 'Pisco'")).scalar())
+
+    assert init_sql_profiler(app, enabled=True, sample_rate=sample_rate)
+    return app
+
+
+def test_huella_normaliza_literales_y_listas_in():
+    assert fingerprint("SELECT * FROM t WHERE id = 42 AND nombre = 'ana'") == 'SELECT * FROM t WHERE id = ? AND nombre = ?'
+    assert fingerprint('SELECT * FROM t WHERE id IN (?, ?, ?)') == fingerprint('SELECT * FROM t WHERE id IN (?)')
+
+
+def test_conteos_y_tiempos_por_endpoint():
+    with tempfile.TemporaryDirectory() as directorio:
+        app = _app(directorio, sample_rate=1.0)
+        store = get_sql_profiler_store()
+        store.reset()
+        cliente = app.test_client()
+        for _ in range(2):
+            assert cliente.get('/lista').status_code == 200
+        assert cliente.get('/detalle').status_code == 200
+
+        with app.app_context():
+            reporte = store.report()
+            endpoints = {e['endpoint']: e for e in reporte['endpoints']}
+            assert reporte['enabled'] and reporte['pid'] == os.getpid()
+
+            lista = endpoints['lista']
+            assert lista['requests'] == 2
+            assert lista['avg_queries'] == N1_THRESHOLD + 2 and lista['max_queries'] == N1_THRESHOLD + 2
+            assert lista['avg_db_ms'] > 0
+            assert lista['flagged_requests'] == 2
+            [sospechosa] = lista['n_plus_one']
+            assert sospechosa['fingerprint'] == 'SELECT nombre FROM productos WHERE id = ?'
+            assert sospechosa['hits'] == 2 and sospechosa['max_repeat'] == N1_THRESHOLD + 1
+
+            detalle = endpoints['detalle']
+            assert detalle['requests'] == 1 and detalle['avg_queries'] == 1
+            assert detalle['flagged_requests'] == 0 and detalle['n_plus_one'] == []
+            assert [r['endpoint'] for r in reporte['recent_flagged']] == ['lista', 'lista']
+            db.engine.dispose()
+
+
+def test_sin_muestreo_no_registra():
+    with tempfile.TemporaryDirectory() as directorio:
+        app = _app(directorio, sample_rate=0.0)
+        store = get_sql_profiler_store()
+        store.reset()
+        assert app.test_client().get('/lista').status_code == 200
+        with app.app_context():
+            assert store.report()['endpoints'] == []
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    test_huella_normaliza_literales_y_listas_in()
+    test_conteos_y_tiempos_por_endpoint()
+    test_sin_muestreo_no_registra()
+    print("✅ Profiler SQL OK")
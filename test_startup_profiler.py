@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Prueba del profiler de arranque y de los módulos diferidos
+(app/helpers/startup_profiler.py)
+
+Uso:
+    python -m pytest test_startup_profiler.py -q
+"""
+import sys
+import os
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from app.helpers.startup_profiler import StartupProfiler, lazy_module, deferred_subsystems
+
+
+def test_modulo_diferido_se_importa_al_primer_uso():
+    sys.modules.pop('colorsys', None)
+    colorsys = lazy_module('colorsys', 'Prueba')
+    assert 'colorsys' not in sys.modules
+    assert 'diferido' in repr(colorsys)
+
+    assert colorsys.rgb_to_hsv(1, 0, 0) == (0.0, 1.0, 1)
+    assert 'colorsys' in sys.modules
+    info = next(d for d in deferred_subsystems() if d['module'] == 'colorsys')
+    assert info['loaded'] and info['load_seconds'] is not None
+    assert info['subsystems'] == ['Prueba']
+
+
+def test_etapas_y_reporte():
+    app = Flask(__name__)
+    profiler = StartupProfiler()
+    profiler.lap('config')
+    import fractions  # noqa: F401
+    profiler.lap('imports')
+    reporte = profiler.finish(app)
+
+    assert app.extensions['startup_profile'] is profiler
+    assert {p['phase'] for p in reporte['phases']} == {'config', 'imports'}
+    assert reporte['total_seconds'] >= sum(p['seconds'] for p in reporte['phases']) - 0.001
+    assert reporte['phases'][0]['seconds'] >= reporte['phases'][-1]['seconds']
+
+
+if __name__ == '__main__':
+    test_modulo_diferido_se_importa_al_primer_uso()
+    test_etapas_y_reporte()
+    print("✅ Profiler de arranque OK")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Prueba del motor de alertas de stock (app/helpers/stock_alerts.py):
+una query para todos los pares, estado guardado y notificación solo al cambiar.
+
+Uso:
+    python -m pytest test_stock_alerts.py -q
+"""
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from sqlalchemy import event
+
+from app.models import db
+from app.models.inventory_stock_models import Ingredient, IngredientStock, InventoryMovement, StockAlertState
+from app.helpers import stock_alerts
+from app.helpers.stock_alerts import StockAlertEngine, compute_stock_levels
+
+
+def test_alertas_por_cambio_de_estado():
+    with tempfile.TemporaryDirectory() as directorio:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directorio, 'stock.db')}"
+        db.init_app(app)
+        with app.app_context():
+            for modelo in (Ingredient, IngredientStock, InventoryMovement, StockAlertState):
+                modelo.__table__.create(db.engine)
+            ron = Ingredient(name='Ron', base_unit='ml')
+            pisco = Ingredient(name='Pisco', base_unit='ml')
+            db.session.add_all([ron, pisco])
+            db.session.flush()
+            ahora = datetime.utcnow()
+            db.session.add_all([
+                IngredientStock(ingredient_id=ron.id, location='Barra Pista', quantity=5000),
+                IngredientStock(ingredient_id=ron.id, location='Terraza', quantity=50),
+                IngredientStock(ingredient_id=pisco.id, location='Barra Pista', quantity=1500),
+                # 7 días × 14.000 ml de consumo -> umbral 1.400 ml
+                InventoryMovement(ingredient_id=pisco.id, location='Barra Pista', movement_type='venta',
+                                  quantity=-98000, created_at=ahora - timedelta(days=1)),
+                InventoryMovement(ingredient_id=pisco.id, location='Barra Pista', movement_type='venta',
+                                  quantity=-50000, created_at=ahora - timedelta(days=30)),
+            ])
+            db.session.commit()
+
+            consultas = []
+            event.listen(db.engine, 'before_cursor_execute', lambda *args: consultas.append(args[2]))
+            niveles = {(n['ingredient_id'], n['location']): n for n in compute_stock_levels(now=ahora)}
+            assert len(consultas) == 1
+            assert niveles[(pisco.id, 'Barra Pista')]['low_threshold'] == 1400.0
+            assert niveles[(pisco.id, 'Barra Pista')]['state'] == 'ok'
+            assert niveles[(ron.id, 'Terraza')]['state'] == 'low'
+
+            notificados = []
+            motor = StockAlertEngine()
+            motor._notify = lambda cambios: notificados.extend(cambios) or len(cambios)
+            habilitado, stock_alerts.STOCK_ALERTS_ENABLED = stock_alerts.STOCK_ALERTS_ENABLED, False
+            try:
+                _evaluar(motor, notificados, pisco)
+            finally:
+                stock_alerts.STOCK_ALERTS_ENABLED = habilitado
+            db.engine.dispose()
+
+
+def _evaluar(motor, notificados, pisco):
+    assert motor.evaluate()['changes'] == 1
+    assert [c[0]['location'] for c in notificados] == ['Terraza']
+
+    # Sin cambios: no se vuelve a notificar
+    notificados.clear()
+    assert motor.evaluate()['changes'] == 0 and notificados == []
+
+    # Pisco baja del umbral: solo ese cambio
+    IngredientStock.query.filter_by(ingredient_id=pisco.id).update({'quantity': 1000})
+    db.session.commit()
+    motor.evaluate()
+    assert [(c[0]['ingredient_name'], c[1]) for c in notificados] == [('Pisco', 'ok')]
+
+    alerts = motor.get_alerts(location='Barra Pista')
+    assert [(a['ingredient_name'], a['type']) for a in alerts] == [('Pisco', 'low')]
+    assert alerts[0]['since']
+    assert len(motor.get_alerts()) == 2
+
+    # Snapshot vencido: se sirve tal cual y la evaluación queda en segundo plano
+    refrescos = []
+    motor.refresh_in_background = lambda: refrescos.append(True)
+    notificados.clear()
+    StockAlertState.query.update({'evaluated_at': datetime.utcnow() - timedelta(days=1)})
+    IngredientStock.query.filter_by(ingredient_id=pisco.id).update({'quantity': 5000})
+    db.session.commit()
+    assert [a['ingredient_name'] for a in motor.get_alerts(location='Barra Pista')] == ['Pisco']
+    assert refrescos == [True] and notificados == []
+
+    # Sin snapshot: alertas calculadas en memoria, sin escribir estados
+    StockAlertState.query.delete()
+    db.session.commit()
+    assert [(a['location'], a['type']) for a in motor.get_alerts()] == [('Terraza', 'low')]
+    assert StockAlertState.query.count() == 0 and notificados == []
+
+
+if __name__ == '__main__':
+    test_alertas_por_cambio_de_estado()
+    print("✅ Alertas de stock OK")
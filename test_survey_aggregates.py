@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Prueba de los agregados incrementales de encuestas (survey_aggregates):
+conteos por barra/hora al guardar, reconstrucción e importación del CSV heredado.
+
+Uso:
+    python -m pytest test_survey_aggregates.py -q
+"""
+import sys
+import os
+import tempfile
+from datetime import date, datetime
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from app.models import db
+from app.models.survey_models import SurveyAggregate, SurveyResponse, SurveySession
+from app.domain.survey import SurveyResponse as DomainSurveyResponse
+from app.infrastructure.repositories.sql_survey_repository import SqlSurveyRepository
+from app.application.services.survey_service import SurveyService
+
+
+def _app(directorio):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directorio, 'encuestas.db')}"
+    db.init_app(app)
+    with app.app_context():
+        for model in (SurveyResponse, SurveySession, SurveyAggregate):
+            model.__table__.create(db.engine)
+    return app
+
+
+def _respuesta(barra, rating, timestamp, comment=''):
+    return DomainSurveyResponse(barra=barra, rating=rating, timestamp=timestamp,
+                                comment=comment, fecha_sesion='2026-10-18')
+
+
+def _resumen(celdas):
+    return sorted((c['barra'], c['hora'], c['total'], c['sum_rating'],
+                   tuple(sorted(c['ratings'].items()))) for c in celdas)
+
+
+def test_agregados_incrementales_y_reconstruccion():
+    with tempfile.TemporaryDirectory() as directorio:
+        app = _app(directorio)
+        with app.app_context():
+            repo = SqlSurveyRepository()
+            for barra, rating, ts in [('1', 5, '2026-10-18 23:10:00'), ('1', 3, '2026-10-18 23:40:00'),
+                                      ('2', 1, '2026-10-18 23:55:00'), ('1', 5, '2026-10-19 01:05:00')]:
+                assert repo.save_response(_respuesta(barra, rating, ts))
+
+            celdas = repo.find_session_aggregates('2026-10-18')
+            assert len(celdas) == 3  # (1, 23), (2, 23), (1, 1)
+            incremental = _resumen(celdas)
+
+            # El GROUP BY sobre survey_responses da lo mismo que los incrementos
+            repo.rebuild_session_aggregates('2026-10-18')
+            assert _resumen(repo.find_session_aggregates('2026-10-18')) == incremental
+
+            service = SurveyService(survey_repository=repo, shift_repository=object(), shift_service=object())
+            recientes = repo.find_recent_responses('2026-10-18', limit=2)
+            stats = service._build_results(celdas, recientes, None, '2026-10-18')
+            assert stats['total'] == 4 and stats['average_rating'] == 3.5
+            assert stats['ratings_count'] == {5: 2, 3: 1, 1: 1}
+            assert stats['by_barra'] == {'1': 3, '2': 1}
+            assert stats['average_by_barra'] == {'1': 4.33, '2': 1.0}
+            assert stats['by_hour'] == {23: 3, 1: 1}
+            assert [r['timestamp'] for r in stats['recent_responses']] == ['2026-10-18 23:55:00', '2026-10-19 01:05:00']
+            db.engine.dispose()
+
+
+def test_sesion_sin_agregados_se_reconstruye():
+    with tempfile.TemporaryDirectory() as directorio:
+        app = _app(directorio)
+        with app.app_context():
+            # Respuestas previas a la tabla de agregados: están en survey_responses, sin filas agregadas
+            db.session.add_all([
+                SurveyResponse(timestamp=datetime(2026, 10, 18, 22, 30), barra='1', rating=4,
+                               fecha_sesion=date(2026, 10, 18)),
+                SurveyResponse(timestamp=datetime(2026, 10, 18, 23, 15), barra='1', rating=2,
+                               fecha_sesion=date(2026, 10, 18)),
+            ])
+            db.session.commit()
+            repo = SqlSurveyRepository()
+            assert SurveyAggregate.query.count() == 0
+
+            celdas = repo.find_session_aggregates('2026-10-18')
+            assert {(c['hora'], c['total'], c['sum_rating']) for c in celdas} == {(22, 1, 4), (23, 1, 2)}
+            assert SurveyAggregate.query.count() == 2
+
+            # Con filas ya presentes la lectura no vuelve a recorrer survey_responses
+            db.session.add(SurveyResponse(timestamp=datetime(2026, 10, 18, 23, 50), barra='1', rating=5,
+                                          fecha_sesion=date(2026, 10, 18)))
+            db.session.commit()
+            assert sum(c['total'] for c in repo.find_session_aggregates('2026-10-18')) == 2
+            assert repo.find_session_aggregates('2026-10-20') == []
+            db.engine.dispose()
+
+
+def test_importacion_unica_del_csv():
+    with tempfile.TemporaryDirectory() as directorio:
+        app = _app(directorio)
+        csv_path = os.path.join(directorio, 'survey_responses.csv')
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write('timestamp,barra,rating,comment,fiesta_nombre,djs,bartender_nombre,fecha_sesion\n')
+            f.write('2026-10-11 22:00:00,1,5,genial,Fiesta,DJ,Ana,2026-10-11\n')
+            f.write('2026-10-12 02:30:00,2,2,,Fiesta,DJ,Ana,\n')
+            f.write('sin-fecha,1,5,,,,,\n')
+        with app.app_context():
+            repo = SqlSurveyRepository()
+            assert repo.import_legacy_csv(csv_path) == {'imported': 2, 'skipped': 0, 'invalid': 1, 'sessions': 1}
+            assert repo.import_legacy_csv(csv_path)['skipped'] == 2
+            assert SurveyResponse.query.count() == 2
+
+            celdas = repo.find_session_aggregates('2026-10-11')
+            assert sum(c['total'] for c in celdas) == 2
+            assert {c['hora'] for c in celdas} == {22, 2}
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    test_agregados_incrementales_y_reconstruccion()
+    test_sesion_sin_agregados_se_reconstruye()
+    test_importacion_unica_del_csv()
+    print("✅ Agregados de encuestas OK")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Prueba de la sincronización en streaming producción → local
+(app/helpers/sync_service.sync_table): upsert por chunks y modo incremental
+por marca de agua.
+
+Uso:
+    python -m pytest test_sync_service.py -q
+"""
+import sys
+import os
+import sqlite3
+import tempfile
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, text
+
+from app.helpers.sync_service import sync_table, get_watermark
+
+SCHEMA = 'CREATE TABLE notifications (id INTEGER PRIMARY KEY, title TEXT, updated_at TEXT)'
+TABLE = {'name': 'notifications', 'order_by': 'id'}
+
+
+def _crear_bases(directorio, filas):
+    prod_engine = create_engine(f"sqlite:///{os.path.join(directorio, 'prod.db')}")
+    with prod_engine.begin() as conn:
+        conn.execute(text(SCHEMA))
+        conn.execute(
+            text('INSERT INTO notifications (id, title, updated_at) VALUES (:id, :title, :updated_at)'),
+            [{'id': i, 'title': f'n{i}', 'updated_at': f'2025-01-01 00:{i // 60:02d}:{i % 60:02d}'}
+             for i in range(1, filas + 1)]
+        )
+    local_conn = sqlite3.connect(os.path.join(directorio, 'local.db'))
+    local_conn.execute(SCHEMA)
+    local_conn.execute("INSERT INTO notifications VALUES (1, 'viejo', '2024-01-01 00:00:00')")
+    local_conn.commit()
+    return prod_engine, local_conn
+
+
+def test_sincronizacion_completa_por_chunks():
+    with tempfile.TemporaryDirectory() as directorio:
+        prod_engine, local_conn = _crear_bases(directorio, 250)
+        progreso = []
+        with prod_engine.connect() as prod_conn:
+            resultado = sync_table(prod_conn, local_conn, TABLE,
+                                   lambda t, estado, p: progreso.append((estado, p)), full=True, chunk_size=100)
+
+        assert resultado['status'] == 'success'
+        assert resultado['chunks'] == 3
+        assert resultado['inserted'] == 249
+        assert resultado['updated'] == 1
+        assert resultado['local_after'] == 250
+        assert local_conn.execute('SELECT title FROM notifications WHERE id = 1').fetchone()[0] == 'n1'
+        assert progreso[0][0] == 'iniciando' and progreso[-1] == ('completado', 100)
+        assert get_watermark(local_conn.cursor(), 'notifications', 'updated_at') == '2025-01-01 00:04:10'
+        local_conn.close()
+
+
+def test_sincronizacion_incremental_solo_trae_cambios():
+    with tempfile.TemporaryDirectory() as directorio:
+        prod_engine, local_conn = _crear_bases(directorio, 50)
+        with prod_engine.connect() as prod_conn:
+            sync_table(prod_conn, local_conn, TABLE, chunk_size=20)
+
+        with prod_engine.begin() as conn:
+            conn.execute(text("UPDATE notifications SET title = 'editado', updated_at = '2025-02-01 00:00:00' WHERE id = 7"))
+            conn.execute(text("INSERT INTO notifications VALUES (51, 'nuevo', '2025-02-01 00:00:01')"))
+
+        with prod_engine.connect() as prod_conn:
+            resultado = sync_table(prod_conn, local_conn, TABLE, chunk_size=20)
+
+        assert resultado['mode'] == 'incremental'
+        assert resultado['total'] == 3  # fila en el borde de la marca + editada + nueva
+        assert resultado['inserted'] == 1
+        assert local_conn.execute('SELECT title FROM notifications WHERE id = 7').fetchone()[0] == 'editado'
+        assert local_conn.execute('SELECT COUNT(*) FROM notifications').fetchone()[0] == 51
+        local_conn.close()
+
+
+def test_tabla_sin_updated_at_se_sincroniza_completa():
+    with tempfile.TemporaryDirectory() as directorio:
+        prod_engine = create_engine(f"sqlite:///{os.path.join(directorio, 'prod.db')}")
+        esquema = 'CREATE TABLE categorias (id INTEGER PRIMARY KEY, nombre TEXT)'
+        with prod_engine.begin() as conn:
+            conn.execute(text(esquema))
+            conn.execute(text("INSERT INTO categorias VALUES (1, 'a'), (2, 'b')"))
+        local_conn = sqlite3.connect(os.path.join(directorio, 'local.db'))
+        local_conn.execute(esquema)
+        tabla = {'name': 'categorias', 'order_by': 'id'}
+        with prod_engine.connect() as prod_conn:
+            sync_table(prod_conn, local_conn, tabla)
+
+        with prod_engine.begin() as conn:
+            conn.execute(text("UPDATE categorias SET nombre = 'editada' WHERE id = 1"))
+
+        with prod_engine.connect() as prod_conn:
+            resultado = sync_table(prod_conn, local_conn, tabla, chunk_size=5000)
+
+        assert resultado['mode'] == 'full'
+        assert resultado['total'] == 2
+        assert local_conn.execute('SELECT nombre FROM categorias WHERE id = 1').fetchone()[0] == 'editada'
+        local_conn.close()
+
+
+if __name__ == '__main__':
+    test_sincronizacion_completa_por_chunks()
+    test_sincronizacion_incremental_solo_trae_cambios()
+    test_tabla_sin_updated_at_se_sincroniza_completa()
+    print("✅ Sincronización OK")